@@ -3,7 +3,7 @@
 import eventlet
 eventlet.monkey_patch()
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response
 import os
 # from gevent import monkey
 # monkey.patch_all()
@@ -17,6 +17,8 @@ import uuid
 import logging
 import hashlib
 import secrets
+import base64
+import gzip
 import json
 import threading
 import importlib.util
@@ -26,6 +28,59 @@ import time
 import traceback
 import sentry_sdk
 
+# Make the shared src package importable when started as `python api/app.py`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Optional pipeline tracing and metrics (requires Redis)
+try:
+    from src.core.tracing import get_tracer, TraceStage
+    from src.core.metrics import get_metrics, render_metrics, PROMETHEUS_CONTENT_TYPE
+    INSTRUMENTATION_AVAILABLE = True
+except ImportError:
+    INSTRUMENTATION_AVAILABLE = False
+
+# Optional response/session caches (Redis layer is best-effort)
+try:
+    from src.core.cache import TwoLevelCache, RedisCache, ResponseCache, invalidate_datasets
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
+
+# Optional in-memory company search index
+try:
+    from src.services.company_search import CompanySearchIndex, calculate_rank as calculate_company_rank
+    COMPANY_SEARCH_AVAILABLE = True
+except ImportError:
+    COMPANY_SEARCH_AVAILABLE = False
+
+# Optional Redis latest-close snapshot for price-diff calculations
+try:
+    from src.services.price_snapshot import get_latest_prices
+    PRICE_SNAPSHOT_AVAILABLE = True
+except ImportError:
+    PRICE_SNAPSHOT_AVAILABLE = False
+
+# Optional cached per-ISIN price series with chart downsampling
+try:
+    from src.services.price_series import get_price_series, downsample, INTERVALS as PRICE_INTERVALS
+    PRICE_SERIES_AVAILABLE = True
+except ImportError:
+    PRICE_SERIES_AVAILABLE = False
+
+# Optional Redis reverse watchlist index for announcement fan-out
+try:
+    from src.services.watchlist_index import get_watchlist_index
+    WATCHLIST_INDEX_AVAILABLE = True
+except ImportError:
+    WATCHLIST_INDEX_AVAILABLE = False
+
+# Announcement payload validation and watchlist fan-out, shared with the
+# workers' message-queue publisher (its own optional dependencies are guarded)
+from src.services.announcement_publisher import (
+    SOCKETIO_MESSAGE_QUEUE, SOCKETIO_CHANNEL, ANNOUNCEMENT_EVENT, BROADCAST_ROOM, USER_ROOM_PREFIX,
+    build_broadcast_payload, queue_watchlist_notifications, watchlist_rooms, is_scoped_room, announcement_rooms
+)
+
 sentry_sdk.init(
     dsn="https://fcc432c252a02d793e113eed465d186a@o4509842731565056.ingest.us.sentry.io/4509842732810240",
     # Add data like request headers and IP for users,
@@ -43,8 +98,9 @@ sentry_sdk.init(
 )
 
 # Configure logging
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
 logging.basicConfig(
-    level=logging.INFO,
+    level=getattr(logging, LOG_LEVEL, logging.INFO),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.StreamHandler(sys.stdout)
@@ -64,17 +120,31 @@ CORS(app, resources={
         "allow_headers": "*"
     }
 }, supports_credentials=True)
-# Initialize Socket.IO with the Flask app
+# Socket.IO / Engine.IO logging is per frame, so keep it quiet unless asked for
+SOCKETIO_LOG_LEVEL = os.getenv('SOCKETIO_LOG_LEVEL', 'WARNING').upper()
+ENGINEIO_LOG_LEVEL = os.getenv('ENGINEIO_LOG_LEVEL', 'WARNING').upper()
+socketio_logger = logging.getLogger('socketio')
+socketio_logger.setLevel(getattr(logging, SOCKETIO_LOG_LEVEL, logging.WARNING))
+engineio_logger = logging.getLogger('engineio')
+engineio_logger.setLevel(getattr(logging, ENGINEIO_LOG_LEVEL, logging.WARNING))
+
+# Initialize Socket.IO with the Flask app. With SOCKETIO_MESSAGE_QUEUE set,
+# emits are relayed through Redis so every replica reaches its own clients
+# (and workers can publish without going through this process).
 socketio = SocketIO(
     app, 
     cors_allowed_origins="*",
     async_mode='eventlet',  # Use eventlet instead of gevent
     ping_timeout=60,
     ping_interval=25,
-    logger=True,
-    engineio_logger=True,
+    logger=socketio_logger,
+    engineio_logger=engineio_logger,
+    message_queue=SOCKETIO_MESSAGE_QUEUE,
+    channel=SOCKETIO_CHANNEL,
     transports=['websocket', 'polling']
 )
+if SOCKETIO_MESSAGE_QUEUE:
+    logger.info(f"Socket.IO message queue enabled on channel '{SOCKETIO_CHANNEL}'")
 
 # Improved Socket.IO event handlers
 @socketio.on('connect')
@@ -82,20 +152,20 @@ def handle_connect():
     """Handle new WebSocket connections with improved logging"""
     client_id = request.sid
     ip = request.remote_addr if hasattr(request, 'remote_addr') else 'unknown'
-    logger.info(f"Client connected: {client_id} from {ip}")
+    logger.debug(f"Client connected: {client_id} from {ip}")
     
     # Send welcome message
     emit('status', {'message': 'Connected to Financial Backend API', 'connected': True})
     
     # Automatically join the 'all' room to receive general announcements
     socketio.server.enter_room(client_id, 'all')
-    logger.info(f"Client {client_id} automatically joined room: all")
+    logger.debug(f"Client {client_id} automatically joined room: all")
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle WebSocket disconnections with improved logging"""
     client_id = request.sid
-    logger.info(f"Client disconnected: {client_id}")
+    logger.debug(f"Client disconnected: {client_id}")
 
 @socketio.on('error')
 def handle_error(error):
@@ -128,7 +198,7 @@ def handle_join(data):
         return
 
     socketio.server.enter_room(client_id, 'all')
-    logger.info(f"Client {client_id} joined room: all")
+    logger.debug(f"Client {client_id} joined room: all")
     emit('status', {'message': 'Joined room: all'}, room=client_id)
 
 @socketio.on('leave')
@@ -153,10 +223,61 @@ def handle_leave(data):
     # Sanitize room name
     room = room.strip()[:50]
     
-    logger.info(f"Client {client_id} left room: {room}")
+    logger.debug(f"Client {client_id} left room: {room}")
     socketio.server.leave_room(client_id, room)
     emit('status', {'message': f'Left room: {room}'}, room=client_id)
 
+# Watchlist-scoped rooms. A client that sends 'subscribe' with its access token
+# leaves 'all' and joins one room per watched ISIN / category, so it is only
+# sent the announcements it would otherwise filter for in the browser. Clients
+# watching more than WATCHLIST_ROOM_LIMIT ISINs + categories stay in 'all'.
+WATCHLIST_ROOM_LIMIT = int(os.getenv('WATCHLIST_ROOM_LIMIT', 1000))
+
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """Move an authenticated client from 'all' to its watchlist rooms."""
+    client_id = request.sid
+
+    token = data.get('token') if isinstance(data, dict) else None
+    if not isinstance(token, str) or not token:
+        emit('status', {'message': 'Invalid request: missing token', 'error': True}, room=client_id)
+        return
+
+    try:
+        current_user = lookup_user_by_token(token)
+        if current_user is None:
+            emit('status', {'message': 'Invalid authentication token!', 'error': True}, room=client_id)
+            return
+
+        user_id = current_user['UserID']
+        watchlists = fetch_user_watchlists(user_id)
+    except Exception as e:
+        logger.error(f"Watchlist subscribe failed for {client_id}: {e}")
+        emit('status', {'message': 'Subscription failed', 'error': True}, room=client_id)
+        return
+
+    rooms = watchlist_rooms(
+        (isin for wl in watchlists for isin in wl['isin']),
+        (category for wl in watchlists for category in wl['categories'])
+    )
+
+    # Re-subscribing (after a watchlist change) replaces the previous rooms
+    for room in socketio.server.rooms(client_id):
+        if is_scoped_room(room) and room not in rooms:
+            socketio.server.leave_room(client_id, room)
+    socketio.server.enter_room(client_id, f"{USER_ROOM_PREFIX}{user_id}")
+
+    if not rooms or len(rooms) > WATCHLIST_ROOM_LIMIT:
+        socketio.server.enter_room(client_id, BROADCAST_ROOM)
+        emit('status', {'message': 'Subscribed to all announcements', 'scoped': False, 'rooms': 0}, room=client_id)
+        return
+
+    for room in rooms:
+        socketio.server.enter_room(client_id, room)
+    socketio.server.leave_room(client_id, BROADCAST_ROOM)
+    logger.debug(f"Client {client_id} subscribed to {len(rooms)} watchlist rooms")
+    emit('status', {'message': 'Subscribed to watchlist rooms', 'scoped': True, 'rooms': len(rooms)}, room=client_id)
+
 
 # Configuration options with environment variables
 DEBUG_MODE = os.getenv('DEBUG_MODE', 'false').lower() == 'true'
@@ -204,6 +325,66 @@ def generate_access_token():
     """Generate a secure random access token."""
     return secrets.token_hex(32)  # 64 character hex string
 
+# Token -> UserData row cache so authenticated requests skip the UserData lookup.
+# Entries are keyed by the token's SHA-256 and dropped on logout, login (token
+# rotation), update_user and upgrade_account. Other replicas may keep serving
+# their in-process copy for up to AUTH_CACHE_TTL seconds after an invalidation.
+# The cached row never holds the password hash or the token itself; handlers
+# that need the password read it from UserData directly.
+AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', 30))
+AUTH_CACHE_SHARED_TTL = int(os.getenv('AUTH_CACHE_SHARED_TTL', 300))
+AUTH_CACHE_MAX_SIZE = int(os.getenv('AUTH_CACHE_MAX_SIZE', 10000))
+
+user_token_cache = TwoLevelCache(
+    'auth_token',
+    max_size=AUTH_CACHE_MAX_SIZE,
+    local_ttl=AUTH_CACHE_TTL,
+    shared_ttl=AUTH_CACHE_SHARED_TTL
+) if CACHE_AVAILABLE else None
+
+def _token_cache_key(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def get_cached_user(token):
+    """Return the cached UserData row for an access token, or None."""
+    if user_token_cache is None:
+        return None
+    user = user_token_cache.get(_token_cache_key(token))
+    if user is None:
+        return None
+    # Entries written before the fields were excluded may still hold them
+    return public_user_fields(user)
+
+AUTH_CACHE_EXCLUDED_FIELDS = ('password', 'accesstoken')
+
+def public_user_fields(user):
+    """Return a UserData row without the password hash and access token."""
+    return {k: v for k, v in user.items() if k.lower() not in AUTH_CACHE_EXCLUDED_FIELDS}
+
+def cache_user(token, user):
+    if user_token_cache is not None:
+        user_token_cache.set(_token_cache_key(token), public_user_fields(user))
+
+def invalidate_cached_user(token):
+    """Drop a token's cached user after the UserData row changed or the token was revoked."""
+    if user_token_cache is not None and token:
+        user_token_cache.delete(_token_cache_key(token))
+
+def lookup_user_by_token(token):
+    """
+    Return the UserData row for an access token (cache first), or None if the token is unknown.
+
+    The row never includes Password or AccessToken, whether it came from the cache or not.
+    """
+    current_user = get_cached_user(token)
+    if current_user is None:
+        response = supabase.table('UserData').select('*').eq('AccessToken', token).execute()
+        if not response.data:
+            return None
+        current_user = public_user_fields(response.data[0])
+        cache_user(token, current_user)
+    return current_user
+
 # Custom authentication middleware
 def auth_required(f):
     @wraps(f)
@@ -228,17 +409,14 @@ def auth_required(f):
         
         try:
             # Find user with matching access token
-            response = supabase.table('UserData').select('*').eq('AccessToken', token).execute()
-            
-            if not response.data or len(response.data) == 0:
+            current_user = lookup_user_by_token(token)
+            if current_user is None:
                 return jsonify({'message': 'Invalid authentication token!'}), 401
-                
-            # User found with matching token
-            current_user = response.data[0]
             
             # Check if token is expired (optional - implement if needed)
             # You could add token_expiry field to UserData table
             
+            g.auth_token = token
             return f(current_user, *args, **kwargs)
         except Exception as e:
             logger.error(f"Authentication error: {str(e)}")
@@ -246,6 +424,77 @@ def auth_required(f):
     
     return decorated
 
+# Shared response cache for hot read endpoints. Entries are invalidated by
+# dataset generation (insert_new_announcement, collector uploads) and otherwise
+# expire after RESPONSE_CACHE_TTL seconds.
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 300))
+
+def cached_response(namespace, datasets, ttl_seconds=None):
+    """
+    Serve a GET endpoint's JSON from the shared response cache.
+
+    The key is the sorted query string at the current generation of ``datasets``.
+    Only successful 200 JSON responses are stored; bodies are kept gzip-compressed
+    and returned as-is to clients that accept gzip, with an ETag so unchanged
+    responses revalidate as 304s. Apply below ``auth_required`` so
+    authentication still runs on every request.
+    """
+    def decorator(f):
+        if not (CACHE_AVAILABLE and RESPONSE_CACHE_ENABLED):
+            return f
+        cache = ResponseCache(namespace, datasets, ttl_seconds=ttl_seconds or RESPONSE_CACHE_TTL)
+
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+
+            key = cache.key_for(request.args.items(multi=True))
+            compressed = cache.get(key) if key else None
+            if INSTRUMENTATION_AVAILABLE:
+                get_metrics().inc("backfin_response_cache_requests_total", {
+                    "endpoint": namespace, "result": "hit" if compressed else "miss"
+                })
+            if compressed:
+                return _compressed_json_response(compressed, cache_status='HIT')
+
+            response = app.make_response(f(*args, **kwargs))
+            if key and response.status_code == 200 and response.is_json:
+                payload = response.get_json(silent=True)
+                if isinstance(payload, dict) and not payload.get('error') and payload.get('success', True):
+                    compressed = cache.set(key, response.get_data())
+                    if compressed:
+                        return _compressed_json_response(compressed, cache_status='MISS')
+            return response
+
+        return decorated
+    return decorator
+
+def _compressed_json_response(compressed, cache_status):
+    # Compressed bodies are deterministic (mtime=0), so their hash is a strong ETag
+    etag = hashlib.sha1(compressed).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['X-Cache'] = cache_status
+        return response
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = Response(compressed, status=200, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(gzip.decompress(compressed), status=200, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['X-Cache'] = cache_status
+    return response
+
+def invalidate_cached_responses(*datasets):
+    """Drop cached responses built from ``datasets`` after new data was written."""
+    if CACHE_AVAILABLE:
+        invalidate_datasets(*datasets)
+
 def get_users_by_isin(isin):
     """Get users by ISIN from the database."""
     if not supabase_connected:
@@ -311,6 +560,34 @@ def get_all_users_email(isin,category):
     return email_ids
 
 
+# Request latency instrumentation
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.monotonic()
+
+@app.after_request
+def _record_request_metrics(response):
+    started = getattr(g, 'request_started', None)
+    if INSTRUMENTATION_AVAILABLE and started is not None and request.method != 'OPTIONS':
+        get_metrics().observe(
+            "backfin_http_request_duration_seconds",
+            time.monotonic() - started,
+            {
+                "app": "flask_api",
+                "method": request.method,
+                "endpoint": request.url_rule.rule if request.url_rule else "unmatched",
+                "status": response.status_code
+            }
+        )
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus metrics for queues, workers and pipeline latencies"""
+    if not INSTRUMENTATION_AVAILABLE:
+        return Response("", status=503, mimetype='text/plain')
+    return Response(render_metrics(), status=200, content_type=PROMETHEUS_CONTENT_TYPE)
+
 # A simple health check endpoint
 @app.route('/health', methods=['GET', 'OPTIONS'])
 def health_check():
@@ -492,6 +769,7 @@ def login():
         
         # Update access token in database
         supabase.table('UserData').update({'AccessToken': access_token}).eq('UserID', user['UserID']).execute()
+        invalidate_cached_user(user.get('AccessToken'))
         
         logger.info(f"User logged in successfully: {user['UserID']}")
         
@@ -521,6 +799,7 @@ def logout(current_user):
     try:
         # Invalidate the token by setting it to null or empty
         supabase.table('UserData').update({'AccessToken': None}).eq('UserID', user_id).execute()
+        invalidate_cached_user(g.get('auth_token'))
         
         logger.info(f"User logged out successfully: {user_id}")
         return jsonify({'message': 'Logged out successfully!'}), 200
@@ -549,7 +828,7 @@ def get_user(current_user):
     logger.debug(f"Get user profile for user: {user_id}")
     
     # Remove sensitive information
-    user_data = {k: v for k, v in current_user.items() if k.lower() not in ['password', 'accesstoken']}
+    user_data = public_user_fields(current_user)
     return jsonify(user_data), 200
 
 @app.route('/api/update_user', methods=['PUT', 'OPTIONS'])
@@ -565,21 +844,24 @@ def update_user(current_user):
     # Remove fields that shouldn't be updated directly
     safe_data = {k: v for k, v in data.items() if k.lower() not in ['userid', 'accesstoken', 'password', 'email', 'emailid']}
     
-    # Handle password change separately if provided
-    if 'new_password' in data and data.get('current_password'):
-        # Verify current password
-        if not verify_password(current_user['Password'], data.get('current_password')):
-            return jsonify({'message': 'Current password is incorrect.'}), 401
-            
-        # Update with new hashed password
-        safe_data['Password'] = hash_password(data.get('new_password'))
-    
     if not supabase_connected:
         return jsonify({'message': 'Database service unavailable. Please try again later.'}), 503
     
     try:
+        # Handle password change separately if provided
+        if 'new_password' in data and data.get('current_password'):
+            # The auth cache does not hold the hash, so verify against UserData
+            password_response = supabase.table('UserData').select('Password').eq('UserID', user_id).execute()
+            stored_password = password_response.data[0]['Password'] if password_response.data else None
+            if not stored_password or not verify_password(stored_password, data.get('current_password')):
+                return jsonify({'message': 'Current password is incorrect.'}), 401
+                
+            # Update with new hashed password
+            safe_data['Password'] = hash_password(data.get('new_password'))
+        
         # Update user data in UserData table
         supabase.table('UserData').update(safe_data).eq('UserID', user_id).execute()
+        invalidate_cached_user(g.get('auth_token'))
         logger.debug(f"User data updated successfully: {user_id}")
         return jsonify({'message': 'User data updated successfully!'}), 200
     except Exception as e:
@@ -609,6 +891,7 @@ def upgrade_account(current_user):
         }
         
         supabase.table('UserData').update(update_data).eq('UserID', user_id).execute()
+        invalidate_cached_user(g.get('auth_token'))
         logger.debug(f"Account upgraded successfully: {user_id}")
         return jsonify({'message': 'Account upgraded successfully!'}), 200
     except Exception as e:
@@ -624,6 +907,97 @@ This script contains fixed versions of the watchlist API endpoint functions
 that properly handle the Supabase Python SDK responses.
 """
 
+# Per-user watchlist cache. Kept in Redis only (no in-process layer) so a
+# mutation served by one replica is visible to the next GET on any replica.
+WATCHLIST_CACHE_TTL = int(os.getenv('WATCHLIST_CACHE_TTL', 300))
+
+watchlist_cache = RedisCache('watchlist', ttl_seconds=WATCHLIST_CACHE_TTL) if CACHE_AVAILABLE else None
+
+def fetch_user_watchlists(user_id, use_cache=True):
+    """
+    Return all of a user's watchlists with their ISINs and categories.
+
+    Two queries regardless of the number of watchlists: the watchlist names,
+    then every watchlistdata row of the user, grouped in memory.
+    """
+    if use_cache and watchlist_cache is not None:
+        cached = watchlist_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+    name_response = supabase.table('watchlistnamedata') \
+        .select('watchlistid, watchlistname') \
+        .eq('userid', user_id).execute()
+    data_response = supabase.table('watchlistdata') \
+        .select('watchlistid, isin, category') \
+        .eq('userid', user_id).execute()
+
+    watchlists = {}
+    for entry in name_response.data or []:
+        watchlists[entry['watchlistid']] = {
+            '_id': entry['watchlistid'],
+            'watchlistName': entry['watchlistname'],
+            'categories': [],
+            'isin': []
+        }
+    for row in data_response.data or []:
+        watchlist = watchlists.get(row['watchlistid'])
+        if watchlist is None:
+            continue
+        # ISIN rows have a NULL category, category rows have a NULL ISIN
+        if row.get('category') is None and row.get('isin') is not None:
+            watchlist['isin'].append(row['isin'])
+        elif row.get('isin') is None and row.get('category') is not None:
+            watchlist['categories'].append(row['category'])
+
+    result = list(watchlists.values())
+    if watchlist_cache is not None:
+        watchlist_cache.set(user_id, result)
+    return result
+
+def invalidate_user_watchlists(user_id):
+    """Drop the cached watchlists after any watchlist mutation of ``user_id``."""
+    if watchlist_cache is not None:
+        watchlist_cache.delete(user_id)
+
+def refresh_user_watchlists(user_id):
+    """
+    Reload a user's watchlists after a mutation: refreshes the per-user cache
+    and the reverse fan-out index, tells the user's subscribed sockets (on any
+    replica) to re-subscribe, and returns the fresh watchlists.
+    """
+    invalidate_user_watchlists(user_id)
+    watchlists = fetch_user_watchlists(user_id, use_cache=False)
+    if WATCHLIST_INDEX_AVAILABLE:
+        get_watchlist_index().sync_user(
+            user_id,
+            (isin for wl in watchlists for isin in wl['isin']),
+            (category for wl in watchlists for category in wl['categories'])
+        )
+    socketio.emit('watchlist_updated', {'message': 'Watchlists changed, re-subscribe'}, room=f"{USER_ROOM_PREFIX}{user_id}")
+    return watchlists
+
+def _watchlist_index_maintenance():
+    """Build the reverse watchlist index if missing and rebuild it periodically."""
+    while True:
+        try:
+            get_watchlist_index().rebuild_if_stale(supabase)
+        except Exception as e:
+            logger.error(f"Watchlist index maintenance error: {e}")
+        time.sleep(600)
+
+if WATCHLIST_INDEX_AVAILABLE and supabase_connected:
+    threading.Thread(target=_watchlist_index_maintenance, name="watchlist-index", daemon=True).start()
+
+def _legacy_watchlist_shape(watchlist):
+    """Single-category shape still returned by the delete/clear endpoints."""
+    return {
+        '_id': watchlist['_id'],
+        'watchlistName': watchlist['watchlistName'],
+        'category': watchlist['categories'][0] if watchlist['categories'] else None,
+        'isin': watchlist['isin']
+    }
+
 # Fixed Watchlist API Endpoints
 @app.route('/api/watchlist', methods=['GET', 'OPTIONS'])
 @auth_required
@@ -635,52 +1009,7 @@ def get_watchlist(current_user):
     logger.debug(f"Get watchlist for user: {user_id}")
 
     try:
-        # Step 1: Get all watchlists for the user
-        response = supabase.table('watchlistnamedata') \
-            .select('watchlistid, watchlistname') \
-            .eq('userid', user_id).execute()
-
-        # No need to check status_code - just check for error
-        if hasattr(response, 'error') and response.error:
-            logger.error(f"Error fetching watchlistnamedata: {response.error}")
-            return jsonify({'message': 'Error fetching watchlists.'}), 500
-
-        watchlist_meta = response.data
-
-        # Step 2: For each watchlist, get ISINs and categories separately
-        watchlists = []
-        for entry in watchlist_meta:
-            watchlist_id = entry['watchlistid']
-            watchlist_name = entry['watchlistname']
-
-            # Get ISINs (where category is NULL)
-            isin_response = supabase.table('watchlistdata') \
-                .select('isin') \
-                .eq('watchlistid', watchlist_id) \
-                .eq('userid', user_id) \
-                .is_('category', 'null') \
-                .execute()
-
-            # Get ALL categories (where isin is NULL) - not just the first one
-            cat_response = supabase.table('watchlistdata') \
-                .select('category') \
-                .eq('watchlistid', watchlist_id) \
-                .eq('userid', user_id) \
-                .is_('isin', 'null') \
-                .execute()
-
-            isins = [row['isin'] for row in isin_response.data] if isin_response.data else []
-            
-            # Extract all categories and filter out None values
-            categories = [row['category'] for row in cat_response.data if row['category'] is not None] if cat_response.data else []
-
-            watchlists.append({
-                '_id': watchlist_id,
-                'watchlistName': watchlist_name,
-                'categories': categories,  # Return as array
-                'isin': isins
-            })
-
+        watchlists = fetch_user_watchlists(user_id)
         return jsonify({'watchlists': watchlists}), 200
 
     except Exception as e:
@@ -718,6 +1047,7 @@ def create_watchlist(current_user):
                 logger.error(f"Failed to create watchlist: {insert_response.error}")
                 return jsonify({'message': 'Failed to create watchlist.'}), 500
 
+            invalidate_user_watchlists(user_id)
             logger.debug(f"Watchlist {watchlist_id} created for user {user_id}")
             return jsonify({
                 'message': 'Watchlist created!',
@@ -805,6 +1135,7 @@ def create_watchlist(current_user):
                 if hasattr(insert, 'error') and insert.error:
                     logger.error(f"Failed to add items to watchlist: {insert.error}")
                     return jsonify({'message': 'Failed to add items to watchlist.'}), 500
+                refresh_user_watchlists(user_id)
 
             # Prepare response
             response_data = {
@@ -862,36 +1193,11 @@ def remove_from_watchlist(current_user, watchlist_id, isin):
             return jsonify({'message': 'ISIN not found in watchlist!'}), 404
         
         # Get the updated watchlist data to return
-        wl_name_response = supabase.table('watchlistnamedata') \
-            .select('watchlistname') \
-            .eq('watchlistid', watchlist_id).execute()
-            
-        # Get ISINs (where category is NULL)
-        isin_response = supabase.table('watchlistdata') \
-            .select('isin') \
-            .eq('watchlistid', watchlist_id) \
-            .eq('userid', user_id) \
-            .is_('category', 'null') \
-            .execute()
-
-        # Get category (where isin is NULL)
-        cat_response = supabase.table('watchlistdata') \
-            .select('category') \
-            .eq('watchlistid', watchlist_id) \
-            .eq('userid', user_id) \
-            .is_('isin', 'null') \
-            .execute()
-            
-        watchlist_name = wl_name_response.data[0]['watchlistname'] if wl_name_response.data else "Unknown"
-        isins = [row['isin'] for row in isin_response.data] if isin_response.data else []
-        category = cat_response.data[0]['category'] if cat_response.data else None
-        
-        updated_watchlist = {
-            '_id': watchlist_id,
-            'watchlistName': watchlist_name,
-            'category': category,
-            'isin': isins
-        }
+        watchlists = refresh_user_watchlists(user_id)
+        updated_watchlist = next(
+            (_legacy_watchlist_shape(wl) for wl in watchlists if wl['_id'] == watchlist_id),
+            {'_id': watchlist_id, 'watchlistName': "Unknown", 'category': None, 'isin': []}
+        )
 
         logger.debug(f"ISIN {isin} removed from watchlist for user: {user_id}")
         return jsonify({
@@ -932,43 +1238,9 @@ def delete_watchlist(current_user, watchlist_id):
         # Check for error and empty data instead of status_code
         if (hasattr(delete_response, 'error') and delete_response.error) or not delete_response.data:
             return jsonify({'message': 'Failed to delete watchlist!'}), 500
-            
+        
         # Get the updated list of watchlists to return
-        wl_response = supabase.table('watchlistnamedata') \
-            .select('watchlistid, watchlistname') \
-            .eq('userid', user_id).execute()
-            
-        watchlists = []
-        for entry in wl_response.data:
-            wl_id = entry['watchlistid']
-            wl_name = entry['watchlistname']
-            
-            # Get ISINs (where category is NULL)
-            isin_response = supabase.table('watchlistdata') \
-                .select('isin') \
-                .eq('watchlistid', wl_id) \
-                .eq('userid', user_id) \
-                .is_('category', 'null') \
-                .execute()
-
-            # Get category (where isin is NULL)
-            cat_response = supabase.table('watchlistdata') \
-                .select('category') \
-                .eq('watchlistid', wl_id) \
-                .eq('userid', user_id) \
-                .is_('isin', 'null') \
-                .execute()
-                
-            isins = [row['isin'] for row in isin_response.data] if isin_response.data else []
-            category = cat_response.data[0]['category'] if cat_response.data else None
-            
-            watchlists.append({
-                '_id': wl_id,
-                'watchlistName': wl_name,
-                'category': category,
-                'isin': isins
-            })
-            
+        watchlists = [_legacy_watchlist_shape(wl) for wl in refresh_user_watchlists(user_id)]
 
         logger.debug(f"Watchlist {watchlist_id} deleted for user: {user_id}")
         return jsonify({
@@ -1011,42 +1283,9 @@ def clear_watchlist(current_user, watchlist_id):
         # Check for error instead of status_code
         if hasattr(clear_response, 'error') and clear_response.error:
             return jsonify({'message': 'Failed to clear watchlist!'}), 500
-            
+        
         # Get all watchlists for return
-        wl_response = supabase.table('watchlistnamedata') \
-            .select('watchlistid, watchlistname') \
-            .eq('userid', user_id).execute()
-            
-        watchlists = []
-        for entry in wl_response.data:
-            wl_id = entry['watchlistid']
-            wl_name = entry['watchlistname']
-            
-            # Get ISINs (where category is NULL)
-            isin_response = supabase.table('watchlistdata') \
-                .select('isin') \
-                .eq('watchlistid', wl_id) \
-                .eq('userid', user_id) \
-                .is_('category', 'null') \
-                .execute()
-
-            # Get category (where isin is NULL)
-            cat_response = supabase.table('watchlistdata') \
-                .select('category') \
-                .eq('watchlistid', wl_id) \
-                .eq('userid', user_id) \
-                .is_('isin', 'null') \
-                .execute()
-                
-            isins = [row['isin'] for row in isin_response.data] if isin_response.data else []
-            category = cat_response.data[0]['category'] if cat_response.data else None
-            
-            watchlists.append({
-                '_id': wl_id,
-                'watchlistName': wl_name,
-                'category': category,
-                'isin': isins
-            })
+        watchlists = [_legacy_watchlist_shape(wl) for wl in refresh_user_watchlists(user_id)]
             
         # Find the cleared watchlist in the list
         cleared_watchlist = next((wl for wl in watchlists if wl['_id'] == watchlist_id), None)
@@ -1193,41 +1432,10 @@ def bulk_add_isins(current_user):
                 return jsonify({'message': f'Failed to add items to watchlist: {str(e)}'}), 500
         
         # Get updated watchlist data
-        # Get ISINs (where category is NULL)
-        isin_response = supabase.table('watchlistdata') \
-            .select('isin') \
-            .eq('watchlistid', watchlist_id) \
-            .eq('userid', user_id) \
-            .is_('category', 'null') \
-            .execute()
-
-        # Get ALL categories (where isin is NULL)
-        cat_response = supabase.table('watchlistdata') \
-            .select('category') \
-            .eq('watchlistid', watchlist_id) \
-            .eq('userid', user_id) \
-            .is_('isin', 'null') \
-            .execute()
-            
-        # Get watchlist name
-        name_response = supabase.table('watchlistnamedata') \
-            .select('watchlistname') \
-            .eq('watchlistid', watchlist_id) \
-            .execute()
-            
-        watchlist_name = name_response.data[0]['watchlistname'] if name_response.data else "Unknown"
-        updated_isins = [row['isin'] for row in isin_response.data] if isin_response.data else []
-        
-        # Extract all categories and filter out None values
-        updated_categories = [row['category'] for row in cat_response.data if row['category'] is not None] if cat_response.data else []
-        
-        # Prepare watchlist object for response
-        updated_watchlist = {
-            '_id': watchlist_id,
-            'watchlistName': watchlist_name,
-            'categories': updated_categories,  # Return as array
-            'isin': updated_isins
-        }
+        updated_watchlist = next(
+            (wl for wl in refresh_user_watchlists(user_id) if wl['_id'] == watchlist_id),
+            {'_id': watchlist_id, 'watchlistName': "Unknown", 'categories': [], 'isin': []}
+        )
 
         # Construct result message
         result_message = f"Added {len(successful_isins)} ISINs successfully"
@@ -1262,6 +1470,7 @@ def bulk_add_isins(current_user):
 
 @app.route('/api/deals', methods=['GET', 'OPTIONS'])
 @auth_required
+@cached_response('deals', ['deals'])
 def get_deals(current_user):
     """
     Endpoint to get bulk and block deals with filtering options
@@ -1619,6 +1828,7 @@ def get_insider_trading(current_user):
 
 @app.route('/api/corporate_actions', methods=['GET', 'OPTIONS'])
 @auth_required
+@cached_response('corporate_actions', ['corporate_actions'])
 def get_corporate_actions(current_user):
     """
     Endpoint to get corporate actions data with filtering options
@@ -1734,10 +1944,89 @@ def get_corporate_actions(current_user):
         }), 500
     
 
+# Total counts for /api/corporate_filings, keyed by filter signature. An exact
+# count over corporatefilings costs a scan of the filtered set, so the value is
+# reused for FILINGS_COUNT_TTL seconds; the feed tolerates a slightly stale total.
+FILINGS_COUNT_TTL = int(os.getenv('FILINGS_COUNT_TTL', 60))
+
+filings_count_cache = TwoLevelCache(
+    'filings_count',
+    max_size=2048,
+    local_ttl=FILINGS_COUNT_TTL,
+    shared_ttl=FILINGS_COUNT_TTL
+) if CACHE_AVAILABLE else None
+
+def _apply_filing_filters(query, start_iso, end_iso, category_list, symbol_list, isin_list, include_duplicates):
+    """Apply the /api/corporate_filings filters shared by the page and count queries."""
+    if start_iso:
+        query = query.gte('date', start_iso)
+    if end_iso:
+        query = query.lte('date', end_iso)
+    if category_list:
+        query = query.in_('category', category_list)
+    if symbol_list:
+        query = query.in_('symbol', symbol_list)
+    if isin_list:
+        query = query.in_('isin', isin_list)
+    if not category_list or "Procedural/Administrative" not in category_list:
+        query = query.neq('category', 'Procedural/Administrative')
+    query = query.neq('category', 'Error')
+    # Exclude duplicate announcements by default (unless explicitly included)
+    if not include_duplicates:
+        query = query.or_('is_duplicate.is.false,is_duplicate.is.null')
+    return query
+
+def _count_corporate_filings(start_iso, end_iso, category_list, symbol_list, isin_list, include_duplicates):
+    """Exact count of filings matching the filters, cached per filter signature."""
+    signature = json.dumps([
+        start_iso, end_iso, sorted(category_list), sorted(symbol_list), sorted(isin_list), include_duplicates
+    ])
+    cache_key = hashlib.sha1(signature.encode()).hexdigest()
+    if filings_count_cache is not None:
+        cached = filings_count_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    count_query = supabase.table("corporatefilings").select("corp_id", count="exact").limit(1)
+    count_query = _apply_filing_filters(
+        count_query, start_iso, end_iso, category_list, symbol_list, isin_list, include_duplicates
+    )
+    count_response = count_query.execute()
+    total_count = count_response.count if hasattr(count_response, 'count') and count_response.count is not None else 0
+
+    if filings_count_cache is not None:
+        filings_count_cache.set(cache_key, total_count)
+    return total_count
+
+def encode_filings_cursor(filing):
+    """Opaque cursor pointing just past ``filing`` in (date desc, corp_id desc) order."""
+    payload = json.dumps([filing['date'], filing['corp_id']])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_filings_cursor(cursor):
+    """Return (date, corp_id) from a cursor, or raise ValueError."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_value, corp_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        uuid.UUID(str(corp_id))
+        dt.datetime.fromisoformat(str(date_value))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return str(date_value), str(corp_id)
+
 @app.route('/api/corporate_filings', methods=['GET', 'OPTIONS'])
 # @auth_required
+@cached_response('corporate_filings', ['corporate_filings'])
 def get_corporate_filings():
-    """Endpoint to get corporate filings with server-side pagination and duplicate filtering"""
+    """
+    Endpoint to get corporate filings with server-side pagination and duplicate filtering.
+
+    Two pagination modes:
+    - ``page=N`` (default): offset pagination, as before
+    - ``cursor=<next_cursor>``: keyset pagination on (date, corp_id); pass an empty
+      ``cursor=`` for the first page, then the ``next_cursor`` from each response.
+      Cost stays constant regardless of how deep the client scrolls.
+    """
     if request.method == 'OPTIONS':
         return _handle_options()
         
@@ -1754,6 +2043,8 @@ def get_corporate_filings():
         # Pagination parameters
         page = request.args.get('page', '1')
         page_size = 15
+        cursor = request.args.get('cursor')
+        cursor_mode = cursor is not None
         
         # Validate and parse pagination parameters
         try:
@@ -1772,7 +2063,14 @@ def get_corporate_filings():
         except (ValueError, TypeError):
             page_size = 15
         
-        logger.info(f"Corporate filings request: start_date={start_date}, end_date={end_date}, category={category}, symbol={symbol}, isin={isin}, page={page}, page_size={page_size}")
+        cursor_position = None
+        if cursor:
+            try:
+                cursor_position = decode_filings_cursor(cursor)
+            except ValueError:
+                return jsonify({'message': 'Invalid cursor', 'status': 'error'}), 400
+        
+        logger.info(f"Corporate filings request: start_date={start_date}, end_date={end_date}, category={category}, symbol={symbol}, isin={isin}, page={page}, page_size={page_size}, cursor_mode={cursor_mode}")
         
         if not supabase_connected:
             logger.error("Database service unavailable")
@@ -1810,10 +2108,15 @@ def get_corporate_filings():
         symbol_list = [s.strip() for s in symbol.split(',') if s.strip()]
         isin_list = [i.strip() for i in isin.split(',') if i.strip()]
 
-        # Order by date descending - most recent first
+        # Order by date descending - most recent first; corp_id breaks ties so
+        # the cursor position is unambiguous
         query = query.order('date', desc=True)
+        if cursor_mode:
+            query = query.order('corp_id', desc=True)
         
         # Apply date filters if provided, using ISO format for correct string comparison
+        start_iso = None
+        end_iso = None
         if start_date:
             try:
                 # Parse user input (YYYY-MM-DD)
@@ -1821,7 +2124,6 @@ def get_corporate_filings():
                 # Convert to ISO format with time at start of day (00:00:00)
                 start_iso = start_dt.isoformat()
                 logger.debug(f"Filtering dates >= {start_iso}")
-                query = query.gte('date', start_iso)
             except ValueError as e:
                 logger.error(f"Invalid start_date format: {start_date} - {str(e)}")
                 return jsonify({'message': 'Invalid start_date format. Use YYYY-MM-DD', 'status': 'error'}), 400
@@ -1835,73 +2137,51 @@ def get_corporate_filings():
                 # Convert to ISO format
                 end_iso = end_dt.isoformat()
                 logger.debug(f"Filtering dates <= {end_iso}")
-                query = query.lte('date', end_iso)
             except ValueError as e:
                 logger.error(f"Invalid end_date format: {end_date} - {str(e)}")
                 return jsonify({'message': 'Invalid end_date format. Use YYYY-MM-DD', 'status': 'error'}), 400
         
-        # Apply additional filters if provided
-        if category_list:
-            query = query.in_('category', category_list)
-        if symbol_list:
-            query = query.in_('symbol', symbol_list)
-        if isin_list:
-            query = query.in_('isin', isin_list)
-        if not category_list or "Procedural/Administrative" not in category_list:
-            query = query.neq('category', 'Procedural/Administrative')
-
-        query = query.neq('category' , 'Error')
-        
-        # NEW: Exclude duplicate announcements by default (unless explicitly included)
-        if not include_duplicates:
-            query = query.or_('is_duplicate.is.false,is_duplicate.is.null')
-            logger.debug("Filtering out duplicate announcements")
+        query = _apply_filing_filters(
+            query, start_iso, end_iso, category_list, symbol_list, isin_list, include_duplicates
+        )
 
         # Execute query with pagination
         try:
             logger.debug("Executing Supabase query with pagination")
             
-            # First, get total count with same filters (without pagination)
-            count_query = supabase.table("corporatefilings").select("corp_id", count="exact")
-            
-            # Apply the same filters for count
-            if start_date:
-                try:
-                    start_dt = dt.datetime.strptime(start_date, '%Y-%m-%d')
-                    start_iso = start_dt.isoformat()
-                    count_query = count_query.gte('date', start_iso)
-                except ValueError:
-                    pass
-            
-            if end_date:
-                try:
-                    end_dt = dt.datetime.strptime(end_date, '%Y-%m-%d')
-                    end_dt = end_dt.replace(hour=23, minute=59, second=59)
-                    end_iso = end_dt.isoformat()
-                    count_query = count_query.lte('date', end_iso)
-                except ValueError:
-                    pass
-            
-            if category_list:
-                count_query = count_query.in_('category', category_list)
-            if symbol_list:
-                count_query = count_query.in_('symbol', symbol_list)
-            if isin_list:
-                count_query = count_query.in_('isin', isin_list)
-            if not category_list or "Procedural/Administrative" not in category_list:
-                count_query = count_query.neq('category', 'Procedural/Administrative')
-            count_query = count_query.neq('category', 'Error')
-            
-            # NEW: Exclude duplicates from count as well
-            if not include_duplicates:
-                count_query = count_query.or_('is_duplicate.is.false,is_duplicate.is.null')
+            # Total count with the same filters (cached per filter signature)
+            total_count = _count_corporate_filings(
+                start_iso, end_iso, category_list, symbol_list, isin_list, include_duplicates
+            )
+            total_pages = (total_count + page_size - 1) // page_size  # Ceiling division
             
-            # Get total count
-            count_response = count_query.execute()
-            total_count = count_response.count if hasattr(count_response, 'count') and count_response.count is not None else 0
+            if cursor_mode:
+                if cursor_position:
+                    cursor_date, cursor_corp_id = cursor_position
+                    query = query.or_(
+                        f'date.lt."{cursor_date}",and(date.eq."{cursor_date}",corp_id.lt.{cursor_corp_id})'
+                    )
+                # One extra row tells us whether another page exists
+                response = query.limit(page_size + 1).execute()
+                rows = response.data if response.data else []
+                has_next = len(rows) > page_size
+                rows = rows[:page_size]
+                next_cursor = encode_filings_cursor(rows[-1]) if has_next and rows else None
+                
+                logger.info(f"Retrieved {len(rows)} corporate filings (cursor mode, total: {total_count})")
+                
+                return jsonify({
+                    'count': len(rows),
+                    'total_count': total_count,
+                    'total_pages': total_pages,
+                    'page_size': page_size,
+                    'has_next': has_next,
+                    'has_previous': bool(cursor),
+                    'next_cursor': next_cursor,
+                    'filings': rows
+                }), 200
             
             # Calculate pagination
-            total_pages = (total_count + page_size - 1) // page_size  # Ceiling division
             from_index = (page - 1) * page_size
             to_index = from_index + page_size - 1
             
@@ -1976,6 +2256,7 @@ def get_filing_by_id(corp_id):
 
 
 @app.route('/api/financial_results', methods=['GET', 'OPTIONS'])
+@cached_response('financial_results', ['financial_results'])
 def get_financial_results():
     """
     Endpoint to get verified financial results with comprehensive filters
@@ -2210,6 +2491,7 @@ def parse_date(s: str):
     return dt.datetime.strptime(s, "%Y-%m-%d").date()
 
 @app.route('/api/get_count', methods=['GET', 'OPTIONS'])
+@cached_response('get_count', ['corporate_filings'])
 def get_count():
     """Get announcement counts by category for a date range"""
     try:
@@ -2358,10 +2640,20 @@ def get_count():
 #         'note': 'This is test data from the test endpoint'
 #     }), 200
 
+# Daily rows returned by /api/stock_price when the client asks for neither an
+# interval nor a point count; longer series are LTTB-downsampled to this size
+STOCK_PRICE_MAX_POINTS = int(os.getenv('STOCK_PRICE_MAX_POINTS', 1500))
+
 @app.route('/api/stock_price', methods=['GET', 'OPTIONS'])
 @auth_required
+@cached_response('stock_price', ['stock_price'])
 def get_stock_price(current_user):
-    """Endpoint to get stock price data"""
+    """
+    Endpoint to get stock price data
+
+    Optional ``interval`` (daily/weekly/monthly OHLC bars) and ``points``
+    (LTTB-downsample the daily series to at most this many rows).
+    """
     try:
         if request.method == 'OPTIONS':
             response = jsonify({'status': 'ok'})
@@ -2373,6 +2665,8 @@ def get_stock_price(current_user):
         # Get and validate parameters
         isin = request.args.get('isin', '').strip()
         date_range = request.args.get('range', 'max').lower()
+        interval = request.args.get('interval', 'daily').lower()
+        points = request.args.get('points')
         
         if not isin:
             return jsonify({'error': 'Missing isin parameter'}), 400
@@ -2385,6 +2679,20 @@ def get_stock_price(current_user):
                 'valid_ranges': valid_ranges
             }), 400
 
+        if PRICE_SERIES_AVAILABLE:
+            if interval not in PRICE_INTERVALS:
+                return jsonify({
+                    'error': f'Invalid interval value: {interval}',
+                    'valid_intervals': list(PRICE_INTERVALS)
+                }), 400
+            if points is not None:
+                try:
+                    points = int(points)
+                except ValueError:
+                    points = 0
+                if points < 3 or interval != 'daily':
+                    return jsonify({'error': 'points must be an integer >= 3 and requires interval=daily'}), 400
+
         # Determine date filter - fix the datetime issue
         today = dt.datetime.now().date()
         date_filter = None
@@ -2402,6 +2710,37 @@ def get_stock_price(current_user):
         elif date_range == 'max':
             date_filter = None
 
+        if PRICE_SERIES_AVAILABLE:
+            # Full history from the per-ISIN series cache, cut and downsampled in memory
+            series = get_price_series(supabase, isin)
+            if date_filter:
+                since = date_filter.isoformat()
+                series = [point for point in series if point[0] >= since]
+            if not series:
+                logger.warning(f"No stock price data found for ISIN: {isin}")
+                return jsonify({
+                    'error': 'No stock price data found',
+                    'isin': isin,
+                    'range': date_range
+                }), 404
+
+            max_points = points or (STOCK_PRICE_MAX_POINTS if interval == 'daily' else None)
+            stock_price = downsample(series, interval, max_points)
+            # Newest first, as before
+            stock_price.reverse()
+            return jsonify({
+                'success': True,
+                'data': stock_price,
+                'metadata': {
+                    'isin': isin,
+                    'range': date_range,
+                    'interval': interval,
+                    'total_records': len(stock_price),
+                    'source_records': len(series),
+                    'downsampled': len(stock_price) < len(series)
+                }
+            }), 200
+
         # Build Supabase query
         query = supabase.table('stockpricedata').select('close', 'date').eq('isin', isin)
 
@@ -2448,6 +2787,29 @@ These are the corrected versions of your save_announcement and calc_price_diff e
 with proper error handling and data validation.
 """
 
+def latest_prices(isins):
+    """
+    Latest close per ISIN as ``{isin: {'close': ..., 'date': ...}}``.
+
+    Served from the Redis price snapshot, so any number of ISINs costs one
+    lookup; ISINs without price data are omitted.
+    """
+    if PRICE_SNAPSHOT_AVAILABLE:
+        return get_latest_prices(supabase, isins)
+    prices = {}
+    for isin in {isin for isin in isins if isin}:
+        response = (
+            supabase.table("stockpricedata")
+            .select("close, date")
+            .eq("isin", isin)
+            .order("date", desc=True)
+            .limit(1)
+            .execute()
+        )
+        if response.data:
+            prices[isin] = response.data[0]
+    return prices
+
 @app.route('/api/save_announcement', methods=['POST', 'OPTIONS'])
 @auth_required
 def save_announcement(current_user):
@@ -2489,18 +2851,11 @@ def save_announcement(current_user):
         # Get stock price with proper error handling
         stock_price = None
         try:
-            stockResponse = (
-                supabase.table("stockpricedata")
-                .select("close")  # Only select what we need
-                .eq("isin", isin)
-                .order("date", desc=True)
-                .limit(1)
-                .execute()
-            )
+            latest = latest_prices([isin]).get(isin)
             
             # Check if we got data
-            if stockResponse.data and len(stockResponse.data) > 0:
-                stock_price = stockResponse.data[0].get("close")
+            if latest:
+                stock_price = latest.get("close")
                 if stock_price is None:
                     logger.warning(f"No close price found for ISIN: {isin}")
             else:
@@ -2610,6 +2965,17 @@ def fetch_saved_announcements(current_user):
                 "data": []
             }), 200
 
+        # Current prices for every saved item in one snapshot lookup
+        try:
+            current_prices = latest_prices(
+                (saved_item.get('corporatefilings') or {}).get('isin')
+                for saved_item in response.data
+                if saved_item.get('saved_price') is not None
+            )
+        except Exception as e:
+            logger.error(f"Error fetching current prices for saved items: {str(e)}")
+            current_prices = {}
+
         # Enhance each announcement with price difference calculations
         enhanced_data = []
         for saved_item in response.data:
@@ -2648,18 +3014,9 @@ def fetch_saved_announcements(current_user):
             
             if saved_price is not None and isin:
                 try:
-                    # Get current stock price
-                    stockResponse = (
-                        supabase.table("stockpricedata")
-                        .select("close")
-                        .eq("isin", isin)
-                        .order("date", desc=True)
-                        .limit(1)
-                        .execute()
-                    )
+                    current_stock_data = current_prices.get(isin)
                     
-                    if stockResponse.data and len(stockResponse.data) > 0:
-                        current_stock_data = stockResponse.data[0]
+                    if current_stock_data:
                         latest_price = current_stock_data.get("close")
                         
                         if latest_price is not None:
@@ -2978,6 +3335,44 @@ def delete_saved_announcement_post(current_user):
         }), 500
 
 
+def _calc_price_diff_bulk(items):
+    """Price differences for many (isin, saved_price) pairs; invalid items get an 'error' entry."""
+    if len(items) > 500:
+        return jsonify({
+            "message": "Too many items (max 500)",
+            "status": "error"
+        }), 400
+
+    prices = latest_prices(item.get("isin") for item in items if isinstance(item, dict))
+    calculation_time = dt.datetime.now().isoformat()
+    results = []
+    for item in items:
+        isin = item.get("isin") if isinstance(item, dict) else None
+        try:
+            saved_price = float(item.get("saved_price"))
+            latest_price = float(prices[isin]["close"])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            results.append({"isin": isin, "error": "Missing saved_price or current price"})
+            continue
+        if saved_price <= 0 or latest_price <= 0:
+            results.append({"isin": isin, "error": "Prices must be positive"})
+            continue
+        price_diff = round(((latest_price - saved_price) / saved_price) * 100, 2)
+        results.append({
+            "isin": isin,
+            "stockDiff": price_diff,
+            "percentage_change": price_diff,
+            "absolute_change": round(latest_price - saved_price, 2),
+            "saved_price": saved_price,
+            "current_price": latest_price,
+            "calculation_time": calculation_time
+        })
+
+    return jsonify({
+        "status": "success",
+        "data": results
+    }), 200
+
 @app.route('/api/calc_price_diff', methods=['POST', 'OPTIONS'])  # Changed to POST
 @auth_required
 def calc_price_diff(current_user):
@@ -2995,6 +3390,10 @@ def calc_price_diff(current_user):
                 "status": "error"
             }), 400
 
+        # Bulk form: {"items": [{"isin": ..., "saved_price": ...}, ...]} - one price lookup for all items
+        if isinstance(data.get("items"), list):
+            return _calc_price_diff_bulk(data["items"])
+
         saved_price = data.get("saved_price")
         isin = data.get("isin")
 
@@ -3021,23 +3420,15 @@ def calc_price_diff(current_user):
 
         # Get current stock price with error handling
         try:
-            stockResponse = (
-                supabase.table("stockpricedata")
-                .select("close")
-                .eq("isin", isin)
-                .order("date", desc=True)
-                .limit(1)
-                .execute()
-            )
+            current_stock_data = latest_prices([isin]).get(isin)
             
             # Check if we got data
-            if not stockResponse.data or len(stockResponse.data) == 0:
+            if not current_stock_data:
                 return jsonify({
                     "message": f"No current stock data found for ISIN: {isin}",
                     "status": "error"
                 }), 404
                 
-            current_stock_data = stockResponse.data[0]
             latest_price = current_stock_data.get("close")
             
             if latest_price is None:
@@ -3232,104 +3623,34 @@ def insert_new_announcement():
             logger.warning("No JSON data received")
             return jsonify({'message': 'No JSON data received', 'status': 'error'}), 400
 
-        logger.info(f"Received data: {data}")
-
-        # Basic validation to prevent empty announcements being broadcast
-        def _is_nonempty_str(v):
-            return isinstance(v, str) and v.strip() != ''
+        logger.debug(f"Received data: {data}")
 
         corp_id = data.get('corp_id')
-        category = data.get('category')
-        summary = data.get('summary')
-        ai_summary = data.get('ai_summary')
-
-        # Require corp_id and a meaningful message (summary or ai_summary)
-        if not _is_nonempty_str(corp_id):
-            logger.warning("Skipping broadcast: missing corp_id")
-            return jsonify({'message': 'Skipped broadcast: missing corp_id', 'status': 'skipped'}), 200
-
-        # Skip routine or error categories
-        if not _is_nonempty_str(category) or category in ['Procedural/Administrative', 'Error']:
-            logger.info(f"Skipping broadcast for corp_id={corp_id}: category='{category}'")
-            return jsonify({'message': 'Skipped broadcast: non-broadcast category', 'status': 'skipped'}), 200
-
-        # Ensure we have some text to show
-        has_content = _is_nonempty_str(summary) or _is_nonempty_str(ai_summary)
-        if not has_content:
-            logger.warning(f"Skipping broadcast for corp_id={corp_id}: empty summary and ai_summary")
-            return jsonify({'message': 'Skipped broadcast: empty announcement content', 'status': 'skipped'}), 200
-
-        new_announcement = {
-            "id": corp_id,
-            "securityid": data.get('securityid'),
-            "summary": summary,
-            "fileurl": data.get('fileurl'),
-            "date": data.get('date'),
-            "ai_summary": ai_summary,
-            "category": category,
-            "isin": data.get('isin'),
-            "companyname": data.get('companyname'),
-            "symbol": data.get('symbol'),
-        }
+        new_announcement, skip_reason = build_broadcast_payload(data)
+
+        # The filing (and any financial results) is already in Supabase by the
+        # time this hook fires, even when the broadcast below is skipped
+        if corp_id:
+            invalidate_cached_responses('corporate_filings', 'financial_results')
+
+        if new_announcement is None:
+            logger.info(f"Skipping broadcast for corp_id={corp_id}: {skip_reason}")
+            return jsonify({'message': f'Skipped broadcast: {skip_reason}', 'status': 'skipped'}), 200
+
+        logger.info(f"Broadcasting corp_id={corp_id} ({new_announcement['category']})")
+        if INSTRUMENTATION_AVAILABLE:
+            with get_tracer().span(corp_id, TraceStage.WEBSOCKET_BROADCAST):
+                socketio.emit(ANNOUNCEMENT_EVENT, new_announcement, to=announcement_rooms(new_announcement))
+        else:
+            socketio.emit(ANNOUNCEMENT_EVENT, new_announcement, to=announcement_rooms(new_announcement))
+
+        # Queue notifications for users watching the ISIN or category
+        users_notified = queue_watchlist_notifications(supabase if supabase_connected else None, data)
 
-        logger.info(f"Broadcasting: {new_announcement}")
-        socketio.emit('new_announcement', new_announcement, room='all')
-        
-        # Queue notifications for users in their watchlist
-        isin = data.get('isin')
-        category = data.get('category')
-        corp_id = data.get('corp_id')
-        symbol = data.get('symbol')
-        company_name = data.get('companyname')
-        
-        # Get matching users from watchlist
-        isin_users = get_users_by_isin(isin) if isin else []
-        category_users = get_user_by_category(category) if category else []
-        all_users = list(set(isin_users) | set(category_users))
-        
-        # Queue notifications (batch insert for efficiency)
-        if all_users:
-            notification_records = []
-            for user_id in all_users:
-                # Determine match reason for analytics
-                is_isin_match = user_id in isin_users
-                is_category_match = user_id in category_users
-                
-                if is_isin_match and is_category_match:
-                    matched_by = 'both'
-                elif is_isin_match:
-                    matched_by = 'isin'
-                else:
-                    matched_by = 'category'
-                
-                notification_records.append({
-                    'user_id': user_id,
-                    'corp_id': corp_id,
-                    'isin': isin,
-                    'symbol': symbol,
-                    'company_name': company_name,
-                    'category': category,
-                    'matched_by': matched_by,
-                    'notification_date': dt.date.today().isoformat()
-                })
-            
-            # Batch insert into notification queue
-            try:
-                # Use upsert to handle duplicates gracefully
-                supabase.table('user_notification_queue').upsert(
-                    notification_records,
-                    on_conflict='user_id,corp_id,notification_date'
-                ).execute()
-                logger.info(f"✅ Queued {len(notification_records)} notifications for {len(all_users)} users")
-            except Exception as queue_error:
-                # Log error but don't fail the entire request
-                logger.error(f"❌ Failed to queue notifications: {queue_error}")
-                # Continue execution - WebSocket broadcast already succeeded
-        
         return jsonify({
             'message': 'Announcement broadcast and queued successfully!', 
             'status': 'success',
-            'users_notified': len(all_users) if all_users else 0
+            'users_notified': users_notified
         }), 200
 
     except Exception as e:
@@ -3371,6 +3692,25 @@ def test_announcement():
         logger.error(f"Error sending test announcement: {str(e)}")
         return jsonify({'message': f'Error sending test announcement: {str(e)}', 'status': 'error'}), 500
 
+def _load_stocklist():
+    """Fetch every stocklistdata row for the company search index."""
+    rows = []
+    page_size = 1000
+    start = 0
+    while True:
+        response = supabase.table('stocklistdata').select('*').range(start, start + page_size - 1).execute()
+        batch = response.data or []
+        rows.extend(batch)
+        if len(batch) < page_size:
+            return rows
+        start += page_size
+
+# In-memory company search index (falls back to the ilike query until built)
+company_search_index = None
+if COMPANY_SEARCH_AVAILABLE and supabase_connected:
+    company_search_index = CompanySearchIndex(_load_stocklist)
+    company_search_index.build_in_background()
+
 @app.route('/api/company/search', methods=['GET', 'OPTIONS'])
 def search_companies():
     if request.method == 'OPTIONS':
@@ -3397,13 +3737,20 @@ def search_companies():
         
         logger.debug(f"Search companies: query={query}, limit={limit}")
         
+        # Serve from the in-memory index once it is built
+        if company_search_index is not None and company_search_index.ready:
+            company_search_index.maybe_refresh()
+            top_companies, total_matches = company_search_index.search(query, limit)
+            logger.debug(f"Search '{query}' returned {len(top_companies)} companies (from {total_matches} matches, index)")
+            return jsonify({
+                'count': len(top_companies),
+                'total_matches': total_matches,
+                'companies': top_companies
+            }), 200
+        
         if not supabase_connected:
             return jsonify({'message': 'Database service unavailable. Please try again later.'}), 503
         
-        # Normalize query for better matching
-        query_upper = query.upper()
-        query_lower = query.lower()
-        
         # Fetch all matching results (we'll rank them in Python)
         # Get a larger set to ensure we have enough after ranking
         search_pattern = f"%{query}%"
@@ -3427,64 +3774,16 @@ def search_companies():
         if not results:
             return jsonify({'count': 0, 'companies': []}), 200
         
-        # Ranking function with prioritization
-        def calculate_rank(company):
-            """
-            Calculate ranking score for a company based on search query
-            Lower score = higher priority
-            """
-            name = (company.get('newname') or company.get('oldname') or '').strip()
-            nse_code = (company.get('newnsecode') or company.get('oldnsecode') or '').strip()
-            bse_code = (company.get('newbsecode') or company.get('oldbsecode') or '').strip()
-            
-            name_upper = name.upper()
-            name_lower = name.lower()
-            
-            # Priority 1: Company name starts with query (case-insensitive) - Score 10-19
-            if name_upper.startswith(query_upper):
-                # Exact length match gets best score
-                if len(name) == len(query):
-                    return 10
-                return 11
-            
-            # Priority 2: Symbol (NSE/BSE code) exact match - Score 20-29
-            if nse_code.upper() == query_upper or bse_code.upper() == query_upper:
-                return 20
-            
-            # Priority 2.5: Symbol starts with query - Score 30-39
-            if nse_code.upper().startswith(query_upper) or bse_code.upper().startswith(query_upper):
-                return 30
-            
-            # Priority 3: Any word in company name starts with query - Score 40-49
-            words = name_upper.split()
-            for word in words:
-                if word.startswith(query_upper):
-                    return 40
-            
-            # Priority 4: Company name contains query - Score 50-59
-            if query_upper in name_upper:
-                # Earlier position gets better score
-                position = name_upper.find(query_upper)
-                return 50 + min(position, 9)
-            
-            # Priority 5: Symbol contains query - Score 60-69
-            if query_upper in nse_code.upper() or query_upper in bse_code.upper():
-                return 60
-            
-            # Fallback - shouldn't happen if query matched
-            return 100
-        
-        # Rank all results
+        # Rank with the in-memory index's rules (lower is better), then by name;
+        # without the search module only the name order applies
         ranked_results = []
         for company in results:
-            rank = calculate_rank(company)
+            rank = calculate_company_rank(company, query) if COMPANY_SEARCH_AVAILABLE else 100
             ranked_results.append({
                 'rank': rank,
                 'company': company
             })
-        
-        # Sort by rank (lower is better) and then by name
-        ranked_results.sort(key=lambda x: (x['rank'], x['company'].get('newname', '').upper()))
+        ranked_results.sort(key=lambda x: (x['rank'], (x['company'].get('newname') or '').upper()))
         
         # Extract top results up to limit
         top_companies = [item['company'] for item in ranked_results[:limit]]
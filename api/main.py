@@ -6,6 +6,7 @@ Provides REST endpoints to interact with the Redis queue system
 
 import os
 import json
+import time
 import logging
 from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional
@@ -13,7 +14,7 @@ import uuid
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import redis
 from pydantic import BaseModel, Field
 import uvicorn
@@ -40,6 +41,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Prometheus request latency
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    """Record request latency for the /metrics endpoint"""
+    from src.core.metrics import get_metrics
+
+    started = time.monotonic()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    get_metrics().observe(
+        "backfin_http_request_duration_seconds",
+        time.monotonic() - started,
+        {
+            "app": "queue_api",
+            "method": request.method,
+            "endpoint": getattr(route, "path", "unmatched"),
+            "status": response.status_code
+        }
+    )
+    return response
+
 # Redis connection
 def get_redis_client():
     """Get Redis client connection"""
@@ -396,6 +418,41 @@ async def get_system_stats():
         logger.error(f"Failed to get system stats: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
 
+@app.get("/metrics")
+async def get_prometheus_metrics():
+    """Prometheus metrics for queues, workers and pipeline latencies"""
+    from src.core.metrics import MetricsRegistry, PROMETHEUS_CONTENT_TYPE
+
+    registry = MetricsRegistry(redis_client=get_redis_client())
+    return PlainTextResponse(content=registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/traces/stats")
+async def get_trace_stats(window_seconds: int = 3600):
+    """Get per-stage pipeline latency percentiles over a time window"""
+    from src.core.tracing import JobTracer
+
+    tracer = JobTracer(redis_client=get_redis_client())
+    try:
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "window_seconds": window_seconds,
+            "stages": tracer.stage_percentiles(window_seconds=window_seconds)
+        }
+    except Exception as e:
+        logger.error(f"Failed to get trace stats: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get trace stats: {str(e)}")
+
+@app.get("/traces/{corp_id}")
+async def get_job_trace(corp_id: str):
+    """Get the recorded stage timeline for a single announcement"""
+    from src.core.tracing import JobTracer
+
+    tracer = JobTracer(redis_client=get_redis_client())
+    trace = tracer.get_trace(corp_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail=f"No trace found for {corp_id}")
+    return {"corp_id": corp_id, "stages": trace}
+
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
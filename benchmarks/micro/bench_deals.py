@@ -0,0 +1,43 @@
+"""
+Bulk/block deal normalization and cross-exchange match keys.
+"""
+
+import pandas as pd
+import pytest
+
+from benchmarks.micro.conftest import import_quietly
+
+normalizer = import_quietly("processors.normalizer")
+deduplicator = import_quietly("processors.deduplicator")
+DataNormalizer = normalizer.DataNormalizer
+DealsDeduplicator = deduplicator.DealsDeduplicator
+
+
+@pytest.mark.parametrize("method", ["normalize_nse_bulk", "normalize_nse_block"])
+def bench_normalize_nse(benchmark, nse_deal_records, method):
+    df = benchmark(getattr(DataNormalizer, method), nse_deal_records)
+    assert len(df) == len(nse_deal_records)
+
+
+@pytest.mark.parametrize("method", ["normalize_bse_bulk", "normalize_bse_block"])
+def bench_normalize_bse(benchmark, bse_deal_records, method):
+    df = benchmark(getattr(DataNormalizer, method), bse_deal_records)
+    assert len(df) == len(bse_deal_records)
+
+
+@pytest.fixture(scope="module")
+def combined_deals(nse_deal_records, bse_deal_records):
+    return pd.concat([
+        DataNormalizer.normalize_nse_bulk(nse_deal_records),
+        DataNormalizer.normalize_bse_bulk(bse_deal_records),
+    ], ignore_index=True)
+
+
+def bench_create_match_key(benchmark, combined_deals):
+    keys = benchmark(combined_deals.apply, DealsDeduplicator.create_match_key, axis=1)
+    assert len(keys) == len(combined_deals)
+
+
+def bench_deduplicate(benchmark, combined_deals):
+    unique_df, duplicates_df = benchmark(DealsDeduplicator.deduplicate, combined_deals.copy())
+    assert len(unique_df) + len(duplicates_df) >= len(combined_deals) - len(duplicates_df)
@@ -0,0 +1,22 @@
+"""
+Per-company field diff run for every stocklist row during change detection.
+"""
+
+import pandas as pd
+import pytest
+
+from benchmarks.micro.conftest import import_quietly
+
+detect_changes = import_quietly("detect_changes")
+
+
+@pytest.fixture(scope="module")
+def stocklist_rows(stocklist_pairs):
+    # compare_stockdata passes DataFrame rows, so benchmark with Series too
+    return [(pd.Series(existing), pd.Series(new)) for existing, new in stocklist_pairs]
+
+
+def bench_detect_field_changes(benchmark, stocklist_rows):
+    result = benchmark(lambda: [detect_changes.detect_field_changes(e, n) for e, n in stocklist_rows])
+    changed = [r for r in result if r[0] != "no_change"]
+    assert 0 < len(changed) < len(result)
@@ -0,0 +1,35 @@
+"""
+Cell parsers used when loading NSE JSON and BSE CSV insider-trading data.
+"""
+
+import pytest
+
+from benchmarks.micro.conftest import import_quietly
+
+detector = import_quietly("insider_trading_detector")
+
+SCRAPERS = {
+    "nse": detector.NSEInsiderScraper.__new__(detector.NSEInsiderScraper),
+    "bse": detector.BSEInsiderScraper(download_dir="."),
+}
+
+
+@pytest.mark.parametrize("exchange", sorted(SCRAPERS))
+def bench_parse_int(benchmark, insider_values, exchange):
+    parse = SCRAPERS[exchange].parse_int
+    result = benchmark(lambda: [parse(v) for v in insider_values["ints"]])
+    assert any(r is not None for r in result)
+
+
+@pytest.mark.parametrize("exchange", sorted(SCRAPERS))
+def bench_parse_decimal(benchmark, insider_values, exchange):
+    parse = SCRAPERS[exchange].parse_decimal
+    result = benchmark(lambda: [parse(v) for v in insider_values["decimals"]])
+    assert any(r is not None for r in result)
+
+
+@pytest.mark.parametrize("exchange", sorted(SCRAPERS))
+def bench_parse_date(benchmark, insider_values, exchange):
+    parse = SCRAPERS[exchange].parse_date
+    result = benchmark(lambda: [parse(v) if v is not None else None for v in insider_values["dates"]])
+    assert any(r is not None for r in result)
@@ -0,0 +1,34 @@
+"""
+AI summary post-processing and announcement filtering.
+
+remove_markdown_tags / clean_summary are the BSE scraper's copies;
+check_for_negative_keywords is the AI worker's copy (the one on the live
+queue path).
+"""
+
+from benchmarks.micro.conftest import import_quietly
+
+from src.ai.helper_functions import check_markdown_tables
+
+bse_scraper = import_quietly("src.scrapers.bse_scraper")
+ai_worker = import_quietly("workers.ephemeral_ai_worker")
+
+
+def bench_remove_markdown_tags(benchmark, ai_summaries):
+    result = benchmark(lambda: [bse_scraper.remove_markdown_tags(s) for s in ai_summaries])
+    assert len(result) == len(ai_summaries)
+
+
+def bench_clean_summary(benchmark, ai_summaries):
+    result = benchmark(lambda: [bse_scraper.clean_summary(s) for s in ai_summaries])
+    assert all(r.startswith("**Category:**") or r.startswith("```") for r in result)
+
+
+def bench_check_for_negative_keywords(benchmark, announcement_subjects):
+    result = benchmark(lambda: [ai_worker.check_for_negative_keywords(s) for s in announcement_subjects])
+    assert any(result) and not all(result)
+
+
+def bench_check_markdown_tables(benchmark, ai_summaries):
+    result = benchmark(lambda: [check_markdown_tables(s) for s in ai_summaries])
+    assert any(result) and not all(result)
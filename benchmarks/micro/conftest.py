@@ -0,0 +1,93 @@
+"""
+Shared setup for the micro-benchmark suite.
+
+The benchmarked modules are normally run as standalone scripts, so this puts
+their directories on sys.path, supplies placeholder Supabase credentials
+(nothing connects during the benchmarks) and imports them from a scratch
+directory so their import-time log/CSV files do not land in the repo.
+"""
+
+import os
+import sys
+import logging
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+from benchmarks.micro import inputs
+
+ROOT = Path(__file__).resolve().parents[2]
+EXCHANGE_DATA = ROOT / "src" / "services" / "exchange_data"
+
+for path in (
+    ROOT,
+    EXCHANGE_DATA / "deals_management",
+    EXCHANGE_DATA / "insider_trading",
+    EXCHANGE_DATA / "company_management",
+):
+    if str(path) not in sys.path:
+        sys.path.append(str(path))
+
+os.environ.setdefault("SUPABASE_URL2", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_KEY2", "bench.stub.key")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench.stub.key")
+
+
+@contextmanager
+def _scratch_cwd():
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            yield
+        finally:
+            os.chdir(previous)
+
+
+def import_quietly(module_name: str):
+    """Import a script-style module from a scratch cwd"""
+    import importlib
+    with _scratch_cwd():
+        module = importlib.import_module(module_name)
+    return module
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _quiet_logging():
+    """Per-call INFO logging would dominate the measurements; restored after the session"""
+    previous = logging.root.manager.disable
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(previous)
+
+
+@pytest.fixture(scope="session")
+def ai_summaries():
+    return inputs.ai_summaries(300)
+
+
+@pytest.fixture(scope="session")
+def announcement_subjects():
+    return inputs.announcement_subjects(2000)
+
+
+@pytest.fixture(scope="session")
+def nse_deal_records():
+    return inputs.nse_deal_records(2000)
+
+
+@pytest.fixture(scope="session")
+def bse_deal_records():
+    return inputs.bse_deal_records(2000)
+
+
+@pytest.fixture(scope="session")
+def insider_values():
+    return inputs.insider_values(5000)
+
+
+@pytest.fixture(scope="session")
+def stocklist_pairs():
+    return inputs.stocklist_pairs(3000)
@@ -0,0 +1,196 @@
+"""
+Seeded generators for realistic benchmark inputs.
+
+Shapes mirror what the exchanges and Gemini actually return: AI summaries with
+markdown tables (some malformed), BSE announcement subjects, NSE/BSE bulk and
+block deal rows with Indian digit grouping, insider-trading cell values with
+the usual "-", "Nil" and mixed date formats, and stocklist rows where a small
+fraction changed between runs.
+"""
+
+import random
+import string
+from typing import Dict, Any, List, Tuple
+
+SEED = 20251018
+
+COMPANIES = [
+    "Reliance Industries", "Tata Consultancy Services", "HDFC Bank", "Infosys", "ICICI Bank",
+    "Hindustan Unilever", "Bharti Airtel", "Larsen & Toubro", "Asian Paints", "Sun Pharmaceutical",
+    "Bajaj Finance", "Maruti Suzuki", "Titan Company", "Wipro", "Adani Ports",
+]
+
+CLIENTS = [
+    "GOLDMAN SACHS (SINGAPORE) PTE", "MORGAN STANLEY ASIA (SINGAPORE) PTE.", "SOCIETE GENERALE",
+    "BOFA SECURITIES EUROPE SA", "GRAVITON RESEARCH CAPITAL LLP", "HRTI PRIVATE LIMITED",
+    "JUNOMONETA FINSOL PRIVATE LIMITED", "NK SECURITIES RESEARCH PRIVATE LIMITED",
+]
+
+SUBJECTS = [
+    "Financial Results for the quarter ended September 30, 2025",
+    "Outcome of Board Meeting held on 14-Nov-2025",
+    "Closure of Trading Window",
+    "Newspaper Publication of Financial Results",
+    "Intimation of Record Date for Interim Dividend",
+    "Award of Order / Receipt of Order",
+    "Investor Presentation for Q2 FY26",
+    "Compliance Report under Regulation 74(5) of SEBI (DP) Regulations, 2018",
+    "Credit Rating - Reaffirmed",
+    "Acquisition of 51% equity stake in subsidiary",
+    "General Updates",
+    "Change in Company Secretary/Compliance Officer",
+]
+
+
+def _indian_grouping(value: int) -> str:
+    """Format an integer the way NSE/BSE do (12,34,567)"""
+    s = str(value)
+    if len(s) <= 3:
+        return s
+    head, tail = s[:-3], s[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    return ",".join(groups + [tail])
+
+
+def _markdown_table(rng: random.Random, rows: int, malformed: bool) -> str:
+    header = "| Particulars | Q2FY26 | Q2FY25 | YoY % |"
+    separator = "|---|---:|---:|---:|"
+    lines = [header, separator]
+    for i in range(rows):
+        cells = [f"Line item {i}", f"{rng.uniform(10, 9000):,.2f}", f"{rng.uniform(10, 9000):,.2f}",
+                 f"{rng.uniform(-40, 60):.1f}%"]
+        if malformed and i == rows // 2:
+            cells = cells[:-1]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def ai_summaries(count: int, seed: int = SEED) -> List[str]:
+    """Gemini-style markdown summaries, some wrapped in code fences or containing HTML"""
+    rng = random.Random(seed)
+    summaries = []
+    for i in range(count):
+        company = rng.choice(COMPANIES)
+        parts = [
+            f"Preamble text the model sometimes emits before the summary {i}.",
+            "**Category:** Financial Results",
+            f"**Headline:** {company} reports {rng.randint(5, 40)}% growth in Q2 revenue",
+            "",
+            "### Key Highlights",
+            *[f"- <b>Point {j}</b>: revenue rose to ₹{rng.uniform(100, 20000):,.1f} Cr" for j in range(rng.randint(3, 8))],
+            "",
+            _markdown_table(rng, rng.randint(4, 12), malformed=rng.random() < 0.2),
+            "",
+            "*Outlook:* " + " ".join(rng.choice(string.ascii_lowercase) * rng.randint(2, 8) for _ in range(40)),
+        ]
+        text = "\n".join(parts)
+        if rng.random() < 0.3:
+            text = "```markdown\n" + "\n".join("    " + line for line in text.splitlines()) + "\n```"
+        summaries.append(text)
+    return summaries
+
+
+def announcement_subjects(count: int, seed: int = SEED) -> List[str]:
+    """BSE NEWSSUB strings: '<Company> - <scrip> - <subject>'"""
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(COMPANIES)} Ltd - {rng.randint(500000, 545000)} - {rng.choice(SUBJECTS)}"
+        for _ in range(count)
+    ]
+
+
+def nse_deal_records(count: int, seed: int = SEED) -> List[Dict[str, Any]]:
+    """Raw NSE bulk/block deal rows as returned by historicalOR/bulk-block-short-deals"""
+    rng = random.Random(seed)
+    months = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+    return [
+        {
+            "BD_SYMBOL": rng.choice(COMPANIES).upper().replace(" ", "")[:10],
+            "BD_DT_DATE": f"{rng.randint(1, 28):02d}-{rng.choice(months)}-2025",
+            "BD_CLIENT_NAME": rng.choice(CLIENTS),
+            "BD_BUY_SELL": rng.choice(["BUY", "SELL"]),
+            "BD_QTY_TRD": rng.randint(50000, 5000000),
+            "BD_TP_WATP": round(rng.uniform(5, 4000), 2),
+            "BD_REMARKS": "-",
+        }
+        for _ in range(count)
+    ]
+
+
+def bse_deal_records(count: int, seed: int = SEED) -> List[Dict[str, Any]]:
+    """Raw BSE bulk/block deal rows as scraped from the report tables (all strings)"""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        price = f"{rng.uniform(5, 4000):.2f}"
+        records.append({
+            "Deal Date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025",
+            "Security Code": str(rng.randint(500000, 545000)),
+            "Security Name": rng.choice(COMPANIES).upper(),
+            "Client Name": rng.choice(CLIENTS),
+            "Deal Type *": rng.choice(["B", "S"]),
+            "Quantity": _indian_grouping(rng.randint(50000, 5000000)),
+            "Price **": price,
+            "Trade Price": price,
+        })
+    return records
+
+
+def insider_values(count: int, seed: int = SEED) -> Dict[str, List[Any]]:
+    """Cell values fed to the insider scrapers' parse_int / parse_decimal / parse_date"""
+    rng = random.Random(seed)
+    blanks = ["-", "Nil", "NA", "", None]
+    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+    def maybe_blank(value):
+        return rng.choice(blanks) if rng.random() < 0.1 else value
+
+    ints, decimals, dates = [], [], []
+    for _ in range(count):
+        ints.append(maybe_blank(rng.choice([
+            _indian_grouping(rng.randint(1, 50000000)),
+            str(rng.randint(1, 50000000)),
+            f"{rng.randint(1, 500000)}.0",
+        ])))
+        decimals.append(maybe_blank(rng.choice([
+            f"{rng.uniform(0, 100):.2f}%",
+            f"{rng.uniform(0, 100):.4f}",
+            _indian_grouping(rng.randint(1000, 90000000)) + ".50",
+        ])))
+        day, month = rng.randint(1, 28), rng.randint(1, 12)
+        dates.append(maybe_blank(rng.choice([
+            f"{day:02d}-{month:02d}-2025",
+            f"{day:02d}/{month:02d}/2025",
+            f"{day:02d}-{months[month - 1]}-2025",
+            f"{day:02d} {months[month - 1]} 2025",
+            f"2025-{month:02d}-{day:02d}",
+            f"{day:02d}-{months[month - 1]}-2025 14:32",
+        ])))
+    return {"ints": ints, "decimals": decimals, "dates": dates}
+
+
+def stocklist_pairs(count: int, seed: int = SEED, change_rate: float = 0.05) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """(existing, new) stocklist rows; ``change_rate`` of them differ in one or two fields"""
+    rng = random.Random(seed)
+    pairs = []
+    for i in range(count):
+        symbol = f"SYM{i:05d}"
+        existing = {
+            "isin": f"INE{i:06d}01{rng.randint(0, 9)}",
+            "securityid": str(500000 + i),
+            "symbol": symbol,
+            "newname": f"{rng.choice(COMPANIES)} {i} Limited",
+            "newbsecode": str(500000 + i),
+            "newnsecode": rng.choice([symbol, f"{symbol}$", ""]),
+        }
+        new = dict(existing)
+        if rng.random() < change_rate:
+            field = rng.choice(["symbol", "newname", "newnsecode", "isin"])
+            new[field] = f"{new[field]}X" if new[field] else "NEW"
+        pairs.append((existing, new))
+    return pairs
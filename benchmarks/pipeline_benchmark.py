@@ -0,0 +1,313 @@
+"""
+End-to-end pipeline benchmark: scraper -> AI worker -> Supabase worker
+
+Runs the real ephemeral workers against local stand-ins so throughput can be
+measured without touching BSE, Gemini or Supabase:
+
+- Redis: fakeredis TCP server (default) or any scratch Redis via --redis-url
+- Supabase: in-memory PostgREST stub (benchmarks/stubs.py)
+- Gemini: FakeGeminiClient with configurable latency / jitter / error rate
+- BSE: fixture server replaying announcements.json and PDFs from --fixtures
+  (or synthetic ones when no fixtures are given)
+
+The harness plays the scraper's role: it fetches the announcement burst from
+the fixture server and enqueues AIProcessingJobs exactly as
+BseScraper.queue_announcement_for_processing does, then waits for every job to
+land in the stub's corporatefilings table (or the delayed/failed queues).
+
+Usage:
+    python -m benchmarks.pipeline_benchmark --burst 50 --ai-workers 2 \\
+        --gemini-latency-ms 1500 --gemini-error-rate 0.05 --output results.json
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import argparse
+import resource
+import multiprocessing
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List
+
+import redis
+import requests
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.stubs import StubPostgrestServer, FixtureServer, FakeGeminiClient, synthetic_announcements
+from src.queue.redis_client import QueueNames
+from src.queue.job_types import AIProcessingJob, serialize_job
+from src.core.tracing import JobTracer, TraceStage
+
+BSE_ATTACHMENT_PREFIX = "https://www.bseindia.com/xml-data/corpfiling/AttachLive/"
+
+
+def _peak_rss_mb(include_children: bool = False) -> float:
+    """Peak resident set size of this process (and reaped children) in MB"""
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        peak_kb = max(peak_kb, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak_kb / 1024.0
+
+
+def _run_ai_worker(env: Dict[str, str], fixture_url: str, gemini_config: Dict[str, Any],
+                   max_jobs: int, idle_timeout: int, ready, results) -> None:
+    """Child process: real EphemeralAIWorker with Gemini and BSE endpoints swapped for stand-ins"""
+    os.environ.update(env)
+    import workers.ephemeral_ai_worker as ai_worker
+
+    ai_worker.genai_client = FakeGeminiClient(**gemini_config)
+
+    def get_isin(scrip_id: str, max_retries: int = 3, request_timeout: int = 10) -> str:
+        resp = requests.get(f"{fixture_url}/isin/{scrip_id}", timeout=request_timeout)
+        return resp.json().get("ISIN") or "N/A"
+
+    ai_worker.get_isin = get_isin
+
+    original_download = ai_worker.EphemeralAIWorker.download_pdf_file
+
+    def download_pdf_file(self, url: str) -> str:
+        if url and url.startswith(BSE_ATTACHMENT_PREFIX):
+            url = f"{fixture_url}/pdf/{url[len(BSE_ATTACHMENT_PREFIX):]}"
+        return original_download(self, url)
+
+    ai_worker.EphemeralAIWorker.download_pdf_file = download_pdf_file
+
+    worker = ai_worker.EphemeralAIWorker()
+    worker.max_jobs_per_session = max_jobs
+    worker.idle_timeout = idle_timeout
+    ready.put(worker.worker_id)
+    try:
+        worker.run()
+    finally:
+        results.put({"worker": worker.worker_id, "role": "ai", "jobs": worker.jobs_processed,
+                     "peak_rss_mb": round(_peak_rss_mb(), 1)})
+
+
+def _run_supabase_worker(env: Dict[str, str], ready, results) -> None:
+    """Child process: real EphemeralSupabaseWorkerV2 pointed at the PostgREST stub"""
+    os.environ.update(env)
+    # A spawned child inherits the "spawn" start method; the worker's per-job children expect
+    # the platform default (fork) as when it runs as a standalone script
+    multiprocessing.set_start_method("fork", force=True)
+    import workers.ephemeral_supabase_worker as supabase_worker
+
+    worker = supabase_worker.EphemeralSupabaseWorkerV2()
+    ready.put(worker.worker_id)
+    try:
+        worker.run()
+    finally:
+        # Per-job children are reaped by now, so RUSAGE_CHILDREN covers their peak too
+        results.put({"worker": worker.worker_id, "role": "supabase", "jobs": worker.jobs_processed,
+                     "peak_rss_mb": round(_peak_rss_mb(include_children=True), 1)})
+
+
+def _start_fake_redis():
+    """Start a fakeredis TCP server on an ephemeral port; returns (server, url)"""
+    import threading
+    from fakeredis import TcpFakeServer
+
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"redis://{host}:{port}/0"
+
+
+def enqueue_burst(client: redis.Redis, tracer: JobTracer, fixture_url: str) -> List[str]:
+    """Fetch the announcement burst from the fixture server and enqueue AI jobs like the BSE scraper"""
+    announcements = requests.get(f"{fixture_url}/bse/announcements", timeout=30).json().get("Table", [])
+    corp_ids = []
+    for announcement in announcements:
+        newsid = str(announcement.get("NEWSID") or "").strip()
+        if not newsid:
+            continue
+        corp_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"bse:{newsid}"))
+        ai_job = AIProcessingJob(
+            job_id=corp_id,
+            corp_id=corp_id,
+            announcement_data=announcement,
+            priority="normal",
+            created_at=datetime.now(timezone.utc).isoformat()
+        )
+        client.lpush(QueueNames.AI_PROCESSING, serialize_job(ai_job))
+        tracer.record(corp_id, TraceStage.ENQUEUE, queue=QueueNames.AI_PROCESSING, source="BENCH")
+        corp_ids.append(corp_id)
+    return corp_ids
+
+
+def wait_for_completion(client: redis.Redis, postgrest: StubPostgrestServer, expected: int,
+                        timeout: float, poll_interval: float = 0.25) -> Dict[str, int]:
+    """Block until every job is uploaded, delayed or dead-lettered (or the timeout expires)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        outcome = {
+            "uploaded": postgrest.count("corporatefilings"),
+            "delayed": client.zcard(f"{QueueNames.AI_PROCESSING}:delayed"),
+            "failed": client.llen(QueueNames.FAILED_JOBS),
+        }
+        if sum(outcome.values()) >= expected or time.monotonic() >= deadline:
+            outcome["timed_out"] = int(sum(outcome.values()) < expected)
+            return outcome
+        time.sleep(poll_interval)
+
+
+def print_report(report: Dict[str, Any]):
+    """Print formatted benchmark results"""
+    print("=" * 72)
+    print(f"Pipeline Benchmark - {report['burst']} announcements, {report['ai_workers']} AI worker(s)")
+    print("=" * 72)
+    outcome = report["outcome"]
+    print(f"Uploaded: {outcome['uploaded']}  Delayed: {outcome['delayed']}  "
+          f"Failed: {outcome['failed']}  Timed out: {'yes' if outcome['timed_out'] else 'no'}")
+    print(f"Elapsed: {report['elapsed_seconds']:.2f}s  Throughput: {report['jobs_per_second']:.2f} jobs/sec")
+    print()
+    print(f"{'STAGE':<22} | {'COUNT':>7} | {'P50 ms':>10} | {'P99 ms':>10} | {'MAX ms':>10}")
+    print("-" * 72)
+    for stage, values in report["stages"].items():
+        print(f"{stage:<22} | {values['count']:>7} | {values['p50']:>10.1f} | "
+              f"{values['p99']:>10.1f} | {values['max']:>10.1f}")
+    print()
+    print(f"{'WORKER':<32} | {'ROLE':<8} | {'JOBS':>6} | {'PEAK RSS MB':>12}")
+    print("-" * 72)
+    for worker in report["workers"]:
+        print(f"{worker['worker']:<32} | {worker['role']:<8} | {worker['jobs']:>6} | {worker['peak_rss_mb']:>12.1f}")
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    """Start stand-ins and workers, push the burst through the pipeline and collect results"""
+    fake_redis = None
+    redis_url = args.redis_url
+    if not redis_url:
+        fake_redis, redis_url = _start_fake_redis()
+    client = redis.from_url(redis_url, decode_responses=True)
+    if args.redis_url and not args.flush:
+        print("⚠️ Using an external Redis without --flush; leftover queue contents will skew results")
+    if args.flush:
+        client.flushdb()
+
+    postgrest = StubPostgrestServer(latency_ms=args.supabase_latency_ms).start()
+    if args.fixtures:
+        fixtures = FixtureServer.from_directory(Path(args.fixtures), latency_ms=args.bse_latency_ms)
+        fixtures.announcements = fixtures.announcements[:args.burst]
+    else:
+        fixtures = FixtureServer(synthetic_announcements(args.burst, seed=args.seed), latency_ms=args.bse_latency_ms)
+    fixtures.start()
+
+    connection = redis.connection.parse_url(redis_url)
+    env = {
+        "REDIS_URL": redis_url,
+        "REDIS_HOST": str(connection.get("host", "127.0.0.1")),
+        "REDIS_PORT": str(connection.get("port", 6379)),
+        "REDIS_DB": str(connection.get("db", 0)),
+        "SUPABASE_URL2": postgrest.url,
+        "SUPABASE_SERVICE_ROLE_KEY": StubPostgrestServer.SERVICE_KEY,
+        "SUPABASE_KEY2": StubPostgrestServer.SERVICE_KEY,
+        "API_HOST": "127.0.0.1",
+        "API_PORT": str(postgrest.httpd.server_address[1]),
+        "GEMINI_API_KEY": "",
+    }
+    os.environ.update(env)
+    gemini_config = {
+        "latency_ms": args.gemini_latency_ms,
+        "jitter_ms": args.gemini_jitter_ms,
+        "error_rate": args.gemini_error_rate,
+        "upload_latency_ms": args.gemini_upload_latency_ms,
+    }
+
+    # Spawn (not fork) so each worker imports its module fresh, like WorkerSpawner's subprocesses
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    results = context.Queue()
+    supabase_proc = context.Process(target=_run_supabase_worker, args=(env, ready, results), daemon=False)
+    ai_procs = [
+        context.Process(
+            target=_run_ai_worker,
+            args=(env, fixtures.url, dict(gemini_config, seed=args.seed + i), args.burst, args.idle_timeout, ready, results),
+            daemon=False
+        )
+        for i in range(args.ai_workers)
+    ]
+    supabase_proc.start()
+    for proc in ai_procs:
+        proc.start()
+    # Wait until every worker has imported and constructed, then let them connect to Redis
+    # (RedisConfig.get_connection sleeps before its first attempt) so startup is not billed to the burst
+    for _ in range(len(ai_procs) + 1):
+        ready.get(timeout=120)
+    time.sleep(args.warmup)
+
+    tracer = JobTracer(redis_client=client, enabled=True)
+    started_wall = time.time()
+    started = time.monotonic()
+    corp_ids = enqueue_burst(client, tracer, fixtures.url)
+    outcome = wait_for_completion(client, postgrest, len(corp_ids), timeout=args.timeout)
+    elapsed = time.monotonic() - started
+
+    for proc in ai_procs + [supabase_proc]:
+        if proc.is_alive():
+            os.kill(proc.pid, signal.SIGTERM)
+    workers = []
+    for _ in range(len(ai_procs) + 1):
+        try:
+            workers.append(results.get(timeout=30))
+        except Exception:
+            break
+    for proc in ai_procs + [supabase_proc]:
+        proc.join(timeout=10)
+        if proc.is_alive():
+            proc.kill()
+
+    window = int(time.time() - started_wall) + 5
+    report = {
+        "burst": len(corp_ids),
+        "ai_workers": args.ai_workers,
+        "gemini": gemini_config,
+        "outcome": outcome,
+        "elapsed_seconds": round(elapsed, 3),
+        "jobs_per_second": round(outcome["uploaded"] / elapsed, 3) if elapsed else 0.0,
+        "stages": tracer.stage_percentiles(window_seconds=window, percentiles=(50, 99), count=100000),
+        "workers": sorted(workers, key=lambda w: (w["role"], w["worker"])),
+        "broadcasts": len(postgrest.broadcasts),
+    }
+
+    fixtures.stop()
+    postgrest.stop()
+    if fake_redis is not None:
+        fake_redis.shutdown()
+    return report
+
+
+def main():
+    """CLI interface for the pipeline benchmark"""
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark with local stand-ins")
+    parser.add_argument("--burst", type=int, default=20, help="Number of announcements to push through")
+    parser.add_argument("--ai-workers", type=int, default=1, help="Concurrent AI worker processes")
+    parser.add_argument("--fixtures", help="Directory with announcements.json and pdfs/ (synthetic if omitted)")
+    parser.add_argument("--redis-url", help="Scratch Redis to use instead of the in-process fakeredis server")
+    parser.add_argument("--flush", action="store_true", help="FLUSHDB the Redis database before running")
+    parser.add_argument("--gemini-latency-ms", type=float, default=1500.0)
+    parser.add_argument("--gemini-jitter-ms", type=float, default=300.0)
+    parser.add_argument("--gemini-upload-latency-ms", type=float, default=200.0)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0, help="Fraction of generate_content calls that fail")
+    parser.add_argument("--supabase-latency-ms", type=float, default=20.0)
+    parser.add_argument("--bse-latency-ms", type=float, default=50.0)
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds to let workers connect before enqueueing")
+    parser.add_argument("--idle-timeout", type=int, default=30, help="AI worker idle shutdown (seconds)")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Give up waiting after this many seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\n📝 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
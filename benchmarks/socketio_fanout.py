@@ -0,0 +1,239 @@
+"""
+Socket.IO fan-out load test: N connected clients, M announcements
+
+Connects ``--clients`` Socket.IO clients (spread round-robin over one or more
+API replicas given with ``--url``) and measures how long each
+``new_announcement`` takes to reach all of them. Clients run as asyncio
+tasks split over ``--processes`` worker processes, so 10k connections do not
+share one event loop.
+
+Announcements are sent either through the Redis message queue with the
+workers' ``AnnouncementPublisher`` (``--mode queue``, requires the API to run
+with the same ``SOCKETIO_MESSAGE_QUEUE`` / ``SOCKETIO_CHANNEL``) or by POSTing
+to ``/api/insert_new_announcement`` (``--mode http``). The HTTP path also
+invalidates cached filings and queues watchlist notifications, so point it
+at a scratch deployment.
+
+Every client needs a file descriptor; raise ``ulimit -n`` (and the server's)
+before running with thousands of clients.
+
+Usage:
+    python -m benchmarks.socketio_fanout --url http://localhost:8000 --clients 10000 \\
+        --processes 8 --messages 20 --mode queue --message-queue redis://localhost:6379/0 \\
+        --output fanout.json
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import resource
+import statistics
+import multiprocessing
+from pathlib import Path
+from typing import Dict, Any, List
+
+import requests
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.announcement_publisher import (
+    AnnouncementPublisher, ANNOUNCEMENT_EVENT, SOCKETIO_CHANNEL, SOCKETIO_MESSAGE_QUEUE, build_broadcast_payload
+)
+
+ID_PREFIX = "fanout"
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _raise_fd_limit() -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def _run_clients(urls: List[str], count: int, offset: int, run_id: str, connect_concurrency: int,
+                       ready, done) -> Dict[str, Any]:
+    import socketio
+
+    receipts: Dict[int, List[float]] = {}
+    prefix = f"{ID_PREFIX}-{run_id}-"
+    clients = []
+    failures = 0
+    semaphore = asyncio.Semaphore(connect_concurrency)
+
+    def on_announcement(data):
+        received_at = time.time()
+        announcement_id = str((data or {}).get('id') or '')
+        if announcement_id.startswith(prefix):
+            receipts.setdefault(int(announcement_id[len(prefix):]), []).append(received_at)
+
+    async def connect(index: int) -> None:
+        nonlocal failures
+        client = socketio.AsyncClient(reconnection=False)
+        client.on(ANNOUNCEMENT_EVENT, on_announcement)
+        async with semaphore:
+            try:
+                await client.connect(urls[(offset + index) % len(urls)], transports=['websocket'], wait_timeout=30)
+                clients.append(client)
+            except Exception:
+                failures += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(connect(i) for i in range(count)))
+    connect_seconds = time.monotonic() - started
+    ready.put((len(clients), failures, connect_seconds))
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, done.wait)
+    await asyncio.gather(*(client.disconnect() for client in clients), return_exceptions=True)
+    return {"receipts": receipts}
+
+
+def _client_process(urls: List[str], count: int, offset: int, run_id: str, connect_concurrency: int,
+                    ready, done, results) -> None:
+    """Child process: hold ``count`` connections until the parent sets ``done``"""
+    _raise_fd_limit()
+    result = asyncio.run(_run_clients(urls, count, offset, run_id, connect_concurrency, ready, done))
+    results.put(result)
+
+
+def _announcement(run_id: str, seq: int) -> Dict[str, Any]:
+    return {
+        "corp_id": f"{ID_PREFIX}-{run_id}-{seq}",
+        "category": "Load Test",
+        "summary": f"Fan-out load test message {seq}",
+        "ai_summary": "**Category:** Load Test",
+        "companyname": "Load Test",
+        "symbol": "LOADTEST",
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket.IO new_announcement fan-out load test")
+    parser.add_argument("--url", action="append", help="Socket.IO server URL (repeat for several replicas)")
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--processes", type=int, default=max(1, min(8, os.cpu_count() or 1)))
+    parser.add_argument("--connect-concurrency", type=int, default=100, help="Concurrent handshakes per process")
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between announcements")
+    parser.add_argument("--mode", choices=("queue", "http"), default="queue")
+    parser.add_argument("--message-queue", default=SOCKETIO_MESSAGE_QUEUE, help="Redis URL for --mode queue")
+    parser.add_argument("--channel", default=SOCKETIO_CHANNEL)
+    parser.add_argument("--api-url", help="API base URL for --mode http (defaults to the first --url)")
+    parser.add_argument("--drain", type=float, default=10.0, help="Seconds to wait for stragglers after the last send")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    urls = args.url or ["http://localhost:8000"]
+    run_id = uuid.uuid4().hex[:8]
+
+    publisher = None
+    if args.mode == "queue":
+        if not args.message_queue:
+            parser.error("--mode queue needs --message-queue or SOCKETIO_MESSAGE_QUEUE")
+        publisher = AnnouncementPublisher(args.message_queue, args.channel)
+        if not publisher.enabled:
+            parser.error("python-socketio is not installed")
+    api_url = (args.api_url or urls[0]).rstrip("/")
+
+    # Spread clients over the processes
+    ctx = multiprocessing.get_context("spawn")
+    ready, results, done = ctx.Queue(), ctx.Queue(), ctx.Event()
+    shares = [args.clients // args.processes + (1 if i < args.clients % args.processes else 0)
+              for i in range(args.processes)]
+    procs, offset = [], 0
+    for share in shares:
+        if share == 0:
+            continue
+        proc = ctx.Process(target=_client_process,
+                           args=(urls, share, offset, run_id, args.connect_concurrency, ready, done, results))
+        proc.start()
+        procs.append(proc)
+        offset += share
+
+    connected = failed = 0
+    connect_seconds = 0.0
+    for _ in procs:
+        ok, failures, seconds = ready.get()
+        connected += ok
+        failed += failures
+        connect_seconds = max(connect_seconds, seconds)
+    print(f"Connected {connected}/{args.clients} clients in {connect_seconds:.1f}s ({failed} failed)")
+
+    sent_at: Dict[int, float] = {}
+    publish_ms: List[float] = []
+    for seq in range(args.messages):
+        announcement = _announcement(run_id, seq)
+        started = time.time()
+        if publisher is not None:
+            payload, _ = build_broadcast_payload(announcement)
+            publisher.emit(ANNOUNCEMENT_EVENT, payload)
+        else:
+            requests.post(f"{api_url}/api/insert_new_announcement", json=announcement, timeout=30)
+        sent_at[seq] = started
+        publish_ms.append((time.time() - started) * 1000)
+        time.sleep(args.interval)
+    time.sleep(args.drain)
+
+    done.set()
+    receipts: Dict[int, List[float]] = {}
+    for _ in procs:
+        for seq, times in results.get()["receipts"].items():
+            receipts.setdefault(seq, []).extend(times)
+    for proc in procs:
+        proc.join(timeout=30)
+
+    per_message = []
+    all_latencies: List[float] = []
+    for seq, started in sent_at.items():
+        latencies = [(t - started) * 1000 for t in receipts.get(seq, [])]
+        all_latencies.extend(latencies)
+        per_message.append({
+            "seq": seq,
+            "delivered": len(latencies),
+            "p50_ms": round(_percentile(latencies, 50), 1),
+            "p99_ms": round(_percentile(latencies, 99), 1),
+            "fanout_ms": round(max(latencies), 1) if latencies else None,
+        })
+
+    expected = connected * len(sent_at)
+    report = {
+        "mode": args.mode,
+        "urls": urls,
+        "clients": args.clients,
+        "connected": connected,
+        "connect_failures": failed,
+        "connect_seconds": round(connect_seconds, 2),
+        "messages": len(sent_at),
+        "delivery_ratio": round(len(all_latencies) / expected, 4) if expected else 0.0,
+        "publish_ms_mean": round(statistics.mean(publish_ms), 2) if publish_ms else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(all_latencies, 50), 1),
+            "p95": round(_percentile(all_latencies, 95), 1),
+            "p99": round(_percentile(all_latencies, 99), 1),
+            "max": round(max(all_latencies), 1) if all_latencies else 0.0,
+        },
+        "fanout_ms_p50": round(_percentile([m["fanout_ms"] for m in per_message if m["fanout_ms"] is not None], 50), 1),
+        "per_message": per_message,
+    }
+
+    summary = {key: value for key, value in report.items() if key != "per_message"}
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
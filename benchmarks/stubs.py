@@ -0,0 +1,405 @@
+"""
+Local stand-ins for the external services the pipeline talks to.
+
+- StubPostgrestServer: in-memory PostgREST/Supabase REST API (plus the Flask
+  API's /api/insert_new_announcement hook) with configurable latency
+- FixtureServer: replays BSE announcement JSON, ISIN lookups and PDFs from a
+  fixture directory (or synthesizes them) with configurable latency
+- FakeGeminiClient: drop-in replacement for RateLimitedGeminiClient with
+  configurable latency and error rate
+
+Servers run in daemon threads on 127.0.0.1 with an ephemeral port.
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+# Tables with a unique key the stub enforces (mirrors production constraints)
+UNIQUE_KEYS = {
+    "corporatefilings": ("corp_id",),
+    "announcement_pdf_hashes": ("isin", "pdf_hash"),
+}
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    """Request handler that does not log every request to stderr"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Any):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length))
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections under concurrent load tests
+    request_queue_size = 128
+
+
+class _BackgroundServer:
+    """Run a ThreadingHTTPServer in a daemon thread"""
+
+    def __init__(self, handler_class, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.httpd = _StubHTTPServer(("127.0.0.1", 0), handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def simulate_latency(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def start(self) -> "_BackgroundServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ---- PostgREST / Supabase stand-in ----
+
+def _matches(row: Dict[str, Any], filters: Dict[str, str]) -> bool:
+    """Evaluate the subset of PostgREST filter operators the pipeline uses"""
+    for column, expression in filters.items():
+        op, _, value = expression.partition(".")
+        actual = row.get(column)
+        if op == "eq" and str(actual) != value:
+            return False
+        if op == "neq" and str(actual) == value:
+            return False
+        if op == "in" and str(actual) not in value.strip("()").split(","):
+            return False
+        if op == "is" and value == "null" and actual is not None:
+            return False
+    return True
+
+
+class _PostgrestHandler(_QuietHandler):
+    RESERVED_PARAMS = {"select", "limit", "offset", "order", "on_conflict", "columns"}
+
+    def _parse(self):
+        parsed = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        filters = {k: v for k, v in params.items() if k not in self.RESERVED_PARAMS}
+        return parsed.path, params, filters
+
+    def _table(self, path: str) -> Optional[str]:
+        prefix = "/rest/v1/"
+        return path[len(prefix):] if path.startswith(prefix) else None
+
+    def _respond_rows(self, rows: List[Dict[str, Any]], status: int = 200):
+        if "vnd.pgrst.object+json" in (self.headers.get("Accept") or ""):
+            if len(rows) != 1:
+                self._send_json(406, {
+                    "code": "PGRST116",
+                    "details": f"The result contains {len(rows)} rows",
+                    "hint": None,
+                    "message": "JSON object requested, multiple (or no) rows returned"
+                })
+                return
+            self._send_json(status, rows[0])
+            return
+        self._send_json(status, rows)
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub.simulate_latency()
+        path, params, filters = self._parse()
+        table = self._table(path)
+        if table is None:
+            self._send_json(404, {"message": "not found"})
+            return
+        rows = [r for r in stub.rows(table) if _matches(r, filters)]
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        self._respond_rows(rows)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_POST(self):
+        stub = self.server.stub
+        stub.simulate_latency()
+        path, params, filters = self._parse()
+        payload = self._read_json()
+
+        if path == "/api/insert_new_announcement":
+            stub.broadcasts.append(payload)
+            self._send_json(200, {"status": "success"})
+            return
+        if path.startswith("/rest/v1/rpc/"):
+            stub.rpc_calls.append((path.rsplit("/", 1)[-1], payload))
+            self._send_json(200, [])
+            return
+
+        table = self._table(path)
+        if table is None:
+            self._send_json(404, {"message": "not found"})
+            return
+        records = payload if isinstance(payload, list) else [payload]
+        upsert = "resolution=merge-duplicates" in (self.headers.get("Prefer") or "")
+        inserted, error = stub.insert(table, records, upsert=upsert)
+        if error:
+            self._send_json(409, {"code": "23505", "details": error, "hint": None,
+                                  "message": "duplicate key value violates unique constraint"})
+            return
+        self._respond_rows(inserted, status=201)
+
+    def do_PATCH(self):
+        stub = self.server.stub
+        stub.simulate_latency()
+        path, params, filters = self._parse()
+        table = self._table(path)
+        updates = self._read_json() or {}
+        updated = stub.update(table, filters, updates)
+        self._respond_rows(updated)
+
+    def do_DELETE(self):
+        stub = self.server.stub
+        stub.simulate_latency()
+        path, params, filters = self._parse()
+        self._respond_rows(stub.delete(self._table(path), filters))
+
+
+class StubPostgrestServer(_BackgroundServer):
+    """In-memory PostgREST-compatible server standing in for Supabase"""
+
+    # Any three-segment token passes the supabase client's API key validation
+    SERVICE_KEY = "bench.stub.key"
+
+    def __init__(self, latency_ms: float = 0.0):
+        super().__init__(_PostgrestHandler, latency_ms)
+        self._lock = threading.Lock()
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.broadcasts: List[Dict[str, Any]] = []
+        self.rpc_calls: List[Any] = []
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.tables.get(table, []))
+
+    def count(self, table: str) -> int:
+        with self._lock:
+            return len(self.tables.get(table, []))
+
+    def insert(self, table: str, records: List[Dict[str, Any]], upsert: bool = False):
+        key_columns = UNIQUE_KEYS.get(table)
+        with self._lock:
+            rows = self.tables.setdefault(table, [])
+            inserted = []
+            for record in records:
+                record = dict(record)
+                if key_columns:
+                    key = tuple(record.get(c) for c in key_columns)
+                    existing = next((r for r in rows if tuple(r.get(c) for c in key_columns) == key), None)
+                    if existing is not None:
+                        if not upsert:
+                            return [], f"Key {key_columns}={key} already exists."
+                        existing.update(record)
+                        inserted.append(existing)
+                        continue
+                record.setdefault("id", str(uuid.uuid4()))
+                rows.append(record)
+                inserted.append(record)
+            return inserted, None
+
+    def update(self, table: str, filters: Dict[str, str], updates: Dict[str, Any]):
+        with self._lock:
+            matched = [r for r in self.tables.get(table, []) if _matches(r, filters)]
+            for row in matched:
+                row.update(updates)
+            return matched
+
+    def delete(self, table: str, filters: Dict[str, str]):
+        with self._lock:
+            rows = self.tables.get(table, [])
+            removed = [r for r in rows if _matches(r, filters)]
+            self.tables[table] = [r for r in rows if not _matches(r, filters)]
+            return removed
+
+
+# ---- Exchange fixture stand-in ----
+
+def synthetic_pdf(label: str) -> bytes:
+    """Build a small valid single-page PDF whose bytes are unique per label"""
+    text = f"Backfin benchmark fixture {label}".replace("(", "").replace(")", "")
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def synthetic_announcements(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Generate BSE-shaped announcement rows (fields used by the scraper and AI worker)"""
+    rng = random.Random(seed)
+    subjects = [
+        "Financial Results for the quarter ended September 30, 2025",
+        "Investor Presentation",
+        "Award of Order / Receipt of Order",
+        "Acquisition of equity stake in subsidiary",
+        "Credit Rating",
+    ]
+    base_newsid = rng.randint(10_000_000, 90_000_000)
+    rows = []
+    for i in range(count):
+        newsid = f"bench-{base_newsid + i}"
+        scrip = str(500000 + rng.randint(0, 45000))
+        rows.append({
+            "NEWSID": newsid,
+            "SCRIP_CD": scrip,
+            "SLONGNAME": f"Benchmark Company {i} Ltd",
+            "NEWSSUB": f"Benchmark Company {i} Ltd - {scrip} - {rng.choice(subjects)}",
+            "HEADLINE": rng.choice(subjects),
+            "DT_TM": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "ATTACHMENTNAME": f"{newsid}.pdf",
+            "NSURL": f"https://www.bseindia.com/stock-share-price/bench/bench{i}/{scrip}/",
+            "CATEGORYNAME": "Company Update",
+        })
+    return rows
+
+
+class _FixtureHandler(_QuietHandler):
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub.simulate_latency()
+        path = urlparse(self.path).path
+        if path == "/bse/announcements":
+            self._send_json(200, {"Table": stub.announcements})
+        elif path.startswith("/isin/"):
+            scrip = path.rsplit("/", 1)[-1]
+            self._send_json(200, {"ISIN": f"INEBENCH{scrip[-4:].zfill(4)}"})
+        elif path.startswith("/pdf/"):
+            name = path.rsplit("/", 1)[-1]
+            body = stub.pdf_bytes(name)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"message": "not found"})
+
+
+class FixtureServer(_BackgroundServer):
+    """Replays recorded (or synthetic) BSE announcement JSON and PDFs"""
+
+    def __init__(self, announcements: List[Dict[str, Any]], fixtures_dir: Optional[Path] = None,
+                 latency_ms: float = 0.0):
+        super().__init__(_FixtureHandler, latency_ms)
+        self.announcements = announcements
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+
+    @classmethod
+    def from_directory(cls, fixtures_dir: Path, latency_ms: float = 0.0) -> "FixtureServer":
+        """Load announcements.json (BSE ``Table`` payload or list) from a fixture directory"""
+        data = json.loads((Path(fixtures_dir) / "announcements.json").read_text())
+        rows = data.get("Table", []) if isinstance(data, dict) else data
+        return cls(rows, fixtures_dir=fixtures_dir, latency_ms=latency_ms)
+
+    def pdf_bytes(self, name: str) -> bytes:
+        if self.fixtures_dir:
+            candidate = self.fixtures_dir / "pdfs" / name
+            if candidate.exists():
+                return candidate.read_bytes()
+        return synthetic_pdf(name)
+
+
+# ---- Gemini stand-in ----
+
+class FakeGeminiError(Exception):
+    """Injected Gemini failure"""
+
+
+class _FakeFiles:
+    def __init__(self, owner: "FakeGeminiClient"):
+        self.owner = owner
+
+    def upload(self, file):
+        self.owner._sleep(self.owner.upload_latency_ms)
+        return SimpleNamespace(name=f"files/{uuid.uuid4().hex[:12]}", uri=str(file))
+
+
+class FakeGeminiClient:
+    """Replacement for RateLimitedGeminiClient with latency and error injection"""
+
+    def __init__(self, latency_ms: float = 1500.0, jitter_ms: float = 500.0, error_rate: float = 0.0,
+                 upload_latency_ms: float = 200.0, category: str = "Financial Results", seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.upload_latency_ms = upload_latency_ms
+        self.category = category
+        self.rng = random.Random(seed)
+        # Truthy so callers' "client initialized" checks pass
+        self.client = self
+
+    def _sleep(self, base_ms: float):
+        delay = base_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else base_ms
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def files(self) -> _FakeFiles:
+        return _FakeFiles(self)
+
+    def delete_file(self, name):
+        return None
+
+    def generate_content(self, contents, config=None, model="gemini-2.5-flash-lite"):
+        self._sleep(self.latency_ms)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise FakeGeminiError("Injected Gemini failure")
+        payload = {
+            "category": self.category,
+            "headline": "Benchmark headline",
+            "summary": "**Benchmark summary**\n\n| Metric | Value |\n|---|---|\n| Revenue | 100 |",
+            "findata": json.dumps({"period": "Q2FY26", "sales_current": "100", "sales_previous_year": "90",
+                                   "pat_current": "10", "pat_previous_year": "9"}),
+            "individual_investor_list": [],
+            "company_investor_list": [],
+            "sentiment": "Positive",
+        }
+        return SimpleNamespace(text=json.dumps(payload))
@@ -0,0 +1,186 @@
+"""
+Verification API load test: throughput vs. in-flight requests
+
+Runs ``verification_system/app.py`` under uvicorn in this process, pointed at
+the in-memory PostgREST stub (``benchmarks/stubs.py``) with ``--db-latency-ms``
+per query, and drives one endpoint with 1, 2, 4, ... concurrent clients.
+
+Every authenticated request costs at least two database round-trips (session
+and user checks in ``auth.get_current_user``) plus the handler's own queries.
+Handlers that block the event loop stay flat at ~1/latency req/s whatever the
+concurrency; handlers offloaded to the threadpool scale until the pool
+(``THREADPOOL_SIZE``) or the database saturates.
+
+Usage:
+    python -m benchmarks.verification_load --db-latency-ms 20 --concurrency 1,4,16,32 \\
+        --duration 5 --output verification_load.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import asyncio
+import argparse
+import threading
+import statistics
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import httpx
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from benchmarks.stubs import StubPostgrestServer
+
+BENCH_USER_ID = "00000000-0000-0000-0000-00000000be4c"
+BENCH_EMAIL = "bench@example.com"
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _seed(stub: StubPostgrestServer, token: str, tasks: int) -> None:
+    now = datetime.now(timezone.utc)
+    stub.insert("admin_users", [{
+        "id": BENCH_USER_ID, "email": BENCH_EMAIL, "name": "Bench", "role": "admin",
+        "is_active": True, "created_at": now.isoformat(),
+    }])
+    stub.insert("admin_sessions", [{
+        "id": "bench-session", "user_id": BENCH_USER_ID, "session_token": token, "is_active": True,
+        "expires_at": (now + timedelta(hours=8)).isoformat(),
+    }])
+    stub.insert("verification_tasks", [{
+        "id": f"bench-task-{i}", "corp_id": f"bench-{i}", "status": "queued",
+        "created_at": (now - timedelta(seconds=i)).isoformat(),
+    } for i in range(tasks)])
+
+
+def _start_app(stub: StubPostgrestServer, port: int):
+    """Import the verification app against the stub and serve it from a background thread"""
+    os.environ["SUPABASE_URL2"] = stub.url
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = StubPostgrestServer.SERVICE_KEY
+    os.environ.setdefault("JWT_SECRET_KEY", "verification-load-test")
+    os.environ["DEBUG"] = "false"
+    sys.path.insert(0, str(ROOT / "verification_system"))
+
+    import uvicorn
+    import app as verification_app
+    from auth import create_access_token
+
+    # One INFO line per stub query would dominate the run
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    token = create_access_token({"sub": BENCH_EMAIL, "user_id": BENCH_USER_ID, "role": "admin"})
+    server = uvicorn.Server(uvicorn.Config(verification_app.app, host="127.0.0.1", port=port,
+                                           log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 15
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("verification app did not start")
+        time.sleep(0.05)
+    return server, thread, token
+
+
+async def _run_level(base_url: str, path: str, token: str, concurrency: int, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        stop_at = time.monotonic() + duration
+
+        async def worker() -> None:
+            nonlocal errors
+            while time.monotonic() < stop_at:
+                started = time.monotonic()
+                try:
+                    response = await client.get(path)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append((time.monotonic() - started) * 1000)
+                else:
+                    errors += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 1) if latencies else 0.0,
+            "p50": round(_percentile(latencies, 50), 1),
+            "p99": round(_percentile(latencies, 99), 1),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verification API throughput vs. concurrency")
+    parser.add_argument("--path", default="/api/admin/auth/me", help="GET endpoint to drive")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="Comma-separated in-flight request levels")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per concurrency level")
+    parser.add_argument("--db-latency-ms", type=float, default=20.0, help="Latency added to every stub query")
+    parser.add_argument("--tasks", type=int, default=50, help="verification_tasks rows to seed")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    stub = StubPostgrestServer(latency_ms=args.db_latency_ms).start()
+    port = _free_port()
+    server, thread, token = _start_app(stub, port)
+    _seed(stub, token, args.tasks)
+    base_url = f"http://127.0.0.1:{port}"
+
+    results = []
+    try:
+        for level in levels:
+            result = asyncio.run(_run_level(base_url, args.path, token, level, args.duration))
+            results.append(result)
+            print(f"concurrency={level:>3}  {result['req_per_sec']:>7} req/s  "
+                  f"p50={result['latency_ms']['p50']}ms  p99={result['latency_ms']['p99']}ms  "
+                  f"errors={result['errors']}")
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        stub.stop()
+
+    report = {
+        "path": args.path,
+        "db_latency_ms": args.db_latency_ms,
+        "duration_s": args.duration,
+        "levels": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Pipeline trace reporting - per-stage latency percentiles and per-job timelines
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.tracing import JobTracer, TraceStage
+
+
+def print_stats(tracer: JobTracer, window_seconds: int):
+    """Print formatted per-stage latency percentiles"""
+    print("=" * 72)
+    print(f"Stage Latency (last {window_seconds}s) - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 72)
+    print(f"{'STAGE':<22} | {'COUNT':>7} | {'P50 ms':>10} | {'P90 ms':>10} | {'P99 ms':>10}")
+    print("-" * 72)
+
+    stats = tracer.stage_percentiles(window_seconds=window_seconds)
+    if not stats:
+        print("No trace events recorded in this window")
+        return
+
+    for stage, values in stats.items():
+        print(
+            f"{stage:<22} | {values['count']:>7} | {values['p50']:>10.1f} | "
+            f"{values['p90']:>10.1f} | {values['p99']:>10.1f}"
+        )
+
+
+def print_trace(tracer: JobTracer, corp_id: str):
+    """Print the recorded timeline for a single announcement"""
+    trace = tracer.get_trace(corp_id)
+    if not trace:
+        print(f"No trace found for {corp_id}")
+        return
+
+    print(f"Trace for {corp_id}:")
+    first_ts = None
+    for stage, event in trace.items():
+        ts = event.get("ts")
+        if ts is None:
+            print(f"  {stage:<22} {event}")
+            continue
+        first_ts = first_ts if first_ts is not None else ts
+        duration = event.get("duration_ms")
+        duration_str = f"{duration:.1f} ms" if duration is not None else "-"
+        print(f"  +{ts - first_ts:>9.3f}s  {stage:<22} {duration_str:>12}")
+
+    missing = [s for s in TraceStage.all_stages() if s not in trace]
+    if missing:
+        print(f"  Not reached: {', '.join(missing)}")
+
+
+def main():
+    """CLI interface for trace reporting"""
+    tracer = JobTracer()
+
+    if len(sys.argv) < 2:
+        print("Usage: python trace_report.py [stats [window_seconds]|show <corp_id>]")
+        return
+
+    command = sys.argv[1].lower()
+
+    if command == "stats":
+        window = int(sys.argv[2]) if len(sys.argv) > 2 else 3600
+        print_stats(tracer, window)
+
+    elif command == "show" and len(sys.argv) > 2:
+        print_trace(tracer, sys.argv[2])
+
+    else:
+        print("Invalid command or missing arguments")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,7 @@ from datetime import datetime
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.queue.redis_client import RedisConfig, QueueNames
+from src.core.metrics import get_metrics
 
 # Setup logging
 logging.basicConfig(
@@ -407,6 +408,12 @@ class WorkerSpawner:
                             if self.spawn_worker(cfg_name):
                                 logger.info(f"🕒 Spawned always-run worker: {cfg_name}")
 
+                # Publish worker counts for the /metrics endpoints
+                get_metrics().publish_worker_counts({
+                    cfg_name: (self.get_active_worker_count(cfg_name), cfg.get('max_concurrent', 1))
+                    for cfg_name, cfg in self.worker_configs.items()
+                })
+
                 # Status logging
                 total_workers = sum(len(workers) for workers in self.active_workers.values())
                 total_jobs = sum(queue_status.values())
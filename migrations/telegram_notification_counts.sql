@@ -0,0 +1,23 @@
+-- ============================================================================
+-- TELEGRAM NOTIFICATION COUNTERS - BULK INCREMENT
+-- The notifier buffers per-chat sent counts and applies them with one call
+-- instead of a read-then-update per message. Until this is applied it falls
+-- back to one select plus one update per chat.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION increment_telegram_notification_counts(
+    p_chat_ids bigint[],
+    p_counts integer[]
+)
+RETURNS void AS $$
+BEGIN
+    UPDATE public.user_telegram_subscriptions ts
+    SET notification_count = COALESCE(ts.notification_count, 0) + c.sent,
+        last_notification_at = now(),
+        updated_at = now()
+    FROM unnest(p_chat_ids, p_counts) AS c(chat_id, sent)
+    WHERE ts.telegram_chat_id = c.chat_id;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION increment_telegram_notification_counts IS 'Adds buffered sent counts to user_telegram_subscriptions.notification_count';
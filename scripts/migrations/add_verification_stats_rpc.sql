@@ -0,0 +1,25 @@
+-- Migration: Single-query verification dashboard counters
+-- Date: 2026-10-18
+-- Purpose: GET /api/admin/stats used six count="exact" queries over
+-- corporatefilings (three for admins' review queue). This function returns
+-- every counter from one pass over the table.
+-- Used by verification_system/app.py (load_filing_stats); until it is
+-- deployed the API falls back to the per-status counts.
+
+CREATE OR REPLACE FUNCTION get_verification_stats(p_today DATE DEFAULT CURRENT_DATE)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'unverified',     count(*) FILTER (WHERE verified = false),
+        'verified_total', count(*) FILTER (WHERE verified = true),
+        'verified_today', count(*) FILTER (WHERE verified = true AND verified_at >= p_today),
+        'pending_review', count(*) FILTER (WHERE verified = true AND review_status = 'pending_review'),
+        'approved',       count(*) FILTER (WHERE review_status = 'approved'),
+        'rejected',       count(*) FILTER (WHERE review_status = 'rejected')
+    )
+    FROM corporatefilings;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_verification_stats(DATE) TO service_role;
@@ -0,0 +1,16 @@
+-- Migration: Stream-driven verification task ingestion
+-- Date: 2026-10-18
+-- Purpose: verification_system/task_stream.py bulk-upserts entries of the AI
+-- worker's verification_tasks Redis stream with ON CONFLICT (corp_id) DO
+-- NOTHING, so redelivered stream entries never create a second task for the
+-- same filing.
+
+ALTER TABLE verification_tasks
+ADD COLUMN IF NOT EXISTS corp_id TEXT,
+ADD COLUMN IF NOT EXISTS priority TEXT DEFAULT 'normal';
+
+-- One task per filing (also the upsert's conflict target)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_verification_tasks_corp_id ON verification_tasks(corp_id);
+
+-- /tasks lists by status, newest first
+CREATE INDEX IF NOT EXISTS idx_verification_tasks_status_created ON verification_tasks(status, created_at DESC);
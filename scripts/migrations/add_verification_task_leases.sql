@@ -0,0 +1,87 @@
+-- Migration: Lease-based batch claiming of verification tasks
+-- Date: 2026-10-18
+-- Purpose: POST /api/admin/tasks/lease reserves a small batch of tasks per
+-- verifier session with an expiry, so the UI can move to the next task
+-- without a claim round-trip. Leases are renewed on every call and expire
+-- on their own when a verifier walks away.
+
+ALTER TABLE verification_tasks
+ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_verification_tasks_lease_expires
+    ON verification_tasks(lease_expires_at) WHERE lease_expires_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_verification_tasks_session
+    ON verification_tasks(assigned_to_session) WHERE status = 'in_progress';
+
+-- Tasks released with POST /tasks/{id}/release used to keep their lease;
+-- clear those so a later /tasks/claim isn't swept back into the queue.
+UPDATE verification_tasks
+SET lease_expires_at = NULL
+WHERE status = 'queued'
+  AND lease_expires_at IS NOT NULL;
+
+-- Returns the session's leased tasks (oldest lease first) after
+--   1. putting expired leases of any session back in the queue,
+--   2. renewing this session's leases,
+--   3. topping them up to p_count from the queue (SKIP LOCKED, so
+--      concurrent verifiers never get the same task).
+CREATE OR REPLACE FUNCTION claim_verification_tasks(
+    p_user_id UUID,
+    p_session_id UUID,
+    p_count INTEGER DEFAULT 3,
+    p_lease_seconds INTEGER DEFAULT 600
+)
+RETURNS SETOF verification_tasks
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_expires TIMESTAMPTZ := now() + make_interval(secs => p_lease_seconds);
+    v_held INTEGER;
+BEGIN
+    UPDATE verification_tasks
+    SET status = 'queued',
+        assigned_to_user = NULL,
+        assigned_to_session = NULL,
+        assigned_at = NULL,
+        lease_expires_at = NULL,
+        updated_at = now()
+    WHERE status = 'in_progress'
+      AND lease_expires_at < now();
+
+    UPDATE verification_tasks
+    SET lease_expires_at = v_expires
+    WHERE assigned_to_session = p_session_id
+      AND status = 'in_progress'
+      AND lease_expires_at IS NOT NULL;
+    GET DIAGNOSTICS v_held = ROW_COUNT;
+
+    IF v_held < p_count THEN
+        UPDATE verification_tasks t
+        SET status = 'in_progress',
+            assigned_to_user = p_user_id,
+            assigned_to_session = p_session_id,
+            assigned_at = now(),
+            lease_expires_at = v_expires,
+            updated_at = now()
+        FROM (
+            SELECT id
+            FROM verification_tasks
+            WHERE status = 'queued'
+            ORDER BY (priority = 'high') DESC, created_at
+            LIMIT p_count - v_held
+            FOR UPDATE SKIP LOCKED
+        ) picked
+        WHERE t.id = picked.id;
+    END IF;
+
+    RETURN QUERY
+    SELECT *
+    FROM verification_tasks
+    WHERE assigned_to_session = p_session_id
+      AND status = 'in_progress'
+      AND lease_expires_at IS NOT NULL
+    ORDER BY assigned_at, created_at;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION claim_verification_tasks(UUID, UUID, INTEGER, INTEGER) TO service_role;
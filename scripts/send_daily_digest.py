@@ -6,6 +6,13 @@ Sends watchlist-based announcement digests to users
 This script processes pending notifications and sends daily digest emails
 to users with announcements from companies in their watchlist.
 
+The run is set-based: pending queue rows, the referenced filings, user info
+and preferences are loaded with a handful of paged / chunked queries, grouped
+in memory, rendered from precompiled templates (a company's section is
+rendered once and reused for every user who follows it), sent from a small
+thread pool paced to the email provider's rate limit, and marked processed /
+logged with bulk writes.
+
 Usage:
     python3 send_daily_digest.py [--date YYYY-MM-DD] [--test-user USER_ID] [--dry-run]
 
@@ -15,9 +22,13 @@ Cron Setup:
 
 import os
 import sys
+import time
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, date
-from typing import List, Dict, Optional
+from string import Template
+from typing import List, Dict, Optional, Iterable, Tuple
 import logging
 import traceback
 
@@ -28,7 +39,7 @@ from dotenv import load_dotenv
 from supabase import create_client, Client
 
 # Setup logging
-LOG_DIR = os.path.join(os.path.dirname(__file__), "..", "logs")
+LOG_DIR = os.getenv('DIGEST_LOG_DIR') or os.path.join(os.path.dirname(__file__), "..", "logs")
 LOG_DIR = os.path.abspath(LOG_DIR)
 os.makedirs(LOG_DIR, exist_ok=True)
 
@@ -52,6 +63,15 @@ if not all([SUPABASE_URL, SUPABASE_KEY, RESEND_API_KEY]):
     logger.error("❌ Missing required environment variables: SUPABASE_URL2, SUPABASE_KEY2, RESEND_API")
     sys.exit(1)
 
+# Bulk loading / sending
+PAGE_SIZE = 1000
+IN_CHUNK_SIZE = 200  # Values per .in_() filter, keeps request URLs short
+SEND_CONCURRENCY = int(os.getenv('DIGEST_SEND_CONCURRENCY', '4'))
+SEND_RATE_PER_SECOND = float(os.getenv('DIGEST_SEND_RATE', '2'))  # Resend's default API rate limit
+RECORD_BATCH_SIZE = 100  # Sent digests are marked processed / logged in batches of this size
+FILING_COLUMNS = 'corp_id, isin, symbol, companyname, summary, ai_summary, category, date, fileurl'
+SENDER = "Marketwire Alerts <notifications@anshulkr.com>"  # Update with your verified domain
+
 # Initialize Supabase client
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
@@ -64,106 +84,112 @@ except ImportError as e:
     sys.exit(1)
 
 
-def get_users_with_pending_notifications(target_date: date) -> List[str]:
-    """Get list of users with pending notifications for the given date"""
-    try:
-        response = supabase.table('user_notification_queue')\
-            .select('user_id')\
+def chunked(values: List, size: int = IN_CHUNK_SIZE) -> Iterable[List]:
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def fetch_all(build_query) -> List[Dict]:
+    """Run a select page by page; build_query() must return a fresh query builder"""
+    rows = []
+    start = 0
+    while True:
+        response = build_query().range(start, start + PAGE_SIZE - 1).execute()
+        batch = response.data or []
+        rows.extend(batch)
+        if len(batch) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+
+def fetch_in(table: str, columns: str, key: str, values: List) -> List[Dict]:
+    """Select rows whose key is in values, in chunks"""
+    rows = []
+    for chunk in chunked(values):
+        response = supabase.table(table).select(columns).in_(key, chunk).execute()
+        rows.extend(response.data or [])
+    return rows
+
+
+def load_pending_notifications(target_date: date, user_ids: Optional[List[str]] = None) -> List[Dict]:
+    """All unprocessed queue rows for the date (optionally only for some users)"""
+    def build_query():
+        query = supabase.table('user_notification_queue')\
+            .select('id, user_id, corp_id')\
             .eq('notification_date', target_date.isoformat())\
-            .eq('is_processed', False)\
-            .execute()
-        
-        # Deduplicate user IDs
-        user_ids = list(set([row['user_id'] for row in response.data]))
-        logger.info(f"📊 Found {len(user_ids)} users with pending notifications")
-        return user_ids
+            .eq('is_processed', False)
+        if user_ids:
+            query = query.in_('user_id', user_ids)
+        return query.order('id')
+    
+    try:
+        rows = fetch_all(build_query)
+        logger.info(f"📊 Found {len(rows)} pending notifications for {len({r['user_id'] for r in rows})} users")
+        return rows
     except Exception as e:
-        logger.error(f"❌ Failed to fetch users: {e}")
+        logger.error(f"❌ Failed to fetch pending notifications: {e}")
         return []
 
 
-def get_user_notifications(user_id: str, target_date: date) -> List[Dict]:
-    """Get all pending notifications for a user on the given date"""
+def load_announcements(corp_ids: List[str]) -> Dict[str, Dict]:
+    """Filings by corp_id"""
     try:
-        response = supabase.table('user_notification_queue')\
-            .select('*')\
-            .eq('user_id', user_id)\
-            .eq('notification_date', target_date.isoformat())\
-            .eq('is_processed', False)\
-            .execute()
-        
-        return response.data
+        return {row['corp_id']: row for row in fetch_in('corporatefilings', FILING_COLUMNS, 'corp_id', corp_ids)}
     except Exception as e:
-        logger.error(f"❌ Failed to fetch notifications for user {user_id}: {e}")
-        return []
+        logger.error(f"❌ Failed to fetch announcement details: {e}")
+        return {}
 
 
-def get_announcement_details(corp_ids: List[str]) -> List[Dict]:
-    """Fetch full announcement details from corporatefilings"""
+def load_users(user_ids: List[str]) -> Dict[str, Dict]:
+    """User info (email) by user id"""
     try:
-        response = supabase.table('corporatefilings')\
-            .select('*')\
-            .in_('corp_id', corp_ids)\
-            .execute()
-        
-        return response.data
+        return {row['UserID']: row for row in fetch_in('UserData', 'UserID, emailID', 'UserID', user_ids)}
     except Exception as e:
-        logger.error(f"❌ Failed to fetch announcement details: {e}")
-        return []
+        logger.error(f"❌ Failed to fetch user info: {e}")
+        return {}
 
 
-def get_user_info(user_id: str) -> Optional[Dict]:
-    """Get user's email and other info"""
+def load_preferences(user_ids: List[str]) -> Optional[Dict[str, Dict]]:
+    """Notification preferences by user id; None if they could not be loaded"""
     try:
-        response = supabase.table('UserData')\
-            .select('emailID, Phone_Number, AccountType')\
-            .eq('UserID', user_id)\
-            .single()\
-            .execute()
-        
-        return response.data
+        rows = fetch_in(
+            'user_notification_preferences',
+            'user_id, email_enabled, minimum_announcements',
+            'user_id',
+            user_ids
+        )
+        return {row['user_id']: row for row in rows}
     except Exception as e:
-        logger.error(f"❌ Failed to fetch info for user {user_id}: {e}")
+        # If preferences table doesn't exist or query fails, default to sending
+        logger.warning(f"⚠️  Failed to fetch preferences, defaulting to send: {e}")
         return None
 
 
-def check_user_preferences(user_id: str, announcement_count: int) -> tuple[bool, str]:
+def check_user_preferences(prefs: Optional[Dict], announcement_count: int) -> tuple[bool, str]:
     """
     Check if user wants to receive email based on preferences
     Returns: (should_send: bool, reason: str)
     """
-    try:
-        response = supabase.table('user_notification_preferences')\
-            .select('*')\
-            .eq('user_id', user_id)\
-            .single()\
-            .execute()
-        
-        if response.data:
-            prefs = response.data
-            
-            # Check if email is enabled
-            if not prefs.get('email_enabled', True):
-                return False, "User has disabled email notifications"
-            
-            # Check minimum announcement threshold
-            min_announcements = prefs.get('minimum_announcements', 1)
-            if announcement_count < min_announcements:
-                return False, f"Only {announcement_count} announcements, user minimum is {min_announcements}"
-            
-            return True, "Preferences allow email"
-        else:
-            # No preferences = default behavior (send email)
-            return True, "No preferences set, using defaults"
-    except Exception as e:
-        # If preferences table doesn't exist or query fails, default to sending
-        logger.warning(f"⚠️  Failed to fetch preferences for user {user_id}, defaulting to send: {e}")
-        return True, "Preference check failed, defaulting to send"
+    if not prefs:
+        # No preferences = default behavior (send email)
+        return True, "No preferences set, using defaults"
+    
+    # Check if email is enabled
+    if not prefs.get('email_enabled', True):
+        return False, "User has disabled email notifications"
+    
+    # Check minimum announcement threshold
+    min_announcements = prefs.get('minimum_announcements') or 1
+    if announcement_count < min_announcements:
+        return False, f"Only {announcement_count} announcements, user minimum is {min_announcements}"
+    
+    return True, "Preferences allow email"
 
 
 def group_announcements_by_company(announcements: List[Dict]) -> Dict[str, Dict]:
     """Group announcements by company for better email organization"""
     grouped = {}
+    app_base_url = os.getenv('APP_BASE_URL', 'https://marketwire.ai')
     
     for announcement in announcements:
         # Use ISIN as primary key, fallback to symbol or company name
@@ -178,11 +204,10 @@ def group_announcements_by_company(announcements: List[Dict]) -> Dict[str, Dict]
             }
         
         # Build announcement URL (update with your actual frontend URL)
-        app_base_url = os.getenv('APP_BASE_URL', 'https://marketwire.ai')
         ai_url = f"{app_base_url}/announcement/{announcement.get('corp_id')}"
         
         grouped[company_key]['announcements'].append({
-            'summary': announcement.get('summary', 'No summary available'),
+            'summary': announcement.get('summary') or 'No summary available',
             'ai_summary': announcement.get('ai_summary', ''),
             'category': announcement.get('category', ''),
             'date': announcement.get('date', ''),
@@ -194,50 +219,37 @@ def group_announcements_by_company(announcements: List[Dict]) -> Dict[str, Dict]
     return grouped
 
 
-def generate_combined_digest_html(grouped_companies: Dict[str, Dict], user_email: str, total_count: int) -> str:
-    """Generate a single email with all companies (alternative to multiple emails)"""
-    from datetime import date as date_module
-    
-    # Build company sections
-    company_sections = ""
-    for company_key, company_data in grouped_companies.items():
-        company_name = company_data['companyname']
-        symbol = company_data['symbol']
-        announcement_count = len(company_data['announcements'])
-        
-        # Generate announcement cards for this company
-        announcement_cards = ""
-        for ann in company_data['announcements']:
-            announcement_cards += f"""
+# ---- Templates (compiled once per process) ----
+
+ANNOUNCEMENT_CARD_TEMPLATE = Template("""
             <div style="background: #f8fafc; border-left: 3px solid #3b82f6; padding: 16px; margin-bottom: 12px; border-radius: 4px;">
                 <div style="font-size: 13px; color: #64748b; margin-bottom: 4px;">
-                    <strong>{ann['category']}</strong> • {ann['date']}
+                    <strong>$category</strong> • $date
                 </div>
                 <div style="color: #1e293b; margin-bottom: 8px; line-height: 1.5;">
-                    {ann['summary'][:300]}{'...' if len(ann['summary']) > 300 else ''}
+                    $summary
                 </div>
                 <div>
-                    <a href="{ann['ai_url']}" style="color: #3b82f6; text-decoration: none; font-size: 13px; margin-right: 16px;">📊 View Details</a>
-                    <a href="{ann['url']}" style="color: #64748b; text-decoration: none; font-size: 13px;">📄 Original Document</a>
+                    <a href="$ai_url" style="color: #3b82f6; text-decoration: none; font-size: 13px; margin-right: 16px;">📊 View Details</a>
+                    <a href="$url" style="color: #64748b; text-decoration: none; font-size: 13px;">📄 Original Document</a>
                 </div>
             </div>
-            """
-        
-        company_sections += f"""
+            """)
+
+COMPANY_SECTION_TEMPLATE = Template("""
         <div style="margin-bottom: 32px; border: 1px solid #e2e8f0; border-radius: 8px; padding: 20px; background: white;">
             <div style="margin-bottom: 16px; padding-bottom: 12px; border-bottom: 2px solid #f1f5f9;">
-                <h2 style="margin: 0 0 8px 0; color: #1e293b; font-size: 20px;">{company_name}</h2>
+                <h2 style="margin: 0 0 8px 0; color: #1e293b; font-size: 20px;">$company_name</h2>
                 <div style="display: inline-block; background: linear-gradient(135deg, #3b82f6 0%, #1d4ed8 100%); color: white; padding: 4px 12px; border-radius: 15px; font-size: 12px; font-weight: 600;">
-                    {symbol or 'N/A'}
+                    $symbol
                 </div>
-                <span style="color: #64748b; font-size: 13px; margin-left: 8px;">{announcement_count} announcement{'s' if announcement_count > 1 else ''}</span>
+                <span style="color: #64748b; font-size: 13px; margin-left: 8px;">$announcement_count</span>
             </div>
-            {announcement_cards}
+            $announcement_cards
         </div>
-        """
-    
-    # Full email template
-    html = f"""
+        """)
+
+DIGEST_TEMPLATE = Template("""
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -251,19 +263,19 @@ def generate_combined_digest_html(grouped_companies: Dict[str, Dict], user_email
             <!-- Header -->
             <div style="background: linear-gradient(135deg, #3b82f6 0%, #1d4ed8 100%); padding: 32px 24px; text-align: center; color: white;">
                 <h1 style="margin: 0 0 8px 0; font-size: 28px; font-weight: 700;">📊 Your Daily Watchlist Digest</h1>
-                <p style="margin: 0; font-size: 14px; opacity: 0.9;">{date_module.today().strftime('%B %d, %Y')}</p>
+                <p style="margin: 0; font-size: 14px; opacity: 0.9;">$today</p>
             </div>
             
             <!-- Summary -->
             <div style="padding: 24px; background: #eff6ff; border-bottom: 1px solid #e2e8f0;">
                 <p style="margin: 0; color: #1e293b; font-size: 15px;">
-                    You have <strong>{total_count} new announcement{'s' if total_count > 1 else ''}</strong> from <strong>{len(grouped_companies)} compan{'ies' if len(grouped_companies) > 1 else 'y'}</strong> in your watchlist.
+                    You have <strong>$total_count</strong> from <strong>$company_count</strong> in your watchlist.
                 </p>
             </div>
             
             <!-- Company Sections -->
             <div style="padding: 24px;">
-                {company_sections}
+                $company_sections
             </div>
             
             <!-- Footer -->
@@ -275,158 +287,316 @@ def generate_combined_digest_html(grouped_companies: Dict[str, Dict], user_email
                     <a href="#" style="color: #64748b; text-decoration: none;">Unsubscribe</a>
                 </p>
                 <p style="margin: 16px 0 0 0; color: #94a3b8; font-size: 12px;">
-                    © {date_module.today().year} Backfin. All rights reserved.
+                    © $year Backfin. All rights reserved.
                 </p>
             </div>
             
         </div>
     </body>
     </html>
-    """
+    """)
+
+
+def render_company_section(company_data: Dict, cache: Optional[Dict[Tuple, str]] = None) -> str:
+    """Company block of the digest; cached by its announcements, which many users share"""
+    cache_key = tuple(ann['corp_id'] for ann in company_data['announcements'])
+    if cache is not None and cache_key in cache:
+        return cache[cache_key]
     
-    return html
+    announcement_cards = "".join(
+        ANNOUNCEMENT_CARD_TEMPLATE.substitute(
+            category=ann['category'],
+            date=ann['date'],
+            summary=f"{ann['summary'][:300]}{'...' if len(ann['summary']) > 300 else ''}",
+            ai_url=ann['ai_url'],
+            url=ann['url']
+        )
+        for ann in company_data['announcements']
+    )
+    announcement_count = len(company_data['announcements'])
+    section = COMPANY_SECTION_TEMPLATE.substitute(
+        company_name=company_data['companyname'],
+        symbol=company_data['symbol'] or 'N/A',
+        announcement_count=f"{announcement_count} announcement{'s' if announcement_count > 1 else ''}",
+        announcement_cards=announcement_cards
+    )
+    
+    if cache is not None:
+        cache[cache_key] = section
+    return section
 
 
-def send_digest_to_user(user_id: str, target_date: date, dry_run: bool = False) -> bool:
+def generate_combined_digest_html(grouped_companies: Dict[str, Dict], user_email: str, total_count: int,
+                                  section_cache: Optional[Dict[Tuple, str]] = None) -> str:
+    """Generate a single email with all companies (alternative to multiple emails)"""
+    company_sections = "".join(
+        render_company_section(company_data, section_cache)
+        for company_data in grouped_companies.values()
+    )
+    company_count = len(grouped_companies)
+    
+    return DIGEST_TEMPLATE.substitute(
+        today=date.today().strftime('%B %d, %Y'),
+        total_count=f"{total_count} new announcement{'s' if total_count > 1 else ''}",
+        company_count=f"{company_count} compan{'ies' if company_count > 1 else 'y'}",
+        company_sections=company_sections,
+        year=date.today().year
+    )
+
+
+# ---- Planning ----
+
+def build_digests(target_date: date, user_ids: Optional[List[str]] = None) -> Tuple[List[Dict], List[Dict]]:
     """
-    Send daily digest email to a single user
+    Load everything for the run in bulk and work out each user's digest
     
-    Args:
-        user_id: User ID to send digest to
-        target_date: Date of notifications to process
-        dry_run: If True, don't actually send email
-        
-    Returns:
-        True if successful, False otherwise
+    Returns (digests, outcomes): digests are the emails to send, outcomes the
+    users that end without one (skipped by preferences or failed), each a
+    dict with user_id, email, status, reason, notification_ids and corp_ids.
     """
-    try:
-        # Get user info
-        user_info = get_user_info(user_id)
-        if not user_info:
-            logger.warning(f"⚠️  No user info found for {user_id}")
-            return False
+    pending = load_pending_notifications(target_date, user_ids)
+    if not pending:
+        return [], []
+    
+    by_user: Dict[str, List[Dict]] = {}
+    for row in pending:
+        by_user.setdefault(row['user_id'], []).append(row)
+    
+    all_user_ids = list(by_user)
+    announcements = load_announcements(list({row['corp_id'] for row in pending}))
+    users = load_users(all_user_ids)
+    preferences = load_preferences(all_user_ids)
+    
+    digests = []
+    outcomes = []
+    for user_id, rows in by_user.items():
+        email = (users.get(user_id) or {}).get('emailID')
+        corp_ids = list(dict.fromkeys(row['corp_id'] for row in rows))
+        outcome = {
+            'user_id': user_id,
+            'email': email,
+            'notification_ids': [row['id'] for row in rows],
+            'corp_ids': corp_ids
+        }
         
-        email = user_info.get('emailID')
+        if user_id not in users:
+            logger.warning(f"⚠️  No user info found for {user_id}")
+            outcomes.append({**outcome, 'status': 'failed', 'reason': 'No user info'})
+            continue
         if not email:
             logger.warning(f"⚠️  No email found for user {user_id}")
-            return False
+            outcomes.append({**outcome, 'status': 'failed', 'reason': 'No email'})
+            continue
         
-        # Get pending notifications
-        notifications = get_user_notifications(user_id, target_date)
-        if not notifications:
-            logger.info(f"ℹ️  No notifications for user {user_id}")
-            return True  # Not an error, just nothing to send
-        
-        # Check user preferences
-        should_send, reason = check_user_preferences(user_id, len(notifications))
+        should_send, reason = check_user_preferences(
+            preferences.get(user_id) if preferences is not None else None,
+            len(rows)
+        )
         if not should_send:
             logger.info(f"⏭️  Skipping user {user_id}: {reason}")
-            mark_notifications_processed(user_id, target_date, 'skipped')
-            log_digest_attempt(user_id, email, target_date, 0, 0, [], 'skipped', reason)
-            return True  # Not a failure
-        
-        # Get full announcement details
-        corp_ids = [n['corp_id'] for n in notifications]
-        announcements = get_announcement_details(corp_ids)
+            outcomes.append({**outcome, 'status': 'skipped', 'reason': reason})
+            continue
         
-        if not announcements:
+        user_announcements = [announcements[corp_id] for corp_id in corp_ids if corp_id in announcements]
+        if not user_announcements:
             logger.warning(f"⚠️  No announcement details found for user {user_id}")
-            return False
-        
-        # Group by company
-        grouped = group_announcements_by_company(announcements)
-        company_count = len(grouped)
-        announcement_count = len(announcements)
-        
-        logger.info(f"📧 Preparing digest for {email}: {announcement_count} announcements from {company_count} companies")
+            outcomes.append({**outcome, 'status': 'failed', 'reason': 'No announcement details'})
+            continue
         
-        # Generate combined digest email
-        html_content = generate_combined_digest_html(grouped, email, announcement_count)
-        subject = f"📊 Daily Watchlist Digest: {announcement_count} new announcement{'s' if announcement_count > 1 else ''}"
-        
-        # Send email (unless dry run)
-        if dry_run:
-            logger.info(f"🧪 DRY RUN: Would send email to {email}")
-            logger.info(f"   Subject: {subject}")
-            logger.info(f"   Companies: {', '.join([c['companyname'] for c in grouped.values()])}")
-            return True
-        
-        # Actually send the email
-        import resend
-        resend.api_key = RESEND_API_KEY
-        
-        try:
-            params = {
-                "from": "Marketwire Alerts <notifications@anshulkr.com>",  # Update with your verified domain
-                "to": [email],
-                "subject": subject,
-                "html": html_content,
-            }
-            
-            result = resend.Emails.send(params)
-            message_id = result.get('id')
-            
-            logger.info(f"✅ Email sent to {email}: {message_id}")
-            
-            # Mark notifications as processed
-            mark_notifications_processed(user_id, target_date, 'sent', corp_ids)
-            
-            # Log successful send
-            log_digest_attempt(user_id, email, target_date, announcement_count, company_count, corp_ids, 'sent', None, message_id)
-            
-            return True
-            
-        except Exception as email_error:
-            logger.error(f"❌ Failed to send email to {email}: {email_error}")
-            log_digest_attempt(user_id, email, target_date, announcement_count, company_count, corp_ids, 'failed', str(email_error))
-            return False
-        
-    except Exception as e:
-        logger.error(f"❌ Error processing digest for user {user_id}: {e}")
-        logger.error(traceback.format_exc())
-        return False
+        # Only rows whose filing made it into the email are marked processed
+        included = {ann['corp_id'] for ann in user_announcements}
+        digests.append({
+            **outcome,
+            'notification_ids': [row['id'] for row in rows if row['corp_id'] in included],
+            'corp_ids': [corp_id for corp_id in corp_ids if corp_id in included],
+            'grouped': group_announcements_by_company(user_announcements),
+            'announcement_count': len(user_announcements)
+        })
+    
+    return digests, outcomes
 
 
-def mark_notifications_processed(user_id: str, target_date: date, status: str, corp_ids: List[str] = None):
-    """Mark notifications as processed"""
+# ---- Sending ----
+
+class SendPacer:
+    """Spaces API calls from all sender threads to stay under the provider's rate limit"""
+    
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            send_at = max(now, self._next_at)
+            self._next_at = send_at + self.interval
+        if send_at > now:
+            time.sleep(send_at - now)
+
+
+def send_digest_email(digest: Dict, section_cache: Dict[Tuple, str], pacer: SendPacer, dry_run: bool) -> Dict:
+    """Render and send one digest; returns the digest with status / message_id / reason"""
+    email = digest['email']
+    grouped = digest['grouped']
+    announcement_count = digest['announcement_count']
+    
+    logger.info(f"📧 Preparing digest for {email}: {announcement_count} announcements from {len(grouped)} companies")
+    
+    html_content = generate_combined_digest_html(grouped, email, announcement_count, section_cache)
+    subject = f"📊 Daily Watchlist Digest: {announcement_count} new announcement{'s' if announcement_count > 1 else ''}"
+    
+    if dry_run:
+        logger.info(f"🧪 DRY RUN: Would send email to {email}")
+        logger.info(f"   Subject: {subject}")
+        logger.info(f"   Companies: {', '.join([c['companyname'] for c in grouped.values()])}")
+        return {**digest, 'status': 'dry_run'}
+    
+    import resend
+    resend.api_key = RESEND_API_KEY
+    
     try:
-        update_query = supabase.table('user_notification_queue')\
-            .update({
-                'is_processed': True,
-                'processed_at': datetime.now().isoformat()
-            })\
-            .eq('user_id', user_id)\
-            .eq('notification_date', target_date.isoformat())
-        
-        if corp_ids:
-            update_query = update_query.in_('corp_id', corp_ids)
-        
-        update_query.execute()
-        logger.info(f"✓ Marked {len(corp_ids) if corp_ids else 'all'} notifications processed for user {user_id}")
-    except Exception as e:
-        logger.error(f"❌ Failed to mark notifications processed: {e}")
+        pacer.wait()
+        result = resend.Emails.send({
+            "from": SENDER,
+            "to": [email],
+            "subject": subject,
+            "html": html_content,
+        })
+        message_id = result.get('id')
+        logger.info(f"✅ Email sent to {email}: {message_id}")
+        return {**digest, 'status': 'sent', 'message_id': message_id}
+    except Exception as email_error:
+        logger.error(f"❌ Failed to send email to {email}: {email_error}")
+        return {**digest, 'status': 'failed', 'reason': str(email_error)}
 
 
-def log_digest_attempt(user_id: str, email: str, digest_date: date, 
-                       announcement_count: int, company_count: int, 
-                       corp_ids: List[str], status: str, error_msg: str = None,
-                       message_id: str = None):
-    """Log digest email attempt to audit table"""
-    try:
-        supabase.table('user_email_digest_log').insert({
-            'user_id': user_id,
-            'email_address': email,
+def send_digests(digests: List[Dict], dry_run: bool = False, on_results=None,
+                 batch_size: Optional[int] = None) -> List[Dict]:
+    """
+    Send digests from a bounded thread pool
+    
+    on_results, if given, is called with every batch_size finished results
+    (and the remainder at the end) while the rest are still sending, so an
+    interrupted run has already recorded what it sent.
+    """
+    batch_size = batch_size or RECORD_BATCH_SIZE
+    section_cache: Dict[Tuple, str] = {}
+    pacer = SendPacer(SEND_RATE_PER_SECOND)
+    results: List[Dict] = []
+    batch: List[Dict] = []
+    with ThreadPoolExecutor(max_workers=max(SEND_CONCURRENCY, 1), thread_name_prefix="digest") as executor:
+        futures = [executor.submit(send_digest_email, digest, section_cache, pacer, dry_run) for digest in digests]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            batch.append(result)
+            if on_results is not None and len(batch) >= batch_size:
+                on_results(batch)
+                batch = []
+    if on_results is not None and batch:
+        on_results(batch)
+    return results
+
+
+# ---- Bookkeeping ----
+
+def mark_notifications_processed(notification_ids: List[str]):
+    """Mark queue rows as processed"""
+    if not notification_ids:
+        return
+    processed_at = datetime.now().isoformat()
+    marked = 0
+    for chunk in chunked(notification_ids):
+        try:
+            supabase.table('user_notification_queue')\
+                .update({
+                    'is_processed': True,
+                    'processed_at': processed_at
+                })\
+                .in_('id', chunk)\
+                .execute()
+            marked += len(chunk)
+        except Exception as e:
+            logger.error(f"❌ Failed to mark notifications processed: {e}")
+    logger.info(f"✓ Marked {marked} notifications processed")
+
+
+def log_digest_attempts(results: List[Dict], digest_date: date):
+    """Log digest email attempts to the audit table"""
+    rows = [
+        {
+            'user_id': result['user_id'],
+            'email_address': result.get('email'),
             'digest_date': digest_date.isoformat(),
-            'announcement_count': announcement_count,
-            'company_count': company_count,
-            'status': status,
-            'error_message': error_msg,
-            'email_provider_id': message_id,
-            'corp_ids': corp_ids,
-            'sent_at': datetime.now().isoformat() if status == 'sent' else None
-        }).execute()
+            'announcement_count': result.get('announcement_count', 0),
+            'company_count': len(result.get('grouped') or {}),
+            'status': result['status'],
+            'error_message': result.get('reason') if result['status'] != 'sent' else None,
+            'email_provider_id': result.get('message_id'),
+            'corp_ids': result['corp_ids'] if result['status'] != 'skipped' else [],
+            'sent_at': datetime.now().isoformat() if result['status'] == 'sent' else None
+        }
+        for result in results
+    ]
+    for chunk in chunked(rows, PAGE_SIZE):
+        try:
+            supabase.table('user_email_digest_log').insert(chunk).execute()
+        except Exception as e:
+            logger.error(f"❌ Failed to log digest attempts: {e}")
+
+
+def record_results(results: List[Dict], digest_date: date):
+    """Mark sent / skipped users' queue rows processed and log the attempts"""
+    done = [result for result in results if result['status'] in ('sent', 'skipped')]
+    mark_notifications_processed([nid for result in done for nid in result['notification_ids']])
+    # Like before, users who never got as far as an email attempt are not logged
+    log_digest_attempts(
+        [result for result in results if result['status'] != 'failed' or result.get('grouped')],
+        digest_date
+    )
+
+
+def run_digest(target_date: date, user_ids: Optional[List[str]] = None, dry_run: bool = False) -> Dict[str, int]:
+    """Build, send and record digests; returns counts by status"""
+    digests, outcomes = build_digests(target_date, user_ids)
+    if not digests and not outcomes:
+        logger.info("ℹ️  No users with pending notifications")
+        return {}
+    
+    on_results = None
+    if not dry_run:
+        record_results(outcomes, target_date)
+        on_results = lambda batch: record_results(batch, target_date)
+    
+    logger.info(f"📤 Sending {len(digests)} digests ({SEND_CONCURRENCY} at a time)")
+    results = send_digests(digests, dry_run=dry_run, on_results=on_results)
+    
+    counts: Dict[str, int] = {}
+    for result in results + outcomes:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    return counts
+
+
+def send_digest_to_user(user_id: str, target_date: date, dry_run: bool = False) -> bool:
+    """
+    Send daily digest email to a single user
+    
+    Args:
+        user_id: User ID to send digest to
+        target_date: Date of notifications to process
+        dry_run: If True, don't actually send email
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        counts = run_digest(target_date, [user_id], dry_run=dry_run)
+        return counts.get('failed', 0) == 0
     except Exception as e:
-        logger.error(f"❌ Failed to log digest attempt: {e}")
+        logger.error(f"❌ Error processing digest for user {user_id}: {e}")
+        logger.error(traceback.format_exc())
+        return False
 
 
 def main():
@@ -450,35 +620,18 @@ def main():
     
     logger.info(f"{'🧪 DRY RUN: ' if args.dry_run else ''}Starting daily digest processing for {target_date}")
     
-    # Get users to process
+    user_ids = None
     if args.test_user:
         user_ids = [args.test_user]
         logger.info(f"🧪 TEST MODE: Processing only user {args.test_user}")
-    else:
-        user_ids = get_users_with_pending_notifications(target_date)
     
-    if not user_ids:
-        logger.info("ℹ️  No users with pending notifications")
+    counts = run_digest(target_date, user_ids, dry_run=args.dry_run)
+    if not counts:
         return 0
     
-    # Process each user
-    success_count = 0
-    failure_count = 0
-    skipped_count = 0
-    
-    for i, user_id in enumerate(user_ids, 1):
-        logger.info(f"📤 Processing user {i}/{len(user_ids)}: {user_id}")
-        
-        try:
-            result = send_digest_to_user(user_id, target_date, dry_run=args.dry_run)
-            if result:
-                success_count += 1
-            else:
-                failure_count += 1
-        except Exception as e:
-            logger.error(f"❌ Unhandled error for user {user_id}: {e}")
-            logger.error(traceback.format_exc())
-            failure_count += 1
+    success_count = counts.get('sent', 0) + counts.get('dry_run', 0)
+    failure_count = counts.get('failed', 0)
+    skipped_count = counts.get('skipped', 0)
     
     # Summary
     logger.info("=" * 60)
@@ -486,7 +639,7 @@ def main():
     logger.info(f"✅ Successful: {success_count}")
     logger.info(f"❌ Failed: {failure_count}")
     logger.info(f"⏭️  Skipped: {skipped_count}")
-    logger.info(f"📊 Total: {len(user_ids)}")
+    logger.info(f"📊 Total: {sum(counts.values())}")
     logger.info("=" * 60)
     
     return 0 if failure_count == 0 else 1
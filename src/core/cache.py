@@ -0,0 +1,292 @@
+"""
+Caching primitives shared by the API processes.
+
+- ``TTLCache`` - thread-safe in-process LRU with per-entry expiry
+- ``RedisCache`` - optional shared layer (JSON values under
+  ``backfin:cache:<namespace>:``) so replicas see each other's fills and
+  invalidations
+- ``TwoLevelCache`` - a short-lived ``TTLCache`` in front of a ``RedisCache``
+- ``ResponseCache`` - gzip-compressed JSON response bodies invalidated by
+  dataset generation (``invalidate_datasets()``) rather than only by TTL
+
+The Redis layer is best-effort: connection errors are logged at debug level,
+the layer is skipped for ``CACHE_REDIS_RETRY_SECONDS`` and callers fall back
+to the in-process layer / the database.
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Hashable, Iterable, Tuple
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CACHE_KEY_PREFIX = "backfin:cache:"
+CACHE_REDIS_ENABLED = os.getenv('CACHE_REDIS_ENABLED', 'true').lower() == 'true'
+CACHE_REDIS_RETRY_SECONDS = int(os.getenv('CACHE_REDIS_RETRY_SECONDS', 30))
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ``ttl_seconds`` after being set"""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 60):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared Redis client for all cache namespaces in this process
+_redis_client: Optional[redis.Redis] = None
+_redis_retry_at = 0.0
+
+
+def get_cache_redis() -> Optional[redis.Redis]:
+    """Get the shared cache Redis client, or None while disabled/unreachable"""
+    global _redis_client
+    if not CACHE_REDIS_ENABLED or time.monotonic() < _redis_retry_at:
+        return None
+    if _redis_client is None:
+        try:
+            _redis_client = redis.Redis(
+                host=os.getenv('REDIS_HOST', 'localhost'),
+                port=int(os.getenv('REDIS_PORT', 6379)),
+                db=int(os.getenv('REDIS_DB', 0)),
+                password=os.getenv('REDIS_PASSWORD'),
+                socket_connect_timeout=1,
+                socket_timeout=1
+            )
+        except Exception as e:
+            logger.debug(f"Cache Redis client unavailable: {e}")
+            mark_cache_redis_down()
+            return None
+    return _redis_client
+
+
+def mark_cache_redis_down() -> None:
+    """Skip the Redis layer for a while after a failure so requests do not pay the timeout"""
+    global _redis_retry_at
+    _redis_retry_at = time.monotonic() + CACHE_REDIS_RETRY_SECONDS
+
+
+class RedisCache:
+    """JSON values in Redis under a namespaced key prefix"""
+
+    def __init__(self, namespace: str, ttl_seconds: int = 300, redis_client: Optional[redis.Redis] = None):
+        self.prefix = f"{CACHE_KEY_PREFIX}{namespace}:"
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis_client
+
+    def _client(self) -> Optional[redis.Redis]:
+        return self.redis_client if self.redis_client is not None else get_cache_redis()
+
+    def get(self, key: str) -> Any:
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            raw = client.get(f"{self.prefix}{key}")
+        except redis.RedisError as e:
+            logger.debug(f"Cache get failed for {self.prefix}{key}: {e}")
+            mark_cache_redis_down()
+            return None
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+        client = self._client()
+        if client is None:
+            return
+        try:
+            client.set(
+                f"{self.prefix}{key}",
+                json.dumps(value, default=str),
+                ex=self.ttl_seconds if ttl_seconds is None else ttl_seconds
+            )
+        except redis.RedisError as e:
+            logger.debug(f"Cache set failed for {self.prefix}{key}: {e}")
+            mark_cache_redis_down()
+
+    def delete(self, *keys: str) -> None:
+        client = self._client()
+        if client is None or not keys:
+            return
+        try:
+            client.delete(*[f"{self.prefix}{key}" for key in keys])
+        except redis.RedisError as e:
+            logger.debug(f"Cache delete failed for {self.prefix}: {e}")
+            mark_cache_redis_down()
+
+
+class TwoLevelCache:
+    """
+    In-process TTL LRU in front of a shared Redis layer.
+
+    Keep ``local_ttl`` short: an invalidation made on another replica only
+    reaches Redis, so this process may serve its local copy until it expires.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_size: int = 1024,
+        local_ttl: float = 30,
+        shared_ttl: int = 300,
+        redis_client: Optional[redis.Redis] = None
+    ):
+        self.local = TTLCache(max_size=max_size, ttl_seconds=local_ttl)
+        self.shared = RedisCache(namespace, ttl_seconds=shared_ttl, redis_client=redis_client)
+
+    def get(self, key: str) -> Any:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        value = self.shared.get(key)
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+        self.shared.set(key, value)
+
+    def delete(self, key: str) -> None:
+        self.local.delete(key)
+        self.shared.delete(key)
+
+
+# ---- Response cache with generation-based invalidation ----
+#
+# Every dataset (corporate_filings, deals, ...) has a generation counter at
+# ``backfin:cache:gen:<dataset>``. Response keys embed the generations of the
+# datasets they were built from, so writers invalidate every cached response of
+# a dataset with a single INCR and nothing has to enumerate keys.
+
+GENERATION_KEY_PREFIX = f"{CACHE_KEY_PREFIX}gen:"
+
+
+def invalidate_datasets(*datasets: str, redis_client: Optional[redis.Redis] = None) -> None:
+    """Bump dataset generations after a write (safe to call from any process)"""
+    client = redis_client if redis_client is not None else get_cache_redis()
+    if client is None or not datasets:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for dataset in datasets:
+            pipe.incr(f"{GENERATION_KEY_PREFIX}{dataset}")
+        pipe.execute()
+        logger.debug(f"Invalidated cached responses for {', '.join(datasets)}")
+    except redis.RedisError as e:
+        logger.debug(f"Cache invalidation failed for {datasets}: {e}")
+        mark_cache_redis_down()
+
+
+class ResponseCache:
+    """
+    Gzip-compressed JSON response bodies in Redis.
+
+    Keys are ``backfin:cache:resp:<namespace>:<generations>:<params hash>``;
+    ``key_for()`` returns None while Redis is unavailable so callers just skip
+    the cache.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        datasets: Iterable[str],
+        ttl_seconds: int = 300,
+        redis_client: Optional[redis.Redis] = None
+    ):
+        self.prefix = f"{CACHE_KEY_PREFIX}resp:{namespace}:"
+        self.datasets = tuple(datasets)
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis_client
+
+    def _client(self) -> Optional[redis.Redis]:
+        return self.redis_client if self.redis_client is not None else get_cache_redis()
+
+    def key_for(self, params: Iterable[Tuple[str, str]]) -> Optional[str]:
+        """Build the cache key for normalized query params at the current generations"""
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            generations = client.mget([f"{GENERATION_KEY_PREFIX}{d}" for d in self.datasets])
+        except redis.RedisError as e:
+            logger.debug(f"Cache generation lookup failed for {self.prefix}: {e}")
+            mark_cache_redis_down()
+            return None
+        generation = ".".join((g.decode() if isinstance(g, bytes) else str(g)) if g else "0" for g in generations)
+        params_hash = hashlib.sha1(json.dumps(sorted(params)).encode()).hexdigest()
+        return f"{self.prefix}{generation}:{params_hash}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the gzip-compressed body stored under ``key``"""
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            return client.get(key)
+        except redis.RedisError as e:
+            logger.debug(f"Cache get failed for {key}: {e}")
+            mark_cache_redis_down()
+            return None
+
+    def set(self, key: str, body: bytes) -> Optional[bytes]:
+        """Compress and store a JSON body; returns the compressed bytes"""
+        client = self._client()
+        if client is None:
+            return None
+        # mtime=0 keeps the output (and the ETag derived from it) stable
+        compressed = gzip.compress(body, compresslevel=6, mtime=0)
+        try:
+            client.set(key, compressed, ex=self.ttl_seconds)
+        except redis.RedisError as e:
+            logger.debug(f"Cache set failed for {key}: {e}")
+            mark_cache_redis_down()
+        return compressed
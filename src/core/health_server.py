@@ -9,11 +9,13 @@ import asyncio
 import logging
 from datetime import datetime
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 import redis
 from typing import Dict, Any
 
+from src.core.metrics import MetricsRegistry, PROMETHEUS_CONTENT_TYPE
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -115,7 +117,22 @@ async def readiness_check():
 
 @app.get("/metrics")
 async def metrics():
-    """Basic metrics endpoint for monitoring"""
+    """Prometheus metrics endpoint (queues, workers, stage and external call latencies)"""
+    redis_conn = get_redis_connection()
+    if not redis_conn:
+        return PlainTextResponse(content="", status_code=503, media_type=PROMETHEUS_CONTENT_TYPE)
+    try:
+        return PlainTextResponse(
+            content=MetricsRegistry(redis_client=redis_conn).render(),
+            media_type=PROMETHEUS_CONTENT_TYPE
+        )
+    except Exception as e:
+        logger.error(f"Metrics failed: {e}")
+        return PlainTextResponse(content="", status_code=503, media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/metrics/summary")
+async def metrics_summary():
+    """Basic JSON metrics summary for monitoring"""
     try:
         redis_conn = get_redis_connection()
         metrics = {
@@ -0,0 +1,400 @@
+"""
+Shared Prometheus-style instrumentation for Backfin services.
+
+Workers are ephemeral processes (and the Supabase worker runs each job in a
+child process), so metrics cannot live in process memory. Counters and
+histograms are therefore accumulated in Redis hashes:
+
+- ``backfin:metrics:counters``   - ``name{labels}`` -> value
+- ``backfin:metrics:histograms`` - ``name_bucket{labels,le}`` / ``_sum`` / ``_count``
+- ``backfin:metrics:workers``    - active worker counts published by WorkerSpawner
+
+Queue depths, job ages and delayed-queue sizes are read from Redis at scrape
+time. ``render_metrics()`` produces the Prometheus text exposition format and
+is served by the health server and both API apps at ``/metrics``.
+
+Recording never touches Redis on the caller's thread: ``inc()`` and
+``observe()`` add to an in-process buffer, which a background thread writes
+as one pipeline every ``METRICS_FLUSH_INTERVAL_MS`` (and at process exit,
+including multiprocessing children). Request handlers and the Telegram
+sender's event loop therefore never wait on Redis. Flushing is best-effort:
+failures are logged at debug level and drop that batch, and after a
+connection error or timeout Redis is skipped for
+``METRICS_REDIS_RETRY_SECONDS``.
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+import weakref
+import threading
+import multiprocessing.util
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+import redis
+
+from src.queue.redis_client import QueueNames
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+COUNTERS_KEY = "backfin:metrics:counters"
+HISTOGRAMS_KEY = "backfin:metrics:histograms"
+WORKERS_KEY = "backfin:metrics:workers"
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_REDIS_RETRY_SECONDS = int(os.getenv('METRICS_REDIS_RETRY_SECONDS', 30))
+METRICS_FLUSH_INTERVAL_SECONDS = float(os.getenv('METRICS_FLUSH_INTERVAL_MS', 500)) / 1000
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds (covers Redis calls up to multi-minute Gemini calls)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Metric metadata: name -> (type, help)
+METRIC_DEFINITIONS = {
+    "backfin_queue_depth": ("gauge", "Number of jobs waiting in a queue"),
+    "backfin_queue_oldest_job_age_seconds": ("gauge", "Age of the oldest job waiting in a queue"),
+    "backfin_delayed_queue_depth": ("gauge", "Number of jobs parked in a delayed retry set"),
+    "backfin_delayed_queue_due": ("gauge", "Number of delayed jobs whose retry time has passed"),
+    "backfin_processing_retries_pending": ("gauge", "Jobs with a non-zero retry counter in the Supabase worker"),
+    "backfin_active_workers": ("gauge", "Worker processes currently running per queue (from WorkerSpawner)"),
+    "backfin_max_workers": ("gauge", "Configured max concurrent workers per queue"),
+    "backfin_redis_used_memory_bytes": ("gauge", "Redis used_memory"),
+    "backfin_redis_connected_clients": ("gauge", "Redis connected_clients"),
+    "backfin_jobs_processed_total": ("counter", "Jobs processed by workers, by outcome"),
+    "backfin_job_retries_total": ("counter", "Job retry attempts by worker"),
+    "backfin_stage_duration_seconds": ("histogram", "Pipeline stage duration"),
+    "backfin_external_call_duration_seconds": ("histogram", "Latency of calls to external services (Gemini, Supabase, exchanges)"),
+    "backfin_external_call_errors_total": ("counter", "Failed calls to external services"),
+    "backfin_http_request_duration_seconds": ("histogram", "API request latency"),
+    "backfin_response_cache_requests_total": ("counter", "API response cache lookups by endpoint and hit/miss"),
+}
+
+
+def _escape_label_value(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Optional[Dict[str, Any]], le: Optional[str] = None) -> str:
+    """Format labels as a Prometheus label set (sorted for stable keys, bucket bound last)"""
+    parts = [f'{k}="{_escape_label_value(v)}"' for k, v in sorted((labels or {}).items()) if v is not None]
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _metric_name(sample: str) -> str:
+    """Get the metric family name from a sample key"""
+    name = sample.split('{', 1)[0]
+    for suffix in ("_bucket", "_sum", "_count"):
+        base = name[:-len(suffix)] if name.endswith(suffix) else None
+        if base and METRIC_DEFINITIONS.get(base, ("",))[0] == "histogram":
+            return base
+    return name
+
+
+def _sample_sort_key(sample: str) -> Tuple[str, float]:
+    """Sort samples by label set, then numerically by histogram bucket bound"""
+    if not sample.endswith('"}') or 'le="' not in sample:
+        return sample, 0.0
+    head, _, bound = sample.rpartition('le="')
+    bound = bound.rstrip('"}')
+    return head, float('inf') if bound == '+Inf' else float(bound)
+
+
+def _job_age_seconds(job_json: Optional[str], now: float) -> Optional[float]:
+    """Best-effort age of a serialized job from its created_at field"""
+    if not job_json:
+        return None
+    try:
+        created_at = json.loads(job_json).get('created_at')
+        if not created_at:
+            return None
+        created = datetime.fromisoformat(str(created_at).replace('Z', '+00:00'))
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        return max(0.0, now - created.timestamp())
+    except Exception:
+        return None
+
+
+# A forked child starts with empty buffers (the parent flushes its own) and
+# starts its own flusher thread on first use
+_registries: "weakref.WeakSet[MetricsRegistry]" = weakref.WeakSet()
+
+
+def _reset_registries_after_fork() -> None:
+    for registry in list(_registries):
+        registry._reset_buffers()
+
+
+os.register_at_fork(after_in_child=_reset_registries_after_fork)
+
+
+class MetricsRegistry:
+    """Redis-backed counters and histograms shared by every Backfin process"""
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        enabled: bool = METRICS_ENABLED,
+        flush_interval: float = METRICS_FLUSH_INTERVAL_SECONDS
+    ):
+        self.redis_client = redis_client
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self._redis_retry_at = 0.0
+        self._reset_buffers()
+        _registries.add(self)
+
+    def _reset_buffers(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._histogram_counts: Dict[str, int] = {}
+        self._histogram_sums: Dict[str, float] = {}
+        self._flusher_pid: Optional[int] = None
+
+    def _get_client(self) -> Optional[redis.Redis]:
+        """Lazily create a Redis client with short timeouts; None while Redis is marked down"""
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        if self.redis_client is None:
+            try:
+                self.redis_client = redis.Redis(
+                    host=os.getenv('REDIS_HOST', 'localhost'),
+                    port=int(os.getenv('REDIS_PORT', 6379)),
+                    db=int(os.getenv('REDIS_DB', 0)),
+                    password=os.getenv('REDIS_PASSWORD'),
+                    socket_connect_timeout=2,
+                    socket_timeout=2,
+                    decode_responses=True
+                )
+            except Exception as e:
+                logger.debug(f"Metrics Redis client unavailable: {e}")
+                self._mark_redis_down()
+                return None
+        return self.redis_client
+
+    def _mark_redis_down(self) -> None:
+        """Skip Redis for a while after a failure so callers do not pay the timeout"""
+        self._redis_retry_at = time.monotonic() + METRICS_REDIS_RETRY_SECONDS
+
+    def _recording_failed(self, name: str, e: Exception) -> None:
+        logger.debug(f"Failed to record {name}: {e}")
+        if isinstance(e, (redis.ConnectionError, redis.TimeoutError)):
+            self._mark_redis_down()
+
+    # ---- Recording ----
+
+    def _ensure_flusher(self) -> None:
+        """Start this process's flusher thread and exit hooks on first use"""
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+        atexit.register(self.flush)
+        # multiprocessing children exit without running atexit handlers
+        multiprocessing.util.Finalize(None, self.flush, exitpriority=10)
+
+    def _flush_loop(self) -> None:
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def inc(self, name: str, labels: Optional[Dict[str, Any]] = None, amount: float = 1) -> None:
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        self._ensure_flusher()
+        field = f"{name}{_format_labels(labels)}"
+        with self._lock:
+            self._counters[field] = self._counters.get(field, 0) + amount
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        labels: Optional[Dict[str, Any]] = None,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> None:
+        """Record a histogram observation (value in seconds)"""
+        if not self.enabled:
+            return
+        self._ensure_flusher()
+        label_set = _format_labels(labels)
+        # Higher buckets get 0 so every bucket series exists
+        increments = [(f"{name}_bucket{_format_labels(labels, le=_format_value(bound))}", int(value <= bound))
+                      for bound in buckets]
+        increments.append((f"{name}_bucket{_format_labels(labels, le='+Inf')}", 1))
+        increments.append((f"{name}_count{label_set}", 1))
+        sum_field = f"{name}_sum{label_set}"
+        with self._lock:
+            counts = self._histogram_counts
+            for field, amount in increments:
+                counts[field] = counts.get(field, 0) + amount
+            self._histogram_sums[sum_field] = self._histogram_sums.get(sum_field, 0.0) + value
+
+    def flush(self) -> None:
+        """Write buffered counters and histograms to Redis in one pipeline"""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            counts, self._histogram_counts = self._histogram_counts, {}
+            sums, self._histogram_sums = self._histogram_sums, {}
+        if not (counters or counts or sums):
+            return
+        client = self._get_client()
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for field, amount in counters.items():
+                pipe.hincrbyfloat(COUNTERS_KEY, field, amount)
+            for field, amount in counts.items():
+                pipe.hincrby(HISTOGRAMS_KEY, field, amount)
+            for field, amount in sums.items():
+                pipe.hincrbyfloat(HISTOGRAMS_KEY, field, amount)
+            pipe.execute()
+        except Exception as e:
+            self._recording_failed(f"{len(counters) + len(counts) + len(sums)} buffered metrics", e)
+
+    @contextmanager
+    def time(self, name: str, labels: Optional[Dict[str, Any]] = None):
+        """Context manager observing the duration of the enclosed block"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, labels)
+
+    @contextmanager
+    def external_call(self, service: str, operation: str):
+        """Time a call to an external service and count failures"""
+        labels = {"service": service, "operation": operation}
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException:
+            self.inc("backfin_external_call_errors_total", labels)
+            raise
+        finally:
+            self.observe("backfin_external_call_duration_seconds", time.monotonic() - started, labels)
+
+    def publish_worker_counts(self, counts: Dict[str, Tuple[int, int]]) -> None:
+        """Publish active/max worker counts per queue (called by WorkerSpawner)"""
+        if not self.enabled or not counts:
+            return
+        client = self._get_client()
+        if client is None:
+            return
+        try:
+            mapping = {queue: json.dumps({"active": active, "max": maximum, "ts": time.time()})
+                       for queue, (active, maximum) in counts.items()}
+            client.hset(WORKERS_KEY, mapping=mapping)
+        except Exception as e:
+            self._recording_failed("worker counts", e)
+
+    # ---- Collection ----
+
+    def collect_queue_samples(self) -> List[Tuple[str, float]]:
+        """Read queue depths, ages, delayed sets and worker counts from Redis"""
+        client = self._get_client()
+        if client is None:
+            return []
+
+        now = time.time()
+        samples: List[Tuple[str, float]] = []
+        queues = QueueNames.all_queues() + [QueueNames.TELEGRAM_NOTIFICATIONS, QueueNames.TELEGRAM_FAILED]
+
+        for queue in queues:
+            labels = _format_labels({"queue": queue})
+            try:
+                samples.append((f"backfin_queue_depth{labels}", client.llen(queue)))
+                # Producers LPUSH and consumers BRPOP, so the oldest job is at the tail
+                age = _job_age_seconds(client.lindex(queue, -1), now)
+                samples.append((f"backfin_queue_oldest_job_age_seconds{labels}", age or 0))
+
+                delayed_key = f"{queue}:delayed"
+                if client.exists(delayed_key):
+                    delayed_labels = _format_labels({"queue": delayed_key})
+                    samples.append((f"backfin_delayed_queue_depth{delayed_labels}", client.zcard(delayed_key)))
+                    samples.append((f"backfin_delayed_queue_due{delayed_labels}", client.zcount(delayed_key, "-inf", now)))
+            except Exception as e:
+                logger.debug(f"Failed to collect metrics for {queue}: {e}")
+
+        try:
+            samples.append(("backfin_processing_retries_pending", client.hlen("processing_retries")))
+        except Exception as e:
+            logger.debug(f"Failed to collect retry metrics: {e}")
+
+        try:
+            for queue, raw in (client.hgetall(WORKERS_KEY) or {}).items():
+                counts = json.loads(raw)
+                labels = _format_labels({"queue": queue})
+                samples.append((f"backfin_active_workers{labels}", counts.get("active", 0)))
+                samples.append((f"backfin_max_workers{labels}", counts.get("max", 0)))
+        except Exception as e:
+            logger.debug(f"Failed to collect worker metrics: {e}")
+
+        try:
+            info = client.info()
+            samples.append(("backfin_redis_used_memory_bytes", info.get('used_memory', 0)))
+            samples.append(("backfin_redis_connected_clients", info.get('connected_clients', 0)))
+        except Exception as e:
+            logger.debug(f"Failed to collect Redis info: {e}")
+
+        return samples
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        self.flush()
+        client = self._get_client()
+        samples: List[Tuple[str, float]] = list(self.collect_queue_samples())
+        if client is not None:
+            for key in (COUNTERS_KEY, HISTOGRAMS_KEY):
+                try:
+                    samples.extend((field, float(value)) for field, value in (client.hgetall(key) or {}).items())
+                except Exception as e:
+                    logger.debug(f"Failed to read {key}: {e}")
+
+        families: Dict[str, List[Tuple[str, float]]] = {}
+        for sample, value in samples:
+            families.setdefault(_metric_name(sample), []).append((sample, value))
+
+        lines = []
+        for name in sorted(families):
+            metric_type, help_text = METRIC_DEFINITIONS.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample, value in sorted(families[name], key=lambda s: _sample_sort_key(s[0])):
+                lines.append(f"{sample} {_format_value(float(value))}")
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance for easy import
+_metrics_instance: Optional[MetricsRegistry] = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get or create singleton metrics registry"""
+    global _metrics_instance
+    if _metrics_instance is None:
+        _metrics_instance = MetricsRegistry()
+    return _metrics_instance
+
+
+def render_metrics() -> str:
+    """Render all Backfin metrics in Prometheus text format"""
+    return get_metrics().render()
@@ -0,0 +1,246 @@
+"""
+Job lifecycle tracing for the announcement pipeline.
+
+Every hop an announcement takes (scraper -> AI worker -> Supabase worker ->
+API broadcast -> Telegram) records a trace event keyed by ``corp_id``:
+
+- ``backfin:trace:<corp_id>`` - Redis hash with one field per stage holding
+  the wall-clock timestamp and duration, expired after the retention window
+- ``backfin:trace:events`` - capped Redis stream of every event, used to
+  compute per-stage latency percentiles over a time window
+
+Durations inside a process are measured with ``time.monotonic()``; waits
+across processes (e.g. queue time between enqueue and dequeue) are derived
+from the wall-clock timestamps stored in the hash.
+
+Tracing is best-effort: any Redis failure is logged at debug level and never
+propagates into the pipeline. After a connection error or timeout, recording
+is skipped for ``TRACE_REDIS_RETRY_SECONDS`` so every hop does not pay the
+socket timeout while Redis is unreachable.
+"""
+
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterable
+
+import redis
+
+from src.core.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+TRACE_KEY_PREFIX = "backfin:trace:"
+TRACE_STREAM = "backfin:trace:events"
+TRACE_RETENTION_SECONDS = int(os.getenv('TRACE_RETENTION_SECONDS', 86400))
+TRACE_STREAM_MAXLEN = int(os.getenv('TRACE_STREAM_MAXLEN', 100000))
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+TRACE_REDIS_RETRY_SECONDS = int(os.getenv('TRACE_REDIS_RETRY_SECONDS', 30))
+
+
+class TraceStage:
+    """Centralized pipeline stage names"""
+    ENQUEUE = "enqueue"
+    DEQUEUE = "dequeue"
+    PDF_DOWNLOAD = "pdf_download"
+    HASH_CHECK = "hash_check"
+    GEMINI_CALL = "gemini_call"
+    UPLOAD = "upload"
+    WEBSOCKET_BROADCAST = "websocket_broadcast"
+    TELEGRAM_SEND = "telegram_send"
+
+    @classmethod
+    def all_stages(cls) -> List[str]:
+        """Get all stages in pipeline order"""
+        return [
+            cls.ENQUEUE,
+            cls.DEQUEUE,
+            cls.PDF_DOWNLOAD,
+            cls.HASH_CHECK,
+            cls.GEMINI_CALL,
+            cls.UPLOAD,
+            cls.WEBSOCKET_BROADCAST,
+            cls.TELEGRAM_SEND,
+        ]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = int(round(pct / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+class JobTracer:
+    """Records and queries per-stage timing events for pipeline jobs"""
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None, enabled: bool = TRACING_ENABLED):
+        self.redis_client = redis_client
+        self.enabled = enabled
+        self._redis_retry_at = 0.0
+
+    def _get_client(self) -> Optional[redis.Redis]:
+        """Lazily create a Redis client with short timeouts; None while Redis is marked down"""
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        if self.redis_client is None:
+            try:
+                self.redis_client = redis.Redis(
+                    host=os.getenv('REDIS_HOST', 'localhost'),
+                    port=int(os.getenv('REDIS_PORT', 6379)),
+                    db=int(os.getenv('REDIS_DB', 0)),
+                    password=os.getenv('REDIS_PASSWORD'),
+                    socket_connect_timeout=2,
+                    socket_timeout=2,
+                    decode_responses=True
+                )
+            except Exception as e:
+                logger.debug(f"Trace Redis client unavailable: {e}")
+                self._mark_redis_down()
+                return None
+        return self.redis_client
+
+    def _mark_redis_down(self) -> None:
+        """Skip Redis for a while after a failure so the pipeline does not pay the timeout"""
+        self._redis_retry_at = time.monotonic() + TRACE_REDIS_RETRY_SECONDS
+
+    def _redis_failed(self, message: str, e: Exception) -> None:
+        logger.debug(f"{message}: {e}")
+        if isinstance(e, (redis.ConnectionError, redis.TimeoutError)):
+            self._mark_redis_down()
+
+    def record(self, corp_id: str, stage: str, duration_ms: Optional[float] = None, **fields) -> None:
+        """Record that ``stage`` happened for ``corp_id`` now, with an optional duration"""
+        if not self.enabled or not corp_id:
+            return
+        client = self._get_client()
+        if client is None:
+            return
+
+        ts = time.time()
+        event = {"ts": ts}
+        if duration_ms is not None:
+            event["duration_ms"] = round(duration_ms, 3)
+        event.update({k: v for k, v in fields.items() if v is not None})
+
+        try:
+            key = f"{TRACE_KEY_PREFIX}{corp_id}"
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(key, stage, json.dumps(event, default=str))
+            pipe.expire(key, TRACE_RETENTION_SECONDS)
+            pipe.xadd(
+                TRACE_STREAM,
+                {
+                    "corp_id": str(corp_id),
+                    "stage": stage,
+                    "ts": str(ts),
+                    "duration_ms": "" if duration_ms is None else str(round(duration_ms, 3)),
+                },
+                maxlen=TRACE_STREAM_MAXLEN,
+                approximate=True
+            )
+            pipe.execute()
+        except Exception as e:
+            self._redis_failed(f"Failed to record trace {stage} for {corp_id}", e)
+
+        if duration_ms is not None:
+            get_metrics().observe("backfin_stage_duration_seconds", duration_ms / 1000.0, {"stage": stage})
+
+    def record_wait(self, corp_id: str, stage: str, since_stage: str, **fields) -> None:
+        """Record ``stage`` with the wall-clock time elapsed since ``since_stage`` as its duration"""
+        if not self.enabled or not corp_id:
+            return
+        duration_ms = None
+        try:
+            client = self._get_client()
+            raw = client.hget(f"{TRACE_KEY_PREFIX}{corp_id}", since_stage) if client else None
+            if raw:
+                duration_ms = (time.time() - float(json.loads(raw)["ts"])) * 1000
+        except Exception as e:
+            self._redis_failed(f"Could not read {since_stage} trace for {corp_id}", e)
+        self.record(corp_id, stage, duration_ms=duration_ms, **fields)
+
+    @contextmanager
+    def span(self, corp_id: str, stage: str, **fields):
+        """Context manager timing the enclosed block with a monotonic clock"""
+        started = time.monotonic()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record(
+                corp_id,
+                stage,
+                duration_ms=(time.monotonic() - started) * 1000,
+                error=error,
+                **fields
+            )
+
+    def get_trace(self, corp_id: str) -> Dict[str, Any]:
+        """Get all recorded stages for one job, ordered by timestamp"""
+        client = self._get_client()
+        if client is None:
+            return {}
+        raw = client.hgetall(f"{TRACE_KEY_PREFIX}{corp_id}") or {}
+        stages = {}
+        for stage, value in raw.items():
+            try:
+                stages[stage] = json.loads(value)
+            except (TypeError, ValueError):
+                stages[stage] = {"raw": value}
+        return dict(sorted(stages.items(), key=lambda item: item[1].get("ts", 0)))
+
+    def iter_events(self, window_seconds: int = 3600, count: int = 10000) -> Iterable[Dict[str, str]]:
+        """Iterate over the newest ``count`` trace events recorded within the last ``window_seconds`` (newest first)"""
+        client = self._get_client()
+        if client is None:
+            return []
+        min_id = f"{int((time.time() - window_seconds) * 1000)}-0"
+        return [fields for _, fields in client.xrevrange(TRACE_STREAM, max="+", min=min_id, count=count)]
+
+    def stage_percentiles(
+        self,
+        window_seconds: int = 3600,
+        percentiles: Iterable[float] = (50, 90, 99),
+        count: int = 10000
+    ) -> Dict[str, Dict[str, float]]:
+        """Compute per-stage latency percentiles (milliseconds) over a time window"""
+        durations: Dict[str, List[float]] = {}
+        for event in self.iter_events(window_seconds, count):
+            value = event.get("duration_ms")
+            if not value:
+                continue
+            try:
+                durations.setdefault(event.get("stage", "unknown"), []).append(float(value))
+            except ValueError:
+                continue
+
+        stats = {}
+        for stage in TraceStage.all_stages() + sorted(set(durations) - set(TraceStage.all_stages())):
+            values = sorted(durations.get(stage, []))
+            if not values:
+                continue
+            stage_stats = {"count": len(values), "max": values[-1]}
+            for pct in percentiles:
+                stage_stats[f"p{int(pct)}"] = round(_percentile(values, pct), 3)
+            stats[stage] = stage_stats
+        return stats
+
+
+# Singleton instance for easy import
+_tracer_instance: Optional[JobTracer] = None
+
+
+def get_tracer() -> JobTracer:
+    """Get or create singleton tracer instance"""
+    global _tracer_instance
+    if _tracer_instance is None:
+        _tracer_instance = JobTracer()
+    return _tracer_instance
@@ -31,6 +31,8 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 try:
     from src.queue.redis_client import RedisConfig, QueueNames
     from src.queue.job_types import AIProcessingJob, serialize_job
+    from src.core.tracing import get_tracer, TraceStage
+    from src.core.metrics import get_metrics
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
@@ -40,6 +42,7 @@ sys.path.insert(0, str(project_root))
 
 from src.ai.prompts import *
 from src.services.investor_analyzer import uploadInvestor
+from src.utils.http_replay import install_http_replay
 from src.utils.pdf_hash_utils import calculate_pdf_hash, check_pdf_duplicate, process_pdf_for_duplicates, register_pdf_hash
 import fcntl  
 import contextlib
@@ -815,6 +818,7 @@ except Exception as e:
 
 class BseScraper:
     def __init__(self, prev_date, to_date, max_retries=50, request_timeout=30):
+        install_http_replay()
         self.url = "https://api.bseindia.com/BseIndiaAPI/api/AnnSubCategoryGetData/w"
         self.params = {
             "pageno": 1,
@@ -884,11 +888,12 @@ class BseScraper:
                 with requests.Session() as session:
                     session.headers.update(self.headers)
                     
-                    response = session.get(
-                        self.url, 
-                        params=self.params, 
-                        timeout=self.request_timeout
-                    )
+                    with (get_metrics().external_call("bse", "announcements") if REDIS_AVAILABLE else contextlib.nullcontext()):
+                        response = session.get(
+                            self.url, 
+                            params=self.params, 
+                            timeout=self.request_timeout
+                        )
                     
                     response.raise_for_status()  # Raises an exception for 4XX/5XX responses
                     
@@ -1184,6 +1189,7 @@ class BseScraper:
                 queue_length = self.redis_client.lpush(QueueNames.AI_PROCESSING, serialized_job)
                 logger.info(f"✅ Queued announcement {newsid} for AI processing (corp_id: {corp_id})")
                 logger.info(f"📊 AI processing queue now has {queue_length} jobs")
+                get_tracer().record(corp_id, TraceStage.ENQUEUE, queue=QueueNames.AI_PROCESSING, source="BSE")
                 
                 # Verify the job was actually added
                 current_queue_length = self.redis_client.llen(QueueNames.AI_PROCESSING)
@@ -1570,6 +1576,7 @@ class BseScraper:
                         )
                         
                         self.redis_client.lpush(QueueNames.AI_PROCESSING, serialize_job(ai_job))
+                        get_tracer().record(corp_id, TraceStage.ENQUEUE, queue=QueueNames.AI_PROCESSING, source="BSE", retry=True)
                         logger.info(f"🔄 Queued Error category announcement for AI retry: {corp_id}")
                         
                     except Exception as e:
@@ -62,12 +62,15 @@ sys.path.insert(0, str(project_root))
 
 from src.ai.prompts import *
 from src.services.investor_analyzer import uploadInvestor
+from src.utils.http_replay import install_http_replay
 from src.utils.pdf_hash_utils import calculate_pdf_hash, check_pdf_duplicate, register_pdf_hash
 
 # Import Redis queue functionality
 try:
     from src.queue.redis_client import RedisConfig, QueueNames
     from src.queue.job_types import AIProcessingJob, serialize_job
+    from src.core.tracing import get_tracer, TraceStage
+    from src.core.metrics import get_metrics
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
@@ -553,6 +556,7 @@ class NseScraper:
     - ENABLE_WEBSOCKET_API: Enable/disable WebSocket API calls (default: true)
     """
     def __init__(self, prev_date, to_date, max_retries=3, request_timeout=30):
+        install_http_replay()
         self.prev_date = prev_date
         self.to_date = to_date
         
@@ -664,7 +668,8 @@ class NseScraper:
         logger.info(f"Requesting API data from {self.prev_date} to {self.to_date}...")
         try:
             # Make the request
-            response = self.session.get(api_url, params=params, timeout=30)
+            with (get_metrics().external_call("nse", "announcements") if REDIS_AVAILABLE else contextlib.nullcontext()):
+                response = self.session.get(api_url, params=params, timeout=30)
             response.raise_for_status()
             
             logger.info(f"API response status: {response.status_code}")
@@ -1121,6 +1126,7 @@ class NseScraper:
                         )
                         
                         self.redis_client.lpush(QueueNames.AI_PROCESSING, serialize_job(ai_job))
+                        get_tracer().record(corp_id, TraceStage.ENQUEUE, queue=QueueNames.AI_PROCESSING, source="NSE", retry=True)
                         logger.info(f"🔄 Queued Error category announcement for AI retry: {corp_id}")
                         
                     except Exception as e:
@@ -0,0 +1,262 @@
+"""
+Announcement broadcasting shared by the API and the pipeline workers.
+
+The API can run as several replicas behind a load balancer. Setting
+``SOCKETIO_MESSAGE_QUEUE`` (a Redis URL such as ``redis://redis:6379/0``) on
+every replica makes Flask-SocketIO relay each emit through the Redis
+``SOCKETIO_CHANNEL`` pub/sub channel so clients connected to any replica
+receive it.
+
+With the message queue configured, workers do not need to POST to
+``/api/insert_new_announcement`` either: ``AnnouncementPublisher`` is a
+write-only Socket.IO client manager that publishes straight to the same
+channel and queues the watchlist notifications itself, so a broadcast costs
+one Redis PUBLISH instead of an HTTP round-trip through an API replica.
+
+Without ``SOCKETIO_MESSAGE_QUEUE`` the publisher is disabled and callers keep
+using the HTTP endpoint (single API process, as before).
+
+Rooms: every client starts in ``all``. A client that subscribes with its
+access token leaves ``all`` and joins ``isin:<ISIN>`` / ``category:<name>``
+rooms derived from its watchlists (plus ``user:<id>`` for watchlist change
+notices). Announcements are emitted to ``all`` and the matching scoped rooms
+in one call, so each client receives them at most once.
+"""
+
+import os
+import logging
+import datetime as dt
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+try:
+    import socketio
+    SOCKETIO_AVAILABLE = True
+except ImportError:
+    SOCKETIO_AVAILABLE = False
+
+try:
+    from src.core.tracing import get_tracer, TraceStage
+    TRACING_AVAILABLE = True
+except ImportError:
+    TRACING_AVAILABLE = False
+
+try:
+    from src.core.cache import invalidate_datasets
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
+
+try:
+    from src.services.watchlist_index import get_watchlist_index
+    WATCHLIST_INDEX_AVAILABLE = True
+except ImportError:
+    WATCHLIST_INDEX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', '').strip() or None
+SOCKETIO_CHANNEL = os.getenv('SOCKETIO_CHANNEL', 'backfin:socketio')
+
+ANNOUNCEMENT_EVENT = 'new_announcement'
+BROADCAST_ROOM = 'all'
+ISIN_ROOM_PREFIX = 'isin:'
+CATEGORY_ROOM_PREFIX = 'category:'
+USER_ROOM_PREFIX = 'user:'
+NON_BROADCAST_CATEGORIES = ('Procedural/Administrative', 'Error')
+
+
+def _is_nonempty_str(value: Any) -> bool:
+    return isinstance(value, str) and value.strip() != ''
+
+
+def build_broadcast_payload(data: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Validate an uploaded filing and build the ``new_announcement`` payload.
+
+    Returns (payload, '') or (None, reason) when the filing must not be broadcast.
+    """
+    corp_id = data.get('corp_id')
+    category = data.get('category')
+    summary = data.get('summary')
+    ai_summary = data.get('ai_summary')
+
+    if not _is_nonempty_str(corp_id):
+        return None, 'missing corp_id'
+    if not _is_nonempty_str(category) or category in NON_BROADCAST_CATEGORIES:
+        return None, 'non-broadcast category'
+    if not (_is_nonempty_str(summary) or _is_nonempty_str(ai_summary)):
+        return None, 'empty announcement content'
+
+    return {
+        "id": corp_id,
+        "securityid": data.get('securityid'),
+        "summary": summary,
+        "fileurl": data.get('fileurl'),
+        "date": data.get('date'),
+        "ai_summary": ai_summary,
+        "category": category,
+        "isin": data.get('isin'),
+        "companyname": data.get('companyname'),
+        "symbol": data.get('symbol'),
+    }, ''
+
+
+def watchlist_rooms(isins: Iterable[str], categories: Iterable[str]) -> List[str]:
+    """Scoped rooms a client watching ``isins`` / ``categories`` should be in"""
+    rooms = {f"{ISIN_ROOM_PREFIX}{isin}" for isin in isins if isin}
+    rooms.update(f"{CATEGORY_ROOM_PREFIX}{category}" for category in categories if category)
+    return sorted(rooms)
+
+
+def is_scoped_room(room: str) -> bool:
+    return room.startswith((ISIN_ROOM_PREFIX, CATEGORY_ROOM_PREFIX))
+
+
+def announcement_rooms(payload: Dict[str, Any]) -> List[str]:
+    """Rooms an announcement is emitted to: ``all`` plus its ISIN and category rooms"""
+    return [BROADCAST_ROOM] + watchlist_rooms(
+        [payload['isin']] if payload.get('isin') else [],
+        [payload['category']] if payload.get('category') else []
+    )
+
+
+def _watchlist_users_from_db(supabase, column: str, value: str) -> Set[str]:
+    try:
+        response = supabase.table('watchlistdata').select('userid').eq(column, value).execute()
+        return {row['userid'] for row in (response.data or [])}
+    except Exception as e:
+        logger.error(f"Error fetching watchlist users by {column}: {e}")
+        return set()
+
+
+def find_watchlist_users(supabase, isin: Optional[str], category: Optional[str]) -> Tuple[Set[str], Set[str]]:
+    """(users watching ``isin``, users watching ``category``) - reverse index first, then the database"""
+    indexed = get_watchlist_index().users_for_announcement(isin, category) if WATCHLIST_INDEX_AVAILABLE else None
+    if indexed is not None:
+        return indexed
+    if supabase is None:
+        return set(), set()
+    isin_users = _watchlist_users_from_db(supabase, 'isin', isin) if isin else set()
+    category_users = _watchlist_users_from_db(supabase, 'category', category) if category else set()
+    return isin_users, category_users
+
+
+def queue_watchlist_notifications(supabase, data: Dict[str, Any]) -> int:
+    """Queue ``user_notification_queue`` rows for every user watching the filing; returns the user count"""
+    isin = data.get('isin')
+    category = data.get('category')
+    isin_users, category_users = find_watchlist_users(supabase, isin, category)
+    all_users = isin_users | category_users
+    if not all_users or supabase is None:
+        return 0
+
+    today = dt.date.today().isoformat()
+    notification_records = []
+    for user_id in all_users:
+        # Match reason for analytics
+        if user_id in isin_users and user_id in category_users:
+            matched_by = 'both'
+        elif user_id in isin_users:
+            matched_by = 'isin'
+        else:
+            matched_by = 'category'
+        notification_records.append({
+            'user_id': user_id,
+            'corp_id': data.get('corp_id'),
+            'isin': isin,
+            'symbol': data.get('symbol'),
+            'company_name': data.get('companyname'),
+            'category': category,
+            'matched_by': matched_by,
+            'notification_date': today
+        })
+
+    try:
+        # Upsert so a re-broadcast of the same filing does not duplicate rows
+        supabase.table('user_notification_queue').upsert(
+            notification_records,
+            on_conflict='user_id,corp_id,notification_date'
+        ).execute()
+        logger.info(f"✅ Queued {len(notification_records)} notifications for {len(all_users)} users")
+    except Exception as e:
+        # Never fail the broadcast because of the notification queue
+        logger.error(f"❌ Failed to queue notifications: {e}")
+    return len(all_users)
+
+
+class AnnouncementPublisher:
+    """
+    Write-only Socket.IO emitter backed by the Redis message queue.
+
+    Emits reach every API replica subscribed to ``channel``; nothing is
+    received, so the publisher needs no eventlet and no Flask app.
+    """
+
+    def __init__(self, message_queue: Optional[str] = SOCKETIO_MESSAGE_QUEUE, channel: str = SOCKETIO_CHANNEL):
+        self.message_queue = message_queue
+        self.channel = channel
+        self._manager = None
+
+    @property
+    def enabled(self) -> bool:
+        return SOCKETIO_AVAILABLE and bool(self.message_queue)
+
+    def _get_manager(self):
+        if self._manager is None:
+            self._manager = socketio.RedisManager(self.message_queue, channel=self.channel, write_only=True)
+        return self._manager
+
+    def emit(self, event: str, payload: Dict[str, Any], room: Union[str, List[str], None] = BROADCAST_ROOM) -> bool:
+        """Publish one Socket.IO event; returns False if the message queue is unavailable"""
+        if not self.enabled:
+            return False
+        try:
+            self._get_manager().emit(event, payload, namespace='/', room=room)
+            return True
+        except Exception as e:
+            logger.error(f"Socket.IO publish of {event} failed: {e}")
+            self._manager = None
+            return False
+
+    def publish(self, data: Dict[str, Any], supabase=None) -> Dict[str, Any]:
+        """
+        Broadcast an uploaded filing and queue its watchlist notifications.
+
+        Mirrors ``/api/insert_new_announcement`` and returns the same
+        ``status`` / ``message`` / ``users_notified`` fields.
+        """
+        corp_id = data.get('corp_id')
+        if CACHE_AVAILABLE and _is_nonempty_str(corp_id):
+            invalidate_datasets('corporate_filings', 'financial_results')
+
+        payload, skip_reason = build_broadcast_payload(data)
+        if payload is None:
+            logger.info(f"Skipping broadcast for corp_id={corp_id}: {skip_reason}")
+            return {'status': 'skipped', 'message': f'Skipped broadcast: {skip_reason}'}
+
+        if TRACING_AVAILABLE:
+            with get_tracer().span(corp_id, TraceStage.WEBSOCKET_BROADCAST, via='message_queue'):
+                sent = self.emit(ANNOUNCEMENT_EVENT, payload, room=announcement_rooms(payload))
+        else:
+            sent = self.emit(ANNOUNCEMENT_EVENT, payload, room=announcement_rooms(payload))
+        if not sent:
+            return {'status': 'error', 'message': 'Socket.IO message queue unavailable'}
+
+        users_notified = queue_watchlist_notifications(supabase, data)
+        return {
+            'status': 'success',
+            'message': 'Announcement broadcast and queued successfully!',
+            'users_notified': users_notified
+        }
+
+
+_publisher: Optional[AnnouncementPublisher] = None
+
+
+def get_announcement_publisher() -> AnnouncementPublisher:
+    """Get the process-wide publisher (disabled unless SOCKETIO_MESSAGE_QUEUE is set)"""
+    global _publisher
+    if _publisher is None:
+        _publisher = AnnouncementPublisher()
+    return _publisher
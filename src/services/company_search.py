@@ -0,0 +1,217 @@
+"""
+In-process company search index for /api/company/search.
+
+The whole ``stocklistdata`` table (~15k rows) is held in memory together with
+a trigram index over the searchable columns (new/old name, new/old NSE code,
+new/old BSE code, ISIN). A query matches exactly the rows the previous
+``ilike '%q%'`` OR filter matched, and results are ordered with the same
+``calculate_rank`` rules, so typeahead requests never reach the database.
+
+Freshness: the index is rebuilt in the background when the ``stocklistdata``
+dataset generation changes in Redis (bumped when verified company changes are
+applied, see ``src.core.cache.invalidate_datasets``) or after
+``COMPANY_INDEX_MAX_AGE`` seconds.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from src.core.cache import TTLCache, GENERATION_KEY_PREFIX, get_cache_redis
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+COMPANY_INDEX_DATASET = "stocklistdata"
+COMPANY_INDEX_MAX_AGE = int(os.getenv('COMPANY_INDEX_MAX_AGE', 6 * 3600))
+COMPANY_INDEX_CHECK_INTERVAL = int(os.getenv('COMPANY_INDEX_CHECK_INTERVAL', 30))
+# Largest page /api/company/search serves; memoized results keep only this many row ids
+SEARCH_MAX_LIMIT = 100
+
+SEARCH_FIELDS = ('newname', 'oldname', 'newnsecode', 'oldnsecode', 'newbsecode', 'oldbsecode', 'isin')
+NGRAM = 3
+
+
+def calculate_rank(company: Dict[str, Any], query: str) -> int:
+    """
+    Calculate ranking score for a company based on search query
+    Lower score = higher priority
+    """
+    query_upper = query.upper()
+    name = (company.get('newname') or company.get('oldname') or '').strip()
+    nse_code = (company.get('newnsecode') or company.get('oldnsecode') or '').strip()
+    bse_code = (company.get('newbsecode') or company.get('oldbsecode') or '').strip()
+
+    name_upper = name.upper()
+
+    # Priority 1: Company name starts with query (case-insensitive) - Score 10-19
+    if name_upper.startswith(query_upper):
+        # Exact length match gets best score
+        if len(name) == len(query):
+            return 10
+        return 11
+
+    # Priority 2: Symbol (NSE/BSE code) exact match - Score 20-29
+    if nse_code.upper() == query_upper or bse_code.upper() == query_upper:
+        return 20
+
+    # Priority 2.5: Symbol starts with query - Score 30-39
+    if nse_code.upper().startswith(query_upper) or bse_code.upper().startswith(query_upper):
+        return 30
+
+    # Priority 3: Any word in company name starts with query - Score 40-49
+    for word in name_upper.split():
+        if word.startswith(query_upper):
+            return 40
+
+    # Priority 4: Company name contains query - Score 50-59
+    if query_upper in name_upper:
+        # Earlier position gets better score
+        position = name_upper.find(query_upper)
+        return 50 + min(position, 9)
+
+    # Priority 5: Symbol contains query - Score 60-69
+    if query_upper in nse_code.upper() or query_upper in bse_code.upper():
+        return 60
+
+    # Fallback - matched on old name / ISIN only
+    return 100
+
+
+class _IndexSnapshot:
+    """Immutable rows + trigram postings; swapped atomically on rebuild"""
+
+    def __init__(self, rows: List[Dict[str, Any]], version: int):
+        self.rows = rows
+        self.version = version
+        # Fields joined with a separator that cannot occur in a query, so a
+        # substring test never matches across two columns
+        self.haystacks = [
+            "\x00".join(str(row.get(field) or '').lower() for field in SEARCH_FIELDS)
+            for row in rows
+        ]
+        self.sort_names = [(row.get('newname') or '').upper() for row in rows]
+        postings: Dict[str, List[int]] = {}
+        for row_id, haystack in enumerate(self.haystacks):
+            grams = {haystack[i:i + NGRAM] for i in range(len(haystack) - NGRAM + 1)}
+            for gram in grams:
+                if "\x00" not in gram:
+                    postings.setdefault(gram, []).append(row_id)
+        self.postings = postings
+
+    def candidates(self, query_lower: str):
+        """Row ids that may contain ``query_lower`` (all rows for short queries)"""
+        if len(query_lower) < NGRAM:
+            return range(len(self.rows))
+        grams = {query_lower[i:i + NGRAM] for i in range(len(query_lower) - NGRAM + 1)}
+        lists = sorted((self.postings.get(gram, []) for gram in grams), key=len)
+        if not lists[0]:
+            return []
+        result = set(lists[0])
+        for posting in lists[1:]:
+            result.intersection_update(posting)
+            if not result:
+                break
+        return result
+
+    def match(self, query: str) -> List[int]:
+        """Row ids matching ``query`` (case-insensitive substring), best rank first"""
+        query_lower = query.lower()
+        matched = [
+            row_id for row_id in self.candidates(query_lower)
+            if query_lower in self.haystacks[row_id]
+        ]
+        ranked = [(calculate_rank(self.rows[row_id], query), self.sort_names[row_id], row_id) for row_id in matched]
+        ranked.sort()
+        return [row_id for _, _, row_id in ranked]
+
+
+class CompanySearchIndex:
+    """
+    Thread-safe search index over ``stocklistdata``.
+
+    ``loader`` returns all stocklistdata rows; it is called on ``build()`` and on
+    background refreshes. Until the first build finishes ``ready`` is False and
+    callers should fall back to querying the database.
+    """
+
+    def __init__(self, loader: Callable[[], List[Dict[str, Any]]], result_cache_size: int = 4096):
+        self.loader = loader
+        self._snapshot: Optional[_IndexSnapshot] = None
+        self._results = TTLCache(max_size=result_cache_size, ttl_seconds=COMPANY_INDEX_MAX_AGE)
+        self._build_lock = threading.Lock()
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        self._generation: Optional[bytes] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    def __len__(self) -> int:
+        return len(self._snapshot.rows) if self._snapshot else 0
+
+    def _read_generation(self) -> Optional[bytes]:
+        client = get_cache_redis()
+        if client is None:
+            return self._generation
+        try:
+            return client.get(f"{GENERATION_KEY_PREFIX}{COMPANY_INDEX_DATASET}")
+        except Exception as e:
+            logger.debug(f"Company index generation check failed: {e}")
+            return self._generation
+
+    def build(self) -> bool:
+        """Load stocklistdata and swap in a fresh index; returns False if a build is already running"""
+        if not self._build_lock.acquire(blocking=False):
+            return False
+        try:
+            started = time.monotonic()
+            generation = self._read_generation()
+            rows = self.loader()
+            snapshot = _IndexSnapshot(rows, version=(self._snapshot.version + 1) if self._snapshot else 1)
+            self._snapshot = snapshot
+            self._results.clear()
+            self._generation = generation
+            self._built_at = self._checked_at = time.monotonic()
+            logger.info(
+                f"Company search index built: {len(rows)} companies, {len(snapshot.postings)} trigrams "
+                f"in {time.monotonic() - started:.2f}s"
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Company search index build failed: {e}")
+            return False
+        finally:
+            self._build_lock.release()
+
+    def build_in_background(self) -> None:
+        threading.Thread(target=self.build, name="company-search-index", daemon=True).start()
+
+    def maybe_refresh(self) -> None:
+        """Rebuild in the background if company data changed or the index is too old"""
+        now = time.monotonic()
+        if now - self._checked_at < COMPANY_INDEX_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        if now - self._built_at >= COMPANY_INDEX_MAX_AGE or self._read_generation() != self._generation:
+            self.build_in_background()
+
+    def search(self, query: str, limit: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+        """Return (top ``limit`` companies, total number of matches)"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise RuntimeError("Company search index is not built yet")
+        if limit > SEARCH_MAX_LIMIT:
+            row_ids = snapshot.match(query)
+            return [snapshot.rows[row_id] for row_id in row_ids[:limit]], len(row_ids)
+        matched = self._results.get(query)
+        if matched is None or matched[0] != snapshot.version:
+            row_ids = snapshot.match(query)
+            # A short query can match most of the table; keep the memo entry bounded
+            matched = (snapshot.version, row_ids[:SEARCH_MAX_LIMIT], len(row_ids))
+            self._results.set(query, matched)
+        _, top_ids, total = matched
+        return [snapshot.rows[row_id] for row_id in top_ids[:limit]], total
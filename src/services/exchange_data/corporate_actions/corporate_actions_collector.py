@@ -18,6 +18,20 @@ load_dotenv()
 from corpactbse import fetch_bse
 from corpactnse import fetch_nse_corporate_actions
 
+# Optional HTTP record/replay of exchange responses (HTTP_REPLAY_MODE)
+try:
+    from src.utils.http_replay import install_http_replay
+    HTTP_REPLAY_AVAILABLE = True
+except ImportError:
+    HTTP_REPLAY_AVAILABLE = False
+
+# Optional API response cache invalidation after uploads
+try:
+    from src.core.cache import invalidate_datasets
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -52,6 +66,8 @@ class CorporateActionsCollector:
     
     def __init__(self):
         """Initialize the collector with Supabase client"""
+        if HTTP_REPLAY_AVAILABLE:
+            install_http_replay()
         if not SUPABASE_URL or not SUPABASE_KEY:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
         
@@ -427,6 +443,10 @@ class CorporateActionsCollector:
                 logger.error(f"Sample record: {batch[0]}")
                 success = False
         
+        # Even a partial upload changes what /api/corporate_actions returns
+        if CACHE_AVAILABLE:
+            invalidate_datasets("corporate_actions")
+        
         if success:
             logger.info(f"Successfully uploaded {len(records)} records")
             logger.info("✅ Upload completed successfully!")
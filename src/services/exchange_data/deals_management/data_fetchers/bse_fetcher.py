@@ -11,6 +11,13 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+# Optional HTTP record/replay of exchange responses (HTTP_REPLAY_MODE)
+try:
+    from src.utils.http_replay import get_http_replay
+    HTTP_REPLAY_AVAILABLE = True
+except ImportError:
+    HTTP_REPLAY_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -59,34 +66,57 @@ class BSEDataFetcher:
         rows = data[1:]
         return [dict(zip(headers, row)) for row in rows]
     
-    def fetch_bulk_deals(self) -> Optional[List[Dict]]:
+    def scrape_table(self, url: str, table_id: str) -> List[List[str]]:
         """
-        Fetch bulk deals from BSE.
+        Load a BSE report page and extract the text of every table cell.
+
+        In HTTP replay mode the rows recorded for ``table_id`` are returned
+        without starting a browser; in record mode they are saved as an artifact.
         
+        Args:
+            url: Report page URL
+            table_id: DOM id of the deals table
+            
         Returns:
-            List of bulk deal records or None if fetch failed
+            List of rows where first row is headers
         """
+        replay = get_http_replay() if HTTP_REPLAY_AVAILABLE else None
+        if replay and replay.is_replaying:
+            return replay.load_artifact("bse_deals", f"{table_id}.json", as_json=True)
+        
         if not self.driver:
             self.setup_driver()
         
+        self.driver.get(url)
+        
+        # Wait for table to load
+        WebDriverWait(self.driver, 15).until(
+            EC.presence_of_element_located((By.ID, table_id))
+        )
+        
+        table = self.driver.find_element(By.ID, table_id)
+        rows = table.find_elements(By.TAG_NAME, "tr")
+        
+        # Extract text from all cells
+        data = []
+        for row in rows:
+            cells = row.find_elements(By.TAG_NAME, "th") + row.find_elements(By.TAG_NAME, "td")
+            data.append([cell.text.strip() for cell in cells])
+        
+        if replay:
+            replay.save_artifact("bse_deals", f"{table_id}.json", data)
+        return data
+    
+    def fetch_bulk_deals(self) -> Optional[List[Dict]]:
+        """
+        Fetch bulk deals from BSE.
+        
+        Returns:
+            List of bulk deal records or None if fetch failed
+        """
         try:
             logger.info("Fetching BSE bulk deals...")
-            self.driver.get(self.BULK_URL)
-            
-            # Wait for table to load
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_gvbulk_deals"))
-            )
-            
-            table = self.driver.find_element(By.ID, "ContentPlaceHolder1_gvbulk_deals")
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            
-            # Extract text from all cells
-            data = []
-            for row in rows:
-                cells = row.find_elements(By.TAG_NAME, "th") + row.find_elements(By.TAG_NAME, "td")
-                data.append([cell.text.strip() for cell in cells])
-            
+            data = self.scrape_table(self.BULK_URL, "ContentPlaceHolder1_gvbulk_deals")
             records = self.convert_to_json(data)
             logger.info(f"Retrieved {len(records)} BSE bulk deal records.")
             return records
@@ -102,27 +132,9 @@ class BSEDataFetcher:
         Returns:
             List of block deal records or None if fetch failed
         """
-        if not self.driver:
-            self.setup_driver()
-        
         try:
             logger.info("Fetching BSE block deals...")
-            self.driver.get(self.BLOCK_URL)
-            
-            # Wait for table to load
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.ID, "ContentPlaceHolder1_gvblock_deals"))
-            )
-            
-            table = self.driver.find_element(By.ID, "ContentPlaceHolder1_gvblock_deals")
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            
-            # Extract text from all cells
-            data = []
-            for row in rows:
-                cells = row.find_elements(By.TAG_NAME, "th") + row.find_elements(By.TAG_NAME, "td")
-                data.append([cell.text.strip() for cell in cells])
-            
+            data = self.scrape_table(self.BLOCK_URL, "ContentPlaceHolder1_gvblock_deals")
             records = self.convert_to_json(data)
             logger.info(f"Retrieved {len(records)} BSE block deal records.")
             return records
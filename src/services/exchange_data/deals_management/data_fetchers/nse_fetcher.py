@@ -11,6 +11,13 @@ import requests
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
 
+# Optional HTTP record/replay of exchange responses (HTTP_REPLAY_MODE)
+try:
+    from src.utils.http_replay import install_http_replay
+    HTTP_REPLAY_AVAILABLE = True
+except ImportError:
+    HTTP_REPLAY_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,6 +28,8 @@ class NSEDataFetcher:
     
     def __init__(self):
         """Initialize NSE session with proper headers."""
+        if HTTP_REPLAY_AVAILABLE:
+            install_http_replay()
         self.session = requests.Session()
         self.setup_session()
     
@@ -31,6 +31,13 @@ from data_fetchers.bse_fetcher import BSEDataFetcher
 from processors.normalizer import DataNormalizer
 from processors.deduplicator import DealsDeduplicator
 
+# Optional API response cache invalidation after uploads
+try:
+    from src.core.cache import invalidate_datasets
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
+
 # Load environment
 load_dotenv()
 
@@ -221,6 +228,8 @@ def insert_deals_to_table(df: pd.DataFrame, supabase, keep_source_data: bool = F
             logger.error(f"Error inserting batch {i // batch_size + 1}: {e}")
     
     logger.info(f"✅ Successfully inserted {total_inserted} deals into deals table")
+    if total_inserted and CACHE_AVAILABLE:
+        invalidate_datasets("deals")
     
     # Show breakdown
     df_inserted = df.iloc[[i for i, r in enumerate(df.to_dict('records')) if r in records]]
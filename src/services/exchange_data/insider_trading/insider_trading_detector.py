@@ -45,6 +45,13 @@ try:
 except:
     pass
 
+# Optional HTTP record/replay of exchange responses (HTTP_REPLAY_MODE)
+try:
+    from src.utils.http_replay import get_http_replay, install_http_replay
+    HTTP_REPLAY_AVAILABLE = True
+except ImportError:
+    HTTP_REPLAY_AVAILABLE = False
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -85,6 +92,8 @@ class NSEInsiderScraper:
     
     def __init__(self):
         self.base_url = "https://www.nseindia.com"
+        if HTTP_REPLAY_AVAILABLE:
+            install_http_replay()
         self.session = requests.Session()
         self.setup_session()
     
@@ -405,6 +414,17 @@ class BSEInsiderScraper:
     
     def scrape_data(self) -> Optional[str]:
         """Download BSE insider trading CSV"""
+        replay = get_http_replay() if HTTP_REPLAY_AVAILABLE else None
+        if replay and replay.is_replaying:
+            try:
+                with open(BSE_CSV, "wb") as f:
+                    f.write(replay.load_artifact("bse_insider", "bse_insider_trading.csv"))
+                logger.info(f"BSE: Replayed recorded CSV to {BSE_CSV}")
+                return BSE_CSV
+            except Exception as e:
+                logger.error(f"BSE: Replay failed: {str(e)}")
+                return None
+        
         try:
             logger.info("BSE: Starting download...")
             self.setup_driver()
@@ -467,6 +487,10 @@ class BSEInsiderScraper:
                 os.remove(final_path)
             shutil.move(downloaded_path, final_path)
             
+            if replay:
+                with open(final_path, "rb") as f:
+                    replay.save_artifact("bse_insider", "bse_insider_trading.csv", f.read())
+            
             logger.info(f"BSE: Saved to {final_path}")
             return final_path
             
@@ -6,6 +6,13 @@ from datetime import datetime, date, timedelta
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+# Optional latest-close snapshot used by the API's price-diff endpoints
+try:
+    from src.services.price_snapshot import update_price_snapshot
+    PRICE_SNAPSHOT_AVAILABLE = True
+except ImportError:
+    PRICE_SNAPSHOT_AVAILABLE = False
+
 # Load environment variables
 load_dotenv()
 
@@ -176,6 +183,8 @@ def upload_historical_data_to_supabase(symbol, security_id, isin, from_date, to_
                     
                     if not (hasattr(response, 'error') and response.error):
                         print(f"Successfully uploaded all {total_records} records for {symbol} on {exchange_segment}!")
+                        if PRICE_SNAPSHOT_AVAILABLE:
+                            update_price_snapshot(parsed_records)
                         return True
                     
                     print(f"Error uploading to Supabase: {response.error}")
@@ -217,6 +226,8 @@ def upload_historical_data_to_supabase(symbol, security_id, isin, from_date, to_
                         # If we got a response with no error, break out of retry loop
                         if not (hasattr(response, 'error') and response.error):
                             successful_uploads += chunk_size
+                            if PRICE_SNAPSHOT_AVAILABLE:
+                                update_price_snapshot(parsed_records)
                             break
                             
                         # Handle rate limit or other errors
@@ -0,0 +1,143 @@
+"""
+Per-ISIN daily close series and chart downsampling for /api/stock_price.
+
+The full ``stockpricedata`` history of an ISIN is loaded once (paged past the
+PostgREST row limit) and kept in Redis as compact ``[[date, close], ...]``
+pairs in ascending date order under ``backfin:cache:price_series:<ISIN>``.
+Ingestion drops the entry for every ISIN it uploads (see
+``src.services.price_snapshot.update_price_snapshot``).
+
+Long ranges are reduced before they are serialized:
+
+- ``aggregate_ohlc`` - weekly / monthly buckets. ``stockpricedata`` only has
+  daily closes, so open/high/low/close are the first/max/min/last close of
+  the bucket
+- ``lttb`` - Largest-Triangle-Three-Buckets, keeps the visual shape of the
+  daily series in a target number of points
+"""
+
+import os
+import logging
+import datetime as dt
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.core.cache import RedisCache
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+PRICE_SERIES_TTL = int(os.getenv('PRICE_SERIES_TTL', 6 * 3600))
+PRICE_SERIES_PAGE_SIZE = 1000
+
+INTERVALS = ('daily', 'weekly', 'monthly')
+
+series_cache = RedisCache('price_series', ttl_seconds=PRICE_SERIES_TTL)
+
+Point = Tuple[str, float]
+
+
+def load_price_series(supabase, isin: str) -> List[Point]:
+    """All (date, close) rows of ``isin`` in ascending date order, straight from the database"""
+    points: List[Point] = []
+    offset = 0
+    while True:
+        response = (
+            supabase.table('stockpricedata')
+            .select('date, close')
+            .eq('isin', isin)
+            .order('date')
+            .range(offset, offset + PRICE_SERIES_PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = response.data or []
+        points.extend((str(row['date'])[:10], float(row['close'])) for row in rows if row.get('close') is not None)
+        if len(rows) < PRICE_SERIES_PAGE_SIZE:
+            return points
+        offset += PRICE_SERIES_PAGE_SIZE
+
+
+def get_price_series(supabase, isin: str) -> List[Point]:
+    """Cached ``load_price_series``"""
+    cached = series_cache.get(isin)
+    if cached is not None:
+        return [(date, close) for date, close in cached]
+    points = load_price_series(supabase, isin)
+    if points:
+        series_cache.set(isin, points)
+    return points
+
+
+def invalidate_price_series(isins: Iterable[str]) -> None:
+    """Drop cached series after new prices for ``isins`` were uploaded"""
+    series_cache.delete(*{isin for isin in isins if isin})
+
+
+def _bucket_key(date: str, interval: str) -> Tuple[int, ...]:
+    if interval == 'monthly':
+        return int(date[:4]), int(date[5:7])
+    year, week, _ = dt.date.fromisoformat(date).isocalendar()
+    return year, week
+
+
+def aggregate_ohlc(points: List[Point], interval: str) -> List[Dict[str, Any]]:
+    """
+    Weekly (ISO week) or monthly OHLC bars from ascending daily closes.
+
+    Each bar is dated with its last trading day, so the latest bar ends on the
+    latest close.
+    """
+    bars: List[Dict[str, Any]] = []
+    current_key = None
+    for date, close in points:
+        key = _bucket_key(date, interval)
+        if key != current_key:
+            current_key = key
+            bars.append({'date': date, 'open': close, 'high': close, 'low': close, 'close': close})
+            continue
+        bar = bars[-1]
+        bar['date'] = date
+        bar['high'] = max(bar['high'], close)
+        bar['low'] = min(bar['low'], close)
+        bar['close'] = close
+    return bars
+
+
+def lttb(points: List[Point], threshold: int) -> List[Point]:
+    """Largest-Triangle-Three-Buckets downsampling to ``threshold`` points (first and last kept)"""
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    xs = [dt.date.fromisoformat(date).toordinal() for date, _ in points]
+    ys = [close for _, close in points]
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        # Average of the next bucket is the third triangle vertex
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, len(points))
+        if next_start >= next_end:
+            next_start, next_end = len(points) - 1, len(points)
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def downsample(points: List[Point], interval: str = 'daily', max_points: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Chart rows in ascending date order: daily closes (LTTB-reduced to ``max_points``) or OHLC bars"""
+    if interval != 'daily':
+        return aggregate_ohlc(points, interval)
+    if max_points:
+        points = lttb(points, max_points)
+    return [{'date': date, 'close': close} for date, close in points]
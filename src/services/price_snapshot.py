@@ -0,0 +1,186 @@
+"""
+Latest-close snapshot for price-diff calculations.
+
+``stockpricedata`` holds the full daily history, so "current price" used to
+be an ``order by date desc limit 1`` query per ISIN per request. The snapshot
+keeps only the latest close of every ISIN in one Redis hash:
+
+- ``backfin:prices:latest`` - field ``<ISIN>``, value JSON
+  ``{"close": ..., "date": "YYYY-MM-DD", "cached_at": <unix ts>}``
+
+The stock-price ingestion jobs call ``update_price_snapshot()`` after each
+upload; it also drops the uploaded ISINs' cached chart series and cached
+``/api/stock_price`` responses. Readers use ``get_latest_prices()``, which resolves any number of ISINs
+with one HMGET; ISINs that are missing (or whose entry is older than
+``PRICE_SNAPSHOT_MAX_AGE``, in case an ingestion path did not update the
+snapshot) are read from ``stockpricedata`` and written back.
+
+Like the other caches, Redis is best-effort: without it every lookup goes to
+the database.
+"""
+
+import os
+import json
+import time
+import logging
+import datetime as dt
+from typing import Any, Dict, Iterable, List, Optional
+
+import redis
+
+from src.core.cache import get_cache_redis, mark_cache_redis_down, invalidate_datasets
+from src.services.price_series import invalidate_price_series
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+PRICE_SNAPSHOT_KEY = "backfin:prices:latest"
+PRICE_SNAPSHOT_MAX_AGE = int(os.getenv('PRICE_SNAPSHOT_MAX_AGE', 24 * 3600))
+# Misses are first looked up in a recent window with one IN query; only ISINs
+# without a close in the window cost a query each
+PRICE_LOOKBACK_DAYS = int(os.getenv('PRICE_LOOKBACK_DAYS', 14))
+PRICE_QUERY_CHUNK = 50
+
+
+def _entry(close: Any, date: Any) -> Dict[str, Any]:
+    return {"close": close, "date": str(date)[:10] if date else None, "cached_at": int(time.time())}
+
+
+def _read_snapshot(client: redis.Redis, isins: List[str]) -> Dict[str, Dict[str, Any]]:
+    try:
+        values = client.hmget(PRICE_SNAPSHOT_KEY, isins)
+    except redis.RedisError as e:
+        logger.debug(f"Price snapshot read failed: {e}")
+        mark_cache_redis_down()
+        return {}
+
+    now = time.time()
+    found = {}
+    for isin, raw in zip(isins, values):
+        if raw is None:
+            continue
+        try:
+            entry = json.loads(raw)
+        except (TypeError, ValueError):
+            continue
+        if now - entry.get("cached_at", 0) <= PRICE_SNAPSHOT_MAX_AGE:
+            found[isin] = entry
+    return found
+
+
+def _write_snapshot(client: Optional[redis.Redis], entries: Dict[str, Dict[str, Any]]) -> None:
+    if client is None or not entries:
+        return
+    try:
+        client.hset(PRICE_SNAPSHOT_KEY, mapping={isin: json.dumps(entry) for isin, entry in entries.items()})
+    except redis.RedisError as e:
+        logger.debug(f"Price snapshot write failed: {e}")
+        mark_cache_redis_down()
+
+
+def _query_latest_prices(supabase, isins: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Latest close per ISIN from stockpricedata (one IN query for the recent window, then per ISIN)"""
+    found: Dict[str, Dict[str, Any]] = {}
+    since = (dt.date.today() - dt.timedelta(days=PRICE_LOOKBACK_DAYS)).isoformat()
+    # Chunked so a window of daily rows stays under the PostgREST row limit
+    for start in range(0, len(isins), PRICE_QUERY_CHUNK):
+        try:
+            response = (
+                supabase.table("stockpricedata")
+                .select("isin, close, date")
+                .in_("isin", isins[start:start + PRICE_QUERY_CHUNK])
+                .gte("date", since)
+                .order("date", desc=True)
+                .execute()
+            )
+            # Rows are newest first, so the first row seen per ISIN is its latest close
+            for row in response.data or []:
+                if row.get("isin") not in found and row.get("close") is not None:
+                    found[row["isin"]] = _entry(row["close"], row.get("date"))
+        except Exception as e:
+            logger.error(f"Error fetching recent stock prices: {e}")
+
+    for isin in isins:
+        if isin in found:
+            continue
+        try:
+            response = (
+                supabase.table("stockpricedata")
+                .select("close, date")
+                .eq("isin", isin)
+                .order("date", desc=True)
+                .limit(1)
+                .execute()
+            )
+            if response.data and response.data[0].get("close") is not None:
+                found[isin] = _entry(response.data[0]["close"], response.data[0].get("date"))
+        except Exception as e:
+            logger.error(f"Error fetching stock price for ISIN {isin}: {e}")
+    return found
+
+
+def get_latest_prices(supabase, isins: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Latest close for each ISIN: ``{isin: {"close": ..., "date": ...}}``.
+
+    ISINs without any price data are left out of the result.
+    """
+    wanted = sorted({isin for isin in isins if isin})
+    if not wanted:
+        return {}
+
+    client = get_cache_redis()
+    found = _read_snapshot(client, wanted) if client is not None else {}
+    missing = [isin for isin in wanted if isin not in found]
+    if missing and supabase is not None:
+        fetched = _query_latest_prices(supabase, missing)
+        _write_snapshot(client, fetched)
+        found.update(fetched)
+    return found
+
+
+def update_price_snapshot(records: Iterable[Dict[str, Any]]) -> int:
+    """
+    Record freshly ingested ``stockpricedata`` rows (``isin``, ``close``, ``date``).
+
+    Only the newest row per ISIN is kept, and an entry is never replaced by an
+    older date (e.g. when a historical range is re-uploaded). Returns the
+    number of ISINs whose latest close was updated.
+    """
+    newest: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        isin = record.get("isin")
+        if not isin or record.get("close") is None or not record.get("date"):
+            continue
+        date = str(record["date"])[:10]
+        if isin not in newest or date > newest[isin]["date"]:
+            newest[isin] = _entry(record["close"], date)
+    if not newest:
+        return 0
+
+    # Any upload (including a re-uploaded historical range) changes the chart series
+    invalidate_price_series(newest)
+    invalidate_datasets('stock_price')
+
+    client = get_cache_redis()
+    if client is None:
+        return 0
+    isins = list(newest)
+    try:
+        current = client.hmget(PRICE_SNAPSHOT_KEY, isins)
+    except redis.RedisError as e:
+        logger.debug(f"Price snapshot read failed: {e}")
+        mark_cache_redis_down()
+        return 0
+
+    updates = {}
+    for isin, raw in zip(isins, current):
+        if raw is not None:
+            try:
+                if (json.loads(raw).get("date") or "") > newest[isin]["date"]:
+                    continue
+            except (TypeError, ValueError):
+                pass
+        updates[isin] = newest[isin]
+    _write_snapshot(client, updates)
+    return len(updates)
@@ -0,0 +1,193 @@
+"""
+Telegram send rate limiting shared by all notification workers
+
+Telegram allows about 30 messages per second per bot and about one message per
+second per chat. ``TelegramRateLimiter`` enforces both limits with a generic
+cell rate algorithm (a token bucket stored as one timestamp per key) in Redis:
+
+- ``backfin:telegram:rl:global``      - next free send time for the bot
+- ``backfin:telegram:rl:chat:<id>``   - next free send time for one chat
+
+``acquire(chat_id)`` reserves a send slot in a single Lua call, then sleeps
+until that time. Concurrent senders, even in different worker replicas, each
+get their own slot. They wait in parallel instead of queueing on a lock.
+Reservations use the Redis server clock, so replicas agree on time.
+
+Global capacity is only reserved when the global bucket decides the send
+time. If the chat's own bucket is further out (a repeat send to the same
+chat), nothing is reserved: the caller sleeps until the chat is free and
+reserves again, so one busy chat does not hold back every other chat.
+
+If Redis is unavailable, the same algorithm runs in process. In that case
+each worker only counts its own sends.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+KEY_PREFIX = "backfin:telegram:rl:"
+GLOBAL_KEY = f"{KEY_PREFIX}global"
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '28'))  # messages/second for the bot (limit ~30)
+GLOBAL_BURST = int(os.getenv('TELEGRAM_GLOBAL_BURST', '1'))
+CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', '1'))  # messages/second per chat
+CHAT_BURST = int(os.getenv('TELEGRAM_CHAT_BURST', '1'))
+REDIS_RETRY_SECONDS = 30  # How long to limit in process after a Redis error
+
+# KEYS: global, chat. ARGV: global interval/tolerance, chat interval/tolerance (ms).
+# Returns {reserved, wait_ms}. When the chat bucket is the later one nothing is
+# reserved and wait_ms is how long until the chat is free to try again.
+_RESERVE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local g_interval, g_tolerance = tonumber(ARGV[1]), tonumber(ARGV[2])
+local c_interval, c_tolerance = tonumber(ARGV[3]), tonumber(ARGV[4])
+local g_tat = tonumber(redis.call('GET', KEYS[1]) or now)
+local c_tat = tonumber(redis.call('GET', KEYS[2]) or now)
+local at = math.max(now, g_tat - g_tolerance)
+local chat_at = math.max(now, c_tat - c_tolerance)
+if chat_at > at then
+    return {0, math.ceil(chat_at - now)}
+end
+g_tat = math.max(g_tat, at) + g_interval
+c_tat = math.max(c_tat, at) + c_interval
+redis.call('SET', KEYS[1], tostring(g_tat), 'PX', math.ceil(g_tat - now) + 1000)
+redis.call('SET', KEYS[2], tostring(c_tat), 'PX', math.ceil(c_tat - now) + 1000)
+return {1, math.ceil(at - now)}
+"""
+
+# KEYS: global. ARGV: pause (ms). Pushes the bot's next free send time out.
+_BACKOFF_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local resume = now + tonumber(ARGV[1])
+local tat = tonumber(redis.call('GET', KEYS[1]) or 0)
+if resume > tat then
+    redis.call('SET', KEYS[1], tostring(resume), 'PX', math.ceil(resume - now) + 1000)
+end
+return 0
+"""
+
+
+def _chat_key(chat_id: int) -> str:
+    return f"{KEY_PREFIX}chat:{chat_id}"
+
+
+class TelegramRateLimiter:
+    """Global plus per-chat send limiter, shared through Redis"""
+
+    def __init__(
+        self,
+        global_rate: float = GLOBAL_RATE,
+        global_burst: int = GLOBAL_BURST,
+        chat_rate: float = CHAT_RATE,
+        chat_burst: int = CHAT_BURST,
+        redis_client: Optional[redis.Redis] = None
+    ):
+        self.global_interval_ms = 1000.0 / global_rate
+        self.global_tolerance_ms = max(global_burst - 1, 0) * self.global_interval_ms
+        self.chat_interval_ms = 1000.0 / chat_rate
+        self.chat_tolerance_ms = max(chat_burst - 1, 0) * self.chat_interval_ms
+        self.redis_client = redis_client
+        self._reserve_script = None
+        self._backoff_script = None
+        self._redis_retry_at = 0.0
+        # In-process fallback: key -> next free send time (monotonic ms)
+        self._local_tats: Dict[str, float] = {}
+        self._local_lock = threading.Lock()
+
+    def _get_client(self) -> Optional[redis.Redis]:
+        """Lazily create a Redis client with short timeouts"""
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        if self.redis_client is None:
+            try:
+                self.redis_client = redis.Redis(
+                    host=os.getenv('REDIS_HOST', 'localhost'),
+                    port=int(os.getenv('REDIS_PORT', 6379)),
+                    db=int(os.getenv('REDIS_DB', 0)),
+                    password=os.getenv('REDIS_PASSWORD'),
+                    socket_connect_timeout=2,
+                    socket_timeout=2,
+                    decode_responses=True
+                )
+            except Exception as e:
+                logger.debug(f"Rate limiter Redis client unavailable: {e}")
+                return None
+        if self._reserve_script is None:
+            self._reserve_script = self.redis_client.register_script(_RESERVE_SCRIPT)
+            self._backoff_script = self.redis_client.register_script(_BACKOFF_SCRIPT)
+        return self.redis_client
+
+    def _redis_failed(self, e: Exception) -> None:
+        logger.warning(f"Telegram rate limiter Redis error, limiting in process for {REDIS_RETRY_SECONDS}s: {e}")
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def reserve(self, chat_id: int) -> Tuple[bool, float]:
+        """
+        Try to reserve a send slot for the chat.
+
+        Returns ``(reserved, wait_seconds)``. If reserved, send after waiting;
+        otherwise the chat is busy and the caller should wait and try again.
+        """
+        client = self._get_client()
+        if client is not None:
+            try:
+                reserved, wait_ms = self._reserve_script(
+                    keys=[GLOBAL_KEY, _chat_key(chat_id)],
+                    args=[self.global_interval_ms, self.global_tolerance_ms,
+                          self.chat_interval_ms, self.chat_tolerance_ms],
+                    client=client
+                )
+                return bool(int(reserved)), max(float(wait_ms), 0.0) / 1000
+            except redis.RedisError as e:
+                self._redis_failed(e)
+        return self._reserve_local(chat_id)
+
+    def _reserve_local(self, chat_id: int) -> Tuple[bool, float]:
+        chat_key = _chat_key(chat_id)
+        with self._local_lock:
+            now = time.monotonic() * 1000
+            g_tat = self._local_tats.get(GLOBAL_KEY, now)
+            c_tat = self._local_tats.get(chat_key, now)
+            at = max(now, g_tat - self.global_tolerance_ms)
+            chat_at = max(now, c_tat - self.chat_tolerance_ms)
+            if chat_at > at:
+                return False, (chat_at - now) / 1000
+            self._local_tats[GLOBAL_KEY] = max(g_tat, at) + self.global_interval_ms
+            self._local_tats[chat_key] = max(c_tat, at) + self.chat_interval_ms
+            if len(self._local_tats) > 10000:
+                self._local_tats = {key: tat for key, tat in self._local_tats.items() if tat > now}
+            return True, (at - now) / 1000
+
+    async def acquire(self, chat_id: int) -> None:
+        """Wait for this chat's send slot"""
+        while True:
+            reserved, wait = await asyncio.to_thread(self.reserve, chat_id)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if reserved:
+                return
+
+    def backoff(self, seconds: float) -> None:
+        """Pause every sender (e.g. after Telegram's RetryAfter)"""
+        # The burst tolerance would otherwise let a few sends through early
+        pause_ms = seconds * 1000 + self.global_tolerance_ms
+        client = self._get_client()
+        if client is not None:
+            try:
+                self._backoff_script(keys=[GLOBAL_KEY], args=[pause_ms], client=client)
+                return
+            except redis.RedisError as e:
+                self._redis_failed(e)
+        with self._local_lock:
+            resume = time.monotonic() * 1000 + pause_ms
+            self._local_tats[GLOBAL_KEY] = max(self._local_tats.get(GLOBAL_KEY, 0.0), resume)
@@ -22,6 +22,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 from dotenv import load_dotenv
 load_dotenv()
 
+from src.services.watchlist_index import get_watchlist_index
+
 # Telegram imports
 try:
     from telegram import Update, Bot, InlineKeyboardButton, InlineKeyboardMarkup
@@ -154,6 +156,7 @@ class TelegramBotService:
                     'subscribed_at': datetime.utcnow().isoformat()
                 }).execute()
             
+            get_watchlist_index().set_telegram_chat(chat_id, user_id, username)
             logger.info(f"Created/updated subscription for user {user_id}, chat {chat_id}")
             return True
         except Exception as e:
@@ -169,6 +172,7 @@ class TelegramBotService:
                 'updated_at': datetime.utcnow().isoformat()
             }).eq('telegram_chat_id', chat_id).execute()
             
+            get_watchlist_index().remove_telegram_chat(chat_id)
             logger.info(f"Deactivated subscription for chat {chat_id}")
             return True
         except Exception as e:
@@ -185,6 +189,7 @@ class TelegramBotService:
                 'updated_at': datetime.utcnow().isoformat()
             }).eq('telegram_chat_id', chat_id).execute()
             
+            get_watchlist_index().refresh_telegram_chat(self.supabase, chat_id)
             logger.info(f"Reactivated subscription for chat {chat_id}")
             return True
         except Exception as e:
@@ -4,6 +4,18 @@ Telegram Notifier Service
 
 Handles formatting and sending notifications to Telegram users.
 Includes rate limiting, retry logic, and error handling.
+
+Subscribers of an announcement are messaged concurrently (bounded by
+TELEGRAM_SEND_CONCURRENCY and scheduled by the Redis-shared
+TelegramRateLimiter), and the
+per-message bookkeeping - notification log rows, subscription counters and
+blocked chats - is buffered in a NotificationRecorder and written in bulk, so
+delivery runs at Telegram's rate limit rather than at database round-trip speed.
+
+When a company files several announcements in quick succession, the
+AnnouncementCoalescer merges those still waiting for a chat into one message
+per (chat, ISIN), so bursts cost one send per subscriber instead of one per
+filing.
 """
 
 import os
@@ -11,11 +23,11 @@ import sys
 import logging
 import asyncio
 import time
+import threading
 from datetime import datetime
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Set, Tuple
 from pathlib import Path
 from dataclasses import dataclass
-from collections import deque
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
@@ -23,11 +35,17 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
 from dotenv import load_dotenv
 load_dotenv()
 
+from src.core.tracing import get_tracer, TraceStage
+from src.core.metrics import get_metrics
+from src.services.watchlist_index import get_watchlist_index
+from src.services.telegram.rate_limiter import TelegramRateLimiter
+
 # Telegram imports
 try:
     from telegram import Bot
     from telegram.constants import ParseMode
     from telegram.error import TelegramError, RetryAfter, Forbidden, BadRequest
+    from telegram.request import HTTPXRequest
 except ImportError:
     print("Error: python-telegram-bot not installed. Run: pip install python-telegram-bot")
     sys.exit(1)
@@ -51,12 +69,19 @@ TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 SUPABASE_URL = os.getenv('SUPABASE_URL2')
 SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 
-# Rate limiting: Telegram allows ~30 messages/second
-RATE_LIMIT_MESSAGES_PER_SECOND = 25  # Stay under limit
-RATE_LIMIT_WINDOW_SECONDS = 1.0
+# Rate limits (global and per chat) are configured in rate_limiter.py
 MAX_RETRIES = 3
 RETRY_DELAY_BASE = 1.0  # Base delay for exponential backoff
 
+# Concurrent delivery: messages in flight per announcement (the rate limiter schedules them)
+SEND_CONCURRENCY = int(os.getenv('TELEGRAM_SEND_CONCURRENCY', '25'))
+# Buffered bookkeeping: flush after this many log rows or this many seconds
+LOG_FLUSH_SIZE = int(os.getenv('TELEGRAM_LOG_FLUSH_SIZE', '500'))
+LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv('TELEGRAM_LOG_FLUSH_INTERVAL', '5'))
+# Coalescing: how long a chat's first announcement for an ISIN waits for more from the same company
+COALESCE_WINDOW_SECONDS = float(os.getenv('TELEGRAM_COALESCE_WINDOW', '3'))
+MAX_COALESCED_ANNOUNCEMENTS = 5  # Keeps merged messages under Telegram's 4096 character limit
+
 
 @dataclass
 class NotificationResult:
@@ -67,32 +92,246 @@ class NotificationResult:
     status: str = 'sent'  # 'sent', 'failed', 'rate_limited', 'blocked', 'user_stopped'
 
 
-class RateLimiter:
-    """Simple rate limiter using sliding window"""
+class NotificationRecorder:
+    """
+    Buffers notification bookkeeping and writes it in bulk
     
-    def __init__(self, max_calls: int, window_seconds: float):
-        self.max_calls = max_calls
-        self.window_seconds = window_seconds
-        self.calls: deque = deque()
-        self._lock = asyncio.Lock()
+    Collects telegram_notification_log rows, per-chat sent counts and chats
+    that blocked the bot; flush() writes them as one insert, one
+    increment_telegram_notification_counts RPC call and one deactivate update.
+    Writes are best-effort like the per-message calls they replace: a failed
+    log insert is retried row by row so one bad row does not drop the batch.
+    """
     
-    async def acquire(self):
-        """Wait until we can make another call"""
-        async with self._lock:
-            now = time.time()
-            
-            # Remove old calls outside the window
-            while self.calls and now - self.calls[0] > self.window_seconds:
-                self.calls.popleft()
-            
-            # If at limit, wait for oldest call to expire
-            if len(self.calls) >= self.max_calls:
-                sleep_time = self.window_seconds - (now - self.calls[0])
-                if sleep_time > 0:
-                    await asyncio.sleep(sleep_time)
-                self.calls.popleft()
+    def __init__(self, supabase: Client, flush_size: int = LOG_FLUSH_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL_SECONDS):
+        self.supabase = supabase
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._log_rows: List[Dict[str, Any]] = []
+        self._sent_counts: Dict[int, int] = {}
+        self._blocked: Set[int] = set()
+        self._last_flush = time.monotonic()
+        self._flushes: Set[asyncio.Future] = set()
+    
+    def record(self, log_row: Dict[str, Any], result: NotificationResult, count_message: bool = True) -> None:
+        """
+        Buffer the outcome of one notification (schedules a flush when the buffer is due)
+        
+        count_message is False for the extra announcements of a merged message,
+        so subscription counters count messages rather than log rows.
+        """
+        chat_id = log_row['telegram_chat_id']
+        with self._lock:
+            self._log_rows.append(log_row)
+            if result.success and count_message:
+                self._sent_counts[chat_id] = self._sent_counts.get(chat_id, 0) + 1
+            elif result.status == 'user_stopped':
+                self._blocked.add(chat_id)
+            due = (
+                len(self._log_rows) >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            flush = asyncio.ensure_future(asyncio.to_thread(self.flush_sync))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+    
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._log_rows)
+    
+    async def flush(self) -> None:
+        """Write everything buffered so far (and wait for flushes already running)"""
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await asyncio.to_thread(self.flush_sync)
+    
+    def flush_sync(self) -> None:
+        with self._lock:
+            log_rows, self._log_rows = self._log_rows, []
+            sent_counts, self._sent_counts = self._sent_counts, {}
+            blocked, self._blocked = self._blocked, set()
+            self._last_flush = time.monotonic()
+        
+        if log_rows:
+            self._insert_log_rows(log_rows)
+        if sent_counts:
+            self._increment_counts(sent_counts)
+        if blocked:
+            self.deactivate_chats(blocked)
+    
+    def _insert_log_rows(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            with get_metrics().external_call("supabase", "insert_telegram_log"):
+                self.supabase.table('telegram_notification_log').insert(rows).execute()
+            return
+        except Exception as e:
+            if len(rows) == 1:
+                logger.error(f"Failed to log notification: {e}")
+                return
+            logger.warning(f"Bulk notification log insert failed ({len(rows)} rows), retrying row by row: {e}")
+        
+        failed = 0
+        for row in rows:
+            try:
+                self.supabase.table('telegram_notification_log').insert(row).execute()
+            except Exception as e:
+                failed += 1
+                logger.debug(f"Failed to log notification for chat {row.get('telegram_chat_id')}: {e}")
+        if failed:
+            logger.error(f"Failed to log {failed}/{len(rows)} notifications")
+    
+    def _increment_counts(self, sent_counts: Dict[int, int]) -> None:
+        chat_ids = list(sent_counts)
+        try:
+            with get_metrics().external_call("supabase", "increment_telegram_counts"):
+                self.supabase.rpc('increment_telegram_notification_counts', {
+                    'p_chat_ids': chat_ids,
+                    'p_counts': [sent_counts[chat_id] for chat_id in chat_ids]
+                }).execute()
+            return
+        except Exception as e:
+            logger.warning(f"increment_telegram_notification_counts failed, updating per chat: {e}")
+        
+        # Fallback until the migration is applied: one read for all chats, one update per chat
+        try:
+            now = datetime.utcnow().isoformat()
+            response = self.supabase.table('user_telegram_subscriptions').select(
+                'telegram_chat_id, notification_count'
+            ).in_('telegram_chat_id', chat_ids).execute()
+            for row in response.data or []:
+                chat_id = row['telegram_chat_id']
+                self.supabase.table('user_telegram_subscriptions').update({
+                    'notification_count': (row.get('notification_count') or 0) + sent_counts.get(chat_id, 0),
+                    'last_notification_at': now,
+                    'updated_at': now
+                }).eq('telegram_chat_id', chat_id).execute()
+        except Exception as e:
+            logger.error(f"Failed to update subscription stats: {e}")
+    
+    def deactivate_chats(self, chat_ids: Set[int]) -> None:
+        """Mark subscriptions inactive for chats that blocked the bot"""
+        try:
+            self.supabase.table('user_telegram_subscriptions').update({
+                'is_active': False,
+                'updated_at': datetime.utcnow().isoformat()
+            }).in_('telegram_chat_id', list(chat_ids)).execute()
+            index = get_watchlist_index()
+            for chat_id in chat_ids:
+                index.remove_telegram_chat(chat_id)
             
-            self.calls.append(time.time())
+            logger.info(f"Marked {len(chat_ids)} subscriptions as inactive for blocked users")
+        except Exception as e:
+            logger.error(f"Failed to update blocked user status: {e}")
+
+
+@dataclass
+class PendingDelivery:
+    """A message to one chat that further announcements can still join"""
+    chat_id: int
+    user_id: Optional[str]
+    isin: str
+    announcements: List[Dict[str, Any]]
+    result: asyncio.Future
+
+
+class AnnouncementCoalescer:
+    """
+    Merges announcements for the same (chat, ISIN) that are waiting to be sent
+    
+    The first announcement for a chat and ISIN opens a PendingDelivery and
+    waits COALESCE_WINDOW_SECONDS, then for the chat's rate-limiter slot.
+    Announcements for the same company that arrive before the slot comes up
+    join it, and a single message covering all of them is sent. Every
+    announcement still gets its own notification log row.
+    
+    Pending deliveries live in this process, so announcements handled by
+    different worker replicas are not merged with each other.
+    """
+    
+    def __init__(self, notifier: 'TelegramNotifier', window_seconds: float = COALESCE_WINDOW_SECONDS):
+        self.notifier = notifier
+        self.window_seconds = window_seconds
+        self._pending: Dict[Tuple[int, str], PendingDelivery] = {}
+    
+    async def deliver(
+        self,
+        chat_id: int,
+        user_id: Optional[str],
+        isin: str,
+        announcement: Dict[str, Any],
+        send_slots: asyncio.Semaphore
+    ) -> NotificationResult:
+        """Send (or join a pending message with) one announcement for a chat"""
+        key = (chat_id, isin)
+        pending = self._pending.get(key)
+        if pending is not None and len(pending.announcements) < MAX_COALESCED_ANNOUNCEMENTS:
+            pending.announcements.append(announcement)
+            return await asyncio.shield(pending.result)
+        
+        pending = PendingDelivery(
+            chat_id=chat_id,
+            user_id=user_id,
+            isin=isin,
+            announcements=[announcement],
+            result=asyncio.get_running_loop().create_future()
+        )
+        self._pending[key] = pending
+        try:
+            result = await self._send(pending, send_slots)
+        except Exception as e:
+            logger.exception(f"Delivery to {chat_id} failed: {e}")
+            result = NotificationResult(success=False, error_message=str(e), status='failed')
+        except BaseException:
+            # Do not leave joined announcements waiting on a cancelled delivery
+            pending.result.cancel()
+            raise
+        finally:
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+        
+        pending.result.set_result(result)
+        return result
+    
+    async def _send(self, pending: PendingDelivery, send_slots: asyncio.Semaphore) -> NotificationResult:
+        notifier = self.notifier
+        if self.window_seconds > 0:
+            await asyncio.sleep(self.window_seconds)
+        
+        # At peak times the slot can be a while away; announcements keep joining until then
+        await notifier.rate_limiter.acquire(pending.chat_id)
+        
+        # Close the delivery: later announcements start a new message
+        if self._pending.get((pending.chat_id, pending.isin)) is pending:
+            del self._pending[(pending.chat_id, pending.isin)]
+        announcements = list(pending.announcements)
+        
+        if len(announcements) == 1:
+            message = announcements[0]['message']
+        else:
+            message = notifier.format_coalesced_message(announcements)
+        
+        async with send_slots:
+            result = await notifier.send_notification(pending.chat_id, message, slot_acquired=True)
+        
+        for i, announcement in enumerate(announcements):
+            notifier.recorder.record(
+                notifier.build_log_row(
+                    user_id=pending.user_id,
+                    chat_id=pending.chat_id,
+                    corp_id=announcement.get('corp_id'),
+                    isin=pending.isin,
+                    company_name=announcement.get('company_name'),
+                    category=announcement.get('category'),
+                    notification_type='announcement',
+                    message_text=message,
+                    result=result
+                ),
+                result,
+                count_message=(i == 0)
+            )
+        return result
 
 
 class TelegramNotifier:
@@ -104,9 +343,15 @@ class TelegramNotifier:
         if not SUPABASE_URL or not SUPABASE_KEY:
             raise ValueError("SUPABASE_URL2 and SUPABASE_SERVICE_ROLE_KEY are required")
         
-        self.bot = Bot(token=TELEGRAM_BOT_TOKEN)
+        # The default request object holds a single connection, which would serialize concurrent sends
+        self.bot = Bot(
+            token=TELEGRAM_BOT_TOKEN,
+            request=HTTPXRequest(connection_pool_size=SEND_CONCURRENCY, pool_timeout=30.0)
+        )
         self.supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        self.rate_limiter = RateLimiter(RATE_LIMIT_MESSAGES_PER_SECOND, RATE_LIMIT_WINDOW_SECONDS)
+        self.rate_limiter = TelegramRateLimiter()
+        self.recorder = NotificationRecorder(self.supabase)
+        self.coalescer = AnnouncementCoalescer(self)
     
     def format_announcement_message(
         self,
@@ -200,6 +445,43 @@ class TelegramNotifier:
         
         return "\n".join(message_parts)
     
+    def format_coalesced_message(self, announcements: List[Dict[str, Any]]) -> str:
+        """Format several announcements from one company as a single message"""
+        first = announcements[0]
+        message_parts = [
+            f"🔔 <b>{len(announcements)} New Announcements</b>",
+            "",
+            f"🏢 <b>{self._escape_html(first.get('company_name'))}</b>",
+        ]
+        
+        if first.get('symbol'):
+            message_parts.append(f"📌 {self._escape_html(first['symbol'])}")
+        
+        for announcement in announcements:
+            category = announcement.get('category')
+            message_parts.append("")
+            message_parts.append(f"📂 <b>{self._escape_html(category)}</b>")
+            
+            headline = announcement.get('headline')
+            summary = announcement.get('summary')
+            if headline:
+                message_parts.append(self._escape_html(headline[:200]))
+            elif summary:
+                truncated_summary = summary[:250]
+                if len(summary) > 250:
+                    truncated_summary += "..."
+                message_parts.append(self._escape_html(truncated_summary))
+            
+            links = []
+            if announcement.get('file_url'):
+                links.append(f"<a href='{announcement['file_url']}'>Document</a>")
+            if announcement.get('corp_id'):
+                links.append(f"<a href='https://screenalpha.in/announcement/{announcement['corp_id']}'>ScreenAlpha</a>")
+            if links:
+                message_parts.append("🔗 " + " | ".join(links))
+        
+        return "\n".join(message_parts)
+    
     def format_insider_trading_message(
         self,
         company_name: str,
@@ -324,22 +606,30 @@ class TelegramNotifier:
         chat_id: int,
         message: str,
         parse_mode: str = ParseMode.HTML,
-        disable_preview: bool = True
+        disable_preview: bool = True,
+        slot_acquired: bool = False
     ) -> NotificationResult:
-        """Send a single notification with rate limiting and retry logic"""
+        """
+        Send a single notification with rate limiting and retry logic
+        
+        slot_acquired: the caller already waited for the rate-limiter slot of
+        the first attempt (retries always wait for a new one).
+        """
         
         for attempt in range(MAX_RETRIES):
             try:
-                # Wait for rate limiter
-                await self.rate_limiter.acquire()
+                # Wait for this chat's slot under the global and per-chat limits
+                if attempt > 0 or not slot_acquired:
+                    await self.rate_limiter.acquire(chat_id)
                 
                 # Send message
-                result = await self.bot.send_message(
-                    chat_id=chat_id,
-                    text=message,
-                    parse_mode=parse_mode,
-                    disable_web_page_preview=disable_preview
-                )
+                with get_metrics().external_call("telegram", "send_message"):
+                    result = await self.bot.send_message(
+                        chat_id=chat_id,
+                        text=message,
+                        parse_mode=parse_mode,
+                        disable_web_page_preview=disable_preview
+                    )
                 
                 return NotificationResult(
                     success=True,
@@ -348,9 +638,9 @@ class TelegramNotifier:
                 )
                 
             except RetryAfter as e:
-                # Telegram is rate limiting us - wait and retry
+                # Telegram is rate limiting us - pause all senders, then retry
                 logger.warning(f"Rate limited by Telegram. Waiting {e.retry_after}s")
-                await asyncio.sleep(e.retry_after)
+                self.rate_limiter.backoff(float(e.retry_after))
                 continue
                 
             except Forbidden as e:
@@ -414,7 +704,7 @@ class TelegramNotifier:
         
         return results
     
-    async def log_notification(
+    def build_log_row(
         self,
         user_id: Optional[str],
         chat_id: int,
@@ -425,67 +715,35 @@ class TelegramNotifier:
         notification_type: str,
         message_text: str,
         result: NotificationResult
-    ):
-        """Log notification result to database"""
-        try:
-            log_data = {
-                'telegram_chat_id': chat_id,
-                'notification_type': notification_type,
-                'message_text': message_text[:1000] if message_text else None,  # Truncate long messages
-                'notification_status': result.status,
-                'telegram_message_id': result.telegram_message_id,
-                'error_message': result.error_message,
-                'sent_at': datetime.utcnow().isoformat() if result.success else None
-            }
-            
-            if user_id:
-                log_data['user_id'] = user_id
-            if corp_id:
-                log_data['corp_id'] = corp_id
-            if isin:
-                log_data['isin'] = isin
-            if company_name:
-                log_data['company_name'] = company_name
-            if category:
-                log_data['category'] = category
-            
-            self.supabase.table('telegram_notification_log').insert(log_data).execute()
-            
-        except Exception as e:
-            logger.error(f"Failed to log notification: {e}")
-    
-    async def update_subscription_stats(self, chat_id: int):
-        """Update notification count and last notification time for subscription"""
-        try:
-            # Get current subscription
-            response = self.supabase.table('user_telegram_subscriptions').select('notification_count').eq('telegram_chat_id', chat_id).execute()
-            
-            if response.data and len(response.data) > 0:
-                current_count = response.data[0].get('notification_count', 0) or 0
-                
-                self.supabase.table('user_telegram_subscriptions').update({
-                    'notification_count': current_count + 1,
-                    'last_notification_at': datetime.utcnow().isoformat(),
-                    'updated_at': datetime.utcnow().isoformat()
-                }).eq('telegram_chat_id', chat_id).execute()
-                
-        except Exception as e:
-            logger.error(f"Failed to update subscription stats: {e}")
+    ) -> Dict[str, Any]:
+        """telegram_notification_log row for a notification result"""
+        return {
+            'telegram_chat_id': chat_id,
+            'notification_type': notification_type,
+            'message_text': message_text[:1000] if message_text else None,  # Truncate long messages
+            'notification_status': result.status,
+            'telegram_message_id': result.telegram_message_id,
+            'error_message': result.error_message,
+            'sent_at': datetime.utcnow().isoformat() if result.success else None,
+            # Bulk inserts need the same keys in every row
+            'user_id': user_id or None,
+            'corp_id': corp_id or None,
+            'isin': isin or None,
+            'company_name': company_name or None,
+            'category': category or None
+        }
     
     async def handle_user_blocked(self, chat_id: int):
         """Handle case where user has blocked the bot"""
-        try:
-            self.supabase.table('user_telegram_subscriptions').update({
-                'is_active': False,
-                'updated_at': datetime.utcnow().isoformat()
-            }).eq('telegram_chat_id', chat_id).execute()
-            
-            logger.info(f"Marked subscription as inactive for blocked user {chat_id}")
-        except Exception as e:
-            logger.error(f"Failed to update blocked user status: {e}")
+        await asyncio.to_thread(self.recorder.deactivate_chats, {chat_id})
     
     def get_subscribers_for_isin_sync(self, isin: str) -> List[Dict]:
         """Synchronous version: Get all subscribers who have this ISIN in their watchlist"""
+        # Reverse watchlist index in Redis; None while it is not built
+        subscribers = get_watchlist_index().telegram_subscribers_for_isin(isin, self.supabase)
+        if subscribers is not None:
+            return subscribers
+        
         try:
             # Use the helper function we created in SQL
             response = self.supabase.rpc(
@@ -552,6 +810,7 @@ async def send_announcement_notification(
     Returns stats dict with sent/failed counts.
     """
     notifier = get_notifier()
+    started = time.monotonic()
     
     # Get all subscribers for this ISIN
     subscribers = notifier.get_subscribers_for_isin_sync(isin)
@@ -575,41 +834,42 @@ async def send_announcement_notification(
         corp_id=corp_id
     )
     
-    # Send to all subscribers
-    sent_count = 0
-    failed_count = 0
+    announcement = {
+        'company_name': company_name,
+        'symbol': symbol,
+        'category': category,
+        'summary': summary,
+        'headline': headline,
+        'file_url': file_url,
+        'corp_id': corp_id,
+        'message': message
+    }
+    
+    # Send to all subscribers concurrently; the rate limiter schedules the actual
+    # sends, and announcements from the same company that are still waiting for
+    # a chat are merged into one message
+    send_slots = asyncio.Semaphore(SEND_CONCURRENCY)
     
-    for sub in subscribers:
+    async def deliver(sub: Dict) -> Optional[NotificationResult]:
         chat_id = sub.get('telegram_chat_id')
-        user_id = sub.get('user_id')
-        
         if not chat_id:
-            continue
-        
-        result = await notifier.send_notification(chat_id, message)
-        
-        # Log the notification
-        await notifier.log_notification(
-            user_id=user_id,
-            chat_id=chat_id,
-            corp_id=corp_id,
-            isin=isin,
-            company_name=company_name,
-            category=category,
-            notification_type='announcement',
-            message_text=message,
-            result=result
-        )
-        
-        if result.success:
-            sent_count += 1
-            await notifier.update_subscription_stats(chat_id)
-        else:
-            failed_count += 1
-            if result.status == 'user_stopped':
-                await notifier.handle_user_blocked(chat_id)
+            return None
+        return await notifier.coalescer.deliver(chat_id, sub.get('user_id'), isin, announcement, send_slots)
+    
+    results = await asyncio.gather(*(deliver(sub) for sub in subscribers))
+    await notifier.recorder.flush()
+    
+    sent_count = sum(1 for result in results if result is not None and result.success)
+    failed_count = sum(1 for result in results if result is not None and not result.success)
     
     logger.info(f"Notification complete for {company_name}: {sent_count} sent, {failed_count} failed")
+    get_tracer().record(
+        corp_id,
+        TraceStage.TELEGRAM_SEND,
+        duration_ms=(time.monotonic() - started) * 1000,
+        sent=sent_count,
+        failed=failed_count
+    )
     
     return {
         'sent': sent_count,
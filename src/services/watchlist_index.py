@@ -0,0 +1,448 @@
+"""
+Reverse watchlist index for announcement fan-out.
+
+Resolving who should hear about a filing used to take several PostgREST
+queries per announcement (users by ISIN, users by category, then Telegram
+subscriptions). The same information is kept in Redis sets instead:
+
+- ``backfin:wlidx:isin:<ISIN>``        - user ids with the ISIN in a watchlist
+- ``backfin:wlidx:cat:<category>``     - user ids watching the category
+- ``backfin:wlidx:user:<uid>:isins``   - the user's own ISINs (for diffing on sync)
+- ``backfin:wlidx:user:<uid>:cats``    - the user's own categories
+- ``backfin:wlidx:tg:<uid>``           - hash telegram_chat_id -> telegram_username
+                                         (active, verified)
+- ``backfin:wlidx:tgchats``            - hash telegram_chat_id -> user id
+- ``backfin:wlidx:dirty:users``        - users synced recently (replayed after a rebuild)
+- ``backfin:wlidx:dirty:chats``        - Telegram chats updated recently
+- ``backfin:wlidx:ready``              - set after a full rebuild completes
+
+The API keeps it current: watchlist endpoints call ``sync_user()`` with the
+user's full ISIN/category sets, and the Telegram bot/notifier update chat
+entries. ``rebuild()`` reloads everything from Supabase (at API startup when
+the index is missing, and every ``WATCHLIST_INDEX_REBUILD_SECONDS`` to heal
+drift). Updates made while a rebuild runs would be overwritten by its
+snapshot, so every update also marks the user or chat dirty and the rebuild
+re-reads those from Supabase once the snapshot is written. Readers return
+None while the index is not ready or Redis is down, and callers fall back to
+their database queries.
+
+Telegram opt-outs (``user_notification_preferences.telegram_enabled``) are
+not indexed; ``telegram_subscribers_for_isin()`` checks them on every call.
+
+Run ``python -m src.services.watchlist_index`` to rebuild manually.
+"""
+
+import os
+import time
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Any
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+INDEX_PREFIX = "backfin:wlidx:"
+READY_KEY = f"{INDEX_PREFIX}ready"
+REBUILD_LOCK_KEY = f"{INDEX_PREFIX}rebuild_lock"
+TELEGRAM_CHATS_KEY = f"{INDEX_PREFIX}tgchats"
+DIRTY_USERS_KEY = f"{INDEX_PREFIX}dirty:users"
+DIRTY_CHATS_KEY = f"{INDEX_PREFIX}dirty:chats"
+DIRTY_TTL_SECONDS = 900  # Longer than the rebuild lock
+WATCHLIST_INDEX_REBUILD_SECONDS = int(os.getenv('WATCHLIST_INDEX_REBUILD_SECONDS', 6 * 3600))
+PAGE_SIZE = 1000
+IN_FILTER_CHUNK = 200  # ids per PostgREST in_() filter
+
+
+def _isin_key(isin: str) -> str:
+    return f"{INDEX_PREFIX}isin:{isin}"
+
+
+def _category_key(category: str) -> str:
+    return f"{INDEX_PREFIX}cat:{category}"
+
+
+def _user_isins_key(user_id: str) -> str:
+    return f"{INDEX_PREFIX}user:{user_id}:isins"
+
+
+def _user_categories_key(user_id: str) -> str:
+    return f"{INDEX_PREFIX}user:{user_id}:cats"
+
+
+def _telegram_key(user_id: str) -> str:
+    return f"{INDEX_PREFIX}tg:{user_id}"
+
+
+def _fetch_all(query_factory) -> List[Dict[str, Any]]:
+    """Page through a PostgREST select (Supabase caps responses at 1000 rows)"""
+    rows = []
+    start = 0
+    while True:
+        batch = query_factory().range(start, start + PAGE_SIZE - 1).execute().data or []
+        rows.extend(batch)
+        if len(batch) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+
+def _group_watch_rows(rows: Iterable[Dict[str, Any]]) -> Tuple[Dict[str, Set[str]], Dict[str, Set[str]]]:
+    """Split watchlistdata rows into user -> ISINs and user -> categories"""
+    user_isins: Dict[str, Set[str]] = {}
+    user_categories: Dict[str, Set[str]] = {}
+    for row in rows:
+        user_id = row.get('userid')
+        if not user_id:
+            continue
+        user_id = str(user_id)
+        if row.get('isin'):
+            user_isins.setdefault(user_id, set()).add(row['isin'])
+        elif row.get('category'):
+            user_categories.setdefault(user_id, set()).add(row['category'])
+    return user_isins, user_categories
+
+
+def _telegram_disabled_users(supabase, user_ids: List[str]) -> Set[str]:
+    """Users among ``user_ids`` who turned Telegram notifications off"""
+    disabled = set()
+    for start in range(0, len(user_ids), IN_FILTER_CHUNK):
+        response = supabase.table('user_notification_preferences') \
+            .select('user_id') \
+            .in_('user_id', user_ids[start:start + IN_FILTER_CHUNK]) \
+            .eq('telegram_enabled', False).execute()
+        disabled.update(str(row['user_id']) for row in response.data or [])
+    return disabled
+
+
+class WatchlistIndex:
+    """Redis-backed ISIN/category -> users and user -> Telegram chats index"""
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self.redis_client = redis_client
+
+    def _get_client(self) -> Optional[redis.Redis]:
+        """Lazily create a Redis client with short timeouts"""
+        if self.redis_client is None:
+            try:
+                self.redis_client = redis.Redis(
+                    host=os.getenv('REDIS_HOST', 'localhost'),
+                    port=int(os.getenv('REDIS_PORT', 6379)),
+                    db=int(os.getenv('REDIS_DB', 0)),
+                    password=os.getenv('REDIS_PASSWORD'),
+                    socket_connect_timeout=2,
+                    socket_timeout=2,
+                    decode_responses=True
+                )
+            except Exception as e:
+                logger.debug(f"Watchlist index Redis client unavailable: {e}")
+                return None
+        return self.redis_client
+
+    # ---- Lookups ----
+
+    def is_ready(self) -> bool:
+        client = self._get_client()
+        if client is None:
+            return False
+        try:
+            return bool(client.exists(READY_KEY))
+        except redis.RedisError as e:
+            logger.debug(f"Watchlist index ready check failed: {e}")
+            return False
+
+    def users_for_announcement(self, isin: Optional[str], category: Optional[str]) -> Optional[Tuple[Set[str], Set[str]]]:
+        """Return (users watching ``isin``, users watching ``category``), or None if unavailable"""
+        client = self._get_client()
+        if client is None:
+            return None
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.exists(READY_KEY)
+            pipe.smembers(_isin_key(isin or ""))
+            pipe.smembers(_category_key(category or ""))
+            ready, isin_users, category_users = pipe.execute()
+        except redis.RedisError as e:
+            logger.debug(f"Watchlist index lookup failed: {e}")
+            return None
+        if not ready:
+            return None
+        return (set(isin_users) if isin else set(), set(category_users) if category else set())
+
+    def telegram_subscribers_for_isin(self, isin: str, supabase) -> Optional[List[Dict[str, Any]]]:
+        """
+        Active Telegram subscribers watching ``isin`` (same shape as the SQL helper), or None.
+
+        Users who disabled Telegram are dropped with one preferences query per
+        call, so opt-outs apply immediately like they do in the SQL helper.
+        """
+        users = self.users_for_announcement(isin, None)
+        if users is None:
+            return None
+        user_ids = sorted(users[0])
+        if not user_ids:
+            return []
+        client = self._get_client()
+        try:
+            pipe = client.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.hgetall(_telegram_key(user_id))
+            chats_per_user = pipe.execute()
+        except redis.RedisError as e:
+            logger.debug(f"Watchlist index Telegram lookup failed: {e}")
+            return None
+        chats_by_user = {user_id: chats for user_id, chats in zip(user_ids, chats_per_user) if chats}
+        if not chats_by_user:
+            return []
+        try:
+            disabled = _telegram_disabled_users(supabase, sorted(chats_by_user))
+        except Exception as e:
+            logger.warning(f"Could not check Telegram preferences for {isin}, using the database: {e}")
+            return None
+        subscribers = []
+        for user_id, chats in chats_by_user.items():
+            if user_id in disabled:
+                continue
+            for chat_id, username in chats.items():
+                subscribers.append({
+                    'user_id': user_id,
+                    'telegram_chat_id': int(chat_id),
+                    'telegram_username': username or None
+                })
+        return subscribers
+
+    # ---- Incremental maintenance ----
+
+    def sync_user(self, user_id: str, isins: Iterable[str], categories: Iterable[str]) -> None:
+        """Replace a user's entries with their current ISIN and category sets"""
+        client = self._get_client()
+        if client is None:
+            return
+        isins = {i for i in isins if i}
+        categories = {c for c in categories if c}
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.smembers(_user_isins_key(user_id))
+            pipe.smembers(_user_categories_key(user_id))
+            old_isins, old_categories = pipe.execute()
+
+            pipe = client.pipeline(transaction=True)
+            for isin in old_isins - isins:
+                pipe.srem(_isin_key(isin), user_id)
+            for isin in isins - old_isins:
+                pipe.sadd(_isin_key(isin), user_id)
+            for category in old_categories - categories:
+                pipe.srem(_category_key(category), user_id)
+            for category in categories - old_categories:
+                pipe.sadd(_category_key(category), user_id)
+            pipe.delete(_user_isins_key(user_id), _user_categories_key(user_id))
+            if isins:
+                pipe.sadd(_user_isins_key(user_id), *isins)
+            if categories:
+                pipe.sadd(_user_categories_key(user_id), *categories)
+            pipe.sadd(DIRTY_USERS_KEY, user_id)
+            pipe.expire(DIRTY_USERS_KEY, DIRTY_TTL_SECONDS)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Watchlist index sync failed for user {user_id}: {e}")
+
+    def set_telegram_chat(self, chat_id: int, user_id: str, username: Optional[str] = None) -> None:
+        """Register an active, verified Telegram chat for a user"""
+        client = self._get_client()
+        if client is None:
+            return
+        try:
+            previous_user = client.hget(TELEGRAM_CHATS_KEY, str(chat_id))
+            pipe = client.pipeline(transaction=True)
+            if previous_user and previous_user != str(user_id):
+                pipe.hdel(_telegram_key(previous_user), str(chat_id))
+            pipe.hset(_telegram_key(str(user_id)), str(chat_id), username or "")
+            pipe.hset(TELEGRAM_CHATS_KEY, str(chat_id), str(user_id))
+            pipe.sadd(DIRTY_CHATS_KEY, str(chat_id))
+            pipe.expire(DIRTY_CHATS_KEY, DIRTY_TTL_SECONDS)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Watchlist index Telegram update failed for chat {chat_id}: {e}")
+
+    def remove_telegram_chat(self, chat_id: int) -> None:
+        """Stop routing notifications to a chat (unsubscribed or bot blocked)"""
+        client = self._get_client()
+        if client is None:
+            return
+        try:
+            user_id = client.hget(TELEGRAM_CHATS_KEY, str(chat_id))
+            pipe = client.pipeline(transaction=True)
+            if user_id:
+                pipe.hdel(_telegram_key(user_id), str(chat_id))
+            pipe.hdel(TELEGRAM_CHATS_KEY, str(chat_id))
+            pipe.sadd(DIRTY_CHATS_KEY, str(chat_id))
+            pipe.expire(DIRTY_CHATS_KEY, DIRTY_TTL_SECONDS)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Watchlist index Telegram removal failed for chat {chat_id}: {e}")
+
+    def refresh_telegram_chat(self, supabase, chat_id: int) -> None:
+        """Re-read one subscription from Supabase and update the index accordingly"""
+        try:
+            response = supabase.table('user_telegram_subscriptions') \
+                .select('user_id, telegram_username, is_active, is_verified') \
+                .eq('telegram_chat_id', chat_id).execute()
+        except Exception as e:
+            logger.warning(f"Could not refresh Telegram chat {chat_id} in watchlist index: {e}")
+            return
+        row = response.data[0] if response.data else None
+        if row and row.get('is_active') and row.get('is_verified') and row.get('user_id'):
+            self.set_telegram_chat(chat_id, row['user_id'], row.get('telegram_username'))
+        else:
+            self.remove_telegram_chat(chat_id)
+
+    # ---- Full rebuild ----
+
+    def _delete_index_keys(self, client: redis.Redis) -> None:
+        batch = []
+        for key in client.scan_iter(match=f"{INDEX_PREFIX}*", count=1000):
+            if key in (REBUILD_LOCK_KEY, DIRTY_USERS_KEY, DIRTY_CHATS_KEY):
+                continue
+            batch.append(key)
+            if len(batch) >= 500:
+                client.delete(*batch)
+                batch = []
+        if batch:
+            client.delete(*batch)
+
+    def rebuild(self, supabase) -> bool:
+        """Reload the whole index from Supabase; only one process rebuilds at a time"""
+        client = self._get_client()
+        if client is None:
+            return False
+        try:
+            if not client.set(REBUILD_LOCK_KEY, str(os.getpid()), nx=True, ex=600):
+                logger.info("Watchlist index rebuild already running elsewhere")
+                return False
+        except redis.RedisError as e:
+            logger.warning(f"Watchlist index rebuild skipped, Redis unavailable: {e}")
+            return False
+
+        started = time.monotonic()
+        try:
+            # Anything updated from here on is replayed after the snapshot is written
+            client.delete(DIRTY_USERS_KEY, DIRTY_CHATS_KEY)
+            watch_rows = _fetch_all(
+                lambda: supabase.table('watchlistdata').select('userid, isin, category')
+            )
+            subscriptions = _fetch_all(
+                lambda: supabase.table('user_telegram_subscriptions')
+                .select('user_id, telegram_chat_id, telegram_username')
+                .eq('is_active', True).eq('is_verified', True)
+            )
+            user_isins, user_categories = _group_watch_rows(watch_rows)
+
+            # Readers fall back to the database while the index is rewritten
+            client.delete(READY_KEY)
+            self._delete_index_keys(client)
+
+            pipe = client.pipeline(transaction=False)
+            queued = 0
+            for user_id, isins in user_isins.items():
+                pipe.sadd(_user_isins_key(user_id), *isins)
+                for isin in isins:
+                    pipe.sadd(_isin_key(isin), user_id)
+                queued += len(isins) + 1
+                if queued >= 5000:
+                    pipe.execute()
+                    queued = 0
+            for user_id, categories in user_categories.items():
+                pipe.sadd(_user_categories_key(user_id), *categories)
+                for category in categories:
+                    pipe.sadd(_category_key(category), user_id)
+                queued += len(categories) + 1
+                if queued >= 5000:
+                    pipe.execute()
+                    queued = 0
+            for sub in subscriptions:
+                user_id = str(sub.get('user_id') or '')
+                chat_id = sub.get('telegram_chat_id')
+                if not user_id or not chat_id:
+                    continue
+                pipe.hset(_telegram_key(user_id), str(chat_id), sub.get('telegram_username') or "")
+                pipe.hset(TELEGRAM_CHATS_KEY, str(chat_id), user_id)
+            pipe.execute()
+
+            replayed = self._replay_dirty(client, supabase)
+            client.set(READY_KEY, str(int(time.time())))
+
+            if replayed:
+                logger.info(f"Watchlist index replayed {replayed} updates made during the rebuild")
+            logger.info(
+                f"Watchlist index rebuilt: {len(user_isins)} users with ISINs, {len(user_categories)} with categories, "
+                f"{len(subscriptions)} Telegram subscriptions in {time.monotonic() - started:.2f}s"
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Watchlist index rebuild failed: {e}")
+            return False
+        finally:
+            try:
+                client.delete(REBUILD_LOCK_KEY)
+            except redis.RedisError:
+                pass
+
+    def _replay_dirty(self, client: redis.Redis, supabase) -> int:
+        """Re-read users and chats updated while the snapshot was being written"""
+        pipe = client.pipeline(transaction=True)
+        pipe.smembers(DIRTY_USERS_KEY)
+        pipe.smembers(DIRTY_CHATS_KEY)
+        pipe.delete(DIRTY_USERS_KEY, DIRTY_CHATS_KEY)
+        user_ids, chat_ids, _ = pipe.execute()
+
+        user_ids = sorted(user_ids)
+        rows = []
+        for start in range(0, len(user_ids), IN_FILTER_CHUNK):
+            chunk = user_ids[start:start + IN_FILTER_CHUNK]
+            rows.extend(_fetch_all(
+                lambda: supabase.table('watchlistdata').select('userid, isin, category').in_('userid', chunk)
+            ))
+        user_isins, user_categories = _group_watch_rows(rows)
+        for user_id in user_ids:
+            self.sync_user(user_id, user_isins.get(user_id, ()), user_categories.get(user_id, ()))
+        for chat_id in chat_ids:
+            self.refresh_telegram_chat(supabase, int(chat_id))
+        return len(user_ids) + len(chat_ids)
+
+    def rebuild_if_stale(self, supabase, max_age: int = WATCHLIST_INDEX_REBUILD_SECONDS) -> bool:
+        """Rebuild when the index is missing or older than ``max_age`` seconds"""
+        client = self._get_client()
+        if client is None:
+            return False
+        try:
+            built_at = client.get(READY_KEY)
+        except redis.RedisError:
+            return False
+        if built_at and time.time() - int(built_at) < max_age:
+            return False
+        return self.rebuild(supabase)
+
+
+# Singleton instance
+_index: Optional[WatchlistIndex] = None
+
+
+def get_watchlist_index() -> WatchlistIndex:
+    """Get or create the process-wide watchlist index"""
+    global _index
+    if _index is None:
+        _index = WatchlistIndex()
+    return _index
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    client = create_client(
+        os.getenv('SUPABASE_URL2'),
+        os.getenv('SUPABASE_SERVICE_ROLE_KEY') or os.getenv('SUPABASE_KEY2')
+    )
+    ok = get_watchlist_index().rebuild(client)
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,349 @@
+"""
+HTTP Record/Replay for Exchange Scrapers
+
+Captures real BSE/NSE responses (JSON, CSV downloads, PDFs, HTML) into a
+fixture directory and replays them deterministically, so parsers, normalizers
+and dedup code can be profiled and regression-benchmarked offline.
+
+Interception happens at the ``requests`` client level by wrapping
+``requests.Session.send`` (which module-level ``requests.get`` also goes
+through), so scrapers need no per-call changes. Only hosts listed in
+``HTTP_REPLAY_HOSTS`` are touched; Supabase, Gemini and internal API calls
+pass through untouched. Selenium-driven fetchers use the artifact helpers
+(``save_artifact`` / ``load_artifact``) to record what they extracted from
+the browser instead.
+
+Configuration (environment):
+    HTTP_REPLAY_MODE        off | record | replay (default: off)
+    HTTP_REPLAY_DIR         fixture directory (default: fixtures/http)
+    HTTP_REPLAY_HOSTS       comma-separated host suffixes (default: bseindia.com,nseindia.com)
+    HTTP_REPLAY_LATENCY_MS  fixed latency added to every replayed response
+    HTTP_REPLAY_RECORDED_LATENCY  true to also sleep for the recorded response time
+
+Fixture layout:
+    <dir>/<host>/<METHOD>_<path-slug>_<key>_<n>.meta.json   status, headers, cookies, elapsed
+    <dir>/<host>/<METHOD>_<path-slug>_<key>_<n>.body.<ext>  raw (decoded) body
+    <dir>/artifacts/<namespace>/<name>                  Selenium/browser artifacts
+
+Repeated identical requests are stored as a sequence (``_0``, ``_1``, ...) and
+replayed in the same order; once exhausted the last response repeats.
+
+Usage:
+    HTTP_REPLAY_MODE=record python src/services/exchange_data/insider_trading/insider_trading_detector.py
+    HTTP_REPLAY_MODE=replay HTTP_REPLAY_LATENCY_MS=150 python ...
+
+    from src.utils.http_replay import http_replay
+    with http_replay("replay", "fixtures/http"):
+        records = NSEDataFetcher().fetch_bulk_deals("01-10-2025")
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple, Union
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from requests.cookies import cookiejar_from_dict
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+DEFAULT_HOSTS = ("bseindia.com", "nseindia.com")
+META_SUFFIX = ".meta.json"
+
+# Body is stored decoded, so transport-level headers no longer apply on replay
+_DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection"}
+
+_BODY_EXTENSIONS = (
+    ("json", "json"),
+    ("csv", "csv"),
+    ("pdf", "pdf"),
+    ("html", "html"),
+    ("xml", "xml"),
+    ("text/plain", "txt"),
+)
+
+
+class ReplayMissError(requests.ConnectionError):
+    """No recorded fixture matches a request made in replay mode"""
+
+
+def _body_extension(content_type: str) -> str:
+    content_type = (content_type or "").lower()
+    for marker, ext in _BODY_EXTENSIONS:
+        if marker in content_type:
+            return ext
+    return "bin"
+
+
+def _slug(path: str, max_length: int = 60) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-").lower()
+    return (slug or "root")[:max_length]
+
+
+def request_key(method: str, url: str, body: Optional[Union[bytes, str]] = None) -> str:
+    """Stable fixture key: method, URL with sorted query parameters and body digest"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    canonical = f"{method.upper()} {parts.scheme}://{parts.netloc.lower()}{parts.path}?{query}"
+    if body:
+        if isinstance(body, str):
+            body = body.encode()
+        canonical += f" {hashlib.sha256(body).hexdigest()}"
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+class FixtureStore:
+    """Reads and writes recorded responses and artifacts under a fixture directory"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def _stem(self, method: str, url: str, key: str, index: int) -> Path:
+        parts = urlsplit(url)
+        return self.root / parts.netloc.lower() / f"{method.upper()}_{_slug(parts.path)}_{key}_{index}"
+
+    def save_response(self, method: str, url: str, key: str, index: int, response: requests.Response) -> Path:
+        """Persist one response (metadata JSON plus raw body file)"""
+        stem = self._stem(method, url, key, index)
+        stem.parent.mkdir(parents=True, exist_ok=True)
+        ext = _body_extension(response.headers.get("Content-Type", ""))
+        body_path = stem.with_name(f"{stem.name}.body.{ext}")
+        body_path.write_bytes(response.content or b"")
+        meta = {
+            "method": method.upper(),
+            "url": url,
+            "status_code": response.status_code,
+            "reason": response.reason,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS},
+            "cookies": requests.utils.dict_from_cookiejar(response.cookies),
+            "elapsed_ms": round(response.elapsed.total_seconds() * 1000, 3) if response.elapsed else 0.0,
+            "body_file": body_path.name,
+            "recorded_at": time.time(),
+        }
+        meta_path = stem.with_name(f"{stem.name}{META_SUFFIX}")
+        meta_path.write_text(json.dumps(meta, indent=2))
+        return meta_path
+
+    def load_response(self, method: str, url: str, key: str, index: int) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """Load the ``index``-th recorded response for a key, falling back to the last one"""
+        directory = self.root / urlsplit(url).netloc.lower()
+        if not directory.is_dir():
+            return None
+        candidates = sorted(
+            directory.glob(f"{method.upper()}_*_{key}_*{META_SUFFIX}"),
+            key=lambda p: int(p.name[:-len(META_SUFFIX)].rsplit("_", 1)[-1])
+        )
+        if not candidates:
+            return None
+        meta_path = candidates[min(index, len(candidates) - 1)]
+        meta = json.loads(meta_path.read_text())
+        return meta, (meta_path.parent / meta["body_file"]).read_bytes()
+
+    def artifact_path(self, namespace: str, name: str) -> Path:
+        return self.root / "artifacts" / _slug(namespace) / name
+
+    def save_artifact(self, namespace: str, name: str, data: Union[bytes, str, Any]) -> Path:
+        """Store a browser-extracted artifact: bytes/str as-is, anything else as JSON"""
+        path = self.artifact_path(namespace, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(data, bytes):
+            path.write_bytes(data)
+        elif isinstance(data, str):
+            path.write_text(data)
+        else:
+            path.write_text(json.dumps(data, indent=2, default=str))
+        return path
+
+    def load_artifact(self, namespace: str, name: str, as_json: bool = False) -> Optional[Union[bytes, Any]]:
+        path = self.artifact_path(namespace, name)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text()) if as_json else path.read_bytes()
+
+
+class HttpReplay:
+    """Record/replay controller that wraps ``requests.Session.send``"""
+
+    def __init__(
+        self,
+        mode: str = MODE_OFF,
+        fixture_dir: Union[str, Path] = "fixtures/http",
+        hosts: Tuple[str, ...] = DEFAULT_HOSTS,
+        latency_ms: float = 0.0,
+        recorded_latency: bool = False
+    ):
+        if mode not in (MODE_OFF, MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Invalid HTTP replay mode: {mode}")
+        self.mode = mode
+        self.store = FixtureStore(fixture_dir)
+        self.hosts = tuple(h.strip().lower() for h in hosts if h.strip())
+        self.latency_ms = latency_ms
+        self.recorded_latency = recorded_latency
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._original_send = None
+
+    @classmethod
+    def from_env(cls) -> "HttpReplay":
+        hosts = os.getenv("HTTP_REPLAY_HOSTS")
+        return cls(
+            mode=os.getenv("HTTP_REPLAY_MODE", MODE_OFF).lower(),
+            fixture_dir=os.getenv("HTTP_REPLAY_DIR", "fixtures/http"),
+            hosts=tuple(hosts.split(",")) if hosts else DEFAULT_HOSTS,
+            latency_ms=float(os.getenv("HTTP_REPLAY_LATENCY_MS", 0)),
+            recorded_latency=os.getenv("HTTP_REPLAY_RECORDED_LATENCY", "false").lower() == "true"
+        )
+
+    @property
+    def is_recording(self) -> bool:
+        return self.mode == MODE_RECORD
+
+    @property
+    def is_replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    def handles(self, url: str) -> bool:
+        host = (urlsplit(url).hostname or "").lower()
+        return any(host == h or host.endswith(f".{h}") for h in self.hosts)
+
+    def _next_index(self, key: str) -> int:
+        with self._lock:
+            index = self._counters.get(key, 0)
+            self._counters[key] = index + 1
+            return index
+
+    def inject_latency(self, recorded_ms: float = 0.0):
+        """Sleep for the configured fixed latency (plus the recorded time if enabled)"""
+        delay_ms = self.latency_ms + (recorded_ms if self.recorded_latency else 0.0)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+    # ---- requests integration ----
+
+    def _send(self, session: requests.Session, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if not self.handles(request.url):
+            return self._original_send(session, request, **kwargs)
+
+        key = request_key(request.method, request.url, request.body)
+        index = self._next_index(key)
+
+        if self.is_replaying:
+            loaded = self.store.load_response(request.method, request.url, key, index)
+            if loaded is None:
+                raise ReplayMissError(f"No recorded fixture for {request.method} {request.url}", request=request)
+            meta, body = loaded
+            self.inject_latency(meta.get("elapsed_ms", 0.0))
+            response = self._build_response(request, meta, body)
+            session.cookies.update(response.cookies)
+            return response
+
+        response = self._original_send(session, request, **kwargs)
+        try:
+            self.store.save_response(request.method, request.url, key, index, response)
+        except Exception as e:
+            logger.warning(f"Failed to record fixture for {request.url}: {e}")
+        return response
+
+    @staticmethod
+    def _build_response(request: requests.PreparedRequest, meta: Dict[str, Any], body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = meta["status_code"]
+        response.reason = meta.get("reason")
+        response.url = meta.get("url", request.url)
+        response.headers = CaseInsensitiveDict(meta.get("headers", {}))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.cookies = cookiejar_from_dict(meta.get("cookies", {}))
+        response.elapsed = timedelta(milliseconds=meta.get("elapsed_ms", 0.0))
+        response.request = request
+        response._content = body
+        response._content_consumed = True
+        return response
+
+    def install(self) -> "HttpReplay":
+        """Patch ``requests.Session.send`` (no-op when mode is off or already installed)"""
+        if self.mode == MODE_OFF or self._original_send is not None:
+            return self
+        self._original_send = requests.Session.send
+        replay = self
+
+        def send(session, request, **kwargs):
+            return replay._send(session, request, **kwargs)
+
+        send._http_replay = self
+        requests.Session.send = send
+        logger.info(f"HTTP {self.mode} enabled for {', '.join(self.hosts)} (fixtures: {self.store.root})")
+        return self
+
+    def uninstall(self):
+        if self._original_send is not None:
+            requests.Session.send = self._original_send
+            self._original_send = None
+
+    # ---- Selenium / browser artifacts ----
+
+    def save_artifact(self, namespace: str, name: str, data: Union[bytes, str, Any]) -> Optional[Path]:
+        """Record an artifact when recording (returns the path, else None)"""
+        if not self.is_recording:
+            return None
+        try:
+            return self.store.save_artifact(namespace, name, data)
+        except Exception as e:
+            logger.warning(f"Failed to record artifact {namespace}/{name}: {e}")
+            return None
+
+    def load_artifact(self, namespace: str, name: str, as_json: bool = False):
+        """Load a recorded artifact in replay mode; raises ReplayMissError if missing"""
+        data = self.store.load_artifact(namespace, name, as_json=as_json)
+        if data is None:
+            raise ReplayMissError(f"No recorded artifact {namespace}/{name}")
+        self.inject_latency()
+        return data
+
+
+# Singleton instance configured from the environment
+_replay_instance: Optional[HttpReplay] = None
+
+
+def get_http_replay() -> HttpReplay:
+    """Get the process-wide replay controller (configured from the environment)"""
+    global _replay_instance
+    if _replay_instance is None:
+        _replay_instance = HttpReplay.from_env()
+    return _replay_instance
+
+
+def install_http_replay() -> HttpReplay:
+    """Install the env-configured record/replay hook; safe to call from every scraper module"""
+    return get_http_replay().install()
+
+
+@contextmanager
+def http_replay(mode: str, fixture_dir: Union[str, Path], **kwargs):
+    """Temporarily record or replay exchange HTTP traffic within a block"""
+    global _replay_instance
+    previous = _replay_instance
+    if previous is not None:
+        previous.uninstall()
+    replay = HttpReplay(mode=mode, fixture_dir=fixture_dir, **kwargs)
+    _replay_instance = replay.install()
+    try:
+        yield replay
+    finally:
+        replay.uninstall()
+        _replay_instance = previous
+        if previous is not None:
+            previous.install()
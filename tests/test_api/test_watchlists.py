@@ -0,0 +1,189 @@
+"""
+Tests for fetch_user_watchlists and _legacy_watchlist_shape in api/app.py.
+
+api/app.py monkey-patches the process with eventlet on import, so the checks
+run in a child interpreter (this file run as ``__main__``) against an
+in-memory PostgREST query builder and a fakeredis-backed watchlist cache.
+The child prints its results as JSON; the tests compare them with the
+per-watchlist queries GET /api/watchlist and the delete/clear endpoints ran
+before fetch_user_watchlists.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+USER_ID = "user-1"
+
+WATCHLIST_NAMES = [
+    {'watchlistid': "wl-1", 'watchlistname': "Banks", 'userid': USER_ID},
+    {'watchlistid': "wl-2", 'watchlistname': "Results", 'userid': USER_ID},
+    {'watchlistid': "wl-3", 'watchlistname': "Empty", 'userid': USER_ID},
+    {'watchlistid': "wl-9", 'watchlistname': "Someone else's", 'userid': "user-2"},
+]
+WATCHLIST_ROWS = [
+    {'watchlistid': "wl-1", 'userid': USER_ID, 'isin': "INE040A01034", 'category': None},
+    {'watchlistid': "wl-1", 'userid': USER_ID, 'isin': "INE090A01021", 'category': None},
+    {'watchlistid': "wl-1", 'userid': USER_ID, 'isin': None, 'category': "Financial Results"},
+    {'watchlistid': "wl-2", 'userid': USER_ID, 'isin': None, 'category': "Board Meeting"},
+    {'watchlistid': "wl-2", 'userid': USER_ID, 'isin': None, 'category': "Dividend"},
+    {'watchlistid': "wl-2", 'userid': USER_ID, 'isin': "INE002A01018", 'category': None},
+    # Another user's rows, and rows of a watchlist without a name row, are never returned
+    {'watchlistid': "wl-9", 'userid': "user-2", 'isin': "INE009A01021", 'category': None},
+    {'watchlistid': "wl-1", 'userid': "user-2", 'isin': "INE009A01021", 'category': None},
+    {'watchlistid': "wl-orphan", 'userid': USER_ID, 'isin': "INE123A01010", 'category': None},
+]
+
+
+class Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class Query:
+    """The subset of the PostgREST query builder the watchlist helpers use"""
+
+    def __init__(self, tables: Dict[str, List[Dict[str, Any]]], table: str):
+        self.rows = tables.get(table, [])
+        self.columns = None
+        self.filters = []
+
+    def select(self, columns: str) -> "Query":
+        self.columns = [column.strip() for column in columns.split(',')]
+        return self
+
+    def eq(self, key, value) -> "Query":
+        self.filters.append(lambda row: row.get(key) == value)
+        return self
+
+    def is_(self, key, value) -> "Query":
+        assert value == 'null'
+        self.filters.append(lambda row: row.get(key) is None)
+        return self
+
+    def execute(self) -> Response:
+        rows = [row for row in self.rows if all(f(row) for f in self.filters)]
+        return Response([{column: row.get(column) for column in self.columns} for row in rows])
+
+
+class FakeSupabase:
+    def __init__(self, tables: Dict[str, List[Dict[str, Any]]]):
+        self.tables = tables
+        self.queries = 0
+
+    def table(self, name: str) -> Query:
+        self.queries += 1
+        return Query(self.tables, name)
+
+
+def per_watchlist_reference(db: FakeSupabase, user_id: str, single_category: bool = False) -> List[Dict[str, Any]]:
+    """What GET /api/watchlist (or, with ``single_category``, delete/clear) built before the helper"""
+    watchlists = []
+    for entry in db.table('watchlistnamedata').select('watchlistid, watchlistname').eq('userid', user_id).execute().data:
+        watchlist_id = entry['watchlistid']
+        isin_rows = db.table('watchlistdata').select('isin') \
+            .eq('watchlistid', watchlist_id).eq('userid', user_id).is_('category', 'null').execute().data
+        cat_rows = db.table('watchlistdata').select('category') \
+            .eq('watchlistid', watchlist_id).eq('userid', user_id).is_('isin', 'null').execute().data
+        isins = [row['isin'] for row in isin_rows]
+        if single_category:
+            watchlists.append({
+                '_id': watchlist_id,
+                'watchlistName': entry['watchlistname'],
+                'category': cat_rows[0]['category'] if cat_rows else None,
+                'isin': isins
+            })
+        else:
+            watchlists.append({
+                '_id': watchlist_id,
+                'watchlistName': entry['watchlistname'],
+                'categories': [row['category'] for row in cat_rows if row['category'] is not None],
+                'isin': isins
+            })
+    return watchlists
+
+
+def run_in_app() -> Dict[str, Any]:
+    """Child process: exercise the helpers inside api/app.py"""
+    from unittest import mock
+
+    import fakeredis
+
+    with mock.patch('sentry_sdk.init'):
+        from api import app as api_app
+    from src.core.cache import RedisCache
+
+    db = FakeSupabase({
+        'watchlistnamedata': [dict(row) for row in WATCHLIST_NAMES],
+        'watchlistdata': [dict(row) for row in WATCHLIST_ROWS],
+    })
+    api_app.supabase = db
+    api_app.watchlist_cache = RedisCache('watchlist', redis_client=fakeredis.FakeRedis(decode_responses=True))
+
+    fetched = api_app.fetch_user_watchlists(USER_ID)
+    fetch_queries = db.queries
+
+    # Served from the cache until a mutation invalidates it
+    db.tables['watchlistdata'].append({'watchlistid': "wl-3", 'userid': USER_ID, 'isin': "INE467B01029", 'category': None})
+    cached = api_app.fetch_user_watchlists(USER_ID)
+    cached_queries = db.queries - fetch_queries
+    api_app.invalidate_user_watchlists(USER_ID)
+    refetched = api_app.fetch_user_watchlists(USER_ID)
+
+    return {
+        'fetched': fetched,
+        'fetch_queries': fetch_queries,
+        'cached': cached,
+        'cached_queries': cached_queries,
+        'refetched': refetched,
+        'legacy': [api_app._legacy_watchlist_shape(watchlist) for watchlist in refetched],
+    }
+
+
+@pytest.fixture(scope="module")
+def app_results(tmp_path_factory):
+    pytest.importorskip("eventlet")
+    pytest.importorskip("fakeredis")
+    env = dict(os.environ, PYTHONPATH=str(ROOT), SUPABASE_URL2="", SUPABASE_KEY2="", SUPABASE_SERVICE_ROLE_KEY="")
+    completed = subprocess.run(
+        [sys.executable, "-m", "tests.test_api.test_watchlists"],
+        cwd=tmp_path_factory.mktemp("api"), env=env, capture_output=True, text=True, timeout=120
+    )
+    assert completed.returncode == 0, completed.stderr[-2000:]
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+@pytest.fixture
+def db():
+    return FakeSupabase({
+        'watchlistnamedata': [dict(row) for row in WATCHLIST_NAMES],
+        'watchlistdata': [dict(row) for row in WATCHLIST_ROWS],
+    })
+
+
+def test_fetch_matches_per_watchlist_queries(app_results, db):
+    assert app_results['fetched'] == per_watchlist_reference(db, USER_ID)
+    assert app_results['fetch_queries'] == 2
+
+
+def test_fetch_is_cached_until_invalidated(app_results, db):
+    assert app_results['cached'] == app_results['fetched']
+    assert app_results['cached_queries'] == 0
+
+    db.tables['watchlistdata'].append({'watchlistid': "wl-3", 'userid': USER_ID, 'isin': "INE467B01029", 'category': None})
+    assert app_results['refetched'] == per_watchlist_reference(db, USER_ID)
+
+
+def test_legacy_shape_matches_single_category_responses(app_results, db):
+    db.tables['watchlistdata'].append({'watchlistid': "wl-3", 'userid': USER_ID, 'isin': "INE467B01029", 'category': None})
+    assert app_results['legacy'] == per_watchlist_reference(db, USER_ID, single_category=True)
+
+
+if __name__ == "__main__":
+    print(json.dumps(run_in_app()))
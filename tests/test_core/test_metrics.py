@@ -0,0 +1,84 @@
+"""
+Tests for MetricsRegistry buffering.
+
+Registries are built with a long flush interval so the background thread never
+fires during a test; ``flush()`` is called explicitly instead.
+"""
+
+from unittest import mock
+
+import pytest
+import redis
+
+from src.core.metrics import COUNTERS_KEY, HISTOGRAMS_KEY, MetricsRegistry
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def registry(client):
+    return MetricsRegistry(redis_client=client, enabled=True, flush_interval=3600)
+
+
+def test_recording_does_not_touch_redis(registry):
+    client = mock.Mock()
+    registry.redis_client = client
+    registry.inc("jobs_total", {"queue": "ai"})
+    registry.observe("job_seconds", 0.3, {"queue": "ai"}, buckets=(0.1, 1.0))
+
+    assert client.method_calls == []
+
+
+def test_flush_aggregates_observations(registry, client):
+    registry.inc("jobs_total", {"queue": "ai"})
+    registry.inc("jobs_total", {"queue": "ai"}, amount=2)
+    registry.observe("job_seconds", 0.5, {"queue": "ai"}, buckets=(0.1, 1.0))
+    registry.observe("job_seconds", 0.0625, {"queue": "ai"}, buckets=(0.1, 1.0))
+    registry.flush()
+
+    assert client.hgetall(COUNTERS_KEY) == {'jobs_total{queue="ai"}': "3"}
+    assert client.hgetall(HISTOGRAMS_KEY) == {
+        'job_seconds_bucket{queue="ai",le="0.1"}': "1",
+        'job_seconds_bucket{queue="ai",le="1"}': "2",
+        'job_seconds_bucket{queue="ai",le="+Inf"}': "2",
+        'job_seconds_count{queue="ai"}': "2",
+        'job_seconds_sum{queue="ai"}': "0.5625",
+    }
+
+    # The buffer is emptied, so a second flush adds nothing
+    registry.flush()
+    assert client.hget(COUNTERS_KEY, 'jobs_total{queue="ai"}') == "3"
+
+
+def test_render_includes_unflushed_observations(registry):
+    registry.inc("jobs_total", {"queue": "ai"})
+    assert 'jobs_total{queue="ai"} 1' in registry.render()
+
+
+def test_failed_flush_backs_off(registry):
+    client = mock.Mock()
+    client.pipeline.return_value.execute.side_effect = redis.ConnectionError("down")
+    registry.redis_client = client
+
+    registry.inc("jobs_total")
+    registry.flush()
+    registry.inc("jobs_total")
+    registry.flush()
+
+    # The second batch is dropped without another round trip
+    assert client.pipeline.call_count == 1
+    assert registry._counters == {}
+
+
+def test_disabled_registry_buffers_nothing(client):
+    registry = MetricsRegistry(redis_client=client, enabled=False, flush_interval=3600)
+    registry.inc("jobs_total")
+    registry.observe("job_seconds", 1.0)
+    registry.flush()
+
+    assert client.keys("*") == []
@@ -0,0 +1,59 @@
+"""
+Tests for JobTracer's Redis down-backoff.
+"""
+
+from unittest import mock
+
+import redis
+
+from src.core.tracing import TraceStage, JobTracer
+
+
+def unreachable_client() -> mock.Mock:
+    client = mock.Mock()
+    client.pipeline.return_value.execute.side_effect = redis.ConnectionError("down")
+    client.hget.side_effect = redis.ConnectionError("down")
+    return client
+
+
+def test_record_skips_redis_after_connection_error():
+    client = unreachable_client()
+    tracer = JobTracer(redis_client=client, enabled=True)
+
+    tracer.record("corp-1", TraceStage.ENQUEUE)
+    tracer.record("corp-2", TraceStage.ENQUEUE)
+
+    assert client.pipeline.call_count == 1
+
+
+def test_record_wait_skips_redis_after_connection_error():
+    client = unreachable_client()
+    tracer = JobTracer(redis_client=client, enabled=True)
+
+    tracer.record_wait("corp-1", TraceStage.DEQUEUE, since_stage=TraceStage.ENQUEUE)
+    tracer.record_wait("corp-2", TraceStage.DEQUEUE, since_stage=TraceStage.ENQUEUE)
+
+    assert client.hget.call_count == 1
+    assert client.pipeline.call_count == 0
+
+
+def test_redis_is_retried_after_the_backoff():
+    client = unreachable_client()
+    tracer = JobTracer(redis_client=client, enabled=True)
+    tracer.record("corp-1", TraceStage.ENQUEUE)
+
+    with mock.patch("src.core.tracing.time.monotonic", return_value=tracer._redis_retry_at + 1):
+        tracer.record("corp-2", TraceStage.ENQUEUE)
+
+    assert client.pipeline.call_count == 2
+
+
+def test_other_errors_do_not_back_off():
+    client = mock.Mock()
+    client.pipeline.return_value.execute.side_effect = redis.ResponseError("WRONGTYPE")
+    tracer = JobTracer(redis_client=client, enabled=True)
+
+    tracer.record("corp-1", TraceStage.ENQUEUE)
+    tracer.record("corp-2", TraceStage.ENQUEUE)
+
+    assert client.pipeline.call_count == 2
@@ -0,0 +1,240 @@
+"""
+Tests for scripts/send_daily_digest.py.
+
+The script is loaded against an in-memory stand-in for the Supabase client
+and a fake ``resend`` module, so planning, rendering and bookkeeping run
+without network access. The expected HTML files were rendered by the
+per-user implementation the set-based script replaced.
+"""
+
+import datetime
+import importlib.util
+import sys
+import types
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+DATA = Path(__file__).parent / "data"
+TARGET_DATE = datetime.date(2026, 10, 18)
+
+
+class FixedDate(datetime.date):
+    @classmethod
+    def today(cls):
+        return cls(2026, 10, 18)
+
+
+class Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class Query:
+    """The subset of the PostgREST query builder the script uses"""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.bounds = None
+        self.update_values = None
+        self.insert_rows = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, key, value):
+        self.filters.append(lambda row: row.get(key) == value)
+        return self
+
+    def in_(self, key, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(key) in values)
+        return self
+
+    def order(self, key):
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def update(self, values):
+        self.update_values = values
+        return self
+
+    def insert(self, rows):
+        self.insert_rows = rows
+        return self
+
+    def execute(self):
+        table = self.db.tables.setdefault(self.table, [])
+        if self.insert_rows is not None:
+            table.extend(self.insert_rows)
+            return Response(self.insert_rows)
+        rows = [row for row in table if all(f(row) for f in self.filters)]
+        if self.update_values is not None:
+            for row in rows:
+                row.update(self.update_values)
+            self.db.updates.append((self.table, [row['id'] for row in rows]))
+            return Response(rows)
+        if self.bounds:
+            rows = rows[self.bounds[0]:self.bounds[1] + 1]
+        return Response([dict(row) for row in rows])
+
+
+class FakeSupabase:
+    def __init__(self, tables=None):
+        self.tables = tables or {}
+        self.updates = []
+
+    def table(self, name):
+        return Query(self, name)
+
+
+@pytest.fixture(scope="module")
+def digest(tmp_path_factory):
+    pytest.importorskip("resend")
+    env = {
+        'SUPABASE_URL2': 'http://localhost',
+        'SUPABASE_KEY2': 'test-key',
+        'RESEND_API_KEY': 'test-key',
+        'DIGEST_LOG_DIR': str(tmp_path_factory.mktemp("logs")),
+    }
+    spec = importlib.util.spec_from_file_location("send_daily_digest", ROOT / "scripts" / "send_daily_digest.py")
+    module = importlib.util.module_from_spec(spec)
+    with mock.patch.dict('os.environ', env), mock.patch('supabase.create_client', return_value=FakeSupabase()):
+        spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def db(digest, monkeypatch):
+    fake = FakeSupabase()
+    monkeypatch.setattr(digest, 'supabase', fake)
+    monkeypatch.setattr(digest, 'date', FixedDate)
+    monkeypatch.setattr(digest, 'SEND_RATE_PER_SECOND', 0)
+    monkeypatch.setattr(digest, 'SEND_CONCURRENCY', 1)
+    return fake
+
+
+class SentEmails(list):
+    """Emails passed to the fake resend module; set ``fail_after`` to kill the run after that many"""
+    fail_after = None
+
+    def send(self, params):
+        if self.fail_after is not None and len(self) >= self.fail_after:
+            raise SystemExit("killed")
+        self.append(params)
+        return {'id': f"msg-{len(self)}"}
+
+
+@pytest.fixture
+def sent_emails(monkeypatch):
+    emails = SentEmails()
+    fake = types.SimpleNamespace(api_key=None, Emails=types.SimpleNamespace(send=emails.send))
+    monkeypatch.setitem(sys.modules, 'resend', fake)
+    return emails
+
+
+ANNOUNCEMENTS = [
+    {'corp_id': 'c1', 'isin': 'INE001', 'symbol': 'ACME', 'companyname': 'Acme Ltd',
+     'summary': 'Board approved results & dividend <b>5%</b>', 'ai_summary': 'x',
+     'category': 'Financial Results', 'date': '2026-10-18', 'fileurl': 'https://x/a.pdf'},
+    {'corp_id': 'c2', 'isin': 'INE001', 'symbol': 'ACME', 'companyname': 'Acme Ltd',
+     'summary': 'S' * 350, 'ai_summary': '',
+     'category': 'Board Meeting', 'date': '2026-10-18', 'fileurl': 'https://x/b.pdf'},
+    {'corp_id': 'c3', 'isin': 'INE002', 'symbol': None, 'companyname': 'Beta Corp',
+     'category': 'Press Release', 'date': '2026-10-17', 'fileurl': 'https://x/c.pdf'},
+]
+
+
+@pytest.mark.parametrize('announcements, total, expected_file', [
+    (ANNOUNCEMENTS, 3, 'digest_expected.html'),
+    (ANNOUNCEMENTS[2:], 1, 'digest_single_expected.html'),
+])
+def test_digest_html_matches_previous_renderer(digest, db, announcements, total, expected_file):
+    grouped = digest.group_announcements_by_company(announcements)
+    html = digest.generate_combined_digest_html(grouped, 'user@example.com', total)
+    assert html == (DATA / expected_file).read_text()
+
+
+def test_company_sections_are_rendered_once_per_run(digest, db):
+    grouped = digest.group_announcements_by_company(ANNOUNCEMENTS)
+    cache = {}
+    first = digest.generate_combined_digest_html(grouped, 'a@example.com', 3, cache)
+    second = digest.generate_combined_digest_html(grouped, 'b@example.com', 3, cache)
+    assert first == second
+    assert set(cache) == {('c1', 'c2'), ('c3',)}
+
+
+def seed(db, users):
+    """users: user_id -> (email or None, corp_ids, preferences or None)"""
+    db.tables['corporatefilings'] = [dict(a) for a in ANNOUNCEMENTS]
+    db.tables['UserData'] = [{'UserID': uid, 'emailID': email} for uid, (email, _, _) in users.items() if email]
+    db.tables['user_notification_preferences'] = [
+        {'user_id': uid, **prefs} for uid, (_, _, prefs) in users.items() if prefs
+    ]
+    db.tables['user_notification_queue'] = [
+        {'id': f"{uid}-{corp_id}", 'user_id': uid, 'corp_id': corp_id,
+         'notification_date': TARGET_DATE.isoformat(), 'is_processed': False}
+        for uid, (_, corp_ids, _) in users.items() for corp_id in corp_ids
+    ]
+
+
+def test_build_digests_plans_each_user(digest, db):
+    seed(db, {
+        'u-send': ('send@example.com', ['c1', 'c2', 'c3'], None),
+        'u-off': ('off@example.com', ['c1'], {'email_enabled': False}),
+        'u-min': ('min@example.com', ['c1'], {'email_enabled': True, 'minimum_announcements': 3}),
+        'u-noemail': (None, ['c3'], None),
+        'u-missing': ('missing@example.com', ['gone'], None),
+    })
+    digests, outcomes = digest.build_digests(TARGET_DATE)
+
+    assert [d['user_id'] for d in digests] == ['u-send']
+    planned = digests[0]
+    assert planned['announcement_count'] == 3
+    assert list(planned['grouped']) == ['INE001', 'INE002']
+    assert sorted(planned['notification_ids']) == ['u-send-c1', 'u-send-c2', 'u-send-c3']
+
+    statuses = {o['user_id']: (o['status'], o['reason']) for o in outcomes}
+    assert statuses['u-off'] == ('skipped', "User has disabled email notifications")
+    assert statuses['u-min'][0] == 'skipped'
+    assert statuses['u-noemail'] == ('failed', 'No user info')
+    assert statuses['u-missing'] == ('failed', 'No announcement details')
+
+
+def test_run_digest_marks_sent_and_skipped_rows(digest, db, sent_emails):
+    seed(db, {
+        'u1': ('one@example.com', ['c1', 'c3'], None),
+        'u2': ('two@example.com', ['c2'], {'email_enabled': False}),
+        'u3': ('three@example.com', ['gone'], None),
+    })
+    counts = digest.run_digest(TARGET_DATE)
+
+    assert counts == {'sent': 1, 'skipped': 1, 'failed': 1}
+    assert [email['to'] for email in sent_emails] == [['one@example.com']]
+    processed = {row['id'] for row in db.tables['user_notification_queue'] if row['is_processed']}
+    assert processed == {'u1-c1', 'u1-c3', 'u2-c2'}
+    logged = {row['user_id']: row['status'] for row in db.tables['user_email_digest_log']}
+    assert logged == {'u1': 'sent', 'u2': 'skipped'}
+
+
+def test_interrupted_run_keeps_already_sent_digests_processed(digest, db, sent_emails, monkeypatch):
+    monkeypatch.setattr(digest, 'RECORD_BATCH_SIZE', 2)
+    seed(db, {f"u{n}": (f"user{n}@example.com", ['c1'], None) for n in range(7)})
+    sent_emails.fail_after = 4
+
+    with pytest.raises(SystemExit):
+        digest.run_digest(TARGET_DATE)
+
+    sent_to = {email['to'][0] for email in sent_emails}
+    processed_users = {row['user_id'] for row in db.tables['user_notification_queue'] if row['is_processed']}
+    assert len(sent_to) == 4
+    assert processed_users == {f"u{n}" for n in range(7) if f"user{n}@example.com" in sent_to}
+    # Marked as the batches finished, not once at the end
+    assert len(db.updates) == 2
@@ -0,0 +1,168 @@
+"""
+Tests for AnnouncementCoalescer.
+
+The notifier is replaced by a fake whose rate limiter only hands out a slot
+when the test opens it, so announcements can be queued behind a pending
+delivery deterministically.
+"""
+
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from src.services.telegram.telegram_notifier import (
+    MAX_COALESCED_ANNOUNCEMENTS,
+    AnnouncementCoalescer,
+    NotificationResult,
+)
+
+CHAT_ID = 1001
+ISIN = "INE000A01010"
+
+
+class GatedRateLimiter:
+    def __init__(self):
+        self.slot_open = asyncio.Event()
+        self.waiting = 0
+
+    async def acquire(self, chat_id: int) -> None:
+        self.waiting += 1
+        await self.slot_open.wait()
+
+
+class RecordingRecorder:
+    def __init__(self):
+        self.records: List[tuple] = []
+
+    def record(self, log_row: Dict[str, Any], result: NotificationResult, count_message: bool = True) -> None:
+        self.records.append((log_row, result, count_message))
+
+
+class FakeNotifier:
+    def __init__(self):
+        self.rate_limiter = GatedRateLimiter()
+        self.recorder = RecordingRecorder()
+        self.sent: List[tuple] = []
+        self.send_error = None
+
+    def format_coalesced_message(self, announcements: List[Dict[str, Any]]) -> str:
+        return " + ".join(a['message'] for a in announcements)
+
+    def build_log_row(self, **fields) -> Dict[str, Any]:
+        return fields
+
+    async def send_notification(self, chat_id: int, message: str, slot_acquired: bool = False) -> NotificationResult:
+        assert slot_acquired
+        if self.send_error:
+            raise self.send_error
+        self.sent.append((chat_id, message))
+        return NotificationResult(success=True, telegram_message_id=len(self.sent))
+
+
+def announcement(n: int) -> Dict[str, Any]:
+    return {'corp_id': f"corp-{n}", 'company_name': "Acme Ltd", 'category': "Board Meeting", 'message': f"filing {n}"}
+
+
+@pytest.fixture
+def notifier():
+    return FakeNotifier()
+
+
+@pytest.fixture
+def coalescer(notifier):
+    return AnnouncementCoalescer(notifier, window_seconds=0)
+
+
+async def start_deliveries(coalescer, count: int, isin: str = ISIN) -> List[asyncio.Task]:
+    slots = asyncio.Semaphore(10)
+    tasks = []
+    for n in range(count):
+        tasks.append(asyncio.create_task(coalescer.deliver(CHAT_ID, "user-1", isin, announcement(n), slots)))
+        await asyncio.sleep(0)  # Let each delivery open or join before the next
+    return tasks
+
+
+@pytest.mark.asyncio
+async def test_burst_is_sent_as_one_message(coalescer, notifier):
+    tasks = await start_deliveries(coalescer, 3)
+    notifier.rate_limiter.slot_open.set()
+    results = await asyncio.gather(*tasks)
+
+    assert notifier.sent == [(CHAT_ID, "filing 0 + filing 1 + filing 2")]
+    assert all(result is results[0] for result in results)
+    assert results[0].success
+
+    # One log row per announcement, but the message is counted once
+    assert [row['corp_id'] for row, _, _ in notifier.recorder.records] == ["corp-0", "corp-1", "corp-2"]
+    assert [counted for _, _, counted in notifier.recorder.records] == [True, False, False]
+    assert not coalescer._pending
+
+
+@pytest.mark.asyncio
+async def test_full_delivery_starts_a_new_message(coalescer, notifier):
+    tasks = await start_deliveries(coalescer, MAX_COALESCED_ANNOUNCEMENTS + 2)
+    assert notifier.rate_limiter.waiting == 2
+
+    notifier.rate_limiter.slot_open.set()
+    results = await asyncio.gather(*tasks)
+
+    assert len(notifier.sent) == 2
+    first_message = " + ".join(f"filing {n}" for n in range(MAX_COALESCED_ANNOUNCEMENTS))
+    second_message = " + ".join(f"filing {n}" for n in range(MAX_COALESCED_ANNOUNCEMENTS, MAX_COALESCED_ANNOUNCEMENTS + 2))
+    assert sorted(message for _, message in notifier.sent) == sorted([first_message, second_message])
+    assert len({id(result) for result in results}) == 2
+
+
+@pytest.mark.asyncio
+async def test_different_isins_are_not_merged(coalescer, notifier):
+    tasks = await start_deliveries(coalescer, 1) + await start_deliveries(coalescer, 1, isin="INE999Z01019")
+    notifier.rate_limiter.slot_open.set()
+    await asyncio.gather(*tasks)
+
+    assert len(notifier.sent) == 2
+
+
+@pytest.mark.asyncio
+async def test_joiners_get_the_owners_failure(coalescer, notifier):
+    notifier.send_error = RuntimeError("network down")
+    tasks = await start_deliveries(coalescer, 3)
+    notifier.rate_limiter.slot_open.set()
+    results = await asyncio.gather(*tasks)
+
+    assert all(result is results[0] for result in results)
+    assert not results[0].success
+    assert results[0].status == 'failed'
+    assert "network down" in results[0].error_message
+    assert not coalescer._pending
+
+
+@pytest.mark.asyncio
+async def test_cancelled_owner_cancels_joiners(coalescer, notifier):
+    owner, *joiners = await start_deliveries(coalescer, 3)
+    owner.cancel()
+    outcomes = await asyncio.gather(owner, *joiners, return_exceptions=True)
+
+    assert all(isinstance(outcome, asyncio.CancelledError) for outcome in outcomes)
+    assert notifier.sent == []
+    assert not coalescer._pending
+
+    # The next announcement opens a fresh delivery
+    notifier.rate_limiter.slot_open.set()
+    retry, = await start_deliveries(coalescer, 1)
+    assert (await retry).success
+    assert notifier.sent == [(CHAT_ID, "filing 0")]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_joiner_does_not_cancel_the_delivery(coalescer, notifier):
+    owner, joiner = await start_deliveries(coalescer, 2)
+    joiner.cancel()
+    notifier.rate_limiter.slot_open.set()
+
+    result = await owner
+    with pytest.raises(asyncio.CancelledError):
+        await joiner
+
+    assert result.success
+    assert notifier.sent == [(CHAT_ID, "filing 0 + filing 1")]
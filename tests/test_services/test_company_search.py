@@ -0,0 +1,59 @@
+"""
+Tests for CompanySearchIndex result memoization.
+"""
+
+from unittest import mock
+
+import pytest
+
+from src.services import company_search
+from src.services.company_search import SEARCH_MAX_LIMIT, CompanySearchIndex
+
+COMPANY_COUNT = SEARCH_MAX_LIMIT + 50
+
+
+def rows():
+    return [
+        {'newname': f"Acme Industries {n:03d}", 'newnsecode': f"ACME{n:03d}", 'isin': f"INE{n:03d}A01010"}
+        for n in range(COMPANY_COUNT)
+    ]
+
+
+@pytest.fixture
+def index():
+    with mock.patch.object(company_search, 'get_cache_redis', return_value=None):
+        index = CompanySearchIndex(rows)
+        assert index.build()
+        yield index
+
+
+def test_memo_keeps_only_the_largest_page(index):
+    first, total = index.search("acme", limit=20)
+    assert total == COMPANY_COUNT
+
+    version, top_ids, memo_total = index._results.get("acme")
+    assert len(top_ids) == SEARCH_MAX_LIMIT
+    assert memo_total == COMPANY_COUNT
+
+    # A later, larger page is served from the same memo entry
+    page, total = index.search("acme", limit=SEARCH_MAX_LIMIT)
+    assert total == COMPANY_COUNT
+    assert page[:20] == first
+    assert len(page) == SEARCH_MAX_LIMIT
+
+
+def test_limit_above_the_memo_is_computed_directly(index):
+    page, total = index.search("acme", limit=COMPANY_COUNT)
+    assert len(page) == total == COMPANY_COUNT
+    assert index._results.get("acme") is None
+
+
+def test_rebuild_invalidates_memo(index):
+    index.search("acme", limit=5)
+    index.loader = lambda: rows()[:3]
+    with mock.patch.object(company_search, 'get_cache_redis', return_value=None):
+        assert index.build()
+
+    page, total = index.search("acme", limit=5)
+    assert total == 3
+    assert len(page) == 3
@@ -0,0 +1,131 @@
+"""
+Tests for TelegramRateLimiter scheduling.
+
+Sends are simulated on a fake clock: each pending send calls ``reserve`` at its
+current time and either records its send time or retries when told the chat
+is still busy.
+"""
+
+import heapq
+from unittest import mock
+
+import pytest
+
+from src.services.telegram.rate_limiter import GLOBAL_KEY, TelegramRateLimiter
+
+GLOBAL_RATE = 28
+SUBSCRIBERS = 100
+
+
+class FakeClock:
+    def __init__(self, start: float = 1_000_000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def simulate(limiter: TelegramRateLimiter, clock: FakeClock, chat_ids):
+    """Run every send to completion; returns [(send_time, chat_id)] relative to the start"""
+    start = clock.now
+    pending = [(start, seq, chat_id) for seq, chat_id in enumerate(chat_ids)]
+    heapq.heapify(pending)
+    sends = []
+    seq = len(chat_ids)
+    while pending:
+        at, _, chat_id = heapq.heappop(pending)
+        clock.now = at
+        reserved, wait = limiter.reserve(chat_id)
+        if reserved:
+            sends.append((at + wait - start, chat_id))
+        else:
+            assert wait > 0
+            heapq.heappush(pending, (at + wait, seq, chat_id))
+            seq += 1
+    return sorted(sends)
+
+
+def interleaved_jobs():
+    """Two jobs for the same announcement burst, fanned out to the same subscribers"""
+    return [chat_id for chat_id in range(SUBSCRIBERS) for _ in range(2)]
+
+
+def assert_within_limits(sends, limiter):
+    times = [t for t, _ in sends]
+    global_gap = limiter.global_interval_ms / 1000
+    for earlier, later in zip(times, times[1:]):
+        assert later - earlier >= global_gap - 0.002
+
+    by_chat = {}
+    for t, chat_id in sends:
+        by_chat.setdefault(chat_id, []).append(t)
+    chat_gap = limiter.chat_interval_ms / 1000
+    for chat_times in by_chat.values():
+        for earlier, later in zip(chat_times, chat_times[1:]):
+            assert later - earlier >= chat_gap - 0.002
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def local_limiter(clock):
+    limiter = TelegramRateLimiter(global_rate=GLOBAL_RATE)
+    limiter._redis_retry_at = float('inf')  # Always use the in-process buckets
+    with mock.patch('src.services.telegram.rate_limiter.time.monotonic', clock):
+        yield limiter
+
+
+@pytest.fixture
+def redis_limiter(clock):
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    client = fakeredis.FakeRedis(decode_responses=True)
+    limiter = TelegramRateLimiter(global_rate=GLOBAL_RATE, redis_client=client)
+    # Redis TIME in the Lua script follows the fake clock
+    with mock.patch('time.time', clock):
+        yield limiter
+
+
+@pytest.mark.parametrize('limiter_fixture', ['local_limiter', 'redis_limiter'])
+def test_repeat_chat_sends_do_not_hold_back_other_chats(limiter_fixture, request):
+    limiter = request.getfixturevalue(limiter_fixture)
+    sends = simulate(limiter, request.getfixturevalue('clock'), interleaved_jobs())
+
+    assert len(sends) == 2 * SUBSCRIBERS
+    assert_within_limits(sends, limiter)
+    # 200 sends at 28/s take about 7.1s when only the bot-wide limit binds
+    assert sends[-1][0] < 2 * SUBSCRIBERS / GLOBAL_RATE + 0.5
+
+
+@pytest.mark.parametrize('limiter_fixture', ['local_limiter', 'redis_limiter'])
+def test_busy_chat_is_not_given_a_global_slot(limiter_fixture, request):
+    limiter = request.getfixturevalue(limiter_fixture)
+
+    assert limiter.reserve(1) == (True, 0.0)
+    reserved, wait = limiter.reserve(1)
+    assert not reserved
+    assert wait == pytest.approx(1.0, abs=0.002)
+
+    # The refused reservation left the bot-wide bucket alone
+    reserved, wait = limiter.reserve(2)
+    assert reserved
+    assert wait == pytest.approx(limiter.global_interval_ms / 1000, abs=0.002)
+
+
+def test_redis_reservations_are_shared_between_limiters(clock):
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    server = fakeredis.FakeServer()
+    first = TelegramRateLimiter(global_rate=GLOBAL_RATE, redis_client=fakeredis.FakeRedis(server=server, decode_responses=True))
+    second = TelegramRateLimiter(global_rate=GLOBAL_RATE, redis_client=fakeredis.FakeRedis(server=server, decode_responses=True))
+
+    with mock.patch('time.time', clock):
+        assert first.reserve(1) == (True, 0.0)
+        assert second.reserve(1)[0] is False
+        reserved, wait = second.reserve(2)
+        assert reserved
+        assert wait == pytest.approx(first.global_interval_ms / 1000, abs=0.002)
+        assert first.redis_client.exists(GLOBAL_KEY)
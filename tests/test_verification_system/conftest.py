@@ -0,0 +1,165 @@
+"""
+Shared setup for the verification service tests.
+
+The service runs from its own directory (``from config import settings``), so
+it is imported with that directory first on sys.path (the repo root has its
+own ``config`` package) and the settings it requires get placeholder values;
+nothing connects to Supabase or Redis during the tests.
+"""
+
+import os
+import sys
+import importlib
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+VERIFICATION_DIR = Path(__file__).resolve().parents[2] / "verification_system"
+SERVICE_MODULES = ("config", "database", "auth", "pdf_cache", "prompts", "task_stream", "app")
+
+os.environ.setdefault("SUPABASE_URL2", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test.stub.key")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+
+
+class APIError(Exception):
+    """PostgREST error carrying a Postgres SQLSTATE, like postgrest.exceptions.APIError"""
+
+    def __init__(self, message: str, code: str):
+        super().__init__(message)
+        self.code = code
+
+
+class Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class Query:
+    """The subset of the PostgREST query builder the service uses"""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.negate_next = False
+        self.update_values = None
+        self.upsert_rows = None
+        self.row_limit = None
+
+    @property
+    def not_(self) -> "Query":
+        self.negate_next = True
+        return self
+
+    def _filter(self, predicate) -> "Query":
+        if self.negate_next:
+            self.negate_next = False
+            self.filters.append(lambda row: not predicate(row))
+        else:
+            self.filters.append(predicate)
+        return self
+
+    def select(self, *columns) -> "Query":
+        return self
+
+    def eq(self, key, value) -> "Query":
+        return self._filter(lambda row: row.get(key) == value)
+
+    def lt(self, key, value) -> "Query":
+        return self._filter(lambda row: row.get(key) is not None and row[key] < value)
+
+    def is_(self, key, value) -> "Query":
+        assert value == "null"
+        return self._filter(lambda row: row.get(key) is None)
+
+    def in_(self, key, values) -> "Query":
+        values = set(values)
+        return self._filter(lambda row: row.get(key) in values)
+
+    def order(self, key, desc=False) -> "Query":
+        return self
+
+    def limit(self, count) -> "Query":
+        self.row_limit = count
+        return self
+
+    def update(self, values) -> "Query":
+        self.update_values = values
+        return self
+
+    def upsert(self, rows, on_conflict: str, ignore_duplicates: bool = False) -> "Query":
+        assert ignore_duplicates, "only insert-or-skip upserts are modelled"
+        self.upsert_rows = (rows, on_conflict)
+        return self
+
+    def _upsert(self) -> Response:
+        rows, key = self.upsert_rows
+        if self.db.upsert_error is not None:
+            error = self.db.upsert_error(rows)
+            if error is not None:
+                raise error
+        table = self.db.tables.setdefault(self.table, [])
+        existing = {row[key] for row in table}
+        inserted = [dict(row, id=f"task-{len(table) + n}") for n, row in enumerate(r for r in rows if r[key] not in existing)]
+        table.extend(inserted)
+        return Response(inserted)
+
+    def execute(self) -> Response:
+        self.db.executed.append(self.table)
+        if self.upsert_rows is not None:
+            return self._upsert()
+        rows = [row for row in self.db.tables.setdefault(self.table, []) if all(f(row) for f in self.filters)]
+        if self.update_values is not None:
+            for row in rows:
+                row.update(self.update_values)
+        if self.row_limit is not None:
+            rows = rows[:self.row_limit]
+        return Response([dict(row) for row in rows])
+
+
+class FakeSupabase:
+    def __init__(self, tables: Dict[str, List[Dict[str, Any]]] = None):
+        self.tables = tables or {}
+        self.executed: List[str] = []
+        self.rpc_results: Dict[str, Any] = {}
+        # rows -> exception to raise from an upsert, or None to let it through
+        self.upsert_error = None
+
+    def table(self, name: str) -> Query:
+        return Query(self, name)
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> Query:
+        rpc = Query(self, f"rpc:{name}")
+        rpc.execute = lambda: self._call(name)
+        return rpc
+
+    def _call(self, name: str) -> Response:
+        self.executed.append(f"rpc:{name}")
+        return Response(self.rpc_results.get(name))
+
+
+@pytest.fixture(scope="session")
+def verification_modules() -> Dict[str, Any]:
+    """The service's modules by name (``app``, ``auth``, ``task_stream``, ...)"""
+    shadowed = {name: sys.modules.pop(name) for name in SERVICE_MODULES if name in sys.modules}
+    sys.path.insert(0, str(VERIFICATION_DIR))
+    try:
+        importlib.import_module("app")
+        return {name: sys.modules[name] for name in SERVICE_MODULES if name in sys.modules}
+    finally:
+        sys.path.remove(str(VERIFICATION_DIR))
+        for name in SERVICE_MODULES:
+            sys.modules.pop(name, None)
+        sys.modules.update(shadowed)
+
+
+@pytest.fixture(scope="session")
+def verification_app(verification_modules):
+    return verification_modules["app"]
+
+
+@pytest.fixture
+def supabase() -> FakeSupabase:
+    return FakeSupabase()
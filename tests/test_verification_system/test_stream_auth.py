@@ -0,0 +1,81 @@
+"""
+Tests for the single-use tickets that authenticate /tasks/events.
+"""
+
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException
+
+TOKEN = "access.token.value"
+VERIFIER = dict(email="verifier@example.com", user_id="user-1", role="verifier", session_id="session-1")
+
+
+@pytest.fixture
+def auth(verification_modules, monkeypatch):
+    auth = verification_modules["auth"]
+
+    def authenticate_token(token, supabase):
+        if token != TOKEN:
+            raise HTTPException(status_code=401, detail="Session expired or invalid")
+        return auth.TokenData(**VERIFIER)
+
+    monkeypatch.setattr(auth, "authenticate_token", authenticate_token)
+    monkeypatch.setattr(auth, "stream_tickets", auth.StreamTicketStore(ttl_seconds=30))
+    return auth
+
+
+@pytest.fixture
+def client(verification_app, auth, supabase, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(verification_app, "stream_tickets", auth.stream_tickets)
+    verification_app.app.dependency_overrides[verification_app.get_db] = lambda: supabase
+    yield TestClient(verification_app.app)
+    verification_app.app.dependency_overrides.clear()
+
+
+def test_ticket_is_single_use(auth):
+    ticket = auth.stream_tickets.issue(TOKEN)
+
+    assert auth.stream_tickets.redeem(ticket) == TOKEN
+    assert auth.stream_tickets.redeem(ticket) is None
+
+
+def test_ticket_expires(auth):
+    ticket = auth.stream_tickets.issue(TOKEN)
+    expired = auth.time.monotonic() + 31
+
+    with mock.patch.object(auth.time, "monotonic", return_value=expired):
+        assert auth.stream_tickets.redeem(ticket) is None
+
+
+def test_tokens_are_not_kept_under_the_ticket(auth):
+    ticket = auth.stream_tickets.issue(TOKEN)
+
+    assert ticket not in auth.stream_tickets._tickets
+
+
+def test_stream_opens_once_per_ticket(client, verification_app):
+    response = client.post(f"{verification_app.settings.API_PREFIX}/tasks/events/ticket",
+                           headers={"Authorization": f"Bearer {TOKEN}"})
+    assert response.status_code == 200
+    ticket = response.json()["ticket"]
+    assert TOKEN not in ticket
+
+    events_url = f"{verification_app.settings.API_PREFIX}/tasks/events"
+    # Authenticated; the stream itself is disabled without TASK_STREAM_ENABLED
+    assert client.get(events_url, params={"ticket": ticket}).status_code == 503
+    assert client.get(events_url, params={"ticket": ticket}).status_code == 401
+
+
+def test_access_token_query_parameter_is_not_accepted(client, verification_app):
+    response = client.get(f"{verification_app.settings.API_PREFIX}/tasks/events", params={"access_token": TOKEN})
+
+    assert response.status_code == 401
+
+
+def test_ticket_needs_a_bearer_token(client, verification_app):
+    response = client.post(f"{verification_app.settings.API_PREFIX}/tasks/events/ticket")
+
+    assert response.status_code in (401, 403)
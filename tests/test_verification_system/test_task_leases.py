@@ -0,0 +1,82 @@
+"""
+Tests for returning expired task leases to the queue outside /tasks/lease.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+VERIFIER = dict(email="verifier@example.com", user_id="user-1", role="verifier", session_id="session-1")
+
+
+def lease(task_id: str, expires_in: float = None, status: str = "in_progress") -> dict:
+    expires_at = None
+    if expires_in is not None:
+        expires_at = (datetime.now(timezone.utc) + timedelta(seconds=expires_in)).isoformat()
+    return {
+        'id': task_id, 'status': status, 'assigned_to_user': "user-2", 'assigned_to_session': "session-2",
+        'assigned_at': "2026-10-18T00:00:00", 'lease_expires_at': expires_at,
+    }
+
+
+@pytest.fixture
+def app(verification_app, monkeypatch):
+    monkeypatch.setattr(verification_app, '_lease_swept_at', 0.0)
+    return verification_app
+
+
+@pytest.fixture
+def verifier(app):
+    return app.TokenData(**VERIFIER)
+
+
+def statuses(supabase) -> dict:
+    return {row['id']: row['status'] for row in supabase.tables['verification_tasks']}
+
+
+def test_sweep_releases_only_expired_leases(app, supabase):
+    supabase.tables['verification_tasks'] = [
+        lease("expired", expires_in=-60),
+        lease("live", expires_in=600),
+        lease("claimed"),  # /tasks/claim, no lease
+        lease("done", expires_in=-60, status="verified"),
+    ]
+
+    assert app.sweep_expired_task_leases(supabase) == 1
+
+    assert statuses(supabase) == {'expired': "queued", 'live': "in_progress", 'claimed': "in_progress", 'done': "verified"}
+    expired = supabase.tables['verification_tasks'][0]
+    assert expired['assigned_to_session'] is None
+    assert expired['lease_expires_at'] is None
+
+
+def test_sweep_is_throttled(app, supabase):
+    supabase.tables['verification_tasks'] = [lease("expired", expires_in=-60)]
+    app.sweep_expired_task_leases(supabase)
+    supabase.tables['verification_tasks'].append(lease("expired-later", expires_in=-60))
+
+    assert app.sweep_expired_task_leases(supabase) == 0
+    assert statuses(supabase)['expired-later'] == "in_progress"
+
+
+def test_get_tasks_lists_expired_leases_as_queued(app, supabase, verifier):
+    supabase.tables['verification_tasks'] = [lease("expired", expires_in=-60), lease("live", expires_in=600)]
+
+    result = app.get_tasks(status_filter="queued", limit=50, current_user=verifier, supabase=supabase)
+
+    assert [task['id'] for task in result['tasks']] == ["expired"]
+
+
+def test_claim_task_sweeps_before_claiming(app, supabase, verifier):
+    supabase.tables['verification_tasks'] = [lease("expired", expires_in=-60)]
+
+    result = app.claim_task(current_user=verifier, supabase=supabase)
+
+    assert result['task'] is None
+    assert supabase.executed.index("verification_tasks") < supabase.executed.index("rpc:claim_verification_task")
+    assert statuses(supabase) == {'expired': "queued"}
+
+
+def test_release_needs_a_scope(app, supabase):
+    with pytest.raises(ValueError):
+        app.release_task_leases(supabase)
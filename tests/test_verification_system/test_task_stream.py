@@ -0,0 +1,150 @@
+"""
+Tests for VerificationTaskIngester.process_batch acknowledgement rules.
+
+The stream and consumer group live in fakeredis; the verification_tasks table
+is the in-memory query builder from conftest, with ``upsert_error`` standing
+in for database failures.
+"""
+
+import json
+
+import pytest
+
+from .conftest import APIError
+
+fakeredis = pytest.importorskip("fakeredis")
+
+CONSUMER = "ingester-1"
+
+
+def entry(corp_id: str, **data) -> dict:
+    return {
+        'task_id': f"task-{corp_id}",
+        'announcement_id': corp_id,
+        'original_data': json.dumps({'companyname': f"{corp_id} Ltd", **data}),
+        'created_at': "1760745600000",
+        'priority': "normal",
+    }
+
+
+@pytest.fixture
+def task_stream(verification_modules):
+    return verification_modules["task_stream"]
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def ingester(task_stream, supabase, client):
+    ingester = task_stream.VerificationTaskIngester(supabase, redis_client=client, consumer=CONSUMER)
+    ingester._ensure_group()
+    return ingester
+
+
+def add(ingester, *entries) -> list:
+    return [ingester.redis.xadd(ingester.stream, fields) for fields in entries]
+
+
+def pending_ids(ingester) -> set:
+    return {item['message_id'] for item in ingester.redis.xpending_range(ingester.stream, ingester.group, "-", "+", 100)}
+
+
+def dead_letters(ingester) -> list:
+    return [fields for _, fields in ingester.redis.xrange(ingester.dead_letter_stream)]
+
+
+def stored_corp_ids(supabase) -> list:
+    return [row['corp_id'] for row in supabase.tables.get('verification_tasks', [])]
+
+
+def test_batch_is_inserted_once_and_acknowledged(ingester, supabase):
+    add(ingester, entry("c1"), entry("c2"), entry("c1", headline="reprocessed"))
+
+    inserted, pending = ingester.process_batch(ingester._read_batch())
+
+    assert pending == 0
+    assert sorted(task['corp_id'] for task in inserted) == ["c1", "c2"]
+    # Last entry wins within a batch
+    assert supabase.tables['verification_tasks'][0]['original_data']['headline'] == "reprocessed"
+    assert pending_ids(ingester) == set()
+
+
+def test_malformed_entries_are_dead_lettered(ingester, supabase):
+    bad_id, _ = add(ingester, {'announcement_id': "c1", 'original_data': "not json"}, entry("c2"))
+
+    inserted, pending = ingester.process_batch(ingester._read_batch())
+
+    assert (len(inserted), pending) == (1, 0)
+    assert stored_corp_ids(supabase) == ["c2"]
+    dead, = dead_letters(ingester)
+    assert (dead['source_id'], dead['error']) == (bad_id, "malformed entry")
+    assert pending_ids(ingester) == set()
+
+
+def test_unavailable_database_leaves_the_batch_pending(ingester, supabase):
+    ids = add(ingester, entry("c1"), entry("c2"))
+    supabase.upsert_error = lambda rows: ConnectionError("database unavailable")
+
+    inserted, pending = ingester.process_batch(ingester._read_batch())
+
+    assert (inserted, pending) == ([], 2)
+    assert pending_ids(ingester) == set(ids)
+    assert dead_letters(ingester) == []
+
+
+def test_rejected_rows_are_isolated_from_the_batch(ingester, supabase):
+    ids = add(ingester, entry("c1"), entry("bad"), entry("c3"))
+
+    def reject_bad(rows):
+        if any(row['corp_id'] == "bad" for row in rows):
+            return APIError("value too long", code="22001")
+    supabase.upsert_error = reject_bad
+
+    inserted, pending = ingester.process_batch(ingester._read_batch())
+
+    assert (sorted(task['corp_id'] for task in inserted), pending) == (["c1", "c3"], 0)
+    dead, = dead_letters(ingester)
+    assert dead['source_id'] == ids[1]
+    assert "value too long" in dead['error']
+    assert pending_ids(ingester) == set()
+
+
+def test_transient_error_while_isolating_keeps_only_that_row_pending(ingester, supabase):
+    ids = add(ingester, entry("c1"), entry("bad"), entry("flaky"))
+
+    def fail(rows):
+        corp_ids = {row['corp_id'] for row in rows}
+        if "bad" in corp_ids:
+            return APIError("violates check constraint", code="23514")
+        if "flaky" in corp_ids:
+            return ConnectionError("connection reset")
+    supabase.upsert_error = fail
+
+    inserted, pending = ingester.process_batch(ingester._read_batch())
+
+    assert ([task['corp_id'] for task in inserted], pending) == (["c1"], 1)
+    assert pending_ids(ingester) == {ids[2]}
+    assert [dead['source_id'] for dead in dead_letters(ingester)] == [ids[1]]
+
+
+def test_redelivered_entries_are_acknowledged_without_new_tasks(ingester, supabase):
+    ids = add(ingester, entry("c1"), entry("c2"))
+    supabase.upsert_error = lambda rows: ConnectionError("database unavailable")
+    assert ingester.run_once() == 2
+
+    # The database recovers; the same entries are read again from the pending list
+    supabase.upsert_error = None
+    redelivered = ingester._read_batch()
+    assert [entry_id for entry_id, _ in redelivered] == ids
+    inserted, pending = ingester.process_batch(redelivered)
+    assert (len(inserted), pending) == (2, 0)
+
+    # An entry already stored (e.g. acknowledged too late) is a no-op, but still acknowledged
+    add(ingester, entry("c1"))
+    inserted, pending = ingester.process_batch(ingester._read_batch())
+    assert (inserted, pending) == ([], 0)
+    assert stored_corp_ids(supabase) == ["c1", "c2"]
+    assert pending_ids(ingester) == set()
@@ -1,20 +1,34 @@
 """
 Backfin Verification System API
 Simple Supabase-only verification system for single verifier
-No Redis, no complex queues - just direct database operations
+Direct database operations; Redis is only used by the optional verification
+task stream (task_stream.py, TASK_STREAM_ENABLED)
+
+The Supabase client is synchronous, so every route that touches the database
+is a plain ``def``: FastAPI runs it in the threadpool (``THREADPOOL_SIZE``
+threads) instead of blocking the event loop.
 """
 import logging
 import sys
 import json
 import tempfile
 import os
+import io
+import time
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta,timezone
 from typing import Optional, List
 from pathlib import Path
 
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+import requests
+import anyio.to_thread
+from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr, Field
 
 # Gemini AI imports
@@ -37,6 +51,10 @@ from auth import (
     verify_password,
     create_access_token,
     get_current_user,
+    get_stream_user,
+    session_cache,
+    stream_tickets,
+    security,
     require_admin,
     require_admin_or_verifier,
     AuthToken,
@@ -74,6 +92,25 @@ except ImportError as e:
     STOCKPRICE_HELPER_AVAILABLE = False
     refresh_stock_price_data_by_security_id = None
 
+from pdf_cache import pdf_cache
+
+# Verification task stream ingestion and push (needs redis)
+from task_stream import (
+    REDIS_AVAILABLE,
+    TaskEventHub,
+    TaskEventListener,
+    VerificationTaskIngester,
+)
+
+# Import shared cache invalidation (signals the main API's caches and search index)
+try:
+    sys.path.append(str(Path(__file__).parent.parent))
+    from src.core.cache import invalidate_datasets
+    CACHE_INVALIDATION_AVAILABLE = True
+except ImportError as e:
+    logger.warning(f"⚠️  Could not import cache invalidation: {e}")
+    CACHE_INVALIDATION_AVAILABLE = False
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
@@ -180,7 +217,7 @@ async def health_check():
 # ============================================================================
 
 @app.post(f"{settings.API_PREFIX}/auth/register", response_model=AuthToken)
-async def register(request: RegisterRequest, supabase=Depends(get_db)):
+def register(request: RegisterRequest, supabase=Depends(get_db)):
     """
     Register a new verifier account
     Note: In production, you might want to restrict this or require admin approval
@@ -257,7 +294,7 @@ async def register(request: RegisterRequest, supabase=Depends(get_db)):
 
 
 @app.post(f"{settings.API_PREFIX}/auth/create-admin", response_model=AuthToken)
-async def create_admin(request: CreateAdminRequest, supabase=Depends(get_db)):
+def create_admin(request: CreateAdminRequest, supabase=Depends(get_db)):
     """
     Create a new admin user account
     Note: In production, you should add authentication to restrict who can create admin accounts
@@ -334,7 +371,7 @@ async def create_admin(request: CreateAdminRequest, supabase=Depends(get_db)):
 
 
 @app.post(f"{settings.API_PREFIX}/auth/login", response_model=AuthToken)
-async def login(request: LoginRequest, supabase=Depends(get_db)):
+def login(request: LoginRequest, supabase=Depends(get_db)):
     """
     Login endpoint for verifiers
     Returns JWT token for authentication
@@ -374,6 +411,8 @@ async def login(request: LoginRequest, supabase=Depends(get_db)):
         
         # Invalidate old sessions for this user
         supabase.table("admin_sessions").update({"is_active": False}).eq("user_id", user["id"]).execute()
+        session_cache.invalidate_user(user["id"])
+        release_task_leases(supabase, user_id=user["id"])
         
         # Check if this token already exists (edge case for rapid requests)
         existing_session = supabase.table("admin_sessions").select("*").eq("session_token", access_token).execute()
@@ -424,11 +463,13 @@ async def login(request: LoginRequest, supabase=Depends(get_db)):
 
 
 @app.post(f"{settings.API_PREFIX}/auth/logout")
-async def logout(current_user: TokenData = Depends(get_current_user), supabase=Depends(get_db)):
+def logout(current_user: TokenData = Depends(get_current_user), supabase=Depends(get_db)):
     """Logout endpoint - invalidates current session"""
     try:
         # Invalidate all sessions for this user
         supabase.table("admin_sessions").update({"is_active": False}).eq("user_id", current_user.user_id).execute()
+        session_cache.invalidate_user(current_user.user_id)
+        release_task_leases(supabase, user_id=current_user.user_id)
         
         logger.info(f"✅ User logged out: {current_user.email}")
         
@@ -443,7 +484,7 @@ async def logout(current_user: TokenData = Depends(get_current_user), supabase=D
 
 
 @app.get(f"{settings.API_PREFIX}/auth/me")
-async def get_current_user_info(current_user: TokenData = Depends(get_current_user), supabase=Depends(get_db)):
+def get_current_user_info(current_user: TokenData = Depends(get_current_user), supabase=Depends(get_db)):
     """Get current user information"""
     try:
         result = supabase.table("admin_users").select("id, email, name, role, created_at").eq("id", current_user.user_id).execute()
@@ -464,7 +505,7 @@ async def get_current_user_info(current_user: TokenData = Depends(get_current_us
 # ============================================================================
 
 @app.get(f"{settings.API_PREFIX}/tasks")
-async def get_tasks(
+def get_tasks(
     status_filter: Optional[str] = "queued",
     limit: int = 50,
     current_user: TokenData = Depends(get_current_user),
@@ -475,6 +516,7 @@ async def get_tasks(
     Filters: queued, in_progress, verified
     """
     try:
+        sweep_expired_task_leases(supabase)
         query = supabase.table("verification_tasks").select("*")
         
         if status_filter:
@@ -497,31 +539,91 @@ async def get_tasks(
         )
 
 
+# SSE connections of this process; TaskEventListener relays the ingester's events
+task_event_hub = TaskEventHub()
+task_event_listener: Optional[TaskEventListener] = None
+task_ingester: Optional[VerificationTaskIngester] = None
+TASK_EVENTS_KEEPALIVE_SECONDS = 15
+
+
+@app.post(f"{settings.API_PREFIX}/tasks/events/ticket")
+def task_events_ticket(
+    current_user: TokenData = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Single-use ticket for opening /tasks/events with EventSource, which cannot
+    send the Authorization header; keeps the access token out of URLs and logs
+    """
+    return {
+        "ticket": stream_tickets.issue(credentials.credentials),
+        "expires_in": settings.STREAM_TICKET_SECONDS
+    }
+
+
+@app.get(f"{settings.API_PREFIX}/tasks/events")
+async def task_events(request: Request, current_user: TokenData = Depends(get_stream_user)):
+    """
+    Server-Sent Events stream of newly ingested verification tasks
+    (``event: task_created``, data ``{"type": ..., "tasks": [...]}``), so the
+    UI does not have to poll /tasks. EventSource clients open it with a ticket
+    from POST /tasks/events/ticket (``?ticket=``) and need a new ticket to
+    reconnect.
+    """
+    if task_event_listener is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Task stream is not enabled"
+        )
+    
+    queue = task_event_hub.subscribe()
+    
+    async def stream():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=TASK_EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            task_event_hub.unsubscribe(queue)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post(f"{settings.API_PREFIX}/tasks/claim")
-async def claim_task(current_user: TokenData = Depends(get_current_user), supabase=Depends(get_db)):
+def claim_task(current_user: TokenData = Depends(get_current_user), supabase=Depends(get_db)):
     """
     Claim the next available queued task
     Uses database function for atomic operation
     """
     try:
-        # Get current session
-        session_result = supabase.table("admin_sessions").select("id").eq("user_id", current_user.user_id).eq("is_active", True).execute()
-        
-        if not session_result.data or len(session_result.data) == 0:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No active session")
-        
-        session_id = session_result.data[0]["id"]
-        
+        sweep_expired_task_leases(supabase)
         # Call database function to atomically claim a task
         result = supabase.rpc("claim_verification_task", {
             "p_user_id": current_user.user_id,
-            "p_session_id": session_id
+            "p_session_id": current_user.session_id
         }).execute()
         
         if not result.data or len(result.data) == 0:
             return {"message": "No tasks available", "task": None}
         
         task = result.data[0]
+        # claim_verification_task predates leases; make sure a lease left on the
+        # row can't expire and hand the task to someone else mid-work
+        try:
+            supabase.table("verification_tasks").update({"lease_expires_at": None})\
+                .eq("id", task["task_id"]).not_.is_("lease_expires_at", "null").execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not clear lease on claimed task {task['task_id']}: {e}")
         logger.info(f"✅ Task claimed: {task['task_id']} by {current_user.email}")
         
         return {
@@ -539,8 +641,142 @@ async def claim_task(current_user: TokenData = Depends(get_current_user), supaba
         )
 
 
+class LeaseTasksRequest(BaseModel):
+    """Request model for leasing a batch of tasks"""
+    count: int = Field(default=settings.TASK_LEASE_BATCH_SIZE, ge=1, le=settings.TASK_LEASE_MAX_BATCH)
+
+
+class ReleaseLeasesRequest(BaseModel):
+    """Request model for releasing leased tasks"""
+    keep: List[str] = Field(default_factory=list, description="Task ids to keep leased")
+
+
+def task_fileurl(task: dict) -> Optional[str]:
+    data = task.get("current_data") or task.get("original_data") or {}
+    return data.get("fileurl")
+
+
+def release_task_leases(
+    supabase,
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    keep: List[str] = (),
+    expired_only: bool = False
+) -> int:
+    """
+    Put leased, unfinished tasks of a user or session back in the queue
+    
+    Only tasks claimed through /tasks/lease (lease_expires_at set) are touched;
+    a task claimed with /tasks/claim stays with its verifier. With
+    ``expired_only`` and no user or session, expired leases of every session
+    are released. Database errors are logged, not raised: leases that are not
+    released here expire on their own.
+    """
+    if not (user_id or session_id or expired_only):
+        raise ValueError("release_task_leases needs a user, a session or expired_only")
+    try:
+        query = supabase.table("verification_tasks").update({
+            "status": "queued",
+            "assigned_to_user": None,
+            "assigned_to_session": None,
+            "assigned_at": None,
+            "lease_expires_at": None,
+            "updated_at": datetime.utcnow().isoformat()
+        }).eq("status", "in_progress").not_.is_("lease_expires_at", "null")
+        if session_id:
+            query = query.eq("assigned_to_session", session_id)
+        elif user_id:
+            query = query.eq("assigned_to_user", user_id)
+        if expired_only:
+            query = query.lt("lease_expires_at", datetime.now(timezone.utc).isoformat())
+        if keep:
+            query = query.not_.in_("id", list(keep))
+        result = query.execute()
+        return len(result.data or [])
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to release task leases: {e}")
+        return 0
+
+
+_lease_swept_at = 0.0
+
+
+def sweep_expired_task_leases(supabase) -> int:
+    """
+    Put expired leases of any session back in the queue
+    
+    claim_verification_tasks only sweeps when someone calls /tasks/lease;
+    /tasks and /tasks/claim call this so a lease abandoned while nobody leases
+    does not hide its task. Runs at most once per TASK_LEASE_SWEEP_SECONDS
+    per process.
+    """
+    global _lease_swept_at
+    now = time.monotonic()
+    if now - _lease_swept_at < settings.TASK_LEASE_SWEEP_SECONDS:
+        return 0
+    _lease_swept_at = now
+    released = release_task_leases(supabase, expired_only=True)
+    if released:
+        logger.info(f"✅ {released} expired task leases returned to the queue")
+    return released
+
+
+@app.post(f"{settings.API_PREFIX}/tasks/lease")
+def lease_tasks(
+    request: LeaseTasksRequest = LeaseTasksRequest(),
+    current_user: TokenData = Depends(get_current_user),
+    supabase=Depends(get_db)
+):
+    """
+    Lease up to ``count`` tasks for the current session
+    
+    Renews the session's current leases and tops them up from the queue in one
+    database call (claim_verification_tasks); expired leases of other sessions
+    go back to the queue first. The response carries the full task rows, and
+    the PDFs of the leased tasks are downloaded in the background, so the UI
+    can move to the next task without a request. Call it again whenever a task
+    is finished; unused leases expire after TASK_LEASE_SECONDS.
+    """
+    try:
+        result = supabase.rpc("claim_verification_tasks", {
+            "p_user_id": current_user.user_id,
+            "p_session_id": current_user.session_id,
+            "p_count": request.count,
+            "p_lease_seconds": settings.TASK_LEASE_SECONDS
+        }).execute()
+        tasks = result.data or []
+        
+        prefetched = pdf_cache.prefetch(task_fileurl(task) for task in tasks)
+        logger.info(f"✅ {len(tasks)} tasks leased by {current_user.email} ({prefetched} PDFs prefetching)")
+        
+        return {
+            "count": len(tasks),
+            "lease_seconds": settings.TASK_LEASE_SECONDS,
+            "tasks": tasks
+        }
+        
+    except Exception as e:
+        logger.error(f"Lease tasks error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to lease tasks: {str(e)}"
+        )
+
+
+@app.post(f"{settings.API_PREFIX}/tasks/lease/release")
+def release_leased_tasks(
+    request: ReleaseLeasesRequest = ReleaseLeasesRequest(),
+    current_user: TokenData = Depends(get_current_user),
+    supabase=Depends(get_db)
+):
+    """Return this session's leased tasks (except ``keep``) to the queue, e.g. when the UI closes"""
+    released = release_task_leases(supabase, session_id=current_user.session_id, keep=request.keep)
+    logger.info(f"✅ {released} leased tasks released by {current_user.email}")
+    return {"released": released}
+
+
 @app.get(f"{settings.API_PREFIX}/tasks/{{task_id}}")
-async def get_task(task_id: str, current_user: TokenData = Depends(get_current_user), supabase=Depends(get_db)):
+def get_task(task_id: str, current_user: TokenData = Depends(get_current_user), supabase=Depends(get_db)):
     """Get detailed information about a specific task"""
     try:
         result = supabase.table("verification_tasks").select("*").eq("id", task_id).execute()
@@ -565,8 +801,37 @@ async def get_task(task_id: str, current_user: TokenData = Depends(get_current_u
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to get task")
 
 
+@app.get(f"{settings.API_PREFIX}/tasks/{{task_id}}/pdf")
+def get_task_pdf(task_id: str, current_user: TokenData = Depends(get_current_user), supabase=Depends(get_db)):
+    """Filing PDF of a task, served from the prefetch cache when possible"""
+    try:
+        result = supabase.table("verification_tasks").select("original_data, current_data").eq("id", task_id).execute()
+        
+        if not result.data:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+        
+        fileurl = task_fileurl(result.data[0])
+        if not fileurl:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task has no PDF")
+        
+        return Response(
+            content=pdf_cache.fetch(fileurl),
+            media_type="application/pdf",
+            headers={"Cache-Control": "private, max-age=3600"}
+        )
+        
+    except HTTPException:
+        raise
+    except requests.RequestException as e:
+        logger.error(f"Task PDF download error: {e}")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Failed to download PDF: {str(e)}")
+    except Exception as e:
+        logger.error(f"Get task PDF error: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to get task PDF")
+
+
 @app.patch(f"{settings.API_PREFIX}/tasks/{{task_id}}")
-async def update_task(
+def update_task(
     task_id: str,
     updates: TaskUpdateRequest,
     current_user: TokenData = Depends(get_current_user),
@@ -651,7 +916,7 @@ async def update_task(
 
 
 @app.post(f"{settings.API_PREFIX}/tasks/{{task_id}}/verify")
-async def verify_task(
+def verify_task(
     task_id: str,
     request: VerifyTaskRequest,
     current_user: TokenData = Depends(get_current_user),
@@ -671,6 +936,8 @@ async def verify_task(
         
         if result.data is True:
             logger.info(f"✅ Task verified: {task_id} by {current_user.email}")
+            if CACHE_INVALIDATION_AVAILABLE:
+                invalidate_datasets("corporate_filings", "financial_results")
             return {"message": "Task verified and published successfully"}
         else:
             raise HTTPException(
@@ -689,7 +956,7 @@ async def verify_task(
 
 
 @app.post(f"{settings.API_PREFIX}/tasks/{{task_id}}/release")
-async def release_task(
+def release_task(
     task_id: str,
     current_user: TokenData = Depends(get_current_user),
     supabase=Depends(get_db)
@@ -719,6 +986,7 @@ async def release_task(
             "assigned_to_user": None,
             "assigned_to_session": None,
             "assigned_at": None,
+            "lease_expires_at": None,
             "updated_at": datetime.utcnow().isoformat()
         }).eq("id", task_id).execute()
         
@@ -741,7 +1009,7 @@ async def release_task(
 # ============================================================================
 
 @app.get(f"{settings.API_PREFIX}/announcements")
-async def get_unverified_announcements(
+def get_unverified_announcements(
     verified: bool = False,
     page: int = 1,
     page_size: int = 50,
@@ -842,7 +1110,7 @@ async def get_unverified_announcements(
 
 
 @app.get(f"{settings.API_PREFIX}/announcements/financial-results")
-async def get_financial_results(
+def get_financial_results(
     verified: bool = False,
     page: int = 1,
     page_size: int = 50,
@@ -941,7 +1209,7 @@ async def get_financial_results(
 
 
 @app.get(f"{settings.API_PREFIX}/announcements/non-financial")
-async def get_non_financial_results(
+def get_non_financial_results(
     verified: bool = False,
     page: int = 1,
     page_size: int = 50,
@@ -1040,7 +1308,7 @@ async def get_non_financial_results(
 
 
 @app.get(f"{settings.API_PREFIX}/announcements/{{corp_id}}")
-async def get_announcement(
+def get_announcement(
     corp_id: str,
     current_user: TokenData = Depends(get_current_user),
     supabase=Depends(get_db)
@@ -1102,7 +1370,7 @@ class AnnouncementUpdate(BaseModel):
 
 
 @app.patch(f"{settings.API_PREFIX}/announcements/{{corp_id}}")
-async def update_announcement(
+def update_announcement(
     corp_id: str,
     update: AnnouncementUpdate,
     current_user: TokenData = Depends(get_current_user),
@@ -1132,6 +1400,9 @@ async def update_announcement(
                 detail=f"Announcement with corp_id {corp_id} not found"
             )
         
+        if CACHE_INVALIDATION_AVAILABLE:
+            invalidate_datasets("corporate_filings", "financial_results")
+        
         return {
             "success": True,
             "corp_id": corp_id,
@@ -1177,7 +1448,7 @@ class FinancialResultCreate(BaseModel):
 
 
 @app.post(f"{settings.API_PREFIX}/announcements/{{corp_id}}/verify")
-async def verify_announcement(
+def verify_announcement(
     corp_id: str,
     verify_req: VerifyRequest = None,
     current_user: TokenData = Depends(get_current_user),
@@ -1222,6 +1493,8 @@ async def verify_announcement(
             logger.warning(f"Could not verify financial results for {corp_id}: {fin_err}")
         
         logger.info(f"✅ Successfully verified announcement {corp_id}")
+        if CACHE_INVALIDATION_AVAILABLE:
+            invalidate_datasets("corporate_filings", "financial_results")
         
         return {
             "success": True,
@@ -1242,7 +1515,7 @@ async def verify_announcement(
 
 
 @app.post(f"{settings.API_PREFIX}/announcements/{{corp_id}}/unverify")
-async def unverify_announcement(
+def unverify_announcement(
     corp_id: str,
     current_user: TokenData = Depends(get_current_user),
     supabase=Depends(get_db)
@@ -1287,6 +1560,9 @@ async def unverify_announcement(
         except Exception as fin_err:
             logger.warning(f"Could not unverify financial results for {corp_id}: {fin_err}")
         
+        if CACHE_INVALIDATION_AVAILABLE:
+            invalidate_datasets("corporate_filings", "financial_results")
+        
         return {
             "success": True,
             "corp_id": corp_id,
@@ -1308,7 +1584,7 @@ async def unverify_announcement(
 # ============================================================================
 
 @app.get(f"{settings.API_PREFIX}/financial-results/{{corp_id}}")
-async def get_financial_result(
+def get_financial_result(
     corp_id: str,
     current_user: TokenData = Depends(get_current_user),
     supabase=Depends(get_db)
@@ -1339,7 +1615,7 @@ async def get_financial_result(
 
 
 @app.post(f"{settings.API_PREFIX}/financial-results")
-async def create_financial_result(
+def create_financial_result(
     data: FinancialResultCreate,
     current_user: TokenData = Depends(get_current_user),
     supabase=Depends(get_db)
@@ -1386,6 +1662,8 @@ async def create_financial_result(
             )
         
         logger.info(f"Created financial result for announcement {data.corp_id}")
+        if CACHE_INVALIDATION_AVAILABLE:
+            invalidate_datasets("corporate_filings", "financial_results")
         
         return {
             "success": True,
@@ -1403,7 +1681,7 @@ async def create_financial_result(
 
 
 @app.patch(f"{settings.API_PREFIX}/financial-results/{{financial_result_id}}")
-async def update_financial_result(
+def update_financial_result(
     financial_result_id: str,
     update: FinancialResultUpdate,
     current_user: TokenData = Depends(get_current_user),
@@ -1446,6 +1724,8 @@ async def update_financial_result(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Financial result with id {financial_result_id} not found"
             )
+        if CACHE_INVALIDATION_AVAILABLE:
+            invalidate_datasets("corporate_filings", "financial_results")
         
         # Log audit trail
         try:
@@ -1479,7 +1759,7 @@ async def update_financial_result(
 
 
 @app.delete(f"{settings.API_PREFIX}/financial-results/{{financial_result_id}}")
-async def delete_financial_result(
+def delete_financial_result(
     financial_result_id: str,
     current_user: TokenData = Depends(require_admin),
     supabase=Depends(get_db)
@@ -1504,6 +1784,8 @@ async def delete_financial_result(
             .delete()\
             .eq("id", financial_result_id)\
             .execute()
+        if CACHE_INVALIDATION_AVAILABLE:
+            invalidate_datasets("corporate_filings", "financial_results")
         
         # Log audit trail
         try:
@@ -1548,7 +1830,7 @@ class SendToReviewRequest(BaseModel):
 
 
 @app.post(f"{settings.API_PREFIX}/announcements/{{corp_id}}/send-to-review")
-async def send_to_review(
+def send_to_review(
     corp_id: str,
     request: SendToReviewRequest = None,
     current_user: TokenData = Depends(require_admin),
@@ -1601,6 +1883,8 @@ async def send_to_review(
             .execute()
         
         logger.info(f"✅ Announcement {corp_id} sent to review queue")
+        if CACHE_INVALIDATION_AVAILABLE:
+            invalidate_datasets("corporate_filings", "financial_results")
         
         return {
             "success": True,
@@ -1622,7 +1906,7 @@ async def send_to_review(
 
 
 @app.get(f"{settings.API_PREFIX}/review-queue")
-async def get_review_queue(
+def get_review_queue(
     page: int = 1,
     page_size: int = 50,
     start_date: Optional[str] = None,
@@ -1720,7 +2004,7 @@ class ReviewDecisionRequest(BaseModel):
 
 
 @app.post(f"{settings.API_PREFIX}/announcements/{{corp_id}}/review")
-async def review_announcement(
+def review_announcement(
     corp_id: str,
     request: ReviewDecisionRequest,
     current_user: TokenData = Depends(require_admin),
@@ -1797,6 +2081,8 @@ async def review_announcement(
             .execute()
         
         logger.info(f"✅ Announcement {corp_id} {request.action}ed by admin {current_user.email}")
+        if CACHE_INVALIDATION_AVAILABLE:
+            invalidate_datasets("corporate_filings", "financial_results")
         
         return {
             "success": True,
@@ -1822,47 +2108,78 @@ async def review_announcement(
 # Statistics Endpoints
 # ============================================================================
 
+# The dashboard polls these endpoints constantly. Each result is reused for
+# STATS_CACHE_TTL_SECONDS, and concurrent pollers of the same stats wait for one load
+_stats_cache: dict = {}
+_stats_locks = defaultdict(threading.Lock)
+
+
+def cached_stats(name: str, loader):
+    """Return ``loader()``'s result, shared for STATS_CACHE_TTL_SECONDS"""
+    if settings.STATS_CACHE_TTL_SECONDS <= 0:
+        return loader()
+    entry = _stats_cache.get(name)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    with _stats_locks[name]:
+        entry = _stats_cache.get(name)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        value = loader()
+        _stats_cache[name] = (time.monotonic() + settings.STATS_CACHE_TTL_SECONDS, value)
+        return value
+
+
+def _count_filing_stats(supabase, today: str) -> dict:
+    """Per-status counts as separate count queries (used until get_verification_stats is deployed)"""
+    def filings():
+        return supabase.table("corporatefilings").select("corp_id", count="exact")
+    
+    def count(query):
+        return query.execute().count or 0
+    
+    return {
+        "unverified": count(filings().eq("verified", False)),
+        "verified_total": count(filings().eq("verified", True)),
+        "verified_today": count(filings().eq("verified", True).gte("verified_at", today)),
+        "pending_review": count(filings().eq("verified", True).eq("review_status", "pending_review")),
+        "approved": count(filings().eq("review_status", "approved")),
+        "rejected": count(filings().eq("review_status", "rejected")),
+    }
+
+
+def load_filing_stats(supabase) -> dict:
+    """All corporatefilings verification counters in one round-trip (get_verification_stats RPC)"""
+    today = datetime.utcnow().date().isoformat()
+    try:
+        result = supabase.rpc("get_verification_stats", {"p_today": today}).execute()
+        if isinstance(result.data, dict):
+            return result.data
+        logger.warning(f"Unexpected get_verification_stats result: {result.data!r}")
+    except Exception as e:
+        logger.warning(f"get_verification_stats RPC failed, counting per status: {e}")
+    return _count_filing_stats(supabase, today)
+
+
 @app.get(f"{settings.API_PREFIX}/stats")
-async def get_stats(current_user: TokenData = Depends(get_current_user), supabase=Depends(get_db)):
+def get_stats(current_user: TokenData = Depends(get_current_user), supabase=Depends(get_db)):
     """Get verification statistics including review queue (admin sees review stats)"""
     try:
-        # Count by verification status
-        unverified = supabase.table("corporatefilings").select("corp_id", count="exact").eq("verified", False).execute()
-        verified = supabase.table("corporatefilings").select("corp_id", count="exact").eq("verified", True).execute()
-        
-        # Count verified today
-        today = datetime.utcnow().date().isoformat()
-        verified_today = supabase.table("corporatefilings").select("corp_id", count="exact").eq("verified", True).gte("verified_at", today).execute()
+        counts = cached_stats("filings", lambda: load_filing_stats(supabase))
         
         stats = {
-            "unverified": unverified.count or 0,
-            "verified_total": verified.count or 0,
-            "verified_today": verified_today.count or 0,
+            "unverified": counts.get("unverified") or 0,
+            "verified_total": counts.get("verified_total") or 0,
+            "verified_today": counts.get("verified_today") or 0,
             "user_role": current_user.role
         }
         
         # Add review queue stats for admins only
         if current_user.role == "admin":
-            pending_review = supabase.table("corporatefilings")\
-                .select("corp_id", count="exact")\
-                .eq("verified", True)\
-                .eq("review_status", "pending_review")\
-                .execute()
-            
-            approved = supabase.table("corporatefilings")\
-                .select("corp_id", count="exact")\
-                .eq("review_status", "approved")\
-                .execute()
-            
-            rejected = supabase.table("corporatefilings")\
-                .select("corp_id", count="exact")\
-                .eq("review_status", "rejected")\
-                .execute()
-            
             stats["review_queue"] = {
-                "pending_review": pending_review.count or 0,
-                "approved": approved.count or 0,
-                "rejected": rejected.count or 0
+                "pending_review": counts.get("pending_review") or 0,
+                "approved": counts.get("approved") or 0,
+                "rejected": counts.get("rejected") or 0
             }
         
         return stats
@@ -1891,7 +2208,7 @@ class CompanyChangeReviewRequest(BaseModel):
 
 
 @app.get(f"{settings.API_PREFIX}/company-changes/pending")
-async def get_pending_company_changes(
+def get_pending_company_changes(
     page: int = 1,
     page_size: int = 50,
     change_type: Optional[str] = None,
@@ -1963,13 +2280,16 @@ async def get_pending_company_changes(
 
 
 @app.get(f"{settings.API_PREFIX}/company-changes/stats")
-async def get_company_changes_stats(
+def get_company_changes_stats(
     current_user: TokenData = Depends(require_admin_or_verifier),
     supabase=Depends(get_db)
 ):
     """Get statistics about company changes"""
     try:
-        result = supabase.table("company_changes_stats").select("*").execute()
+        result = cached_stats(
+            "company_changes",
+            lambda: supabase.table("company_changes_stats").select("*").execute()
+        )
         
         if result.data and len(result.data) > 0:
             return result.data[0]
@@ -1994,7 +2314,7 @@ async def get_company_changes_stats(
 
 
 @app.get(f"{settings.API_PREFIX}/company-changes/{{change_id}}")
-async def get_company_change_detail(
+def get_company_change_detail(
     change_id: str,
     current_user: TokenData = Depends(require_admin_or_verifier),
     supabase=Depends(get_db)
@@ -2035,7 +2355,7 @@ async def get_company_change_detail(
 
 
 @app.post(f"{settings.API_PREFIX}/company-changes/{{change_id}}/verify")
-async def verify_company_change(
+def verify_company_change(
     change_id: str,
     request: CompanyChangeVerifyRequest = None,
     current_user: TokenData = Depends(require_admin_or_verifier),
@@ -2108,7 +2428,7 @@ async def verify_company_change(
 
 
 @app.post(f"{settings.API_PREFIX}/company-changes/{{change_id}}/reject")
-async def reject_company_change(
+def reject_company_change(
     change_id: str,
     request: CompanyChangeReviewRequest,
     current_user: TokenData = Depends(require_admin_or_verifier),
@@ -2157,7 +2477,7 @@ async def reject_company_change(
 
 
 @app.post(f"{settings.API_PREFIX}/company-changes/apply-verified")
-async def apply_verified_company_changes(
+def apply_verified_company_changes(
     current_user: TokenData = Depends(require_admin),
     supabase=Depends(get_db)
 ):
@@ -2211,6 +2531,8 @@ async def apply_verified_company_changes(
                 logger.error(f"❌ Error applying change {change['id']}: {str(e)}")
         
         logger.info(f"✅ Applied {applied_count}/{len(changes_to_apply)} company changes")
+        if applied_count and CACHE_INVALIDATION_AVAILABLE:
+            invalidate_datasets("stocklistdata")
         
         return {
             "success": True,
@@ -2281,24 +2603,23 @@ def parse_page_specification(page_spec: str) -> List[int]:
     return sorted(list(pages))
 
 
-def extract_pdf_pages(input_path: str, output_path: str, page_numbers: List[int]) -> int:
+def extract_pdf_pages(content: bytes, page_numbers: List[int]) -> bytes:
     """
-    Extract specific pages from a PDF and save to a new file.
+    Extract specific pages from a PDF.
     
     Args:
-        input_path: Path to input PDF
-        output_path: Path to save extracted pages
+        content: PDF bytes
         page_numbers: List of 0-indexed page numbers to extract
         
     Returns:
-        Number of pages extracted
+        PDF bytes containing only the requested pages
     """
     try:
         from PyPDF2 import PdfReader, PdfWriter
     except ImportError:
         raise ImportError("PyPDF2 is required for page extraction. Install with: pip install PyPDF2")
     
-    reader = PdfReader(input_path)
+    reader = PdfReader(io.BytesIO(content))
     total_pages = len(reader.pages)
     
     # Validate page numbers
@@ -2311,46 +2632,34 @@ def extract_pdf_pages(input_path: str, output_path: str, page_numbers: List[int]
     for page_num in page_numbers:
         writer.add_page(reader.pages[page_num])
     
-    with open(output_path, 'wb') as output_file:
-        writer.write(output_file)
-    
-    return len(page_numbers)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
 
 
-@app.post(f"{settings.API_PREFIX}/generate-content", response_model=GenerateContentResponse)
-async def generate_content(
-    request: GenerateContentRequest,
-    current_user: TokenData = Depends(require_admin_or_verifier)
-):
-    """
-    Generate AI content from announcement PDF using Gemini (Admin/Verifier)
-    
-    Args:
-        request: Contains fileurl, summary, and model selection
-        current_user: Authenticated admin or verifier user
-        
-    Returns:
-        Generated category, headline, AI summary, financial data, and sentiment
-    """
-    if not GENAI_AVAILABLE:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="AI content generation not available - Google GenAI library not installed"
-        )
-    
-    if not gemini_client:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="AI content generation not available - Gemini API key not configured"
-        )
-    
-    # Validate model selection
-    valid_models = ["gemini-2.5-pro", "gemini-2.5-flash-lite"]
-    model_to_use = request.model if request.model in valid_models else "gemini-2.5-flash-lite"
-    
-    logger.info(f"🤖 Generating content for PDF: {request.fileurl} using model: {model_to_use}")
-    
-    # Build comprehensive prompt using imported prompts
+GENERATION_MODELS = ["gemini-2.5-pro", "gemini-2.5-flash-lite"]
+DEFAULT_GENERATION_MODEL = "gemini-2.5-flash-lite"
+
+# Model calls of /generate-content/compare run side by side in this pool
+generation_executor = ThreadPoolExecutor(max_workers=settings.GENERATION_WORKERS, thread_name_prefix="generate")
+
+
+class AIOutput(BaseModel):
+    """Structured output requested from Gemini"""
+    category: str = Field(description=category_prompt)
+    headline: str = Field(description=headline_prompt)
+    ai_summary: str = Field(description=all_prompt)
+    sentiment: str = Field(description=sentiment_prompt)
+
+
+class CompareContentRequest(GenerateContentRequest):
+    """Request model for generating AI content with several models"""
+    models: List[str] = Field(default_factory=lambda: list(GENERATION_MODELS), min_length=1)
+    stream: bool = Field(default=True, description="Stream one NDJSON line per model as it finishes")
+
+
+def build_generation_prompt(request: GenerateContentRequest) -> str:
+    """Analysis prompt, prefixed with the previous summary / headline when given"""
     base_instruction = """Analyze the provided announcement document and extract the following information following the detailed guidelines below:"""
     
     prompt_sections = [
@@ -2381,135 +2690,167 @@ async def generate_content(
         context_parts.append(f"**Previous Headline for Reference:** {request.headline}")
     
     if context_parts:
-        prompt = "\n\n".join([
+        return "\n\n".join([
             "=== CONTEXT FROM PREVIOUS ANALYSIS ===",
             *context_parts,
             "",
             "=== ANALYSIS INSTRUCTIONS ===",
             *prompt_sections
         ])
-    else:
-        prompt = "\n".join(prompt_sections)
+    return "\n".join(prompt_sections)
+
+
+def prepare_pdf(fileurl: str, pages: Optional[str]) -> bytes:
+    """
+    The PDF (or the requested pages of it) to send to Gemini
     
-    temp_file_path = None
-    uploaded_file = None
-    extracted_file_path = None  # Initialize here to avoid UnboundLocalError
+    Downloads go through pdf_cache, and extracted pages are cached under the
+    URL plus the normalized page list, so comparing models or regenerating
+    does not repeat the download or the PyPDF2 pass.
     
+    Raises HTTPException (400) for download and page specification errors.
+    """
+    try:
+        page_numbers = parse_page_specification(pages) if pages else []
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid page specification: {str(e)}")
+    
+    try:
+        logger.info(f"📥 Fetching PDF from {fileurl}")
+        content = pdf_cache.fetch(fileurl)
+    except requests.RequestException as e:
+        logger.error(f"Failed to download PDF: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Failed to download PDF from URL: {str(e)}")
+    
+    if not page_numbers:
+        if pages:
+            logger.warning("No valid pages specified, using full PDF")
+        return content
+    
+    cache_key = f"{fileurl}#pages={','.join(str(p + 1) for p in page_numbers)}"
+    extracted = pdf_cache.get(cache_key)
+    if extracted is not None:
+        return extracted
+    
+    try:
+        extracted = extract_pdf_pages(content, page_numbers)
+    except ValueError as e:
+        logger.error(f"Page extraction error: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid page specification: {str(e)}")
+    except ImportError as e:
+        logger.error(f"PyPDF2 not available: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="PDF page extraction not available. PyPDF2 library required."
+        )
+    except Exception as e:
+        logger.error(f"Failed to extract pages: {e}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Failed to extract pages: {str(e)}")
+    
+    logger.info(f"✅ Extracted {len(page_numbers)} pages: {[p+1 for p in page_numbers]}")
+    pdf_cache.put(cache_key, extracted)
+    return extracted
+
+
+def upload_pdf(content: bytes):
+    """Upload PDF bytes to Gemini once; every model call of the request shares the file"""
+    temp_file_path = None
     try:
-        # Download PDF from URL
-        import requests
-        logger.info(f"📥 Downloading PDF from {request.fileurl}")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/pdf,application/x-pdf,*/*',
-            'Referer': 'https://www.bseindia.com/'
-        }
-        response = requests.get(request.fileurl, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        # Save to temporary file
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(response.content)
+            temp_file.write(content)
             temp_file_path = temp_file.name
-        
-        logger.info(f"💾 Saved PDF to {temp_file_path}")
-        
-        # Extract specific pages if requested
-        file_to_upload = temp_file_path
-        extracted_file_path = None
-        
-        if request.pages:
+        logger.info(f"📤 Uploading PDF to Gemini")
+        return gemini_client.files.upload(file=temp_file_path)
+    finally:
+        if temp_file_path and os.path.exists(temp_file_path):
             try:
-                logger.info(f"📄 Extracting pages: {request.pages}")
-                page_numbers = parse_page_specification(request.pages)
-                
-                if page_numbers:
-                    # Create another temp file for extracted pages
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='_extracted.pdf') as extracted_file:
-                        extracted_file_path = extracted_file.name
-                    
-                    num_pages = extract_pdf_pages(temp_file_path, extracted_file_path, page_numbers)
-                    logger.info(f"✅ Extracted {num_pages} pages: {[p+1 for p in page_numbers]}")
-                    file_to_upload = extracted_file_path
-                else:
-                    logger.warning("No valid pages specified, using full PDF")
-            except ValueError as e:
-                logger.error(f"Page extraction error: {e}")
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid page specification: {str(e)}"
-                )
-            except ImportError as e:
-                logger.error(f"PyPDF2 not available: {e}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="PDF page extraction not available. PyPDF2 library required."
-                )
+                os.unlink(temp_file_path)
             except Exception as e:
-                logger.error(f"Failed to extract pages: {e}")
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Failed to extract pages: {str(e)}"
-                )
-        
-        # Upload to Gemini
-        logger.info(f"📤 Uploading PDF to Gemini")
-        uploaded_file = gemini_client.files.upload(file=file_to_upload)
-        
-        # Define response schema
-        class AIOutput(BaseModel):
-            category: str = Field(description=category_prompt)
-            headline: str = Field(description=headline_prompt)
-            ai_summary: str = Field(description=all_prompt)
-            sentiment: str = Field(description=sentiment_prompt)
-        
-        # Generate content
-        logger.info(f"🤖 Generating AI content with {model_to_use}")
-        ai_response = gemini_client.models.generate_content(
-            model=model_to_use,
-            contents=[prompt, uploaded_file],
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json",
-                response_schema=AIOutput,
-                thinking_config=types.ThinkingConfig(thinking_budget=-1) if model_to_use == "gemini-2.0-flash-pro" else None
-            )
+                logger.warning(f"Failed to delete temp file: {e}")
+
+
+def delete_uploaded_pdf(uploaded_file) -> None:
+    if uploaded_file is None:
+        return
+    try:
+        gemini_client.files.delete(name=uploaded_file.name)
+    except Exception as e:
+        logger.warning(f"Failed to delete uploaded file: {e}")
+
+
+def run_generation_model(model: str, prompt: str, uploaded_file) -> GenerateContentResponse:
+    """One Gemini call; raises on API or JSON errors"""
+    logger.info(f"🤖 Generating AI content with {model}")
+    ai_response = gemini_client.models.generate_content(
+        model=model,
+        contents=[prompt, uploaded_file],
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=AIOutput,
+            thinking_config=types.ThinkingConfig(thinking_budget=-1) if model == "gemini-2.0-flash-pro" else None
         )
-        
-        # Parse response
-        logger.info("📝 Parsing AI response")
-        result_data = json.loads(ai_response.text.strip())
-        
-        if isinstance(result_data, list) and len(result_data) > 0:
-            result_data = result_data[0]
-        
-        category = result_data.get("category", "Procedural/Administrative")
-        headline = result_data.get("headline", "")
-        ai_summary = result_data.get("ai_summary", "")
-        sentiment = result_data.get("sentiment", "Neutral")
-        
-        logger.info(f"✅ AI content generated successfully - Category: {category}")
-        
-        # Cleanup uploaded file
-        try:
-            gemini_client.files.delete(name=uploaded_file.name)
-        except Exception as e:
-            logger.warning(f"Failed to delete uploaded file: {e}")
-        
-        return GenerateContentResponse(
-            success=True,
-            category=category,
-            headline=headline,
-            ai_summary=ai_summary,
-            sentiment=sentiment,
-            model_used=model_to_use
+    )
+    
+    result_data = json.loads(ai_response.text.strip())
+    if isinstance(result_data, list) and len(result_data) > 0:
+        result_data = result_data[0]
+    
+    category = result_data.get("category", "Procedural/Administrative")
+    logger.info(f"✅ AI content generated successfully with {model} - Category: {category}")
+    
+    return GenerateContentResponse(
+        success=True,
+        category=category,
+        headline=result_data.get("headline", ""),
+        ai_summary=result_data.get("ai_summary", ""),
+        sentiment=result_data.get("sentiment", "Neutral"),
+        model_used=model
+    )
+
+
+def require_gemini() -> None:
+    if not GENAI_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI content generation not available - Google GenAI library not installed"
         )
-        
-    except requests.RequestException as e:
-        logger.error(f"Failed to download PDF: {e}")
+    
+    if not gemini_client:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Failed to download PDF from URL: {str(e)}"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI content generation not available - Gemini API key not configured"
         )
+
+
+@app.post(f"{settings.API_PREFIX}/generate-content", response_model=GenerateContentResponse)
+def generate_content(
+    request: GenerateContentRequest,
+    current_user: TokenData = Depends(require_admin_or_verifier)
+):
+    """
+    Generate AI content from announcement PDF using Gemini (Admin/Verifier)
+    
+    Args:
+        request: Contains fileurl, summary, and model selection
+        current_user: Authenticated admin or verifier user
+        
+    Returns:
+        Generated category, headline, AI summary, financial data, and sentiment
+    """
+    require_gemini()
+    
+    # Validate model selection
+    model_to_use = request.model if request.model in GENERATION_MODELS else DEFAULT_GENERATION_MODEL
+    logger.info(f"🤖 Generating content for PDF: {request.fileurl} using model: {model_to_use}")
+    
+    prompt = build_generation_prompt(request)
+    content = prepare_pdf(request.fileurl, request.pages)
+    
+    uploaded_file = None
+    try:
+        uploaded_file = upload_pdf(content)
+        return run_generation_model(model_to_use, prompt, uploaded_file)
+        
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse AI response: {e}")
         raise HTTPException(
@@ -2523,20 +2864,81 @@ async def generate_content(
             detail=f"Content generation failed: {str(e)}"
         )
     finally:
-        # Cleanup temporary files
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-                logger.info(f"🗑️  Cleaned up temporary file")
-            except Exception as e:
-                logger.warning(f"Failed to delete temp file: {e}")
-        
-        if extracted_file_path and os.path.exists(extracted_file_path):
-            try:
-                os.unlink(extracted_file_path)
-                logger.info(f"🗑️  Cleaned up extracted pages file")
-            except Exception as e:
-                logger.warning(f"Failed to delete extracted file: {e}")
+        delete_uploaded_pdf(uploaded_file)
+
+
+@app.post(f"{settings.API_PREFIX}/generate-content/compare")
+def compare_generated_content(
+    request: CompareContentRequest,
+    current_user: TokenData = Depends(require_admin_or_verifier)
+):
+    """
+    Generate AI content with several models at once (Admin/Verifier)
+    
+    The PDF is prepared and uploaded once, then every model runs in parallel,
+    so the total time is that of the slowest model. With ``stream`` (default)
+    the response is NDJSON: one GenerateContentResponse line per model in the
+    order they finish, then ``{"done": true, "elapsed_ms": ...}``. Otherwise
+    all results are returned together as ``{"results": [...]}``.
+    A failing model yields ``success: false`` with ``error``; the others
+    still return.
+    """
+    require_gemini()
+    
+    models = list(dict.fromkeys(request.models))
+    invalid = [model for model in models if model not in GENERATION_MODELS]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown models {invalid}; choose from {GENERATION_MODELS}"
+        )
+    logger.info(f"🤖 Comparing {models} for PDF: {request.fileurl}")
+    
+    started = time.monotonic()
+    prompt = build_generation_prompt(request)
+    content = prepare_pdf(request.fileurl, request.pages)
+    try:
+        uploaded_file = upload_pdf(content)
+    except Exception as e:
+        logger.error(f"Gemini upload error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Content generation failed: {str(e)}"
+        )
+    
+    futures = {
+        generation_executor.submit(run_generation_model, model, prompt, uploaded_file): model
+        for model in models
+    }
+    
+    def results():
+        try:
+            for future in as_completed(futures):
+                model = futures[future]
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.error(f"Content generation error with {model}: {e}")
+                    yield GenerateContentResponse(
+                        success=False, category="", headline="", ai_summary="", sentiment="",
+                        model_used=model, error=str(e)
+                    )
+        finally:
+            # Also reached when the client disconnects mid-stream
+            for future in futures:
+                future.cancel()
+            delete_uploaded_pdf(uploaded_file)
+    
+    if not request.stream:
+        collected = list(results())
+        return {"results": collected, "elapsed_ms": round((time.monotonic() - started) * 1000)}
+    
+    def ndjson():
+        for result in results():
+            yield result.model_dump_json() + "\n"
+        yield json.dumps({"done": True, "elapsed_ms": round((time.monotonic() - started) * 1000)}) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 
 # ============================================================================
@@ -2588,7 +2990,7 @@ class RefreshStockPriceResponse(BaseModel):
 
 
 @app.post(f"{settings.API_PREFIX}/refresh-stock-price", response_model=RefreshStockPriceResponse)
-async def refresh_stock_price(
+def refresh_stock_price(
     request: RefreshStockPriceRequest,
     current_user: TokenData = Depends(require_admin_or_verifier),
     supabase=Depends(get_db)
@@ -2669,7 +3071,7 @@ async def refresh_stock_price(
 # ============================================================================
 
 @app.get(f"{settings.API_PREFIX}/corporate-actions")
-async def get_corporate_actions(
+def get_corporate_actions(
     page: int = 1,
     page_size: int = 50,
     exchange: Optional[str] = None,
@@ -2793,7 +3195,7 @@ async def get_corporate_actions(
 # ============================================================================
 
 @app.get(f"{settings.API_PREFIX}/deals/pending")
-async def get_pending_deals(
+def get_pending_deals(
     skip: int = 0,
     limit: int = 50,
     exchange: Optional[str] = None,
@@ -2839,7 +3241,7 @@ async def get_pending_deals(
 
 
 @app.post(f"{settings.API_PREFIX}/deals/{{deal_id}}/claim")
-async def claim_deal(
+def claim_deal(
     deal_id: str,
     supabase=Depends(get_db),
     current_user=Depends(require_admin_or_verifier)
@@ -2909,8 +3311,47 @@ async def claim_deal(
         )
 
 
+@app.get(f"{settings.API_PREFIX}/deals/stats")
+def get_deals_stats(
+    supabase=Depends(get_db),
+    current_user=Depends(require_admin_or_verifier)
+):
+    """Get statistics about deals verification queue"""
+    try:
+        result = cached_stats(
+            "deals",
+            lambda: supabase.table("deals_verification_stats").select("*").execute()
+        )
+        
+        if not result.data or len(result.data) == 0:
+            return {
+                "success": True,
+                "stats": {
+                    "pending_verification": 0,
+                    "currently_claimed": 0,
+                    "verified": 0,
+                    "rejected": 0,
+                    "bulk_deals": 0,
+                    "block_deals": 0,
+                    "nse_deals": 0,
+                    "bse_deals": 0
+                }
+            }
+        
+        return {
+            "success": True,
+            "stats": result.data[0]
+        }
+    except Exception as e:
+        logger.error(f"Error fetching deals stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch deals stats: {str(e)}"
+        )
+
+
 @app.get(f"{settings.API_PREFIX}/deals/{{deal_id}}")
-async def get_deal_details(
+def get_deal_details(
     deal_id: str,
     supabase=Depends(get_db),
     current_user=Depends(require_admin_or_verifier)
@@ -2943,7 +3384,7 @@ async def get_deal_details(
 
 
 @app.put(f"{settings.API_PREFIX}/deals/{{deal_id}}")
-async def update_deal(
+def update_deal(
     deal_id: str,
     update_req: DealUpdateRequest,
     supabase=Depends(get_db),
@@ -3022,7 +3463,7 @@ async def update_deal(
 
 
 @app.post(f"{settings.API_PREFIX}/deals/{{deal_id}}/verify")
-async def verify_deal(
+def verify_deal(
     deal_id: str,
     verify_req: DealVerifyRequest,
     supabase=Depends(get_db),
@@ -3082,7 +3523,11 @@ async def verify_deal(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to insert deal into deals table"
             )
-        
+
+        # The new row must show up in the main API's cached deals responses
+        if CACHE_INVALIDATION_AVAILABLE:
+            invalidate_datasets("deals")
+
         # Update verification status
         update_data = {
             "verification_status": "verified",
@@ -3111,7 +3556,7 @@ async def verify_deal(
 
 
 @app.post(f"{settings.API_PREFIX}/deals/{{deal_id}}/reject")
-async def reject_deal(
+def reject_deal(
     deal_id: str,
     reject_req: DealRejectRequest,
     supabase=Depends(get_db),
@@ -3185,7 +3630,7 @@ async def reject_deal(
 
 
 @app.post(f"{settings.API_PREFIX}/deals/{{deal_id}}/release")
-async def release_deal(
+def release_deal(
     deal_id: str,
     supabase=Depends(get_db),
     current_user=Depends(require_admin_or_verifier)
@@ -3256,42 +3701,6 @@ async def release_deal(
         )
 
 
-@app.get(f"{settings.API_PREFIX}/deals/stats")
-async def get_deals_stats(
-    supabase=Depends(get_db),
-    current_user=Depends(require_admin_or_verifier)
-):
-    """Get statistics about deals verification queue"""
-    try:
-        result = supabase.table("deals_verification_stats").select("*").execute()
-        
-        if not result.data or len(result.data) == 0:
-            return {
-                "success": True,
-                "stats": {
-                    "pending_verification": 0,
-                    "currently_claimed": 0,
-                    "verified": 0,
-                    "rejected": 0,
-                    "bulk_deals": 0,
-                    "block_deals": 0,
-                    "nse_deals": 0,
-                    "bse_deals": 0
-                }
-            }
-        
-        return {
-            "success": True,
-            "stats": result.data[0]
-        }
-    except Exception as e:
-        logger.error(f"Error fetching deals stats: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to fetch deals stats: {str(e)}"
-        )
-
-
 # ============================================================================
 # Application Startup
 # ============================================================================
@@ -3303,6 +3712,10 @@ async def startup_event():
     logger.info(f"📍 Environment: {'Production' if settings.PROD else 'Development'}")
     logger.info(f"🌐 API: http://{settings.HOST}:{settings.PORT}{settings.API_PREFIX}")
     
+    # Bound the threadpool that runs the (blocking) route handlers
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    logger.info(f"🧵 Threadpool: {settings.THREADPOOL_SIZE} threads")
+    
     # Test database connection
     try:
         supabase = get_db()
@@ -3310,6 +3723,26 @@ async def startup_event():
     except Exception as e:
         logger.error(f"❌ Database connection failed: {e}")
         raise
+    
+    # Verification task stream: push events to SSE clients, optionally ingest here
+    global task_event_listener, task_ingester
+    if settings.TASK_STREAM_ENABLED:
+        if not REDIS_AVAILABLE:
+            logger.warning("⚠️  TASK_STREAM_ENABLED but redis is not installed - task stream disabled")
+        else:
+            task_event_listener = TaskEventListener(task_event_hub).start()
+            if settings.TASK_INGEST_IN_API:
+                task_ingester = VerificationTaskIngester(supabase).start()
+            logger.info(f"📋 Task stream enabled (ingester {'in API' if task_ingester else 'external'})")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background task stream threads"""
+    if task_ingester is not None:
+        await anyio.to_thread.run_sync(task_ingester.stop)
+    if task_event_listener is not None:
+        await anyio.to_thread.run_sync(task_event_listener.stop)
 
 
 if __name__ == "__main__":
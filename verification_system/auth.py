@@ -2,9 +2,14 @@
 Authentication utilities for Backfin Verification System
 JWT token generation, password hashing, user verification
 """
+import time
+import hashlib
 import logging
-from datetime import datetime, timedelta
-from typing import Optional
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
 
 import bcrypt
 from fastapi import Depends, HTTPException, status
@@ -30,6 +35,7 @@ class TokenData(BaseModel):
     user_id: str
     role: str = "verifier"  # 'admin' or 'verifier'
     exp: Optional[datetime] = None
+    session_id: Optional[str] = None  # admin_sessions.id, set once the session is validated
 
 class AuthToken(BaseModel):
     """Response model for authentication"""
@@ -162,21 +168,138 @@ def decode_access_token(token: str) -> TokenData:
         logger.error(f"Token decode error: {e}")
         raise credentials_exception
 
+# ============================================================================
+# Session Cache
+# ============================================================================
+
+class SessionCache:
+    """
+    In-process cache of validated sessions, so authenticated requests skip the
+    admin_sessions / admin_users lookups
+    
+    Entries are keyed by the token's SHA-256 and live for at most
+    SESSION_CACHE_TTL_SECONDS, never past the session's expires_at. Login and
+    logout drop every cached session of the user.
+    
+    No endpoint changes admin_users.is_active; users are deactivated directly
+    in the database, which this process cannot see. Deactivation therefore
+    relies on the TTL: an active session keeps working for up to
+    SESSION_CACHE_TTL_SECONDS (60s by default) afterwards. Set it to 0 where
+    that window is not acceptable.
+    """
+    
+    def __init__(self, ttl_seconds: float, max_size: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        # token hash -> (monotonic expiry, user_id, session_id)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # user_id -> monotonic time of the last invalidation
+        self._revoked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def get(self, token: str, user_id: str) -> Optional[str]:
+        """Session id if the token was validated for ``user_id`` recently, else None"""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, cached_user_id, session_id = entry
+            if expires_at <= time.monotonic() or cached_user_id != user_id:
+                del self._entries[key]
+                return None
+            return session_id
+    
+    def add(self, token: str, user_id: str, session_id: str, session_expires_at: datetime, checked_at: float) -> None:
+        """
+        Cache a session validated at ``checked_at`` (time.monotonic() taken
+        before the database checks), unless the user was invalidated since
+        """
+        if self.ttl_seconds <= 0:
+            return
+        ttl = min(self.ttl_seconds, (session_expires_at - datetime.now(timezone.utc)).total_seconds())
+        if ttl <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            if self._revoked_at.get(user_id, 0.0) >= checked_at:
+                return
+            self._entries[key] = (time.monotonic() + ttl, user_id, session_id)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop every cached session of a user (login, logout, deactivation)"""
+        with self._lock:
+            self._revoked_at[user_id] = time.monotonic()
+            for key in [key for key, (_, cached, _) in self._entries.items() if cached == user_id]:
+                del self._entries[key]
+
+
+session_cache = SessionCache(settings.SESSION_CACHE_TTL_SECONDS)
+
+
+class StreamTicketStore:
+    """
+    Short-lived, single-use tickets that stand in for the JWT on event streams
+    
+    Browsers' EventSource cannot set headers, and a token in the query string
+    ends up in access and proxy logs. A client exchanges its bearer token for a
+    ticket and opens the stream with ``?ticket=``; the ticket works once and
+    only for STREAM_TICKET_SECONDS. Only the ticket's SHA-256 is kept, and the
+    session is validated again on redemption. In-process, like SessionCache.
+    """
+    
+    def __init__(self, ttl_seconds: float, max_size: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        # ticket hash -> (monotonic expiry, access token)
+        self._tickets: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(ticket: str) -> str:
+        return hashlib.sha256(ticket.encode()).hexdigest()
+    
+    def issue(self, token: str) -> str:
+        """New ticket for an already validated access token"""
+        ticket = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self._lock:
+            while self._tickets and next(iter(self._tickets.values()))[0] <= now:
+                self._tickets.popitem(last=False)
+            self._tickets[self._key(ticket)] = (now + self.ttl_seconds, token)
+            while len(self._tickets) > self.max_size:
+                self._tickets.popitem(last=False)
+        return ticket
+    
+    def redeem(self, ticket: str) -> Optional[str]:
+        """The ticket's access token, once; None if unknown, used or expired"""
+        with self._lock:
+            entry = self._tickets.pop(self._key(ticket), None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+
+stream_tickets = StreamTicketStore(settings.STREAM_TICKET_SECONDS)
+
 # ============================================================================
 # Authentication Dependencies
 # ============================================================================
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    supabase = Depends(get_db)
-) -> TokenData:
+def authenticate_token(token: str, supabase) -> TokenData:
     """
-    FastAPI dependency to get current authenticated user
-    Validates JWT token and checks if session is active in database
+    Validate a JWT and check that its session is active in the database
     
     Args:
-        credentials: HTTP Bearer token from request header
-        supabase: Supabase client from dependency injection
+        token: JWT access token
+        supabase: Supabase client
         
     Returns:
         TokenData with user information
@@ -184,11 +307,14 @@ async def get_current_user(
     Raises:
         HTTPException: If authentication fails
     """
-    token = credentials.credentials
-    
     # Decode token
     token_data = decode_access_token(token)
     
+    token_data.session_id = session_cache.get(token, token_data.user_id)
+    if token_data.session_id:
+        return token_data
+    checked_at = time.monotonic()
+    
     # Check if session exists and is active
     try:
         session_result = supabase.table("admin_sessions").select("*").eq(
@@ -206,7 +332,6 @@ async def get_current_user(
         session = session_result.data[0]
         
         # Check session expiration
-        from datetime import timezone
         expires_at_str = session["expires_at"].replace('Z', '+00:00')
         expires_at = datetime.fromisoformat(expires_at_str)
         now = datetime.now(timezone.utc)
@@ -225,11 +350,14 @@ async def get_current_user(
         user_result = supabase.table("admin_users").select("is_active").eq("id", token_data.user_id).execute()
         
         if not user_result.data or not user_result.data[0].get("is_active"):
+            session_cache.invalidate_user(token_data.user_id)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="User account is deactivated"
             )
         
+        token_data.session_id = session["id"]
+        session_cache.add(token, token_data.user_id, session["id"], expires_at, checked_at)
         return token_data
         
     except HTTPException:
@@ -243,6 +371,50 @@ async def get_current_user(
         )
 
 
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    supabase = Depends(get_db)
+) -> TokenData:
+    """
+    FastAPI dependency to get current authenticated user
+    Validates JWT token and checks if session is active in database
+    (plain def: the Supabase client blocks, so FastAPI runs it in the threadpool)
+    
+    Args:
+        credentials: HTTP Bearer token from request header
+        supabase: Supabase client from dependency injection
+        
+    Returns:
+        TokenData with user information
+        
+    Raises:
+        HTTPException: If authentication fails
+    """
+    return authenticate_token(credentials.credentials, supabase)
+
+
+def get_stream_user(
+    ticket: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
+    supabase = Depends(get_db)
+) -> TokenData:
+    """
+    FastAPI dependency for event streams
+    Browsers' EventSource cannot set headers, so it passes a single-use
+    ``ticket`` (see StreamTicketStore) instead of the access token
+    """
+    if credentials:
+        return authenticate_token(credentials.credentials, supabase)
+    token = stream_tickets.redeem(ticket) if ticket else None
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Stream ticket missing, used or expired" if ticket else "Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return authenticate_token(token, supabase)
+
+
 async def get_current_active_user(
     current_user: TokenData = Depends(get_current_user)
 ) -> TokenData:
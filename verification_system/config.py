@@ -29,12 +29,45 @@ class Settings(BaseSettings):
     
     # Gemini AI Configuration
     GEMINI_ADMIN_KEY: str = ""
+    GENERATION_WORKERS: int = 8  # Parallel model calls for /generate-content/compare
     
     # Session Configuration
     SESSION_TIMEOUT_MINUTES: int = 30
+    # How long a validated session is trusted without re-checking the database (0 disables);
+    # also how long a user deactivated in admin_users can keep using an open session
+    SESSION_CACHE_TTL_SECONDS: int = 60
+    # Lifetime of the single-use tickets EventSource clients open /tasks/events with
+    STREAM_TICKET_SECONDS: int = 30
     
     # Task Management
     TASK_TIMEOUT_MINUTES: int = 30  # Release tasks if not completed
+    TASK_LEASE_BATCH_SIZE: int = 3  # Tasks reserved per session by /tasks/lease
+    TASK_LEASE_MAX_BATCH: int = 10
+    TASK_LEASE_SECONDS: int = 600  # Renewed on every /tasks/lease call
+    TASK_LEASE_SWEEP_SECONDS: int = 15  # Min gap between expired-lease sweeps from /tasks and /tasks/claim
+    
+    # Filing PDFs kept in memory for /tasks/{id}/pdf and prefetching
+    PDF_CACHE_MAX_MB: int = 256
+    PDF_CACHE_TTL_SECONDS: int = 3600
+    PDF_PREFETCH_WORKERS: int = 4
+    
+    # Worker threads for route handlers - the Supabase client is blocking, so
+    # handlers are plain defs that FastAPI runs in this pool
+    THREADPOOL_SIZE: int = 40
+    
+    # Dashboard stats endpoints reuse results for this long (0 disables)
+    STATS_CACHE_TTL_SECONDS: int = 5
+    
+    # Verification task stream (EphemeralAIWorker XADDs processed filings to it)
+    TASK_STREAM_ENABLED: bool = False
+    TASK_INGEST_IN_API: bool = True  # False when task_stream.py runs as its own process
+    REDIS_URL: str = "redis://localhost:6379"
+    TASK_STREAM_KEY: str = "verification_tasks"
+    TASK_STREAM_GROUP: str = "verification_ingest"
+    TASK_EVENTS_CHANNEL: str = "verification_tasks:events"
+    TASK_INGEST_BATCH_SIZE: int = 100
+    TASK_INGEST_BLOCK_MS: int = 2000
+    TASK_INGEST_CLAIM_IDLE_MS: int = 60000  # take over entries a crashed consumer left pending
     
     # CORS Configuration
     CORS_ORIGINS: str = "*"  # Comma-separated string or "*" for all origins
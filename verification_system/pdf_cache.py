@@ -0,0 +1,125 @@
+"""
+Announcement PDF cache for the verification API
+
+Verifiers open the filing PDF of every task they work on, and BSE only serves
+it with browser-like headers. ``PdfCache`` keeps recently downloaded PDFs in
+memory (LRU, bounded by PDF_CACHE_MAX_MB) so ``GET /tasks/{id}/pdf`` serves
+them without another download, and ``prefetch()`` downloads the PDFs of
+leased tasks in the background before the verifier gets to them.
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+import requests
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/pdf,application/x-pdf,*/*',
+    'Referer': 'https://www.bseindia.com/'
+}
+
+
+def download_pdf(url: str) -> bytes:
+    """Download a filing PDF (raises requests.RequestException)"""
+    response = requests.get(url, headers=PDF_REQUEST_HEADERS, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+
+class PdfCache:
+    """Thread-safe LRU of PDF bytes by URL, with single-flight downloads and background prefetch"""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, prefetch_workers: int = 4):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.prefetch_workers = prefetch_workers
+        # url -> (monotonic expiry, content)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def get(self, url: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            expires_at, content = entry
+            if expires_at <= time.monotonic():
+                self._remove(url)
+                return None
+            self._entries.move_to_end(url)
+            return content
+
+    def _remove(self, url: str) -> None:
+        _, content = self._entries.pop(url)
+        self._size -= len(content)
+
+    def put(self, url: str, content: bytes) -> None:
+        # One huge document should not evict everything else
+        if len(content) > self.max_bytes // 4:
+            return
+        with self._lock:
+            if url in self._entries:
+                self._remove(url)
+            self._entries[url] = (time.monotonic() + self.ttl_seconds, content)
+            self._size += len(content)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def fetch(self, url: str) -> bytes:
+        """Cached PDF, downloading it once even if several requests ask at the same time"""
+        content = self.get(url)
+        if content is not None:
+            return content
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(url, threading.Lock())
+        with fetch_lock:
+            try:
+                content = self.get(url)
+                if content is None:
+                    content = download_pdf(url)
+                    self.put(url, content)
+                return content
+            finally:
+                with self._lock:
+                    self._fetch_locks.pop(url, None)
+
+    def _prefetch_one(self, url: str) -> None:
+        try:
+            self.fetch(url)
+        except Exception as e:
+            logger.debug(f"PDF prefetch failed for {url}: {e}")
+
+    def prefetch(self, urls: Iterable[str]) -> int:
+        """Download the given PDFs in the background; returns how many were queued"""
+        if self.prefetch_workers <= 0:
+            return 0
+        queued = 0
+        for url in urls:
+            if not url or self.get(url) is not None:
+                continue
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.prefetch_workers, thread_name_prefix="pdf-prefetch")
+            self._executor.submit(self._prefetch_one, url)
+            queued += 1
+        return queued
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+pdf_cache = PdfCache(
+    max_bytes=settings.PDF_CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=settings.PDF_CACHE_TTL_SECONDS,
+    prefetch_workers=settings.PDF_PREFETCH_WORKERS
+)
@@ -5,13 +5,23 @@ Simplified version for refreshing stock price data by security ID
 
 import pandas as pd
 import os
+import sys
 import json
 import time
 from datetime import datetime, date
+from pathlib import Path
 from supabase import create_client, Client
 import requests
 import pytz
 
+# Optional latest-close snapshot used by the main API's price-diff endpoints
+try:
+    sys.path.append(str(Path(__file__).parent.parent))
+    from src.services.price_snapshot import update_price_snapshot
+    PRICE_SNAPSHOT_AVAILABLE = True
+except ImportError:
+    PRICE_SNAPSHOT_AVAILABLE = False
+
 # Supabase configuration
 def get_supabase_client():
     """Get Supabase client using environment variables"""
@@ -136,6 +146,8 @@ def upload_data_to_supabase(supabase, df):
                 
                 if not (hasattr(response, 'error') and response.error):
                     print(f"Successfully uploaded all {total_records} records!")
+                    if PRICE_SNAPSHOT_AVAILABLE:
+                        update_price_snapshot(parsed_records)
                     return True
                 
                 if retry < MAX_RETRIES - 1:
@@ -165,6 +177,8 @@ def upload_data_to_supabase(supabase, df):
                     
                     if not (hasattr(response, 'error') and response.error):
                         successful_uploads += chunk_size
+                        if PRICE_SNAPSHOT_AVAILABLE:
+                            update_price_snapshot(parsed_records)
                         break
                         
                     if retry < MAX_RETRIES - 1:
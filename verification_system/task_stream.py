@@ -0,0 +1,366 @@
+"""
+Verification task ingestion from the AI worker's Redis stream
+
+EphemeralAIWorker XADDs every processed filing to the ``verification_tasks``
+stream (fields: task_id, announcement_id, original_data, created_at,
+priority). ``VerificationTaskIngester`` reads it through a consumer group and
+writes each batch to the ``verification_tasks`` table with one bulk upsert
+(``ignore-duplicates`` on corp_id, so redelivered entries are no-ops) before
+acknowledging it.
+
+Newly inserted tasks are announced on the ``TASK_EVENTS_CHANNEL`` pub/sub
+channel. Every API process runs a ``TaskEventListener`` that relays those
+events into its ``TaskEventHub``, which feeds the SSE endpoint
+(``GET /api/admin/tasks/events``), so verifier UIs see new tasks without
+polling ``/tasks``.
+
+Delivery is at-least-once: entries that were read but not acknowledged
+(failed insert, crashed process) are retried from the consumer's pending
+list, and entries idle in another consumer's pending list for
+``TASK_INGEST_CLAIM_IDLE_MS`` are taken over. Entries that are malformed or
+that the database rejects (data / constraint errors) are moved to
+``<stream>:dead``; anything else stays pending until the database is back.
+
+Runs inside the API when ``TASK_STREAM_ENABLED=true`` (and
+``TASK_INGEST_IN_API``, the default), or on its own:
+    python task_stream.py
+"""
+import os
+import json
+import socket
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TASK_CREATED_EVENT = "task_created"
+
+# Fields pushed to verifier UIs; the full task is one GET /tasks/{id} away
+TASK_EVENT_FIELDS = ("id", "corp_id", "status", "priority", "created_at")
+TASK_EVENT_DATA_FIELDS = ("companyname", "symbol", "category", "headline")
+
+
+def get_stream_redis():
+    """Redis client for the task stream (decoded responses, timeout above the XREADGROUP block)"""
+    return redis.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        socket_connect_timeout=5,
+        socket_timeout=settings.TASK_INGEST_BLOCK_MS / 1000 + 5
+    )
+
+
+def _iso_from_millis(value: Optional[str]) -> str:
+    try:
+        return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc).isoformat()
+    except (TypeError, ValueError):
+        return datetime.now(timezone.utc).isoformat()
+
+
+def _is_data_error(error: Exception) -> bool:
+    """Postgres data / constraint errors (SQLSTATE class 22, 23) fail the same way on every retry"""
+    return str(getattr(error, "code", "") or "")[:2] in ("22", "23")
+
+
+def parse_stream_entry(fields: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """verification_tasks row for one stream entry, or None if the entry is malformed"""
+    corp_id = fields.get("announcement_id")
+    try:
+        data = json.loads(fields.get("original_data") or "")
+    except ValueError:
+        return None
+    if not corp_id or not isinstance(data, dict):
+        return None
+    created_at = _iso_from_millis(fields.get("created_at"))
+    return {
+        "corp_id": corp_id,
+        "original_data": data,
+        "current_data": data,
+        "status": "queued",
+        "priority": fields.get("priority") or "normal",
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def task_event(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact task summary pushed to verifier UIs"""
+    event = {field: task.get(field) for field in TASK_EVENT_FIELDS}
+    data = task.get("current_data") or task.get("original_data") or {}
+    event.update({field: data.get(field) for field in TASK_EVENT_DATA_FIELDS})
+    return event
+
+
+class VerificationTaskIngester:
+    """Consumer-group reader that bulk-inserts stream entries into verification_tasks"""
+
+    def __init__(self, supabase, redis_client=None, consumer: Optional[str] = None):
+        self.supabase = supabase
+        self.redis = redis_client
+        self.stream = settings.TASK_STREAM_KEY
+        self.group = settings.TASK_STREAM_GROUP
+        self.dead_letter_stream = f"{self.stream}:dead"
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = settings.TASK_INGEST_BATCH_SIZE
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.ingested = 0
+
+    def _ensure_group(self) -> None:
+        try:
+            # "0": a new group also picks up entries XADDed before the ingester existed
+            self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            logger.info(f"✅ Created consumer group {self.group} on {self.stream}")
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _read_batch(self) -> List[Tuple[str, Dict[str, str]]]:
+        """This consumer's pending entries first, then idle entries of dead consumers, then new ones"""
+        pending = self.redis.xreadgroup(self.group, self.consumer, {self.stream: "0"}, count=self.batch_size)
+        pending = [entry for _, stream_entries in pending for entry in stream_entries]
+        # Entries trimmed from the stream while pending come back without fields
+        trimmed = [entry_id for entry_id, fields in pending if not fields]
+        if trimmed:
+            self.redis.xack(self.stream, self.group, *trimmed)
+        entries = [(entry_id, fields) for entry_id, fields in pending if fields]
+        if entries:
+            return entries
+
+        claimed = self.redis.xautoclaim(
+            self.stream, self.group, self.consumer,
+            min_idle_time=settings.TASK_INGEST_CLAIM_IDLE_MS, start_id="0-0", count=self.batch_size
+        )
+        entries = [(entry_id, fields) for entry_id, fields in claimed[1] if fields]
+        if entries:
+            logger.info(f"Claimed {len(entries)} idle verification stream entries")
+            return entries
+
+        new = self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"},
+            count=self.batch_size, block=settings.TASK_INGEST_BLOCK_MS
+        )
+        return [(entry_id, fields) for _, stream_entries in new or [] for entry_id, fields in stream_entries]
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert rows, skipping corp_ids that already have a task; returns the inserted rows"""
+        result = self.supabase.table("verification_tasks").upsert(
+            rows, on_conflict="corp_id", ignore_duplicates=True
+        ).execute()
+        return result.data or []
+
+    def _dead_letter(self, entry_id: str, fields: Dict[str, str], error: str) -> None:
+        self.redis.xadd(self.dead_letter_stream, {**fields, "source_id": entry_id, "error": error[:500]})
+        self.redis.xack(self.stream, self.group, entry_id)
+        logger.error(f"❌ Moved verification stream entry {entry_id} to {self.dead_letter_stream}: {error}")
+
+    def process_batch(self, entries: List[Tuple[str, Dict[str, str]]]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Insert one batch and acknowledge what was stored.
+
+        Returns (newly created tasks, number of entries left pending for a retry).
+        """
+        fields_by_id = dict(entries)
+        rows: Dict[str, Dict[str, Any]] = {}
+        ids_by_corp: Dict[str, List[str]] = {}
+        for entry_id, fields in entries:
+            row = parse_stream_entry(fields)
+            if row is None:
+                self._dead_letter(entry_id, fields, "malformed entry")
+                continue
+            # Last entry wins when a filing was reprocessed within the batch
+            rows[row["corp_id"]] = row
+            ids_by_corp.setdefault(row["corp_id"], []).append(entry_id)
+        if not rows:
+            return [], 0
+
+        try:
+            inserted = self._insert(list(rows.values()))
+            self.redis.xack(self.stream, self.group, *[i for ids in ids_by_corp.values() for i in ids])
+            return inserted, 0
+        except Exception as e:
+            if not _is_data_error(e):
+                logger.warning(f"⚠️ Insert of {len(rows)} verification tasks failed, will retry: {e}")
+                return [], len(entries)
+            logger.warning(f"⚠️ Bulk insert of {len(rows)} verification tasks rejected, retrying one by one: {e}")
+
+        # Isolate the rejected rows; the rest of the batch is stored and acknowledged
+        inserted, pending = [], 0
+        for corp_id, row in rows.items():
+            ids = ids_by_corp[corp_id]
+            try:
+                inserted.extend(self._insert([row]))
+                self.redis.xack(self.stream, self.group, *ids)
+            except Exception as e:
+                if _is_data_error(e):
+                    for entry_id in ids:
+                        self._dead_letter(entry_id, fields_by_id[entry_id], str(e))
+                else:
+                    pending += len(ids)
+        return inserted, pending
+
+    def publish(self, tasks: List[Dict[str, Any]]) -> None:
+        """Announce new tasks to every API process (TaskEventListener)"""
+        if not tasks:
+            return
+        message = json.dumps({"type": TASK_CREATED_EVENT, "tasks": [task_event(t) for t in tasks]}, default=str)
+        try:
+            self.redis.publish(settings.TASK_EVENTS_CHANNEL, message)
+        except redis.RedisError as e:
+            logger.warning(f"⚠️ Could not publish {len(tasks)} task events: {e}")
+
+    def run_once(self) -> int:
+        """
+        Read, store and acknowledge one batch.
+
+        Returns the number of entries left pending (database unavailable).
+        """
+        entries = self._read_batch()
+        if not entries:
+            return 0
+        inserted, pending = self.process_batch(entries)
+        self.publish(inserted)
+        self.ingested += len(inserted)
+        if inserted:
+            logger.info(f"📋 Ingested {len(inserted)} verification tasks ({len(entries)} stream entries)")
+        return pending
+
+    def run(self) -> None:
+        if self.redis is None:
+            self.redis = get_stream_redis()
+        logger.info(f"🚀 Verification task ingester {self.consumer} reading {self.stream} ({self.group})")
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                self._ensure_group()
+                while not self._stop.is_set():
+                    if self.run_once():
+                        # Pending entries are read again first; give the database time to recover
+                        self._stop.wait(backoff)
+                        backoff = min(backoff * 2, 30)
+                    else:
+                        backoff = 1
+            except Exception as e:
+                logger.error(f"❌ Verification task ingester error: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def start(self) -> "VerificationTaskIngester":
+        self._thread = threading.Thread(target=self.run, name="task-ingester", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=settings.TASK_INGEST_BLOCK_MS / 1000 + 5)
+
+
+class TaskEventHub:
+    """Fans task events out to the SSE connections of this process"""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        # A client that stopped reading loses events rather than growing memory
+        if not queue.full():
+            queue.put_nowait(event)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        """Deliver an event to every subscriber (safe to call from any thread)"""
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # Loop already closed
+                self.unsubscribe(queue)
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+
+class TaskEventListener:
+    """Relays TASK_EVENTS_CHANNEL messages into a TaskEventHub from a background thread"""
+
+    def __init__(self, hub: TaskEventHub, redis_client=None):
+        self.hub = hub
+        self.redis = redis_client
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run(self) -> None:
+        backoff = 1
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                if self.redis is None:
+                    self.redis = get_stream_redis()
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(settings.TASK_EVENTS_CHANNEL)
+                backoff = 1
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        try:
+                            self.hub.publish(json.loads(message["data"]))
+                        except ValueError:
+                            logger.debug(f"Ignoring malformed task event: {message['data']!r}")
+            except Exception as e:
+                logger.warning(f"⚠️ Task event listener error: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def start(self) -> "TaskEventListener":
+        self._thread = threading.Thread(target=self.run, name="task-events", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    from database import get_db
+
+    logging.basicConfig(
+        level=logging.DEBUG if settings.DEBUG else logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    if not REDIS_AVAILABLE:
+        raise SystemExit("redis is not installed")
+    VerificationTaskIngester(get_db()).run()
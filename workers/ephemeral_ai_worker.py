@@ -32,6 +32,8 @@ from src.queue.job_types import deserialize_job, AIProcessingJob, SupabaseUpload
 from src.ai.prompts import invalid_value
 from src.ai.helper_functions import check_markdown_tables
 from src.utils.pdf_hash_utils import calculate_pdf_hash, check_pdf_duplicate, register_pdf_hash
+from src.core.tracing import get_tracer, TraceStage
+from src.core.metrics import get_metrics
 
 # --- Timeout utility ---
 class TimeoutError(Exception):
@@ -86,7 +88,8 @@ def get_isin(scrip_id: str, max_retries: int = 3, request_timeout: int = 10) ->
 
     for attempt in range(1, max_retries + 1):
         try:
-            resp = requests.get(isin_url, headers=headers, timeout=request_timeout)
+            with get_metrics().external_call("bse", "isin_lookup"):
+                resp = requests.get(isin_url, headers=headers, timeout=request_timeout)
             resp.raise_for_status()
             data = resp.json()
             return data.get("ISIN") or data.get("isin") or "N/A"
@@ -215,7 +218,8 @@ class RateLimitedGeminiClient:
 
         try:
             # If the inner call times out, with_timeout will raise TimeoutError
-            response = with_timeout(_generate, timeout_seconds=180)()
+            with get_metrics().external_call("gemini", "generate_content"):
+                response = with_timeout(_generate, timeout_seconds=180)()
             self.last_request_time = time.time()
             return response
         except TimeoutError:
@@ -245,7 +249,8 @@ class RateLimitedFiles:
             return self.files_client.upload(file=file)
 
         try:
-            result = with_timeout(_upload, timeout_seconds=90)()
+            with get_metrics().external_call("gemini", "file_upload"):
+                result = with_timeout(_upload, timeout_seconds=90)()
             self.last_request_time = time.time()
             return result
         except TimeoutError:
@@ -373,8 +378,9 @@ class EphemeralAIWorker:
                 "Referer": "https://www.bseindia.com/",
                 "Origin": "https://www.bseindia.com"
             }
-            response = requests.get(url, timeout=30, headers=headers)
-            response.raise_for_status()
+            with get_metrics().external_call("bse", "pdf_download"):
+                response = requests.get(url, timeout=30, headers=headers)
+                response.raise_for_status()
             with open(filepath, "wb") as file:
                 file.write(response.content)
             logger.info(f"✅ Downloaded PDF to: {filepath} (size: {len(response.content)} bytes)")
@@ -669,7 +675,8 @@ class EphemeralAIWorker:
                 )
 
             try:
-                filepath = self.download_pdf_file(pdf_url)
+                with get_tracer().span(job.corp_id, TraceStage.PDF_DOWNLOAD):
+                    filepath = self.download_pdf_file(pdf_url)
             except Exception as e:
                 logger.error(f"Failed to download PDF: {e}")
                 return "Error", f"Failed to download PDF: {str(e)}", "", "", [], [], "Neutral", None, None, False, None
@@ -679,6 +686,7 @@ class EphemeralAIWorker:
             pdf_size_bytes = None
             is_duplicate = False
             original_announcement_id = None
+            hash_check_started = time.monotonic()
             
             try:
                 # calculate_pdf_hash returns (hash_string, file_size) tuple
@@ -737,6 +745,11 @@ class EphemeralAIWorker:
                                         except:
                                             pass
                                         
+                                        get_tracer().record(
+                                            job.corp_id, TraceStage.HASH_CHECK,
+                                            duration_ms=(time.monotonic() - hash_check_started) * 1000,
+                                            is_duplicate=True
+                                        )
                                         # Return duplicate result (skipping AI processing)
                                         return (dup_category, dup_summary, dup_headline, "", [], [], dup_sentiment, 
                                                 pdf_hash, pdf_size_bytes, True, original_announcement_id)
@@ -766,9 +779,15 @@ class EphemeralAIWorker:
                         logger.warning(f"⚠️ Could not check for duplicate PDF: {dup_check_error}")
             except Exception as hash_error:
                 logger.error(f"❌ Failed to calculate PDF hash: {hash_error}")
+            get_tracer().record(
+                job.corp_id, TraceStage.HASH_CHECK,
+                duration_ms=(time.monotonic() - hash_check_started) * 1000,
+                is_duplicate=is_duplicate
+            )
 
             try:
-                result = self.ai_process_pdf(filepath,original_summary)
+                with get_tracer().span(job.corp_id, TraceStage.GEMINI_CALL):
+                    result = self.ai_process_pdf(filepath,original_summary)
                 logger.info(f"🎯 AI processing result for {job.job_id}: {result[0] if result else 'None'}")
                 # Add PDF hash info to result tuple
                 if result and len(result) == 7:
@@ -793,6 +812,7 @@ class EphemeralAIWorker:
         return category == "Error" or not self.is_valid_category(category)
 
     def requeue_failed_job(self, job: AIProcessingJob, retry_count: int, reason: str) -> bool:
+        get_metrics().inc("backfin_job_retries_total", {"worker": "ai", "kind": "delayed"})
         try:
             logger.info(f"🔄 Requeuing failed job {getattr(job, 'job_id', '<unknown>')} with reason: {reason}")
             base_delay = 300  # 5 minutes
@@ -838,7 +858,8 @@ class EphemeralAIWorker:
                             expected_corp_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"bse:{ann_newsid}"))
                         except Exception:
                             pass
-                    existing = supabase.table("corporatefilings").select("corp_id").eq("corp_id", expected_corp_id).execute()
+                    with get_metrics().external_call("supabase", "corporatefilings_exists"):
+                        existing = supabase.table("corporatefilings").select("corp_id").eq("corp_id", expected_corp_id).execute()
                     if existing.data and len(existing.data) > 0:
                         logger.warning(f"⚠️ Corp_id {expected_corp_id} already exists in Supabase - skipping duplicate processing")
                         return True
@@ -864,6 +885,7 @@ class EphemeralAIWorker:
 
                 if self.should_retry_processing(category):
                     retry_count += 1
+                    get_metrics().inc("backfin_job_retries_total", {"worker": "ai", "kind": "inline"})
                     last_result = result
                     if retry_count < self.max_retries_per_job:
                         logger.warning(f"⚠️ AI processing returned retryable category='{category}', attempt {retry_count}/{self.max_retries_per_job} for corp_id: {job.corp_id}")
@@ -913,6 +935,7 @@ class EphemeralAIWorker:
 
             except TimeoutError as te:
                 retry_count += 1
+                get_metrics().inc("backfin_job_retries_total", {"worker": "ai", "kind": "inline"})
                 logger.warning(f"⏱️ Timeout during AI processing (attempt {retry_count}/{self.max_retries_per_job}) for corp_id {job.corp_id}: {te}")
                 if retry_count < self.max_retries_per_job:
                     time.sleep(2 * retry_count)
@@ -926,6 +949,7 @@ class EphemeralAIWorker:
 
             except Exception as e:
                 retry_count += 1
+                get_metrics().inc("backfin_job_retries_total", {"worker": "ai", "kind": "inline"})
                 logger.error(f"❌ AI processing exception (attempt {retry_count}/{self.max_retries_per_job}) for corp_id {job.corp_id}: {e}")
                 if retry_count < self.max_retries_per_job:
                     time.sleep(2 * retry_count)
@@ -1110,6 +1134,8 @@ class EphemeralAIWorker:
                         logger.warning(f"⚠️ Unexpected job type: {type(job)} - skipping")
                         continue
 
+                    get_tracer().record_wait(job.corp_id, TraceStage.DEQUEUE, since_stage=TraceStage.ENQUEUE, worker=self.worker_id)
+
                     lock_key = f"worker_processing:{job.corp_id}:{job.job_id}"
                     self.current_lock_key = lock_key
                     try:
@@ -1146,6 +1172,7 @@ class EphemeralAIWorker:
                             success = False
 
                         last_job_time = time.time()
+                        get_metrics().inc("backfin_jobs_processed_total", {"worker": "ai", "outcome": "success" if success else "failure"})
                         if success:
                             logger.info(f"✅ Job {job.job_id} processed successfully")
                         else:
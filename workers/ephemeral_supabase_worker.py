@@ -30,6 +30,10 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from src.queue.redis_client import RedisConfig, QueueNames
 from src.queue.job_types import deserialize_job, SupabaseUploadJob, InvestorAnalysisJob, serialize_job
+from src.core.tracing import get_tracer, TraceStage
+from src.core.metrics import get_metrics
+from src.core.cache import invalidate_datasets
+from src.services.announcement_publisher import get_announcement_publisher
 
 # ---- Configuration ----
 MAIN_QUEUE = QueueNames.SUPABASE_UPLOAD
@@ -59,7 +63,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(worker_id)
 
-def _send_to_api_if_needed(data):
+def _send_to_api_if_needed(data, supabase=None):
         """Helper method to send data to API if needed"""
         category = data.get("category")
         if category in (None, "Procedural/Administrative", "Error"):
@@ -76,6 +80,16 @@ def _send_to_api_if_needed(data):
             logger.info("Skipping API call due to empty summary and ai_summary")
             return
         
+        # Publish straight to the Socket.IO message queue when the API runs
+        # with one; every replica relays it to its own clients
+        publisher = get_announcement_publisher()
+        if publisher.enabled:
+            result = publisher.publish(data, supabase)
+            if result["status"] != "error":
+                logger.info(f"Published via Socket.IO message queue: {result['message']}")
+                return
+            logger.warning("Socket.IO message queue publish failed, falling back to API")
+
         # Send to API endpoint (which will handle websocket communication)
         try:
             # Use Docker service name for container communication
@@ -306,7 +320,8 @@ class EphemeralSupabaseWorkerV2:
                 while attempts < 3:
                     attempts += 1
                     try:
-                        resp = supabase.table(table_name).insert(payload).execute()
+                        with get_metrics().external_call("supabase", f"insert_{table_name}"):
+                            resp = supabase.table(table_name).insert(payload).execute()
                         if hasattr(resp, "error") and resp.error:
                             errstr = str(resp.error)
                             if "duplicate key" in errstr.lower() or "23505" in errstr:
@@ -371,19 +386,21 @@ class EphemeralSupabaseWorkerV2:
                 if getattr(check_resp, "data", None) and len(check_resp.data) > 0:
                     logger.warning(f"Child: corp_id {job.corp_id} already exists - skipping insert")
                 else:
-                    ok = supabase_insert_table("corporatefilings", upload_data)
+                    with get_tracer().span(job.corp_id, TraceStage.UPLOAD, table="corporatefilings"):
+                        ok = supabase_insert_table("corporatefilings", upload_data)
                     if not ok:
                         logger.error("Child: Failed to insert corporatefilings after retries")
                         sys.exit(6)
                     if ok:
                         logger.info(f"Child: Inserted corp_id {job.corp_id} into corporatefilings")
+                        invalidate_datasets("corporate_filings")
                         try:
                             update_count(upload_data)
                             logger.info("Child: Updated announcement count")
                         except Exception as e:
                             logger.warning(f"Child: Failed to update announcement count: {e}")
                         # Send to API for websocket broadcast if needed
-                        _send_to_api_if_needed(upload_data)
+                        _send_to_api_if_needed(upload_data, supabase)
                         
                         # Queue Telegram notification for watchlist users
                         try:
@@ -430,6 +447,7 @@ class EphemeralSupabaseWorkerV2:
                         ok = supabase_insert_table("financial_results", financial_data)
                         if ok:
                             logger.info("Child: Uploaded financial data")
+                            invalidate_datasets("financial_results")
                 except Exception as e:
                     logger.warning(f"Child: Failed to upload financial data: {e}")
 
@@ -576,6 +594,7 @@ class EphemeralSupabaseWorkerV2:
                         pass
                     self.jobs_processed += 1
                     last_job_time = time.time()
+                    get_metrics().inc("backfin_jobs_processed_total", {"worker": "supabase", "outcome": "success"})
                     logger.info(f"✅ Completed job {job_id} ({self.jobs_processed}/{self.max_jobs_per_session})")
                     continue
 
@@ -585,7 +604,9 @@ class EphemeralSupabaseWorkerV2:
                 except Exception:
                     retries = 1
 
+                get_metrics().inc("backfin_jobs_processed_total", {"worker": "supabase", "outcome": "failure"})
                 if retries <= MAX_RETRIES:
+                    get_metrics().inc("backfin_job_retries_total", {"worker": "supabase", "kind": "requeue"})
                     try:
                         self.redis_client.lpush(MAIN_QUEUE, job_json)
                         logger.info(f"🔁 Requeued job {job_id} for retry {retries}/{MAX_RETRIES}")
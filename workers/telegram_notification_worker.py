@@ -5,6 +5,10 @@ Telegram Notification Worker
 Consumes notification jobs from Redis queue and sends Telegram messages.
 This worker handles the async nature of Telegram notifications to avoid
 blocking the main Supabase worker.
+
+Up to TELEGRAM_JOB_CONCURRENCY jobs are processed at once; each job fans out
+to its subscribers concurrently under the notifier's shared rate limiter, and
+notification logs / subscription stats are flushed in bulk.
 """
 
 import os
@@ -40,6 +44,7 @@ FAILED_QUEUE = "backfin:queue:telegram_failed"
 BRPOP_TIMEOUT = 5
 MAX_RETRIES = 3
 PROCESSING_TTL = 60  # seconds
+JOB_CONCURRENCY = int(os.getenv('TELEGRAM_JOB_CONCURRENCY', '4'))
 
 # Logging
 worker_id = f"telegram_worker_{os.getpid()}"
@@ -279,41 +284,56 @@ class TelegramNotificationWorker:
         except Exception as e:
             logger.error(f"Error moving job to failed queue: {e}")
     
+    async def handle_job(self, job_json: str):
+        """Process a job and settle it in the processing list"""
+        try:
+            success = await self.process_job(job_json)
+            
+            if success:
+                self.complete_job(job_json)
+                self.jobs_processed += 1
+            else:
+                self.fail_job(job_json, "Processing returned False")
+                
+        except Exception as e:
+            logger.exception(f"Job processing error: {e}")
+            self.fail_job(job_json, str(e))
+    
     async def run_async(self):
         """Main async worker loop"""
-        logger.info(f"Starting Telegram notification worker: {self.worker_id}")
+        logger.info(f"Starting Telegram notification worker: {self.worker_id} ({JOB_CONCURRENCY} concurrent jobs)")
         
         if not self.connect_redis():
             logger.error("Failed to connect to Redis, exiting")
             return
         
         self.running = True
+        in_flight = set()
         
         while self.running:
             try:
-                # Get job from queue
-                job_json = self.get_job()
+                if len(in_flight) >= JOB_CONCURRENCY:
+                    await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                
+                # Blocking pop runs in a thread so in-flight jobs keep sending
+                job_json = await asyncio.to_thread(self.get_job)
                 
                 if not job_json:
                     continue
                 
-                # Process the job
-                try:
-                    success = await self.process_job(job_json)
-                    
-                    if success:
-                        self.complete_job(job_json)
-                        self.jobs_processed += 1
-                    else:
-                        self.fail_job(job_json, "Processing returned False")
-                        
-                except Exception as e:
-                    logger.exception(f"Job processing error: {e}")
-                    self.fail_job(job_json, str(e))
+                task = asyncio.create_task(self.handle_job(job_json))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
                 
             except Exception as e:
                 logger.exception(f"Worker loop error: {e}")
-                time.sleep(5)  # Back off on errors
+                await asyncio.sleep(5)  # Back off on errors
+        
+        if in_flight:
+            logger.info(f"Waiting for {len(in_flight)} in-flight jobs")
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        await get_notifier().recorder.flush()
         
         logger.info(f"Worker stopped. Processed {self.jobs_processed} jobs.")
     